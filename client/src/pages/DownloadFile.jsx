@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from "react";
 import { localPost } from "../services/api";
+import { LOCAL_API } from "../config/api";
 import { useNavigate } from "react-router-dom";
 
 export default function DownloadFile() {
@@ -33,6 +34,7 @@ export default function DownloadFile() {
             id: result.id,
             filename: result.filename,
             fileData: result.file_data,           // base64 decrypted file
+            downloadUrl: result.download_url,     // large files: streamed instead
             fileSize: result.file_size,
             kyberCiphertext: result.kyber_ciphertext,  // hex
             signature: result.signature,               // base64
@@ -56,6 +58,16 @@ export default function DownloadFile() {
 
   const triggerDownload = (file) => {
     try {
+      if (!file.fileData && file.downloadUrl) {
+        const a = document.createElement("a");
+        a.href = LOCAL_API + file.downloadUrl;
+        a.download = file.filename;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        setTimeout(() => navigate("/filedownload"), 1500);
+        return;
+      }
       const binary = atob(file.fileData);
       const bytes = new Uint8Array(binary.length);
       for (let i = 0; i < binary.length; i++) {
@@ -7,6 +7,7 @@ export default function UploadFile() {
   const [selectedFile, setSelectedFile] = useState(null);
   const [encryptedFile, setEncryptedFile] = useState(null);
   const [encryptedFileName, setEncryptedFileName] = useState(null);
+  const [containerFileName, setContainerFileName] = useState(null);
   const [kyberCiphertext, setKyberCiphertext] = useState(null);
   const [sharedSecret, setSharedSecret] = useState(null);
   const [fileHash, setFileHash] = useState(null);
@@ -26,6 +27,7 @@ export default function UploadFile() {
     setSelectedFile(file);
     setEncryptedFile(result.encrypted_file);
     setEncryptedFileName(result.encrypted_file_name);
+    setContainerFileName(result.container_file_name);  // single-file transfer
     setKyberCiphertext(result.kyber_ciphertext);       // hex string
     setSharedSecret(result.shared_secret);             // hex string (becomes AES key)
     setFileHash(result.file_hash);                     // hex string
@@ -113,6 +115,7 @@ export default function UploadFile() {
       try {
         const payload = {
           encrypted_file_name: encryptedFileName,
+          container_file_name: containerFileName, // sent as is when present
           encryptedFile: encryptedFile,           // base64 string
           signature: signature,                   // base64 string
           kyber_ciphertext: kyberCiphertext,      // hex string
@@ -138,6 +141,7 @@ export default function UploadFile() {
     setSelectedFile(null);
     setEncryptedFile(null);
     setEncryptedFileName(null);
+    setContainerFileName(null);
     setKyberCiphertext(null);
     setSharedSecret(null);
     setFileHash(null);
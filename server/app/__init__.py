@@ -4,9 +4,11 @@ from .config import Config
 
 def create_app():
     app = Flask(__name__)
-    app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50 MB
     app.config.from_object(Config)
 
+    from .extensions import app_state
+    app_state.init_app(app)
+
     CORS(app)
 
     CORS(app, origins=["http://localhost:5173"])
@@ -17,6 +19,13 @@ def create_app():
     from app.routes.pqc_file_routes import file_pqc_bp
     from app.routes.pqc_handshake_routes import pqc_handshake_bp
     from app.routes.pqc_control_routes import pqc_control_bp
+    from app.routes.key_routes import key_bp
+    from app.routes.cipher_routes import cipher_bp
+    from app.routes.pqc_batch_routes import pqc_batch_bp
+    from app.routes.verify_routes import verify_bp
+    from app.routes.pqc_delta_routes import pqc_delta_bp
+    from app.routes.session_routes import session_bp
+    from app.routes.metrics_routes import metrics_bp
     
     app.register_blueprint(file_bp)
     app.register_blueprint(health_bp)
@@ -25,5 +34,32 @@ def create_app():
     app.register_blueprint(file_pqc_bp)
     app.register_blueprint(pqc_handshake_bp)
     app.register_blueprint(pqc_control_bp)
+    app.register_blueprint(key_bp)
+    app.register_blueprint(cipher_bp)
+    app.register_blueprint(pqc_batch_bp)
+    app.register_blueprint(verify_bp)
+    app.register_blueprint(pqc_delta_bp)
+    app.register_blueprint(session_bp)
+    app.register_blueprint(metrics_bp)
+
+    from app.services.cipher_suite_service import init_cipher_suite
+    init_cipher_suite(app)
+
+    from app.services.key_lifecycle_service import key_lifecycle
+    key_lifecycle.init_app(app)
 
     return app
+
+
+def shutdown_app():
+    """
+    Graceful stop of a worker process, after its in-flight requests:
+    finishes acknowledged deliveries still being decrypted and the
+    queued CPU work, and hands the key pool over to another worker.
+    """
+    from app.services import cpu_pool_service, pqc_inbox_service
+    from app.services.key_lifecycle_service import key_lifecycle
+
+    key_lifecycle.stop()
+    pqc_inbox_service.shutdown()
+    cpu_pool_service.shutdown()
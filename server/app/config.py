@@ -7,4 +7,130 @@ class Config:
     DECRYPTED_FOLDER = os.path.join(BASE_DIR,"..","decrypted_files")
     PQC_KEY_FOLDER = os.path.join(BASE_DIR, "..", "pqc_keys")
 
-    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 20 MBq
+    # Node state: role, peer sessions, inboxes (see services/state_store.py).
+    # "memory" serves one process; "sqlite" is shared by all worker processes
+    STATE_BACKEND = "memory"
+    STATE_DB_PATH = os.path.join(BASE_DIR, "..", "state", "node_state.db")
+
+    # Request bodies (see utils/limits.py): MAX_CONTENT_LENGTH for buffered
+    # JSON / control endpoints, the role limits for streaming endpoints
+    MAX_CONTENT_LENGTH = 64 * 1024 * 1024
+    SENDER_MAX_UPLOAD_BYTES = 16 * 1024 * 1024 * 1024      # 0 → unlimited
+    RECEIVER_MAX_UPLOAD_BYTES = 16 * 1024 * 1024 * 1024
+    INLINE_FILE_MAX_BYTES = 32 * 1024 * 1024    # larger files are not base64'd into JSON
+
+    # Admission control for encrypt / decrypt endpoints
+    # (see services/admission_service.py)
+    ADMISSION_ENABLED = True
+    ADMISSION_MAX_JOBS = max(2, os.cpu_count() or 1)    # concurrent jobs (CPU budget)
+    ADMISSION_MEMORY_BUDGET_BYTES = 1024 * 1024 * 1024
+    ADMISSION_MAX_QUEUE = 64
+    ADMISSION_QUEUE_TIMEOUT_SECONDS = 30
+    ADMISSION_JOB_BASE_BYTES = 16 * 1024 * 1024          # buffers of a streamed job
+    ADMISSION_INLINE_FACTOR = 3                          # inlined file: read, base64, JSON
+    ADMISSION_AGING_BYTES_PER_SECOND = 64 * 1024 * 1024  # queued jobs gain priority as they wait
+
+    # PQC parameter sets (see services/pqc_param_service.py)
+    PQC_KEM_ALGORITHM = "ML-KEM-512"
+    PQC_SIG_ALGORITHM = "ML-DSA-44"
+    PQC_ALLOWED_KEM_ALGORITHMS = ["ML-KEM-512", "ML-KEM-768", "ML-KEM-1024"]
+    PQC_ALLOWED_SIG_ALGORITHMS = ["ML-DSA-44", "ML-DSA-65", "ML-DSA-87"]
+    PQC_MIN_SECURITY_LEVEL = 1  # NIST category
+
+    # Classical suites (see services/classical_suite_service.py)
+    CLASSICAL_SUITE = "RSA-2048"
+    CLASSICAL_ALLOWED_SUITES = ["RSA-2048", "X25519-Ed25519"]
+
+    # Bulk cipher suites (see services/cipher_suite_service.py)
+    CIPHER_SUITE = "auto"   # "auto" → fastest allowed suite measured at startup
+    CIPHER_ALLOWED_SUITES = [
+        "AES-256-GCM",
+        "ChaCha20-Poly1305",
+        "AES-256-CTR-HMAC-SHA256",
+        "AES-256-CBC",      # legacy files only, never auto-selected
+    ]
+    CIPHER_SEGMENT_SIZE = 1024 * 1024       # plaintext bytes per authenticated segment
+    CIPHER_CALIBRATION_BYTES = 4 * 1024 * 1024
+
+    # Compress before encrypting (see services/compression_service.py)
+    COMPRESSION_ENABLED = False
+    COMPRESSION_CODEC = "zlib"              # "zlib", "lzma" or "bz2"
+    COMPRESSION_LEVEL = 1                   # cheapest zlib level wins on Wi-Fi links (benchmarks compress)
+    COMPRESSION_SAMPLE_BYTES = 256 * 1024   # sampled to estimate compressibility
+    COMPRESSION_MIN_SAVING = 0.10           # skip unless the sample shrinks by 10 %
+
+    # Signed hash for PQC transfers: "sha512" (linear) or "merkle-sha512"
+    PQC_HASH_MODE = "merkle-sha512"
+    MERKLE_LEAF_SIZE = 1024 * 1024          # containers refuse leaves below 64 KiB
+    MERKLE_WORKERS = None   # own threads for leaf hashing, None → shared CPU pool (CPU_WORKERS)
+
+    # Share one Dilithium signature between documents signed within
+    # the window (see services/coalescing_signer_service.py)
+    SIGN_COALESCE_ENABLED = False
+    SIGN_COALESCE_WINDOW_MS = 5
+    SIGN_COALESCE_MAX_ITEMS = 32
+
+    # Signature verification (see services/verification_service.py)
+    VERIFY_WORKERS = 8
+    VERIFY_CACHE_SIZE = 4096            # cached (hash, signature, key) results
+    VERIFY_BATCH_MAX_ITEMS = 1000
+
+    # Reuse finished artifacts for repeated documents to the same receiver
+    # (see services/artifact_cache_service.py); repeats become linkable
+    ARTIFACT_CACHE_ENABLED = False
+    ARTIFACT_CACHE_FOLDER = os.path.join(BASE_DIR, "..", "artifact_cache")
+    ARTIFACT_CACHE_MAX_ENTRIES = 256
+    ARTIFACT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+    ARTIFACT_CACHE_TTL_SECONDS = 3600
+
+    # Idempotent delivery (see services/delivery_service.py)
+    DELIVERY_RETRIES = 3                    # sender re-sends after a timeout / connection error
+    DELIVERY_RETRY_BACKOFF_SECONDS = 1.0    # doubled after every attempt
+    DELIVERY_RETRY_AFTER_MAX_SECONDS = 30   # cap on a receiver's Retry-After (429 / 503)
+    DELIVERY_INDEX_SIZE = 10000             # completed transfers remembered by the receiver
+    DELIVERY_INDEX_TTL_SECONDS = 24 * 3600
+    DELIVERY_WAIT_SECONDS = 300             # duplicate waits this long for the first attempt
+
+    # Receiver answers once a delivery is spooled and its signature
+    # checked, then decrypts on a worker pool (services/pqc_inbox_service.py)
+    RECEIVE_ASYNC_DECRYPT = True
+    RECEIVE_WORKERS = 2
+    RECEIVE_MAX_PENDING = 32    # more waiting → decrypt before answering (backpressure)
+
+    # Keep verified ciphertext next to queued files so byte ranges can be
+    # decrypted on demand (GET /pqc/files/<id>/range)
+    PQC_KEEP_CIPHERTEXT = False
+
+    # Shared pool for independent workflow stages (stage_graph_service)
+    STAGE_WORKERS = 4
+
+    # Shared pool for CPU-bound segment sealing / leaf hashing
+    # (see services/cpu_pool_service.py), 0 → run on the request thread
+    CPU_WORKERS = os.cpu_count() or 1
+    CPU_MAX_QUEUED = 64         # queued + running tasks, more blocks the submitter (backpressure)
+    CPU_PIPELINE_DEPTH = 4      # segments in flight per stream
+
+    # Production server (gunicorn.conf.py), see README "Production Serving"
+    SERVE_BIND = "0.0.0.0:5050"
+    SERVE_WORKERS = 0                 # worker processes, 0 → one per core
+    SERVE_THREADS = 16                # request threads per worker
+    SERVE_GRACEFUL_TIMEOUT = 300      # seconds in-flight transfers get to finish on shutdown
+    SERVE_KEEPALIVE = 5
+
+    # Batch transfers (see services/pqc_batch_service.py)
+    BATCH_WORKERS = 4
+    BATCH_ALLOWED_DIRECTORIES = []   # server-side folders a batch may read, empty → uploads only
+
+    # Delta transfers (see services/pqc_delta_service.py)
+    DELTA_MIN_CHUNK_SIZE = 16 * 1024
+    DELTA_AVG_CHUNK_SIZE = 64 * 1024        # power of two
+    DELTA_MAX_CHUNK_SIZE = 256 * 1024
+    DELTA_STORE_FOLDER = os.path.join(BASE_DIR, "..", "delta_store")
+    DELTA_STORE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # per sender, least recently used chunks go first
+
+    # Pre-generated key pools (see services/key_lifecycle_service.py)
+    KEY_POOL_ENABLED = True
+    KEY_POOL_FOLDER = os.path.join(BASE_DIR, "..", "key_pool")
+    KEY_POOL_SIZE = 2                       # ready pairs per kind / parameter set
+    KEY_MAX_AGE_SECONDS = 7 * 24 * 3600     # rotate keys older than a week
+    KEY_POOL_RETRY_SECONDS = 30             # backoff after a failed keygen
@@ -1,13 +1,152 @@
+import time
+
+from app.services.state_store import MemoryStateStore, open_state_store
+
+
+# Node state, in the state store (see services/state_store.py)
+NODE_FIELDS = {
+    "role": "IDLE",     # IDLE | SENDER | RECEIVER
+    "receiver_ip": None,
+    "receiver_port": 5000,
+    "receiver_name": None,
+
+    # Classical suite of this node (RSA-2048 | X25519-Ed25519)
+    "classical_suite": None,
+
+    # PQC parameter sets of this node's key pairs
+    "kem_algorithm": None,
+    "sig_algorithm": None,
+    "pqc_cost_matrix": None,
+
+    "accepting_files": False,
+    "active_peer": "default",
+}
+
+# Per peer session: the peer's keys and the suites negotiated with it
+PEER_FIELDS = {
+    "peer_rsa_public_key": None,
+    "peer_signature_public_key": None,
+    "peer_classical_suite": None,
+    "peer_kem_algorithm": None,
+    "peer_sig_algorithm": None,
+    "peer_kem_offer": None,
+    "peer_kyber_public_key": None,
+    "peer_dilithium_public_key": None,
+    # id the peer keeps this node's session under (sent as X-Peer-Id)
+    "local_peer_id": None,
+}
+
+HANDSHAKE_DEFAULTS = {
+    "should_stop": False,
+    "handshake_received": False,
+    "sender_info": {},
+    "ack_received": False,
+    "receiver_info": {},
+}
+
+
+class SharedRecord:
+    """Attribute view of one store record, every write goes to the store."""
+
+    def __init__(self, store, collection: str, key: str):
+        object.__setattr__(self, "_location", (store, collection, key))
+
+    def __getattr__(self, name):
+        store, collection, key = self._location
+        record = store.get(collection, key) or {}
+        if name not in record:
+            raise AttributeError(name)
+        return record[name]
+
+    def __setattr__(self, name, value):
+        store, collection, key = self._location
+        store.update(collection, key, {name: value})
+
+
 class AppState:
-    role = "IDLE"   # IDLE | SENDER | RECEIVER
-    receiver_ip = None
-    receiver_port = 5000
+    """
+    NODE_FIELDS and PEER_FIELDS read and write the state store, so every
+    request thread (and with STATE_BACKEND = "sqlite" every worker) sees
+    the same node. The peer_* fields belong to the active peer session;
+    other attributes (thread handles, this process's cipher calibration)
+    stay local to the process.
+    """
 
-    peer_rsa_public_key = None
-    peer_signature_public_key = None
+    # Bulk cipher suite picked by this process's startup calibration
+    cipher_suite = None
+    cipher_calibration = None
 
     discovery_thread = None
-    accepting_files = False
+
+    def __init__(self):
+        object.__setattr__(self, "store", MemoryStateStore())
+
+    def init_app(self, app):
+        object.__setattr__(self, "store", open_state_store(app.config))
+
+    def __getattr__(self, name):
+        if name in NODE_FIELDS:
+            record = self.store.get("node", "self") or {}
+            return record.get(name, NODE_FIELDS[name])
+        if name in PEER_FIELDS:
+            record = self.store.get("sessions", self.active_peer) or {}
+            return record.get(name, PEER_FIELDS[name])
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in NODE_FIELDS:
+            self.store.update("node", "self", {name: value})
+        elif name in PEER_FIELDS:
+            self.store.update("sessions", self.active_peer, {
+                "peer_id": self.active_peer,
+                "updated_at": time.time(),
+                name: value
+            })
+        else:
+            object.__setattr__(self, name, value)
+
+    # ---------------- peer sessions ----------------
+
+    def use_peer(self, peer_id: str):
+        """Makes `peer_id` the active session (created if new)."""
+        record = self.store.get("sessions", peer_id)
+        if record is None:
+            self.store.put("sessions", peer_id, {
+                "peer_id": peer_id,
+                "created_at": time.time(),
+                "updated_at": time.time()
+            })
+        self.active_peer = peer_id
+
+    def sessions(self) -> list:
+        return self.store.values("sessions")
+
+    def peer_session(self, peer_id: str = None) -> dict:
+        """
+        Keys and suites of one peer, looked up per transfer rather than
+        through the active peer alone.
+
+        Returns:
+            session record of `peer_id` (None → active peer), {} if unknown
+        """
+        record = self.store.get("sessions", peer_id or self.active_peer) or {}
+        return {**PEER_FIELDS, **record}
+
+    # ---------------- handshake listeners ----------------
+
+    def handshake_state(self, name: str, reset: bool = False):
+        """
+        Store-backed BroadcastState of a handshake listener thread, so a
+        status poll served by any worker sees what the listener saw.
+
+        Returns:
+            SharedRecord → None when never started (and not reset)
+        """
+        if reset:
+            self.store.put("handshakes", name, HANDSHAKE_DEFAULTS)
+        elif self.store.get("handshakes", name) is None:
+            return None
+        return SharedRecord(self.store, "handshakes", name)
 
 
 app_state = AppState()
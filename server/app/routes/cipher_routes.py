@@ -0,0 +1,37 @@
+from flask import Blueprint, jsonify, current_app
+from app.extensions import app_state
+from app.services.cipher_suite_service import (
+    CIPHER_SUITES,
+    allowed_cipher_suites,
+    calibrate_cipher_suites,
+    get_cipher_suite
+)
+
+cipher_bp = Blueprint("cipher", __name__)
+
+
+# ======================================================
+# Bulk cipher suites + calibration
+# ======================================================
+
+@cipher_bp.route("/cipher/suites", methods=["GET"])
+def list_cipher_suites():
+    """Supported suites, policy, the suite used for new files and the last calibration"""
+    return jsonify({
+        "suites": CIPHER_SUITES,
+        "allowed": allowed_cipher_suites(),
+        "configured": current_app.config["CIPHER_SUITE"],
+        "selected": get_cipher_suite(),
+        "segment_size": current_app.config["CIPHER_SEGMENT_SIZE"],
+        "calibration": app_state.cipher_calibration
+    }), 200
+
+
+@cipher_bp.route("/cipher/calibrate", methods=["POST"])
+def recalibrate_cipher_suites():
+    """Re-time the allowed suites on this host and select the fastest"""
+    calibration = calibrate_cipher_suites()
+    return jsonify({
+        "calibration": calibration,
+        "in_use": get_cipher_suite()
+    }), 200
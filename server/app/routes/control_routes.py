@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify, current_app
-from app.services.key_service import (
-    generate_signature_keys,
-    generate_rsa_keys
+from app.services.key_lifecycle_service import key_lifecycle
+from app.services.classical_suite_service import (
+    CLASSICAL_SUITES,
+    allowed_suites,
+    default_suite,
+    ensure_suite_allowed
 )
 from app.utils.network_utils import get_local_ip, broadcast_receiver, listen_for_receiver
 import threading
@@ -16,17 +19,27 @@ def select_role():
     if role not in ["sender", "receiver"]:
         return jsonify({"error": "Invalid role"}), 400
 
+    # Sender picks the classical suite; the receiver follows it in the handshake
+    try:
+        suite = ensure_suite_allowed(request.json.get("suite") or default_suite())
+    except ValueError as e:
+        return jsonify({"error": str(e), "allowed": allowed_suites()}), 400
+
     app_state.role = role.upper()
+    app_state.classical_suite = suite
 
-    # Generate keys on demand
+    # Bind pre-generated keys (generated in the background if the pool is empty)
     if role == "sender":
-        generate_signature_keys()
-        print("Generated signature keys for sender")
+        ready = key_lifecycle.bind_key_pair(*CLASSICAL_SUITES[suite]["sig_key"])
+        print(f"Bound {suite} signature keys for sender")
     elif role == "receiver":
-        generate_rsa_keys()
-        print("Generated RSA keys for receiver")
+        ready = key_lifecycle.bind_key_pair(*CLASSICAL_SUITES[suite]["kem_key"])
+        print(f"Bound {suite} key transport keys for receiver")
 
     return jsonify({
-        "message": f"Role set to {role}"
-    })
+        "message": f"Role set to {role}",
+        "suite": suite,
+        "keys_ready": ready,
+        "status_url": "/keys/status"
+    }), 200 if ready else 202
     
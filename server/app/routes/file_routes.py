@@ -1,19 +1,39 @@
 import uuid
 from flask import Blueprint, request, jsonify, current_app
-from app.services.file_service import save_uploaded_file
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.services.file_service import (
+    DOWNLOADS,
+    inline_b64,
+    open_upload_stream,
+    save_uploaded_file,
+    send_and_remove
+)
+from app.utils.limits import admitted, upload_limit
+from app.utils.multipart import READ_CHUNK_SIZE, StreamedMultipartBody
+from app.utils.peers import peer_headers, sending_peer
 from app.services.encryption_service import aes_encrypt_file
 from app.extensions import app_state
 import os
+import shutil
 import requests
 import base64
 from cryptography.hazmat.primitives import serialization
 from app.services.workflow_service import decrypt_file_workflow
-from app.services.key_service import load_rsa_private_key
 from app.services.workflow_service import encrypt_file_workflow
-from app.services.key_service import load_signature_private_key
+from app.services.classical_suite_service import (
+    LEGACY_SUITE,
+    ensure_suite_allowed,
+    get_classical_suite,
+    load_kem_private_key,
+    load_signing_private_key
+)
+from app.services.cipher_suite_service import ensure_cipher_allowed
 
 file_bp = Blueprint("files", __name__)
 
+# State store collection of received files (services/state_store.py)
+INBOX = "inbox"
+
 
 
 @file_bp.route("/secureUpload", methods=["POST"])
@@ -43,48 +63,62 @@ def secureUpload_file():
     })
 
 @file_bp.route("/encrypt", methods=["POST"])
+@admitted
+@upload_limit("SENDER")
 def encrypt_file():
     # Sender-only operation
     if app_state.role != "SENDER":
         return jsonify({"error": "Not in sender mode"}), 403
-    print("Request files:", request.files)
-    print(request.files)
-    if "file" not in request.files:
+
+    # Parse the body as it arrives; cipher_suite / peer_id must precede the file
+    try:
+        upload = open_upload_stream(request)
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except ValueError:
         print("File not found in request")
         return jsonify({"error": "File missing"}), 400
+    print("Upload:", upload.filename, upload.form)
 
-    if app_state.peer_rsa_public_key is None:
+    peer_rsa_public_key = app_state.peer_session(upload.form.get("peer_id"))["peer_rsa_public_key"]
+    if peer_rsa_public_key is None:
         print("Peer RSA public key is None")
         return jsonify({"error": "Receiver public key not available"}), 400
 
-    uploaded_file = request.files["file"]
+    cipher_suite = upload.form.get("cipher_suite")
+    if cipher_suite:
+        try:
+            ensure_cipher_allowed(cipher_suite)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-    # Save original file
-    upload_dir = current_app.config["UPLOAD_FOLDER"]
-    os.makedirs(upload_dir, exist_ok=True)
-    input_path = os.path.join(upload_dir, uploaded_file.filename)
-    uploaded_file.save(input_path)
-
-    # Load sender signature private key
-    signature_private_key = load_signature_private_key()
-
-    # Encrypt workflow
-    result = encrypt_file_workflow(
-        input_path=input_path,
-        output_dir=current_app.config["ENCRYPTED_FOLDER"],
-        rsa_public_key=app_state.peer_rsa_public_key,
-        signing_private_key=signature_private_key
-    )
+    # Load sender signature private key for the selected suite
+    suite = get_classical_suite()
+    signature_private_key = load_signing_private_key(suite)
 
-    # Delete original file after encryption
+    # Encrypt workflow, straight from the upload (no plaintext file)
     try:
-        os.remove(input_path)
-    except Exception as e:
-        print(f"Failed to delete original file: {e}")
+        result = encrypt_file_workflow(
+            input_path=upload.filename,
+            output_dir=current_app.config["ENCRYPTED_FOLDER"],
+            rsa_public_key=peer_rsa_public_key,
+            signing_private_key=signature_private_key,
+            suite=suite,
+            cipher_suite=cipher_suite,
+            reader=upload
+        )
+        late_fields = upload.finish()
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # Read encrypted file and send as base64
-    with open(result["encrypted_file_path"], 'rb') as f:
-        encrypted_file_data = base64.b64encode(f.read()).decode('utf-8')
+    if "cipher_suite" in late_fields or "peer_id" in late_fields:
+        os.remove(result["encrypted_file_path"])
+        return jsonify({"error": "cipher_suite and peer_id must come before the file"}), 400
+
+    # Encrypted file as base64 for the UI (large files stay on disk)
+    encrypted_file_data = inline_b64(result["encrypted_file_path"])
 
     return jsonify({
         "message": "File encrypted successfully",
@@ -92,9 +126,10 @@ def encrypt_file():
         "encrypted_file_name": os.path.basename(result["encrypted_file_path"]),
         "aes_key": result["aes_key"].hex(),
         "encrypted_aes_key": result["encrypted_aes_key"].hex(),
-        "receiver_public_key": app_state.peer_rsa_public_key.hex() if isinstance(app_state.peer_rsa_public_key, bytes) else str(app_state.peer_rsa_public_key),
+        "receiver_public_key": peer_rsa_public_key.hex() if isinstance(peer_rsa_public_key, bytes) else str(peer_rsa_public_key),
         "file_hash": result["file_hash"].hex(),
         "signature": result["signature"].hex(),
+        "classical_suite": suite,
         "signature_private_key": signature_private_key.private_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PrivateFormat.PKCS8,
@@ -123,41 +158,37 @@ def send_file():
 
     signature = data.get("signature")
     encrypted_aes_key = data.get("encrypted_aes_key")
+    classical_suite = data.get("classical_suite") or LEGACY_SUITE
    
     if not all([encrypted_file_name, encrypted_aes_key, signature, receiver_ip]):
         return jsonify({"error": "Missing required fields"}), 400
 
-    # FULL PATH TO ENCRYPTED FILE
+    # FULL PATH TO ENCRYPTED FILE (only inside ENCRYPTED_FOLDER)
     encrypted_path = os.path.join(
         current_app.config["ENCRYPTED_FOLDER"],
-        encrypted_file_name
+        os.path.basename(encrypted_file_name)
     )
 
     if not os.path.exists(encrypted_path):
         return jsonify({"error": "Encrypted file not found"}), 404
 
     try:
-        with open(encrypted_path, "rb") as f:
-            files = {
-                "file": (
-                    encrypted_file_name,
-                    f,
-                    "application/octet-stream"
-                )
-            }
-
-            data = {
-                "encrypted_aes_key": encrypted_aes_key,  # already hex
-                "signature": signature,                  # already hex
-                "original_filename": original_filename
-            }
-
-            response = requests.post(
-                f"{receiver_ip}/decrypt",
-                files=files,
-                data=data,
-                timeout=15
-            )
+        # Streamed from disk: the encrypted file is never loaded whole
+        body = StreamedMultipartBody(
+            [
+                ("encrypted_aes_key", encrypted_aes_key),   # already hex
+                ("signature", signature),                   # already hex
+                ("original_filename", original_filename),
+                ("classical_suite", classical_suite)
+            ],
+            [("file", encrypted_file_name, encrypted_path, 0, os.path.getsize(encrypted_path))]
+        )
+        response = requests.post(
+            f"{receiver_ip}/decrypt",
+            data=body,
+            headers={"Content-Type": body.content_type, **peer_headers(data.get("peer_id"))},
+            timeout=300
+        )
 
         # Forward receiver response to sender UI
         if response.status_code != 200:
@@ -179,38 +210,60 @@ def send_file():
         }), 500
 
 @file_bp.route("/decrypt", methods=["POST"])
+@admitted
+@upload_limit("RECEIVER")
 def decrypt_file():
 
-    if "file" not in request.files:
+    # Parse the body as it arrives (no Werkzeug temp file)
+    try:
+        upload = open_upload_stream(request)
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except ValueError:
         return jsonify({"error": "Encrypted file missing"}), 400
 
-    encrypted_file = request.files["file"]
-    encrypted_aes_key = request.form.get("encrypted_aes_key")
-    signature = request.form.get("signature")
-    original_filename = request.form.get("original_filename", "received_file.pdf")
-
-    if not encrypted_aes_key or not signature:
-        return jsonify({"error": "Missing key or signature"}), 400
-
-    # 🔑 READ RAW ENCRYPTED BYTES (NO BASE64)
-    encrypted_file.stream.seek(0)
-    encrypted_file_data = encrypted_file.read()
-
-    # Save encrypted file exactly as received
+    # Save encrypted file exactly as received (raw bytes, streamed)
     encrypted_dir = current_app.config["ENCRYPTED_FOLDER"]
     os.makedirs(encrypted_dir, exist_ok=True)
     encrypted_path = os.path.join(
         encrypted_dir, f"encrypted_{uuid.uuid4().hex}.enc"
     )
+    try:
+        with open(encrypted_path, "wb") as f:
+            shutil.copyfileobj(upload, f, READ_CHUNK_SIZE)
+        # /send-file puts the fields first; accept them after the file too
+        form = {**upload.form, **upload.finish()}
+    except RequestEntityTooLarge as e:
+        os.remove(encrypted_path)
+        return jsonify({"error": e.description}), 413
+    except ValueError as e:
+        os.remove(encrypted_path)
+        return jsonify({"error": str(e)}), 400
+
+    encrypted_aes_key = form.get("encrypted_aes_key")
+    signature = form.get("signature")
+    original_filename = form.get("original_filename", "received_file.pdf")
+    # Senders that predate suite selection only speak RSA
+    suite = form.get("classical_suite") or LEGACY_SUITE
+
+    if not encrypted_aes_key or not signature:
+        os.remove(encrypted_path)
+        return jsonify({"error": "Missing key or signature"}), 400
 
-    with open(encrypted_path, "wb") as f:
-        f.write(encrypted_file_data)
+    try:
+        ensure_suite_allowed(suite)
+    except ValueError as e:
+        os.remove(encrypted_path)
+        return jsonify({"error": str(e)}), 400
 
-    rsa_private_key = load_rsa_private_key()
-    sender_signature_public_key = app_state.peer_signature_public_key
+    rsa_private_key = load_kem_private_key(suite)
+    # Key of the sending peer's session, whichever peer is active
+    peer_id = sending_peer()
+    sender_signature_public_key = app_state.peer_session(peer_id)["peer_signature_public_key"]
 
     if sender_signature_public_key is None:
         print("key error")
+        os.remove(encrypted_path)
         return jsonify({"error": "Sender public key not available"}), 400
     
     
@@ -223,7 +276,8 @@ def decrypt_file():
             rsa_private_key=rsa_private_key,
             signer_public_key=sender_signature_public_key,
             decrypted_output_dir=current_app.config["DECRYPTED_FOLDER"],
-            original_filename = original_filename
+            original_filename = original_filename,
+            suite=suite
         )
 
         os.remove(encrypted_path)
@@ -232,16 +286,9 @@ def decrypt_file():
         print(str(e))
         return jsonify({"error": str(e)}), 400
 
-    # (Optional UI demo)
-    with open(decrypted_path, "rb") as f:
-        decrypted_file_data = base64.b64encode(f.read()).decode("utf-8")
-
     file_size = os.path.getsize(decrypted_path)
 
     file_id = str(uuid.uuid4())
-    app_state.received_files_queue = getattr(
-        app_state, "received_files_queue", []
-    )
     # sender_public_key_pem = sender_signature_public_key.public_bytes(
     #     encoding=serialization.Encoding.PEM,
     #     format=serialization.PublicFormat.SubjectPublicKeyInfo
@@ -252,16 +299,16 @@ def decrypt_file():
         format=serialization.PrivateFormat.PKCS8,
         encryption_algorithm=serialization.NoEncryption()
     ).decode("utf-8")
-    app_state.received_files_queue.append({
+    app_state.store.put(INBOX, file_id, {
         "id": file_id,
         "filename": original_filename,
         "encrypted_aes_key": encrypted_aes_key,
         "signature": signature,
         "sender_public_key": sender_signature_public_key,
         "rsa_private_key": rsa_private_key_pem,
-        "decrypted_file": decrypted_file_data,
         "file_size": file_size,
         "path": decrypted_path,
+        "peer_id": peer_id,
         "status": "READY"
     })
 
@@ -276,27 +323,43 @@ def next_file():
     if app_state.role != "RECEIVER":
         return jsonify({"error": "Not in receiver mode"}), 403
 
-    if not hasattr(app_state, 'received_files_queue') or not app_state.received_files_queue:
-        return jsonify({"message": "No files available"}), 204  # No Content
-
     # Get first file from queue
-    file_entry = app_state.received_files_queue.pop(0)
+    file_entry = app_state.store.pop_first(INBOX)
+    if file_entry is None:
+        return jsonify({"message": "No files available"}), 204  # No Content
     
-    # Delete file from disk
-    try:
-        if os.path.exists(file_entry["path"]):
-            os.remove(file_entry["path"])
-    except Exception as e:
-        print(f"Failed to delete file from disk: {e}")
+    # Delete file from disk; a file too large to inline stays until downloaded
+    # ((Optional UI demo) smaller files are returned as base64)
+    download_url = None
+    file_data = inline_b64(file_entry["path"])
+    if file_data is None:
+        app_state.store.put(DOWNLOADS, file_entry["id"], file_entry)
+        download_url = f"/files/{file_entry['id']}/download"
+    else:
+        try:
+            if os.path.exists(file_entry["path"]):
+                os.remove(file_entry["path"])
+        except Exception as e:
+            print(f"Failed to delete file from disk: {e}")
     
     # Return entire file data
     return jsonify({
         "id": file_entry["id"],
         "filename": file_entry["filename"],
-        "file_data": file_entry["decrypted_file"],
+        "file_data": file_data,
+        "download_url": download_url,
         "file_size": file_entry["file_size"],
          "encrypted_aes_key": file_entry["encrypted_aes_key"],
         "signature": file_entry["signature"],
         "sender_public_key": file_entry["sender_public_key"],
         "rsa_private_key": file_entry["rsa_private_key"]
     }), 200
+
+
+@file_bp.route("/files/<file_id>/download", methods=["GET"])
+def download_file(file_id):
+    """Streams a large file handed out by /next-file, then deletes it"""
+    file_entry = app_state.store.pop(DOWNLOADS, file_id)
+    if file_entry is None or not os.path.exists(file_entry["path"]):
+        return jsonify({"error": "File not found"}), 404
+    return send_and_remove(file_entry["path"], file_entry["filename"])
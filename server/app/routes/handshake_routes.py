@@ -1,8 +1,19 @@
 from flask import Blueprint, request, jsonify, current_app
-from app.utils.network_utils import get_local_ip, listen_for_acknowledgment, send_acknowledgment, broadcast_receiver, listen_for_receiver, listen_for_handshake, send_handshake, BroadcastState
+from app.utils.network_utils import get_local_ip, listen_for_acknowledgment, send_acknowledgment, broadcast_receiver, listen_for_receiver, listen_for_handshake, send_handshake
 import threading
 from app.extensions import app_state
-from app.services.key_service import load_rsa_public_key, load_signature_public_key
+from app.services.key_lifecycle_service import key_lifecycle
+from app.services.classical_suite_service import (
+    CLASSICAL_SUITES,
+    LEGACY_SUITE,
+    allowed_suites,
+    ensure_suite_allowed,
+    get_classical_suite,
+    get_peer_classical_suite,
+    load_kem_public_key,
+    load_signing_public_key,
+    public_key_pem
+)
 
 handshake_bp = Blueprint("handshake", __name__)
 
@@ -39,8 +50,7 @@ def start_receiver():
     port = 5051
 
     # Create shared state
-    broadcast_state = BroadcastState()
-    app_state.broadcast_state = broadcast_state
+    broadcast_state = app_state.handshake_state("broadcast", reset=True)
 
     # Thread 1: Broadcast availability
     broadcast_thread = threading.Thread(
@@ -75,23 +85,30 @@ def receiver_status():
     if app_state.role != "RECEIVER":
         return jsonify({"error": "Not in receiver mode"}), 403
     print("Checking receiver status...")
-    if not hasattr(app_state, 'broadcast_state'):
+    state = app_state.handshake_state("broadcast")
+    if state is None:
         return jsonify({"status": "NOT_STARTED"})
 
-    state = app_state.broadcast_state
-
     if state.handshake_received:
-        # 🔑 Store sender's public keys from handshake
-        if 'rsa_public_key' in state.sender_info:
-            app_state.peer_rsa_public_key = bytes.fromhex(state.sender_info['rsa_public_key'])
-        if 'signature_public_key' in state.sender_info:
-            app_state.peer_signature_public_key = state.sender_info['signature_public_key']
+        sender_info = state.sender_info
+        # 🔑 Store sender's signing public key (PEM) and suite from handshake
+        suite = sender_info.get("classical_suite") or LEGACY_SUITE
+        try:
+            ensure_suite_allowed(suite)
+        except ValueError as e:
+            return jsonify({"error": str(e), "allowed": allowed_suites()}), 409
+
+        app_state.use_peer(f"{sender_info['ip']}:{sender_info['port']}")
+        if sender_info.get('signature_public_key'):
+            app_state.peer_signature_public_key = sender_info['signature_public_key']
+        app_state.peer_classical_suite = suite
         
         return jsonify({
             "status": "READY",
-            "sender_ip": state.sender_info["ip"],
-            "sender_port": state.sender_info["port"],
-            "sender_name": state.sender_info["name"]
+            "sender_ip": sender_info["ip"],
+            "sender_port": sender_info["port"],
+            "sender_name": sender_info["name"],
+            "suite": suite
         })
     else:
         print("Handshake not yet received.")
@@ -114,9 +131,15 @@ def receiver_acknowledge():
     receiver_ip = get_local_ip()
     receiver_port = 5050
 
-    # 🔑 Load receiver's public keys
-    receiver_rsa_public_key = load_rsa_public_key()
-    receiver_signature_public_key = load_signature_public_key()
+    # 🔑 Follow the sender's suite: bind a key transport pair for it if needed
+    suite = get_peer_classical_suite()
+    if suite != get_classical_suite():
+        key_lifecycle.bind_key_pair(*CLASSICAL_SUITES[suite]["kem_key"], wait=True)
+        app_state.classical_suite = suite
+    elif not key_lifecycle.wait_until_ready(CLASSICAL_SUITES[suite]["kem_key"][0], timeout=30):
+        return jsonify({"error": "Receiver keys are still being generated"}), 503
+
+    receiver_kem_public_key = public_key_pem(load_kem_public_key(suite))
 
     # Send acknowledgment to sender with public keys
     success = send_acknowledgment(
@@ -125,13 +148,16 @@ def receiver_acknowledge():
         receiver_ip, 
         receiver_port, 
         receiver_name,
+        classical_suite=suite,
+        kem_public_key=receiver_kem_public_key
     )
 
     if success:
         return jsonify({
             "message": "Acknowledgment sent",
             "receiver_ip": receiver_ip,
-            "receiver_port": receiver_port
+            "receiver_port": receiver_port,
+            "suite": suite
         })
     else:
         return jsonify({"error": "Failed to send acknowledgment"}), 500
@@ -152,9 +178,11 @@ def sender_handshake():
     sender_ip = get_local_ip()
     sender_port = 5051
 
-    # 🔑 Load sender's public keys
-    sender_rsa_public_key = load_rsa_public_key()
-    sender_signature_public_key = load_signature_public_key()
+    # 🔑 Load sender's signing public key for the selected suite
+    suite = get_classical_suite()
+    if not key_lifecycle.wait_until_ready(CLASSICAL_SUITES[suite]["sig_key"][0], timeout=30):
+        return jsonify({"error": "Sender keys are still being generated"}), 503
+    sender_signature_public_key = public_key_pem(load_signing_public_key(suite))
 
     # Send handshake with public keys
     success = send_handshake(
@@ -162,13 +190,16 @@ def sender_handshake():
         receiver_port, 
         sender_ip, 
         sender_port, 
-        sender_name
+        sender_name,
+        classical_suite=suite,
+        signature_public_key=sender_signature_public_key
     )
 
     if success:
         # Start listening for acknowledgment
-        ack_state = BroadcastState()
-        app_state.ack_state = ack_state
+        app_state.use_peer(f"{receiver_ip}:{receiver_port}")
+        app_state.local_peer_id = f"{sender_ip}:{sender_port}"
+        ack_state = app_state.handshake_state("ack", reset=True)
         
         ack_thread = threading.Thread(
             target=listen_for_acknowledgment,
@@ -193,20 +224,25 @@ def sender_ack_status():
     if app_state.role != "SENDER":
         return jsonify({"error": "Not in sender mode"}), 403
 
-    if not hasattr(app_state, 'ack_state'):
+    state = app_state.handshake_state("ack")
+    if state is None:
         return jsonify({"status": "NOT_STARTED"})
 
-    state = app_state.ack_state
-
     if state.ack_received:
         # 🔑 Store receiver's public keys from acknowledgment
-        print(state.receiver_info)
-        if hasattr(state, 'receiver_info'):
-            if 'rsa_public_key' in state.receiver_info:
-                app_state.peer_rsa_public_key =  state.receiver_info['rsa_public_key']
-            if 'signature_public_key' in state.receiver_info:
-                app_state.peer_signature_public_key = bytes.fromhex(state.receiver_info['signature_public_key'])
+        receiver_info = state.receiver_info
+        print(receiver_info)
+        if receiver_info:
+            suite = receiver_info.get('classical_suite') or LEGACY_SUITE
+            if suite != get_classical_suite():
+                return jsonify({
+                    "error": f"Receiver answered with suite {suite}, expected {get_classical_suite()}"
+                }), 409
+            # RSA or X25519 public key PEM, depending on the suite
+            if receiver_info.get('kem_public_key'):
+                app_state.peer_rsa_public_key = receiver_info['kem_public_key']
+            app_state.peer_classical_suite = suite
         
-        return jsonify({"status": "ACKNOWLEDGED"})
+        return jsonify({"status": "ACKNOWLEDGED", "suite": get_classical_suite()})
     else:
         return jsonify({"status": "WAITING"})
\ No newline at end of file
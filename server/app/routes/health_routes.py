@@ -1,7 +1,23 @@
-from flask import Blueprint, jsonify
+import os
+
+from flask import Blueprint, current_app, jsonify
+from app.services import cpu_pool_service
+from app.services.admission_service import admission
 
 health_bp = Blueprint("health", __name__)
 
 @health_bp.route("/health", methods=["GET"])
 def health():
     return jsonify({"status": "ok"})
+
+
+@health_bp.route("/admission/status", methods=["GET"])
+def admission_status():
+    """Load and queue wait times of the encrypt / decrypt endpoints (of the worker process answering)"""
+    status = admission.status(
+        current_app.config["ADMISSION_MAX_JOBS"],
+        current_app.config["ADMISSION_MEMORY_BUDGET_BYTES"]
+    )
+    status["cpu_pool"] = cpu_pool_service.status()
+    status["worker_pid"] = os.getpid()
+    return jsonify(status), 200
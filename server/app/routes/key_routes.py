@@ -0,0 +1,17 @@
+from flask import Blueprint, jsonify
+from app.services.key_lifecycle_service import key_lifecycle
+
+key_bp = Blueprint("keys", __name__)
+
+
+# ======================================================
+# Key pool / rotation status
+# ======================================================
+
+@key_bp.route("/keys/status", methods=["GET"])
+def key_status():
+    """
+    Pre-generated pool levels, active key ages, pending binds
+    and the last keygen error per pool
+    """
+    return jsonify(key_lifecycle.status()), 200
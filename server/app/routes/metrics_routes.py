@@ -0,0 +1,19 @@
+from flask import Blueprint, jsonify
+from app.services.metrics_service import stage_metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+# ======================================================
+# Workflow stage metrics (of the worker process answering)
+# ======================================================
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics_status():
+    return jsonify(stage_metrics.snapshot()), 200
+
+
+@metrics_bp.route("/metrics", methods=["DELETE"])
+def metrics_reset():
+    stage_metrics.reset()
+    return jsonify({"message": "Metrics reset"}), 200
@@ -0,0 +1,197 @@
+import os
+import uuid
+import shutil
+import requests
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+from app.services.pqc_batch_service import (
+    BatchTransferBody,
+    pqc_encrypt_batch_workflow,
+    receive_pqc_batch
+)
+from app.services.pqc_key_service import load_kyber_private_key
+from app.services.pqc_inbox_service import READY, add_entry
+from app.utils.limits import admitted, upload_limit
+from app.utils.peers import peer_headers, sending_peer
+
+# ------------------------------------------------------
+# Blueprint
+# ------------------------------------------------------
+pqc_batch_bp = Blueprint("pqc_batch", __name__)
+
+
+def _batch_directory_files(directory: str):
+    """
+    Files of a server-side directory, only inside BATCH_ALLOWED_DIRECTORIES.
+    """
+    real = os.path.realpath(directory)
+    allowed = [os.path.realpath(d) for d in current_app.config["BATCH_ALLOWED_DIRECTORIES"]]
+    if not any(real == root or real.startswith(root + os.sep) for root in allowed):
+        raise ValueError("Directory is not allowed for batch transfers")
+    if not os.path.isdir(real):
+        raise ValueError("Directory not found")
+
+    return [
+        (os.path.join(real, name), name)
+        for name in sorted(os.listdir(real))
+        if os.path.isfile(os.path.join(real, name))
+    ]
+
+
+# ======================================================
+# SENDER: Encrypt + send many files in one transfer
+# ======================================================
+@pqc_batch_bp.route("/pqc/batch/send", methods=["POST"])
+@upload_limit("SENDER")
+def pqc_batch_send():
+    """
+    multipart: files=<file> (repeated), receiver_api, optional kem_algorithm /
+    sig_algorithm / cipher_suite / peer_id (session, default: active)
+    JSON / form: directory=<server path>, receiver_api
+    """
+    data = request.get_json(silent=True) or request.form
+    receiver_api = data.get("receiver_api")
+    if not receiver_api:
+        return jsonify({"error": "Missing receiver_api"}), 400
+
+    upload_dir = None
+    try:
+        uploaded = request.files.getlist("files")
+        if uploaded:
+            upload_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], f"batch_{uuid.uuid4().hex}")
+            os.makedirs(upload_dir, exist_ok=True)
+            inputs = []
+            for index, f in enumerate(uploaded):
+                input_path = os.path.join(upload_dir, f"{index}_{secure_filename(f.filename) or 'file'}")
+                f.save(input_path)
+                inputs.append((input_path, f.filename))
+        elif data.get("directory"):
+            inputs = _batch_directory_files(data["directory"])
+        else:
+            return jsonify({"error": "No files or directory given"}), 400
+
+        batch = pqc_encrypt_batch_workflow(
+            inputs,
+            kem_algorithm=data.get("kem_algorithm"),
+            sig_algorithm=data.get("sig_algorithm"),
+            cipher_suite=data.get("cipher_suite"),
+            peer_id=data.get("peer_id")
+        )
+    except ValueError as e:
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        print(f"Error during batch encryption: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    try:
+        body = BatchTransferBody(batch)
+        response = requests.post(
+            f"{receiver_api}/pqc/batch/receive",
+            data=body,
+            headers={"Content-Type": body.content_type, **peer_headers(data.get("peer_id"))},
+            timeout=300
+        )
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {str(e)}")
+        return jsonify({
+            "error": "Failed to contact receiver",
+            "details": str(e)
+        }), 500
+    finally:
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        for f in batch["files"]:
+            if os.path.exists(f["encrypted_file_path"]):
+                os.remove(f["encrypted_file_path"])
+
+    if response.status_code != 200:
+        print(f"Receiver error: {response.status_code} - {response.text}")
+        return jsonify({
+            "error": "Receiver rejected the batch",
+            "receiver_status": response.status_code,
+            "receiver_response": response.text
+        }), 500
+
+    return jsonify({
+        "message": "Batch sent successfully",
+        "batch_id": batch["batch_id"],
+        "files": [
+            {key: f[key] for key in ("index", "filename", "size", "sha512")}
+            for f in batch["files"]
+        ],
+        "kem_algorithm": batch["kem_algorithm"],
+        "sig_algorithm": batch["sig_algorithm"],
+        "cipher_suite": batch["cipher_suite"],
+        "timings": batch["timings"],
+        "receiver_response": response.json()
+    }), 200
+
+
+# ======================================================
+# RECEIVER: Verify manifest once, every file against it
+# ======================================================
+@pqc_batch_bp.route("/pqc/batch/receive", methods=["POST"])
+@admitted
+@upload_limit("RECEIVER")
+def pqc_batch_receive():
+    if request.mimetype != "multipart/form-data" or "boundary" not in request.mimetype_params:
+        return jsonify({"error": "Batch transfer must be multipart/form-data"}), 400
+
+    peer_id = sending_peer()
+    try:
+        result = receive_pqc_batch(
+            request.stream,
+            request.mimetype_params["boundary"],
+            current_app.config.get("MAX_FORM_MEMORY_SIZE"),
+            peer_id
+        )
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        print(f"Batch receive error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+    kyber_private_key = load_kyber_private_key(result["kem_algorithm"]).hex()
+    files = []
+    for item in result["files"]:
+        if item["status"] != "READY":
+            print(f"Batch file {item['index']} failed: {item['error']}")
+            files.append({key: item[key] for key in ("index", "filename", "status", "error")})
+            continue
+
+        decrypted_path = item["decrypted_file_path"]
+        file_id = str(uuid.uuid4())
+        add_entry({
+            "id": file_id,
+            "filename": item["filename"],
+            "kyber_ciphertext": result["kyber_ciphertext"],
+            "signature": result["signature"],
+            "file_size": os.path.getsize(decrypted_path),
+            "kyber_private_key": kyber_private_key,
+            "shared_secret": result["shared_secret"].hex(),
+            "file_hash": item["sha512"],
+            "kem_algorithm": result["kem_algorithm"],
+            "sig_algorithm": result["sig_algorithm"],
+            "cipher_suite": item["cipher_suite"],
+            "hash_mode": "batch-manifest",
+            "batch_id": result["batch_id"],
+            "path": decrypted_path,
+            "peer_id": peer_id,
+            "status": READY
+        })
+        files.append({"index": item["index"], "filename": item["filename"],
+                      "status": "READY", "file_id": file_id})
+
+    failed = sum(1 for f in files if f["status"] != "READY")
+    return jsonify({
+        "message": f"Batch received: {len(files) - failed} stored, {failed} failed",
+        "batch_id": result["batch_id"],
+        "files": files,
+        "timings": result["timings"]
+    }), 200
@@ -1,7 +1,23 @@
 import os
+import shutil
 import subprocess
 from flask import Blueprint, request, jsonify, current_app
 from app.extensions import app_state
+from app.services.pqc_key_service import generate_pqc_key_pair, keep_kem_key_pair, keygen_binary_path
+from app.services.key_lifecycle_service import key_lifecycle
+from app.services.pqc_param_service import (
+    KEM_PARAMETER_SETS,
+    SIG_PARAMETER_SETS,
+    allowed_algorithms,
+    default_algorithm,
+    ensure_allowed,
+    get_kem_algorithm,
+    get_peer_kem_algorithm,
+    get_peer_sig_algorithm,
+    get_sig_algorithm,
+    measure_cost_matrix,
+    recommend_parameter_sets
+)
 
 pqc_control_bp = Blueprint("pqc_control", __name__)
 
@@ -9,102 +25,43 @@ pqc_control_bp = Blueprint("pqc_control", __name__)
 # ======================================================
 # PQC Key Generation Functions
 # ======================================================
-def generate_dilithium_keys():
-    """Generate Dilithium5 key pair (sender's signature keys)"""
+def generate_dilithium_keys(sig_algorithm: str):
+    """
+    Generate an ML-DSA key pair (sender's signature keys) right now,
+    bypassing the key pool. Role selection uses key_lifecycle instead.
+    """
     pqc_key_folder = current_app.config["PQC_KEY_FOLDER"]
     os.makedirs(pqc_key_folder, exist_ok=True)
 
-    dilithium_keygen_bin = os.path.join(
-        current_app.root_path,
-        "services", "PQC", "dilithium", "bin", "dilithium_keygen"
-    )
-
-    if not os.path.exists(dilithium_keygen_bin):
-        raise FileNotFoundError(f"dilithium_keygen binary not found at {dilithium_keygen_bin}")
-
-    print("Generating Dilithium5 key pair...")
-    
-    # Your C binary expects "server/pqc_keys/"
-    # So we need to run it from the PARENT of server/ directory
-    server_dir = os.path.dirname(current_app.root_path)  # This is server/
-    project_root = os.path.dirname(server_dir)            # This is PQDocSec/
-    
-    print(f"Binary location: {dilithium_keygen_bin}")
-    print(f"Running from: {project_root}")
-    print(f"Keys will be written to: {os.path.join(project_root, 'server', 'pqc_keys')}")
-    
-    result = subprocess.run(
-        [dilithium_keygen_bin],
-        cwd=project_root,  # Run from PQDocSec/ so "server/pqc_keys/" works
-        capture_output=True,
-        text=True
+    print(f"Generating {sig_algorithm} key pair...")
+    generate_pqc_key_pair(
+        "sig",
+        sig_algorithm,
+        os.path.join(pqc_key_folder, "dilithium_pk.bin"),
+        os.path.join(pqc_key_folder, "dilithium_sk.bin")
     )
-    
-    if result.returncode != 0:
-        print(f"STDOUT: {result.stdout}")
-        print(f"STDERR: {result.stderr}")
-        raise subprocess.CalledProcessError(result.returncode, dilithium_keygen_bin)
-    
-    print("✓ Dilithium5 keys generated successfully")
-    
-    # Verify keys were created in the right place
-    pk_path = os.path.join(pqc_key_folder, "dilithium_pk.bin")
-    sk_path = os.path.join(pqc_key_folder, "dilithium_sk.bin")
-    
-    if not os.path.exists(pk_path):
-        raise FileNotFoundError(f"Public key not found at: {pk_path}")
-    if not os.path.exists(sk_path):
-        raise FileNotFoundError(f"Secret key not found at: {sk_path}")
-    
-    print(f"✓ Keys verified at: {pqc_key_folder}")
+    app_state.sig_algorithm = sig_algorithm
+    print(f"✓ {sig_algorithm} keys generated at: {pqc_key_folder}")
 
 
-def generate_kyber_keys():
-    """Generate Kyber1024 key pair (receiver's encryption keys)"""
+def generate_kyber_keys(kem_algorithm: str):
+    """
+    Generate an ML-KEM key pair (receiver's encryption keys) right now,
+    bypassing the key pool. Role selection uses key_lifecycle instead.
+    """
     pqc_key_folder = current_app.config["PQC_KEY_FOLDER"]
     os.makedirs(pqc_key_folder, exist_ok=True)
 
-    kyber_keygen_bin = os.path.join(
-        current_app.root_path,
-        "services", "PQC", "kyber", "bin", "kyber_keygen"
-    )
-
-    if not os.path.exists(kyber_keygen_bin):
-        raise FileNotFoundError(f"kyber_keygen binary not found at {kyber_keygen_bin}")
-
-    print("Generating Kyber1024 key pair...")
-    
-    # Same logic - run from parent directory
-    server_dir = os.path.dirname(current_app.root_path)
-    project_root = os.path.dirname(server_dir)
-    
-    print(f"Binary location: {kyber_keygen_bin}")
-    print(f"Running from: {project_root}")
-    
-    result = subprocess.run(
-        [kyber_keygen_bin],
-        cwd=project_root,  # Run from PQDocSec/ so "server/pqc_keys/" works
-        capture_output=True,
-        text=True
+    print(f"Generating {kem_algorithm} key pair...")
+    generate_pqc_key_pair(
+        "kem",
+        kem_algorithm,
+        os.path.join(pqc_key_folder, "kyber_pk.bin"),
+        os.path.join(pqc_key_folder, "kyber_sk.bin")
     )
-    
-    if result.returncode != 0:
-        print(f"STDOUT: {result.stdout}")
-        print(f"STDERR: {result.stderr}")
-        raise subprocess.CalledProcessError(result.returncode, kyber_keygen_bin)
-    
-    print("✓ Kyber1024 keys generated successfully")
-    
-    # Verify keys
-    pk_path = os.path.join(pqc_key_folder, "kyber_pk.bin")
-    sk_path = os.path.join(pqc_key_folder, "kyber_sk.bin")
-    
-    if not os.path.exists(pk_path):
-        raise FileNotFoundError(f"Public key not found at: {pk_path}")
-    if not os.path.exists(sk_path):
-        raise FileNotFoundError(f"Secret key not found at: {sk_path}")
-    
-    print(f"✓ Keys verified at: {pqc_key_folder}")
+    keep_kem_key_pair(kem_algorithm)
+    app_state.kem_algorithm = kem_algorithm
+    print(f"✓ {kem_algorithm} keys generated at: {pqc_key_folder}")
 
 
 # ======================================================
@@ -117,10 +74,10 @@ def pqc_select_role():
     Set role (SENDER or RECEIVER) and generate appropriate PQC keys
     
     SENDER needs:
-    - Dilithium5 key pair (for signing)
+    - ML-DSA key pair (for signing), "sig_algorithm" selects the set
     
     RECEIVER needs:
-    - Kyber1024 key pair (for key encapsulation)
+    - ML-KEM key pair (for key encapsulation), "kem_algorithm" selects the set
     """
     data = request.json
     if not data:
@@ -131,27 +88,45 @@ def pqc_select_role():
     if role not in ["SENDER", "RECEIVER"]:
         return jsonify({"error": "Invalid role. Must be 'sender' or 'receiver'"}), 400
 
+    try:
+        kem_algorithm = ensure_allowed("kem", data.get("kem_algorithm") or default_algorithm("kem"))
+        sig_algorithm = ensure_allowed("sig", data.get("sig_algorithm") or default_algorithm("sig"))
+    except ValueError as e:
+        return jsonify({
+            "error": str(e),
+            "allowed": {"kem": allowed_algorithms("kem"), "sig": allowed_algorithms("sig")}
+        }), 400
+
     # Set role in app state
     app_state.role = role
     print(f"PQC Role selected: {role}")
 
     try:
-        # Generate keys based on role
+        # Bind a pre-generated key pair; if the pool is empty the pair is
+        # generated in the background and readiness shows in /keys/status
         if role == "SENDER":
-            generate_dilithium_keys()
+            keygen_binary_path("sig")
+            ready = key_lifecycle.bind_key_pair("pqc_sig", sig_algorithm)
             return jsonify({
                 "message": "Role set to SENDER",
                 "role": "SENDER",
-                "keys_generated": "Dilithium5 (signature keys)"
-            }), 200
+                "sig_algorithm": sig_algorithm,
+                "keys_generated": f"{sig_algorithm} (signature keys)",
+                "keys_ready": ready,
+                "status_url": "/keys/status"
+            }), 200 if ready else 202
             
         elif role == "RECEIVER":
-            generate_kyber_keys()
+            keygen_binary_path("kem")
+            ready = key_lifecycle.bind_key_pair("pqc_kem", kem_algorithm)
             return jsonify({
                 "message": "Role set to RECEIVER",
                 "role": "RECEIVER",
-                "keys_generated": "Kyber1024 (encryption keys)"
-            }), 200
+                "kem_algorithm": kem_algorithm,
+                "keys_generated": f"{kem_algorithm} (encryption keys)",
+                "keys_ready": ready,
+                "status_url": "/keys/status"
+            }), 200 if ready else 202
 
     except FileNotFoundError as e:
         return jsonify({
@@ -214,16 +189,19 @@ def pqc_verify_keys():
         "dilithium_private_key": os.path.exists(
             os.path.join(pqc_key_folder, "dilithium_sk.bin")
         ),
-        "receiver_kyber_public_key": os.path.exists(
-            os.path.join(pqc_key_folder, "receiver_kyber_pk.bin")
-        ),
-        "sender_dilithium_public_key": os.path.exists(
-            os.path.join(pqc_key_folder, "sender_dilithium_pk.bin")
-        ),
+        # Peer keys live in the active peer's session
+        "receiver_kyber_public_key": app_state.peer_kyber_public_key is not None,
+        "sender_dilithium_public_key": app_state.peer_dilithium_public_key is not None,
     }
     
     return jsonify({
         "keys": keys_status,
+        "algorithms": {
+            "kem": get_kem_algorithm(),
+            "sig": get_sig_algorithm(),
+            "peer_kem": get_peer_kem_algorithm(),
+            "peer_sig": get_peer_sig_algorithm()
+        },
         "pqc_key_folder": pqc_key_folder,
         "all_required_present": (
             (app_state.role == "SENDER" and keys_status["dilithium_public_key"]) or
@@ -267,6 +245,8 @@ def pqc_reset_role():
                 if os.path.exists(key_path):
                     os.remove(key_path)
                     print(f"Deleted: {key_file}")
+            # Kyber pairs kept per parameter set
+            shutil.rmtree(os.path.join(pqc_key_folder, "kem"), ignore_errors=True)
             
             return jsonify({
                 "message": "Role reset and keys cleared",
@@ -282,4 +262,56 @@ def pqc_reset_role():
     return jsonify({
         "message": "Role reset",
         "previous_role": old_role
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+# ======================================================
+# Parameter sets + host cost matrix
+# ======================================================
+
+@pqc_control_bp.route("/pqc/params", methods=["GET"])
+def pqc_list_params():
+    """List supported parameter sets, policy and current selection"""
+    return jsonify({
+        "kem": KEM_PARAMETER_SETS,
+        "sig": SIG_PARAMETER_SETS,
+        "policy": {
+            "allowed_kem": allowed_algorithms("kem"),
+            "allowed_sig": allowed_algorithms("sig"),
+            "min_security_level": current_app.config["PQC_MIN_SECURITY_LEVEL"]
+        },
+        "selected": {
+            "kem": get_kem_algorithm(),
+            "sig": get_sig_algorithm(),
+            "peer_kem": get_peer_kem_algorithm(),
+            "peer_sig": get_peer_sig_algorithm()
+        },
+        "cost_matrix": app_state.pqc_cost_matrix,
+        "recommended": recommend_parameter_sets(app_state.pqc_cost_matrix)
+    }), 200
+
+
+@pqc_control_bp.route("/pqc/params/benchmark", methods=["POST"])
+def pqc_benchmark_params():
+    """
+    Measure keygen/encaps/decaps/sign/verify on this host and
+    return the cheapest parameter sets that meet policy
+    """
+    data = request.get_json(silent=True) or {}
+    iterations = int(data.get("iterations", 100))
+
+    try:
+        matrix = measure_cost_matrix(iterations)
+    except FileNotFoundError as e:
+        return jsonify({
+            "error": "PQC binary not found",
+            "details": str(e),
+            "hint": "Compile services/PQC/bench/pqc_bench.c (see README)"
+        }), 500
+
+    app_state.pqc_cost_matrix = matrix
+
+    return jsonify({
+        "cost_matrix": matrix,
+        "recommended": recommend_parameter_sets(matrix)
+    }), 200
@@ -0,0 +1,206 @@
+import os
+import uuid
+import requests
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+from app.services.pqc_delta_service import (
+    DeltaTransferBody,
+    StoreChunksMissing,
+    missing_chunks,
+    pqc_encrypt_delta_workflow,
+    pqc_plan_delta_transfer,
+    receive_pqc_delta
+)
+from app.services.pqc_key_service import load_kyber_private_key
+from app.services.pqc_inbox_service import READY, add_entry
+from app.utils.limits import admitted, upload_limit
+from app.utils.peers import peer_headers, sending_peer
+
+# ------------------------------------------------------
+# Blueprint
+# ------------------------------------------------------
+pqc_delta_bp = Blueprint("pqc_delta", __name__)
+
+
+def _send_delta(receiver_api: str, input_path: str, filename: str, plan: dict, missing: set, data):
+    delta = pqc_encrypt_delta_workflow(
+        input_path,
+        filename,
+        plan,
+        missing,
+        kem_algorithm=data.get("kem_algorithm"),
+        sig_algorithm=data.get("sig_algorithm"),
+        cipher_suite=data.get("cipher_suite"),
+        peer_id=data.get("peer_id")
+    )
+    try:
+        body = DeltaTransferBody(delta)
+        response = requests.post(
+            f"{receiver_api}/pqc/delta/receive",
+            data=body,
+            headers={"Content-Type": body.content_type, **peer_headers(data.get("peer_id"))},
+            timeout=300
+        )
+    finally:
+        os.remove(delta["spool_path"])
+    return delta, response
+
+
+# ======================================================
+# SENDER: Send only the chunks the receiver lacks
+# ======================================================
+@pqc_delta_bp.route("/pqc/delta/send", methods=["POST"])
+@upload_limit("SENDER")
+def pqc_delta_send():
+    """
+    multipart: file=<file>, receiver_api, optional kem_algorithm /
+    sig_algorithm / cipher_suite / peer_id (session, default: active)
+    """
+    receiver_api = request.form.get("receiver_api")
+    if not receiver_api:
+        return jsonify({"error": "Missing receiver_api"}), 400
+    if "file" not in request.files:
+        return jsonify({"error": "File missing"}), 400
+
+    uploaded_file = request.files["file"]
+    upload_dir = current_app.config["UPLOAD_FOLDER"]
+    os.makedirs(upload_dir, exist_ok=True)
+    input_path = os.path.join(upload_dir, f"delta_{uuid.uuid4().hex}_{secure_filename(uploaded_file.filename) or 'file'}")
+    uploaded_file.save(input_path)
+
+    try:
+        plan = pqc_plan_delta_transfer(input_path, request.form.get("peer_id"))
+        chunk_ids = [c["id"] for c in plan["chunks"]]
+
+        # Ask first, so unchanged chunks are never encrypted or sent
+        answer = requests.post(
+            f"{receiver_api}/pqc/delta/missing",
+            json={"chunks": chunk_ids},
+            headers=peer_headers(request.form.get("peer_id")),
+            timeout=60
+        )
+        if answer.status_code != 200:
+            return jsonify({
+                "error": "Receiver rejected the chunk query",
+                "receiver_status": answer.status_code,
+                "receiver_response": answer.text
+            }), 500
+        missing = set(answer.json()["missing"])
+
+        delta, response = _send_delta(receiver_api, input_path, uploaded_file.filename, plan, missing, request.form)
+        if response.status_code == 409 and "missing" in response.json():
+            # Chunks pruned from the receiver's store in the meantime: once more with them
+            missing |= set(response.json()["missing"])
+            delta, response = _send_delta(receiver_api, input_path, uploaded_file.filename, plan, missing, request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {str(e)}")
+        return jsonify({
+            "error": "Failed to contact receiver",
+            "details": str(e)
+        }), 500
+    except Exception as e:
+        print(f"Error during delta transfer: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        os.remove(input_path)
+
+    if response.status_code != 200:
+        print(f"Receiver error: {response.status_code} - {response.text}")
+        return jsonify({
+            "error": "Receiver rejected the delta transfer",
+            "receiver_status": response.status_code,
+            "receiver_response": response.text
+        }), 500
+
+    return jsonify({
+        "message": "Delta sent successfully",
+        "transfer_id": delta["transfer_id"],
+        "chunks": delta["chunk_count"],
+        "sent_chunks": delta["sent_chunks"],
+        "sent_bytes": delta["sent_bytes"],
+        "file_size": sum(c["length"] for c in plan["chunks"]),
+        "kem_algorithm": delta["kem_algorithm"],
+        "sig_algorithm": delta["sig_algorithm"],
+        "cipher_suite": delta["cipher_suite"],
+        "timings": delta["timings"],
+        "receiver_response": response.json()
+    }), 200
+
+
+# ======================================================
+# RECEIVER: Which chunks are not stored yet
+# ======================================================
+@pqc_delta_bp.route("/pqc/delta/missing", methods=["POST"])
+def pqc_delta_missing():
+    data = request.get_json(silent=True) or {}
+    chunk_ids = data.get("chunks")
+    if not isinstance(chunk_ids, list):
+        return jsonify({"error": "chunks must be a list"}), 400
+
+    try:
+        missing = missing_chunks(chunk_ids, sending_peer())
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"missing": missing}), 200
+
+
+# ======================================================
+# RECEIVER: Rebuild from stored + new chunks
+# ======================================================
+@pqc_delta_bp.route("/pqc/delta/receive", methods=["POST"])
+@admitted
+@upload_limit("RECEIVER")
+def pqc_delta_receive():
+    if request.mimetype != "multipart/form-data" or "boundary" not in request.mimetype_params:
+        return jsonify({"error": "Delta transfer must be multipart/form-data"}), 400
+
+    peer_id = sending_peer()
+    try:
+        result = receive_pqc_delta(
+            request.stream,
+            request.mimetype_params["boundary"],
+            current_app.config.get("MAX_FORM_MEMORY_SIZE"),
+            peer_id
+        )
+    except StoreChunksMissing as e:
+        print(f"Delta receive: {e}")
+        return jsonify({"error": str(e), "missing": e.missing}), 409
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        print(f"Delta receive error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+    file_id = str(uuid.uuid4())
+    add_entry({
+        "id": file_id,
+        "filename": result["filename"],
+        "kyber_ciphertext": result["kyber_ciphertext"],
+        "signature": result["signature"],
+        "file_size": result["file_size"],
+        "kyber_private_key": load_kyber_private_key(result["kem_algorithm"]).hex(),
+        "shared_secret": result["shared_secret"].hex(),
+        "file_hash": result["manifest_hash"].hex(),
+        "kem_algorithm": result["kem_algorithm"],
+        "sig_algorithm": result["sig_algorithm"],
+        "cipher_suite": result["cipher_suite"],
+        "hash_mode": "delta-manifest",
+        "transfer_id": result["transfer_id"],
+        "path": result["decrypted_file_path"],
+        "peer_id": peer_id,
+        "status": READY
+    })
+
+    return jsonify({
+        "message": "Delta received and rebuilt",
+        "file_id": file_id,
+        "transfer_id": result["transfer_id"],
+        "chunks": result["chunk_count"],
+        "received_chunks": result["received_chunks"],
+        "timings": result["timings"]
+    }), 200
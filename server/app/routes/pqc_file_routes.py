@@ -1,24 +1,62 @@
 import os
+import shutil
+import time
 import uuid
 import base64
+import hashlib
 import requests
 from flask import Blueprint, request, jsonify, current_app
 from app.extensions import app_state
 import urllib.parse
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_date
 
 
 # PQC workflow services
 from app.services.pqc_workflow_service import (
+    pqc_decrypt_file_workflow,
     pqc_encrypt_file_workflow,
-    pqc_decrypt_file_workflow
+    pqc_verify_received
+)
+from app.services.pqc_inbox_service import (
+    FAILED,
+    READY,
+    VERIFIED,
+    add_entry,
+    find_entry,
+    list_entries,
+    pop_ready,
+    remove_entry,
+    set_status,
+    submit_decryption
+)
+from app.services.file_service import DOWNLOADS, inline_b64, open_upload_stream, send_and_remove
+from app.utils.limits import admitted, upload_limit
+from app.utils.peers import peer_headers, sending_peer
+from app.services.artifact_cache_service import artifact_cache, pqc_encrypt_file_cached
+from app.services.pqc_receive_service import receive_pqc_upload
+from app.utils.multipart import READ_CHUNK_SIZE
+from app.services.merkle_service import encode_leaves
+from app.services.crypto_service import derive_aes_key_from_shared_secret
+from app.services.pqc_encryption_service import decrypt_range_with_aes_key, received_file_name
+from app.services.container_service import (
+    MIMETYPE as CONTAINER_MIMETYPE,
+    pack_workflow_result,
+    read_container_info,
+    receive_pqc_container
+)
+from app.services.delivery_service import (
+    CONTENT_HASH_HEADER,
+    TRANSFER_ID_HEADER,
+    TransferConflict,
+    delivery_index
 )
 
 # Key storage helpers (used during handshake elsewhere)
 from app.services.pqc_key_service import (
     load_kyber_private_key,
     load_kyber_public_key,
-    store_receiver_kyber_public_key,
-    store_sender_dilithium_public_key
+    load_peer_kyber_public_key
 )
 
 # ------------------------------------------------------
@@ -26,70 +64,239 @@ from app.services.pqc_key_service import (
 # ------------------------------------------------------
 file_pqc_bp = Blueprint("file_pqc", __name__)
 
+# /pqc/encrypt form fields that change how the file is encrypted
+PARAMETER_FIELDS = {"kem_algorithm", "sig_algorithm", "cipher_suite", "reuse", "peer_id"}
+
 # ======================================================
 # SENDER: Encrypt file using PQC
 # ======================================================
 @file_pqc_bp.route("/pqc/encrypt", methods=["POST"])
+@admitted
+@upload_limit("SENDER")
 def pqc_encrypt_file():
     # if app_state.role != "SENDER":
     #     return jsonify({"error": "Not in sender mode"}), 403
     
-    if "file" not in request.files:
-        return jsonify({"error": "File missing"}), 400
-
-    uploaded_file = request.files["file"]
-    upload_dir = current_app.config["UPLOAD_FOLDER"]
-    os.makedirs(upload_dir, exist_ok=True)
-    input_path = os.path.join(upload_dir, uploaded_file.filename)
-    uploaded_file.save(input_path)
+    # Parse the body as it arrives; parameter fields must precede the file
+    try:
+        upload = open_upload_stream(request)
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    form = upload.form
+    filename = upload.filename
+    reuse = form.get("reuse", "true").lower() != "false"
+    input_path = None
 
     try:
-        # Full PQC encryption workflow
-        result = pqc_encrypt_file_workflow(input_path)
+        if current_app.config["ARTIFACT_CACHE_ENABLED"] and reuse:
+            # The cache is keyed by the plaintext hash: needs the whole file first
+            upload_dir = current_app.config["UPLOAD_FOLDER"]
+            os.makedirs(upload_dir, exist_ok=True)
+            # Client-supplied name: sanitised, and unique per request
+            input_path = os.path.join(upload_dir, received_file_name(filename))
+            with open(input_path, "wb") as f:
+                shutil.copyfileobj(upload, f, READ_CHUNK_SIZE)
+            result = pqc_encrypt_file_cached(
+                input_path,
+                kem_algorithm=form.get("kem_algorithm"),
+                sig_algorithm=form.get("sig_algorithm"),
+                cipher_suite=form.get("cipher_suite"),
+                reuse=reuse,
+                peer_id=form.get("peer_id")
+            )
+        else:
+            # Upload → encryption directly, only ciphertext touches the disk
+            result = {
+                **pqc_encrypt_file_workflow(
+                    filename,
+                    kem_algorithm=form.get("kem_algorithm"),
+                    sig_algorithm=form.get("sig_algorithm"),
+                    cipher_suite=form.get("cipher_suite"),
+                    reader=upload,
+                    peer_id=form.get("peer_id")
+                ),
+                "artifact_cached": False
+            }
+        late_fields = PARAMETER_FIELDS & upload.finish().keys()
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error during PQC encryption: {e}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        # Delete original file after encryption
+        if input_path and os.path.exists(input_path):
+            try:
+                os.remove(input_path)
+            except Exception as e:
+                print(f"Failed to delete original file: {e}")
+
+    if late_fields:
+        os.remove(result["encrypted_file_path"])
+        return jsonify({
+            "error": f"Fields {sorted(late_fields)} must come before the file"
+        }), 400
 
-    # Delete original file after encryption
-    try:
-        os.remove(input_path)
-    except Exception as e:
-        print(f"Failed to delete original file: {e}")
-
-    # Read encrypted file → base64
-    with open(result["encrypted_file_path"], "rb") as f:
-        encrypted_b64 = base64.b64encode(f.read()).decode("utf-8")
-    kyber_pk_path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "receiver_kyber_pk.bin"
-    )
-
-    with open(kyber_pk_path, "rb") as f:
-        kyber_pk_bytes = f.read()
-    print(encrypted_b64[:100] + "...")  # Print first 100 chars for debugging
+    # Ciphertext, Kyber ciphertext, leaf index and signature in one file
+    container_path = pack_workflow_result(result, filename)
+    container = read_container_info(container_path)
+
+    # Encrypted body → base64 (shown by the UI), large files stay on disk
+    encrypted_b64 = None
+    if container["body_size"] <= current_app.config["INLINE_FILE_MAX_BYTES"]:
+        with open(container_path, "rb") as f:
+            f.seek(container["body_offset"])
+            encrypted_b64 = base64.b64encode(f.read(container["body_size"])).decode("utf-8")
+    kyber_pk_bytes = load_peer_kyber_public_key(form.get("peer_id"))
     return jsonify({
         "message": "File encrypted using PQC",
         "encrypted_file": encrypted_b64,
         "kyber_public_key": kyber_pk_bytes.hex(),
         "encrypted_file_name": os.path.basename(result["encrypted_file_path"]),
+        "container_file_name": os.path.basename(container_path),
         "kyber_ciphertext": result["kyber_ciphertext"].hex(),
         "shared_secret": result["shared_secret"].hex(),
         "file_hash": result["file_hash"].hex(),
         "signature": base64.b64encode(
             result["signature"]
         ).decode("utf-8"),
-        "original_filename": uploaded_file.filename
+        "original_filename": filename,
+        "kem_algorithm": result["kem_algorithm"],
+        "sig_algorithm": result["sig_algorithm"],
+        "cipher_suite": result["cipher_suite"],
+        "hash_mode": result["hash_mode"],
+        "artifact_cached": result["artifact_cached"],
+        "merkle_leaves": (
+            base64.b64encode(encode_leaves(result["merkle_leaves"])).decode("utf-8")
+            if result["merkle_leaves"] is not None else None
+        )
     }), 200
 
 
 # ======================================================
 # SENDER → RECEIVER: Send encrypted file
 # ======================================================
+# Receiver answers worth another attempt: admission queue full, busy
+RETRY_STATUSES = (429, 503)
+
+
+def _retry_after_seconds(response) -> float:
+    """Receiver's Retry-After (seconds or HTTP date), None if absent or unreadable."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        date = parse_date(value)
+        if date is None:
+            return None
+        return max(0.0, date.timestamp() - time.time())
+
+
+def _deliver_with_retries(url: str, headers: dict, files: dict = None, data=None):
+    """
+    POSTs one delivery, re-sending it with the same transfer id after a
+    timeout, a dropped connection or a 429 / 503 from the receiver. A
+    receiver's Retry-After is honoured (capped), otherwise the wait
+    doubles after every attempt. A file object as `data` is rewound
+    before every attempt.
+    """
+    retries = current_app.config["DELIVERY_RETRIES"]
+    backoff = current_app.config["DELIVERY_RETRY_BACKOFF_SECONDS"]
+    retry_after_max = current_app.config["DELIVERY_RETRY_AFTER_MAX_SECONDS"]
+    attempt = 0
+    while True:
+        wait = None
+        try:
+            if hasattr(data, "seek"):
+                data.seek(0)
+            response = requests.post(url, files=files, data=data, headers=headers, timeout=300)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            reason = f"receiver busy ({response.status_code} {response.text})"
+            wait = _retry_after_seconds(response)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            if attempt >= retries:
+                raise
+            reason = str(e)
+
+        attempt += 1
+        if wait is None:
+            wait = backoff * 2 ** (attempt - 1)
+        else:
+            wait = min(wait, retry_after_max)
+        current_app.logger.warning(
+            "Delivery %s attempt %d failed: %s, retrying in %.1fs",
+            headers[TRANSFER_ID_HEADER], attempt, reason, wait
+        )
+        time.sleep(wait)
+
+
+def _send_container(receiver_api: str, container_file_name: str, transfer_id: str = None,
+                    peer_id: str = None):
+    """
+    Streams a container written by /pqc/encrypt to the receiver as the
+    request body, without decoding or re-encoding any part of it.
+    """
+    container_path = os.path.join(
+        current_app.config["ENCRYPTED_FOLDER"],
+        os.path.basename(container_file_name)
+    )
+    if not os.path.isfile(container_path):
+        return jsonify({"error": "Container not found"}), 404
+
+    try:
+        with open(container_path, "rb") as f:
+            content_hash = hashlib.file_digest(f, "sha256").hexdigest()
+            # One id per send, kept across its retries: an artifact cache
+            # hit sends identical bytes again and is still a new delivery
+            transfer_id = transfer_id or uuid.uuid4().hex
+            response = _deliver_with_retries(
+                f"{receiver_api}/pqc/decrypt",
+                {
+                    TRANSFER_ID_HEADER: transfer_id,
+                    CONTENT_HASH_HEADER: content_hash,
+                    "Content-Type": CONTAINER_MIMETYPE,
+                    "Content-Length": str(os.path.getsize(container_path)),
+                    **peer_headers(peer_id)
+                },
+                data=f
+            )
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {str(e)}")
+        return jsonify({
+            "error": "Failed to contact receiver",
+            "details": str(e)
+        }), 500
+
+    if response.status_code != 200:
+        print(f"Receiver error: {response.status_code} - {response.text}")
+        return jsonify({
+            "error": "Receiver failed to decrypt",
+            "receiver_status": response.status_code,
+            "receiver_response": response.text
+        }), 500
+
+    os.remove(container_path)
+    return jsonify({
+        "message": "File sent successfully",
+        "transfer_id": transfer_id,
+        "receiver_response": response.json()
+    }), 200
+
+
 @file_pqc_bp.route("/pqc/send-file", methods=["POST"])
 def pqc_send_file():
     """
     Sender backend → Receiver backend
-    Sends encrypted file + Kyber ciphertext + Dilithium signature
+    Sends encrypted file + Kyber ciphertext + Dilithium signature,
+    either as the container named by container_file_name or as the
+    base64 / hex fields of the payload
     """
     data = request.get_json()
     
@@ -98,11 +305,16 @@ def pqc_send_file():
         return jsonify({"error": "Invalid JSON payload"}), 400
 
     receiver_api = data.get("receiver_api")
+    if receiver_api and data.get("container_file_name"):
+        return _send_container(receiver_api, data["container_file_name"], data.get("transfer_id"),
+                               data.get("peer_id"))
+
     encrypted_file_b64 = data.get("encryptedFile")  # ← Changed: get base64 file from JSON
     encrypted_file_name = data.get("encrypted_file_name")
     signature = data.get("signature")
     kyber_ciphertext = data.get("kyber_ciphertext")
     original_filename = data.get("original_filename")
+    merkle_leaves = data.get("merkle_leaves")
     # print("encrypted_file_b64 length:", len(encrypted_file_b64) if encrypted_file_b64 else "None")
     if not all([
         receiver_api,
@@ -118,6 +330,11 @@ def pqc_send_file():
     try:
         # Decode base64 encrypted file to raw bytes
         encrypted_file_bytes = base64.b64decode(encrypted_file_b64)
+
+        # Idempotency key of this send, reused only by its own retries
+        # (identical bytes can be a legitimate second send, e.g. a cache hit)
+        content_hash = hashlib.sha256(encrypted_file_bytes).hexdigest()
+        transfer_id = data.get("transfer_id") or uuid.uuid4().hex
         
         # Prepare multipart form data
         files = {
@@ -133,13 +350,20 @@ def pqc_send_file():
             "kyber_ciphertext": kyber_ciphertext,  # Keep as base64 string
             "original_filename": original_filename
         }
+        if merkle_leaves:
+            # Sent ahead of the file so the receiver can check each leaf on arrival
+            form_data["merkle_leaves"] = merkle_leaves
 
         # print(f"Sending to receiver: {receiver_api}/pqc/decrypt")
-        response = requests.post(
+        response = _deliver_with_retries(
             f"{receiver_api}/pqc/decrypt",
+            {
+                TRANSFER_ID_HEADER: transfer_id,
+                CONTENT_HASH_HEADER: content_hash,
+                **peer_headers(data.get("peer_id"))
+            },
             files=files,
-            data=form_data,
-            timeout=300
+            data=form_data
         )
 
         # Forward receiver response to sender UI
@@ -154,6 +378,7 @@ def pqc_send_file():
         # print("File sent and decrypted successfully")
         return jsonify({
             "message": "File sent successfully",
+            "transfer_id": transfer_id,
             "receiver_response": response.json()
         }), 200
 
@@ -181,105 +406,190 @@ def pqc_send_file():
 # ======================================================
 # RECEIVER: Decrypt file using PQC
 # ======================================================
-@file_pqc_bp.route("/pqc/decrypt", methods=["POST"])
-def pqc_decrypt_file():
-    # if app_state.role != "RECEIVER":
-    #     return jsonify({"error": "Not in receiver mode"}), 403
-    
-    if "file" not in request.files:
-        return jsonify({"error": "Encrypted file missing"}), 400
-
-    encrypted_file = request.files["file"]
-    signature_b64 = request.form.get("signature")
-    kyber_ct_b64 = request.form.get("kyber_ciphertext")
-    original_filename = request.form.get(
-        "original_filename", "received_file"
-    )
+def _decrypt_upload():
+    """
+    Receives, verifies and decrypts one upload and queues the file.
 
-     # Print first 100 chars for debugging
-    if not signature_b64 or not kyber_ct_b64:
-        print("Missing signature or Kyber ciphertext in form data")
-        return jsonify({"error": "Missing signature or Kyber ciphertext"}), 400
-    # print(f"kyber_ct_b64: {kyber_ct_b64[:100]}...")  # Print first 100 chars for debugging
-    # Decode Base64 inputs
-    kyber_ct = bytes.fromhex(kyber_ct_b64)  
-    # print(f"Kyber ciphertext length: {len(kyber_ct)} bytes")
-    try:
-        signature = base64.b64decode(signature_b64)
-        
-    except Exception:
-        print("Invalid Base64 encoding for signature or Kyber ciphertext")
-        return jsonify({"error": "Invalid Base64 encoding"}), 400
+    Returns:
+        (response body, status)
+    """
+    is_container = request.mimetype == CONTAINER_MIMETYPE
+    if not is_container and (
+        request.mimetype != "multipart/form-data" or "boundary" not in request.mimetype_params
+    ):
+        return {"error": "Encrypted file missing"}, 400
 
-    # Save encrypted file exactly as received
     encrypted_dir = current_app.config["ENCRYPTED_FOLDER"]
     os.makedirs(encrypted_dir, exist_ok=True)
     encrypted_path = os.path.join(
         encrypted_dir,
         f"recv_{uuid.uuid4().hex}.enc"
     )
-    
-    encrypted_file.stream.seek(0)
-    with open(encrypted_path, "wb") as f:
-        f.write(encrypted_file.read())
-
-    # Store Kyber ciphertext for decapsulation
-    kyber_ct_path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "sender_kyber_ct.bin"
-    )
-    with open(kyber_ct_path, "wb") as f:
-        f.write(kyber_ct)
-    # print(f"Kyber ciphertext stored for decapsulation at: {kyber_ct_path}")
+
+    # Hash + spool the upload in one pass, Kyber decapsulation overlapping it
+    peer_id = sending_peer()
     try:
-        result = pqc_decrypt_file_workflow(
-            encrypted_file_path=encrypted_path,
-            signature=signature,
-            original_filename=original_filename
-        )
-        print("File decrypted successfully")
-        
-        # Delete encrypted file after successful decryption
-        os.remove(encrypted_path)
-        
+        if is_container:
+            received = receive_pqc_container(request.stream, encrypted_path, request.content_length, peer_id)
+        else:
+            received = receive_pqc_upload(
+                request.stream,
+                request.mimetype_params["boundary"],
+                encrypted_path,
+                current_app.config.get("MAX_FORM_MEMORY_SIZE"),
+                peer_id
+            )
+    except RequestEntityTooLarge as e:
+        return {"error": e.description}, 413
     except Exception as e:
-        print(f"Decryption error: {str(e)}")
-        return jsonify({"error": str(e)}), 400
-
-    # Read decrypted file for queue storage
-    print(f"Decrypted file path: {result['decrypted_file_path']}")
-    actual_decrypted_path = result["decrypted_file_path"]
-
-    with open(actual_decrypted_path, "rb") as f:
-        decrypted_b64 = base64.b64encode(f.read()).decode("utf-8")
-    
-    # file_size = os.path.getsize(decrypted_path)
-    file_id = str(uuid.uuid4())
-    file_size = os.path.getsize(actual_decrypted_path)
+        print(f"Receive error: {str(e)}")
+        return {"error": str(e)}, 400
 
-    # Initialize queue if not exists
-    if not hasattr(app_state, 'pqc_received_files_queue'):
-        app_state.pqc_received_files_queue = []
+    signature_b64 = received["form"]["signature"]
+    kyber_ct_b64 = received["form"]["kyber_ciphertext"]
+    original_filename = received["form"].get(
+        "original_filename", "received_file"
+    )
+    try:
+        signature = base64.b64decode(signature_b64)
+    except Exception:
+        os.remove(encrypted_path)
+        print("Invalid Base64 encoding for signature")
+        return {"error": "Invalid Base64 encoding"}, 400
 
-    # Add to queue
-    app_state.pqc_received_files_queue.append({
-        "id": file_id,
+    # Ciphertext is on disk: the file shows up in the inbox as RECEIVED
+    entry = add_entry({
+        "id": str(uuid.uuid4()),
         "filename": original_filename,
-        "decrypted_content": decrypted_b64,
         "kyber_ciphertext": kyber_ct_b64,
         "signature": signature_b64,
-        "file_size": file_size,
+        "file_size": None,
         "kyber_private_key": load_kyber_private_key().hex(),
-        "shared_secret": result.get("shared_secret", "").hex(),
-        "file_hash": result.get("file_hash", "").hex(),
-        "path": result["decrypted_file_path"],
-        "status": "READY"
+        "path": None,
+        "ciphertext_path": None,
+        "peer_id": peer_id
     })
 
-    return jsonify({
+    try:
+        received = pqc_verify_received(encrypted_path, signature, received, peer_id)
+    except Exception as e:
+        print(f"Verification error: {str(e)}")
+        remove_entry(entry["id"])
+        os.remove(encrypted_path)
+        return {"error": str(e)}, 400
+    set_status(entry, VERIFIED)
+
+    def decrypt(entry):
+        try:
+            result = pqc_decrypt_file_workflow(
+                encrypted_file_path=encrypted_path,
+                signature=signature,
+                original_filename=original_filename,
+                received=received,
+                peer_id=peer_id
+            )
+        except Exception:
+            if os.path.exists(encrypted_path):
+                os.remove(encrypted_path)
+            raise
+        print(f"Decrypted file path: {result['decrypted_file_path']}")
+        actual_decrypted_path = result["decrypted_file_path"]
+
+        # Keep the verified ciphertext for range reads, else delete it
+        ciphertext_path = None
+        if current_app.config["PQC_KEEP_CIPHERTEXT"]:
+            ciphertext_path = os.path.join(encrypted_dir, f"stored_{entry['id']}.enc")
+            os.replace(encrypted_path, ciphertext_path)
+        else:
+            os.remove(encrypted_path)
+
+        set_status(
+            entry,
+            READY,
+            file_size=os.path.getsize(actual_decrypted_path),
+            shared_secret=result.get("shared_secret", "").hex(),
+            file_hash=result.get("file_hash", "").hex(),
+            kem_algorithm=result["kem_algorithm"],
+            sig_algorithm=result["sig_algorithm"],
+            cipher_suite=result["cipher_suite"],
+            hash_mode=result["hash_mode"],
+            path=actual_decrypted_path,
+            ciphertext_path=ciphertext_path
+        )
+
+    # Acknowledge now (ciphertext flushed to disk first), decrypt on the receive pool
+    if current_app.config["RECEIVE_ASYNC_DECRYPT"]:
+        with open(encrypted_path, "rb") as f:
+            os.fsync(f.fileno())
+    if current_app.config["RECEIVE_ASYNC_DECRYPT"] and submit_decryption(decrypt, entry):
+        return {
+            "message": "File received and verified",
+            "file_id": entry["id"],
+            "status": VERIFIED
+        }, 200
+
+    try:
+        decrypt(entry)
+        print("File decrypted successfully")
+    except Exception as e:
+        print(f"Decryption error: {str(e)}")
+        remove_entry(entry["id"])
+        return {"error": str(e)}, 400
+
+    return {
         "message": "File decrypted and stored",
-        "file_id": file_id
-    }), 200
+        "file_id": entry["id"],
+        "status": READY
+    }, 200
+
+
+@file_pqc_bp.route("/pqc/decrypt", methods=["POST"])
+@admitted
+@upload_limit("RECEIVER")
+def pqc_decrypt_file():
+    # if app_state.role != "RECEIVER":
+    #     return jsonify({"error": "Not in receiver mode"}), 403
+
+    transfer_id = request.headers.get(TRANSFER_ID_HEADER)
+    if not transfer_id:
+        body, status = _decrypt_upload()
+        return jsonify(body), status
+
+    content_hash = request.headers.get(CONTENT_HASH_HEADER, "")
+    try:
+        record = delivery_index.acquire(
+            transfer_id,
+            content_hash,
+            current_app.config["DELIVERY_INDEX_TTL_SECONDS"],
+            current_app.config["DELIVERY_WAIT_SECONDS"]
+        )
+    except TransferConflict as e:
+        return jsonify({"error": str(e)}), 409
+    except TimeoutError as e:
+        return jsonify({"error": str(e)}), 503
+
+    if record is not None:
+        # Already delivered: drain the re-sent body, answer as the first time
+        while request.stream.read(READ_CHUNK_SIZE):
+            pass
+        print(f"Duplicate delivery {transfer_id}, returning stored result")
+        return jsonify({**record["response"], "duplicate": True}), record["status"]
+
+    try:
+        body, status = _decrypt_upload()
+    except Exception:
+        delivery_index.release(transfer_id)
+        raise
+
+    if status == 200:
+        body["transfer_id"] = transfer_id
+        delivery_index.complete(
+            transfer_id, content_hash, status, body,
+            current_app.config["DELIVERY_INDEX_SIZE"]
+        )
+    else:
+        delivery_index.release(transfer_id)
+    return jsonify(body), status
 
 
 # ======================================================
@@ -291,16 +601,22 @@ def pqc_next_file():
     if app_state.role != "RECEIVER":
         return jsonify({"error": "Not in receiver mode"}), 403
 
-    if not hasattr(app_state, 'pqc_received_files_queue') or not app_state.pqc_received_files_queue:
+    # Oldest decrypted file; files still being decrypted stay queued
+    file_entry = pop_ready()
+    if file_entry is None:
         return jsonify({"message": "No files available"}), 204  # No Content
-
-    # Get first file from queue
-    file_entry = app_state.pqc_received_files_queue.pop(0)
     
-    # Delete file from disk
+    # Delete file (and kept ciphertext) from disk; a file too large to
+    # inline stays until it has been downloaded
+    download_url = None
+    file_data = inline_b64(file_entry["path"])
+    if file_data is None:
+        app_state.store.put(DOWNLOADS, file_entry["id"], file_entry)
+        download_url = f"/pqc/files/{file_entry['id']}/download"
     try:
-        if os.path.exists(file_entry["path"]):
-            os.remove(file_entry["path"])
+        for path in (file_entry.get("ciphertext_path"), None if download_url else file_entry["path"]):
+            if path and os.path.exists(path):
+                os.remove(path)
     except Exception as e:
         print(f"Failed to delete file from disk: {e}")
     
@@ -310,9 +626,115 @@ def pqc_next_file():
         "filename": file_entry["filename"],
         "file_size": file_entry["file_size"],
         "kyber_ciphertext": file_entry["kyber_ciphertext"],
-        "file_data": file_entry["decrypted_content"],
+        "file_data": file_data,
+        "download_url": download_url,
         "signature": file_entry["signature"],
         "file_hash": file_entry.get("file_hash"),
         "shared_secret": file_entry.get("shared_secret"),
-        "kyber_private_key": file_entry.get("kyber_private_key")
-    }), 200
\ No newline at end of file
+        "kyber_private_key": file_entry.get("kyber_private_key"),
+        "kem_algorithm": file_entry.get("kem_algorithm"),
+        "sig_algorithm": file_entry.get("sig_algorithm"),
+        "cipher_suite": file_entry.get("cipher_suite")
+    }), 200
+
+# ======================================================
+# RECEIVER: Inbox (per-file decryption status)
+# ======================================================
+@file_pqc_bp.route("/pqc/inbox", methods=["GET"])
+def pqc_inbox():
+    """Queued files with their status: RECEIVED, VERIFIED, READY or FAILED"""
+    return jsonify({"files": list_entries()}), 200
+
+
+@file_pqc_bp.route("/pqc/inbox/<file_id>", methods=["DELETE"])
+def pqc_inbox_remove(file_id):
+    """Drops a READY or FAILED file from the inbox"""
+    entry = find_entry(file_id)
+    if entry is None:
+        return jsonify({"error": "File not found"}), 404
+    if entry["status"] not in (READY, FAILED):
+        return jsonify({"error": f"File is {entry['status']}"}), 409
+    remove_entry(file_id)
+    for path in (entry.get("path"), entry.get("ciphertext_path")):
+        if path and os.path.exists(path):
+            os.remove(path)
+    return jsonify({"message": "File removed"}), 200
+
+# ======================================================
+# RECEIVER: Stream a large file handed out by /pqc/next-file
+# ======================================================
+@file_pqc_bp.route("/pqc/files/<file_id>/download", methods=["GET"])
+def pqc_file_download(file_id):
+    file_entry = app_state.store.pop(DOWNLOADS, file_id)
+    if file_entry is None or not os.path.exists(file_entry["path"]):
+        return jsonify({"error": "File not found"}), 404
+    return send_and_remove(file_entry["path"], file_entry["filename"])
+
+
+# ======================================================
+# RECEIVER: Decrypt a byte range of a queued file
+# ======================================================
+@file_pqc_bp.route("/pqc/files/<file_id>/range", methods=["GET"])
+def pqc_file_range(file_id):
+    """
+    Plaintext bytes of a queued file, decrypted from its kept ciphertext
+    (PQC_KEEP_CIPHERTEXT); only the segments in the range are opened.
+
+    Range: bytes=START-END (or ?offset=&length=, default first 64 KB)
+    """
+    entry = find_entry(file_id)
+    if entry is None:
+        return jsonify({"error": "File not found"}), 404
+    if entry["status"] != READY:
+        return jsonify({"error": f"File is {entry['status']}"}), 409
+    if not entry.get("ciphertext_path"):
+        return jsonify({"error": "Ciphertext of this file was not kept"}), 409
+
+    aes_key = derive_aes_key_from_shared_secret(bytes.fromhex(entry["shared_secret"]))
+    try:
+        offset = request.args.get("offset", 0, type=int)
+        length = request.args.get("length", 64 * 1024, type=int)
+        if request.range is not None:
+            # Plaintext size is needed to resolve suffix / open ranges
+            _, plaintext_size, _ = decrypt_range_with_aes_key(entry["ciphertext_path"], aes_key, 0, 0)
+            bounds = request.range.range_for_length(plaintext_size)
+            if bounds is None:
+                return jsonify({"error": "Range not satisfiable"}), 416, {
+                    "Content-Range": f"bytes */{plaintext_size}"
+                }
+            offset, length = bounds[0], bounds[1] - bounds[0]
+
+        start = time.perf_counter_ns()
+        data, plaintext_size, segments = decrypt_range_with_aes_key(
+            entry["ciphertext_path"], aes_key, offset, length
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+    print(f"Range {offset}+{len(data)} of {file_id}: {segments} segment(s), {elapsed_ms:.2f} ms")
+
+    if not data and offset >= plaintext_size > 0:
+        return jsonify({"error": "Range not satisfiable"}), 416, {
+            "Content-Range": f"bytes */{plaintext_size}"
+        }
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "Accept-Ranges": "bytes",
+        "X-Segments-Decrypted": str(segments)
+    }
+    if data:
+        headers["Content-Range"] = f"bytes {offset}-{offset + len(data) - 1}/{plaintext_size}"
+    return data, 206, headers
+
+
+# ======================================================
+# Delivery index (receiver) / artifact cache (sender)
+# ======================================================
+@file_pqc_bp.route("/pqc/deliveries", methods=["GET"])
+def pqc_delivery_status():
+    return jsonify(delivery_index.status()), 200
+
+
+@file_pqc_bp.route("/pqc/artifact-cache", methods=["GET"])
+def pqc_artifact_cache_status():
+    return jsonify(artifact_cache.stats()), 200
@@ -3,10 +3,6 @@ import base64
 from flask import Blueprint, request, jsonify
 
 from app.extensions import app_state
-from app.services.pqc_key_service import (
-    store_receiver_kyber_public_key,
-    store_sender_dilithium_public_key
-)
 from app.utils.network_utils import (
     get_local_ip,
     listen_for_receiver,
@@ -14,15 +10,26 @@ from app.utils.network_utils import (
     listen_for_handshake,
     listen_for_acknowledgment,
     send_handshake,
-    send_acknowledgment,
-    BroadcastState
+    send_acknowledgment
 )
 
 from app.services.pqc_key_service import (
+    has_kem_key_pair,
     load_kyber_public_key,
     load_dilithium_public_key
 )
 
+from app.services.pqc_param_service import (
+    algorithm_for_public_key,
+    allowed_algorithms,
+    ensure_allowed,
+    get_kem_algorithm,
+    get_sig_algorithm,
+    negotiate_algorithm,
+    validate_public_key
+)
+from app.services.key_lifecycle_service import key_lifecycle
+
 # --------------------------------------------------
 # Blueprint
 # --------------------------------------------------
@@ -72,8 +79,7 @@ def start_receiver():
     receiver_ip = get_local_ip()
     receiver_port = 5051
 
-    broadcast_state = BroadcastState()
-    app_state.broadcast_state = broadcast_state
+    broadcast_state = app_state.handshake_state("broadcast", reset=True)
 
     # Broadcast availability
     threading.Thread(
@@ -107,11 +113,10 @@ def receiver_status():
     if app_state.role != "RECEIVER":
         return jsonify({"error": "Not in receiver mode"}), 403
 
-    if not hasattr(app_state, "broadcast_state"):
+    state = app_state.handshake_state("broadcast")
+    if state is None:
         return jsonify({"status": "NOT_STARTED"})
 
-    state = app_state.broadcast_state
-
     if not state.handshake_received:
         return jsonify({"status": "WAITING"})
 
@@ -122,16 +127,29 @@ def receiver_status():
     # PQC (Post-Quantum Cryptography) handshake process.
     # print("Handshake received from sender:", sender_info)
 
-    # Store sender Dilithium public key
+    # Store sender Dilithium public key (parameter set must meet policy)
     # print(f"typer of sender_info['dilithium_public_key']: {type(sender_info['dilithium_public_key'])}")
-    app_state.peer_dilithium_public_key = bytes.fromhex(sender_info["dilithium_public_key"])
-    store_sender_dilithium_public_key(bytes.fromhex(sender_info["dilithium_public_key"]))
+    if not sender_info.get("dilithium_public_key"):
+        return jsonify({"error": "Sender handshake carries no Dilithium key (classical sender?)"}), 400
+    sender_pk = bytes.fromhex(sender_info["dilithium_public_key"])
+    sig_algorithm = sender_info.get("sig_algorithm") or algorithm_for_public_key("sig", sender_pk)
+    try:
+        ensure_allowed("sig", sig_algorithm)
+        validate_public_key("sig", sig_algorithm, sender_pk)
+    except (ValueError, KeyError) as e:
+        return jsonify({"error": f"Rejected sender key: {e}"}), 400
+
+    app_state.use_peer(f"{sender_info['ip']}:{sender_info['port']}")
+    app_state.peer_dilithium_public_key = sender_pk
+    app_state.peer_sig_algorithm = sig_algorithm
+    app_state.peer_kem_offer = sender_info.get("kem_algorithms")
 
     return jsonify({
         "status": "READY",
         "sender_ip": sender_info["ip"],
         "sender_port": sender_info["port"],
-        "sender_name": sender_info["name"]
+        "sender_name": sender_info["name"],
+        "sig_algorithm": sig_algorithm
     })
 
 
@@ -156,19 +174,46 @@ def receiver_acknowledge():
     receiver_ip = get_local_ip()
     receiver_port = 5050
 
-    kyber_pk = load_kyber_public_key()
+    # Negotiate the KEM parameter set: cheapest one both sides accept.
+    # Senders that predate negotiation get whatever key we already hold.
+    kem_algorithm = get_kem_algorithm()
+    sender_offer = getattr(app_state, "peer_kem_offer", None) or [kem_algorithm]
+    negotiated = negotiate_algorithm(
+        "kem", allowed_algorithms("kem"), sender_offer, app_state.pqc_cost_matrix
+    )
+    if negotiated is None:
+        return jsonify({
+            "error": "No mutually acceptable KEM parameter set",
+            "sender_offer": sender_offer,
+            "allowed": allowed_algorithms("kem")
+        }), 409
+
+    # Another set than the active one: reuse the pair kept for it, never
+    # replace the active pair other senders may still encrypt to
+    if negotiated != kem_algorithm:
+        if not has_kem_key_pair(negotiated):
+            key_lifecycle.bind_key_pair("pqc_kem", negotiated, wait=True)
+        kem_algorithm = negotiated
+    elif not key_lifecycle.wait_until_ready("pqc_kem", timeout=30):
+        return jsonify({"error": "Kyber keys are still being generated"}), 503
+
+    kyber_pk = load_kyber_public_key(kem_algorithm)
 
     payload = {
         "type": "RECEIVER_ACK",
         "name": receiver_name,
         "ip": receiver_ip,
         "port": receiver_port,
-        "kyber_public_key": kyber_pk.hex()
+        "kyber_public_key": kyber_pk.hex(),
+        "kem_algorithm": kem_algorithm
     }
 
 
 
-    success = send_acknowledgment(sender_ip, sender_port, receiver_ip, receiver_port, receiver_name)
+    success = send_acknowledgment(
+        sender_ip, sender_port, receiver_ip, receiver_port, receiver_name,
+        kem_algorithm=kem_algorithm
+    )
 
     if not success:
         return jsonify({"error": "Failed to send acknowledgment"}), 500
@@ -176,7 +221,8 @@ def receiver_acknowledge():
     return jsonify({
         "message": "Acknowledgment sent (PQC)",
         "receiver_ip": receiver_ip,
-        "receiver_port": receiver_port
+        "receiver_port": receiver_port,
+        "kem_algorithm": kem_algorithm
     })
 
 
@@ -201,7 +247,12 @@ def sender_handshake():
     sender_ip = get_local_ip()
     sender_port = 5051
 
+    if not key_lifecycle.wait_until_ready("pqc_sig", timeout=30):
+        return jsonify({"error": "Dilithium keys are still being generated"}), 503
+
     dilithium_pk = load_dilithium_public_key()
+    sig_algorithm = get_sig_algorithm()
+    kem_algorithms = allowed_algorithms("kem")
     # print(f"type of dilithium_pk: {type(dilithium_pk)}, length: {len(dilithium_pk)} bytes")
     # print(f"type(dilithium_pk.hex()): {type(dilithium_pk.hex())}, length: {len(dilithium_pk.hex())} chars")
     payload = {
@@ -209,16 +260,23 @@ def sender_handshake():
         "name": sender_name,
         "ip": sender_ip,
         "port": sender_port,
-        "dilithium_public_key": dilithium_pk.hex()
+        "dilithium_public_key": dilithium_pk.hex(),
+        "sig_algorithm": sig_algorithm,
+        "kem_algorithms": kem_algorithms
     }
     # print("Prepared handshake payload:", payload)
-    success = send_handshake(receiver_ip, receiver_port, sender_ip, sender_port, sender_name)
+    success = send_handshake(
+        receiver_ip, receiver_port, sender_ip, sender_port, sender_name,
+        sig_algorithm=sig_algorithm,
+        kem_algorithms=kem_algorithms
+    )
 
     if not success:
         return jsonify({"error": "Handshake failed"}), 500
 
-    ack_state = BroadcastState()
-    app_state.ack_state = ack_state
+    app_state.use_peer(f"{receiver_ip}:{receiver_port}")
+    app_state.local_peer_id = f"{sender_ip}:{sender_port}"
+    ack_state = app_state.handshake_state("ack", reset=True)
 
     threading.Thread(
         target=listen_for_acknowledgment,
@@ -243,18 +301,27 @@ def sender_ack_status():
     if app_state.role != "SENDER":
         return jsonify({"error": "Not in sender mode"}), 403
 
-    if not hasattr(app_state, "ack_state"):
+    state = app_state.handshake_state("ack")
+    if state is None:
         return jsonify({"status": "NOT_STARTED"})
 
-    state = app_state.ack_state
-
     if not state.ack_received:
         return jsonify({"status": "WAITING"})
 
     receiver_info = state.receiver_info
 
-    # Store receiver Kyber public key
-    store_receiver_kyber_public_key(bytes.fromhex(receiver_info["kyber_public_key"]))
-    app_state.peer_kyber_public_key = bytes.fromhex(receiver_info["kyber_public_key"])
-
-    return jsonify({"status": "ACKNOWLEDGED"})
\ No newline at end of file
+    # Store receiver Kyber public key (parameter set must meet policy)
+    if not receiver_info.get("kyber_public_key"):
+        return jsonify({"error": "Receiver acknowledgment carries no Kyber key (classical receiver?)"}), 400
+    receiver_pk = bytes.fromhex(receiver_info["kyber_public_key"])
+    kem_algorithm = receiver_info.get("kem_algorithm") or algorithm_for_public_key("kem", receiver_pk)
+    try:
+        ensure_allowed("kem", kem_algorithm)
+        validate_public_key("kem", kem_algorithm, receiver_pk)
+    except (ValueError, KeyError) as e:
+        return jsonify({"error": f"Rejected receiver key: {e}"}), 400
+
+    app_state.peer_kyber_public_key = receiver_pk
+    app_state.peer_kem_algorithm = kem_algorithm
+
+    return jsonify({"status": "ACKNOWLEDGED", "kem_algorithm": kem_algorithm})
\ No newline at end of file
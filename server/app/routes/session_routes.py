@@ -0,0 +1,41 @@
+from flask import Blueprint, jsonify
+from app.extensions import app_state
+
+session_bp = Blueprint("sessions", __name__)
+
+
+# ======================================================
+# Peer sessions
+# ======================================================
+# Every handshake records its peer (ip:port) as a session holding the
+# peer's keys and the suites negotiated with it; the peer_* fields of
+# app_state read and write the active one. Transfers look their peer's
+# keys up by id (app_state.peer_session): senders pick it with a peer_id
+# field and name themselves to the receiver with X-Peer-Id, so the
+# active peer is only the default.
+
+def _public(session: dict) -> dict:
+    # Raw PQC public keys are stored as bytes
+    return {
+        name: value.hex() if isinstance(value, bytes) else value
+        for name, value in session.items()
+    }
+
+
+@session_bp.route("/sessions", methods=["GET"])
+def list_sessions():
+    return jsonify({
+        "active_peer": app_state.active_peer,
+        "sessions": [_public(s) for s in app_state.sessions()]
+    }), 200
+
+
+@session_bp.route("/sessions/<peer_id>/activate", methods=["POST"])
+def activate_session(peer_id):
+    """Switches back to a peer handshaken with before, without a new handshake"""
+    session = next((s for s in app_state.sessions() if s["peer_id"] == peer_id), None)
+    if session is None:
+        return jsonify({"error": "Unknown peer session"}), 404
+
+    app_state.use_peer(peer_id)
+    return jsonify({"message": f"Active peer: {peer_id}", "session": _public(session)}), 200
@@ -0,0 +1,80 @@
+import base64
+import time
+from flask import Blueprint, request, jsonify, current_app
+from app.services.pqc_param_service import SIG_PARAMETER_SETS
+from app.services.verification_service import verify_batch, verification_cache
+
+verify_bp = Blueprint("verify", __name__)
+
+
+# ======================================================
+# Batch signature verification
+# ======================================================
+
+def _decode_item(item: dict) -> dict:
+    """
+    JSON item → verify_batch item
+    hash: hex, signature: base64, public_key: hex (ML-DSA) or PEM (classical)
+    """
+    scheme = item.get("scheme")
+    public_key = item.get("public_key")
+    if public_key is not None:
+        public_key = (
+            bytes.fromhex(public_key) if scheme in SIG_PARAMETER_SETS
+            else public_key.encode("utf-8")
+        )
+    return {
+        "scheme": scheme,
+        "hash": bytes.fromhex(item["hash"]),
+        "signature": base64.b64decode(item["signature"]),
+        "public_key": public_key
+    }
+
+
+@verify_bp.route("/verify/batch", methods=["POST"])
+def verify_signatures_batch():
+    """
+    {"items": [{"id", "scheme", "hash", "signature", "public_key"?}, ...]}
+    Returns per-item {id, valid, cached, error} in request order.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+    if len(items) > current_app.config["VERIFY_BATCH_MAX_ITEMS"]:
+        return jsonify({
+            "error": f"At most {current_app.config['VERIFY_BATCH_MAX_ITEMS']} items per batch"
+        }), 400
+
+    decoded = []
+    for index, item in enumerate(items):
+        try:
+            decoded.append(_decode_item(item))
+        except Exception as e:
+            return jsonify({"error": f"Item {index}: invalid encoding ({e})"}), 400
+
+    start = time.perf_counter_ns()
+    results = verify_batch(decoded)
+    elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+
+    for item, result in zip(items, results):
+        result["id"] = item.get("id")
+    valid = sum(1 for r in results if r["valid"])
+    return jsonify({
+        "results": results,
+        "valid": valid,
+        "invalid": len(results) - valid,
+        "elapsed_ms": elapsed_ms,
+        "cache": verification_cache.stats()
+    }), 200
+
+
+@verify_bp.route("/verify/cache", methods=["GET"])
+def verification_cache_status():
+    return jsonify(verification_cache.stats()), 200
+
+
+@verify_bp.route("/verify/cache", methods=["DELETE"])
+def clear_verification_cache():
+    verification_cache.clear()
+    return jsonify({"message": "Verification cache cleared"}), 200
@@ -0,0 +1,138 @@
+#include <stdio.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <oqs/oqs.h>
+
+/*
+ * Usage: pqc_bench <iterations> <algorithm>...
+ *
+ * Times keygen/encaps/decaps (KEM) or keygen/sign/verify (signature)
+ * in-process and prints one JSON object per algorithm on stdout.
+ * Times are average microseconds per operation.
+ */
+
+static double now_us(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1e6 + ts.tv_nsec / 1e3;
+}
+
+static int bench_kem(const char *alg, int iterations) {
+    OQS_KEM *kem = OQS_KEM_new(alg);
+    if (kem == NULL) {
+        return 1;
+    }
+
+    uint8_t *pk = malloc(kem->length_public_key);
+    uint8_t *sk = malloc(kem->length_secret_key);
+    uint8_t *ct = malloc(kem->length_ciphertext);
+    uint8_t *ss = malloc(kem->length_shared_secret);
+    double keygen = 0, encaps = 0, decaps = 0, t;
+    int rc = 0;
+
+    for (int i = 0; i < iterations && rc == 0; i++) {
+        t = now_us();
+        rc |= OQS_KEM_keypair(kem, pk, sk) != OQS_SUCCESS;
+        keygen += now_us() - t;
+
+        t = now_us();
+        rc |= OQS_KEM_encaps(kem, ct, ss, pk) != OQS_SUCCESS;
+        encaps += now_us() - t;
+
+        t = now_us();
+        rc |= OQS_KEM_decaps(kem, ss, ct, sk) != OQS_SUCCESS;
+        decaps += now_us() - t;
+    }
+
+    if (rc == 0) {
+        printf("{\"algorithm\": \"%s\", \"type\": \"kem\", \"iterations\": %d, "
+               "\"keygen_us\": %.2f, \"encaps_us\": %.2f, \"decaps_us\": %.2f, "
+               "\"public_key_bytes\": %zu, \"secret_key_bytes\": %zu, "
+               "\"ciphertext_bytes\": %zu, \"shared_secret_bytes\": %zu}\n",
+               alg, iterations,
+               keygen / iterations, encaps / iterations, decaps / iterations,
+               kem->length_public_key, kem->length_secret_key,
+               kem->length_ciphertext, kem->length_shared_secret);
+    }
+
+    free(pk); free(sk); free(ct); free(ss);
+    OQS_KEM_free(kem);
+    return rc;
+}
+
+static int bench_sig(const char *alg, int iterations) {
+    OQS_SIG *sig = OQS_SIG_new(alg);
+    if (sig == NULL) {
+        return 1;
+    }
+
+    uint8_t *pk = malloc(sig->length_public_key);
+    uint8_t *sk = malloc(sig->length_secret_key);
+    uint8_t *signature = malloc(sig->length_signature);
+    uint8_t message[64];  /* same size as the SHA-512 document hash */
+    size_t sig_len = 0;
+    double keygen = 0, sign = 0, verify = 0, t;
+    int rc = 0;
+
+    OQS_randombytes(message, sizeof(message));
+
+    for (int i = 0; i < iterations && rc == 0; i++) {
+        t = now_us();
+        rc |= OQS_SIG_keypair(sig, pk, sk) != OQS_SUCCESS;
+        keygen += now_us() - t;
+
+        t = now_us();
+        rc |= OQS_SIG_sign(sig, signature, &sig_len, message, sizeof(message), sk) != OQS_SUCCESS;
+        sign += now_us() - t;
+
+        t = now_us();
+        rc |= OQS_SIG_verify(sig, message, sizeof(message), signature, sig_len, pk) != OQS_SUCCESS;
+        verify += now_us() - t;
+    }
+
+    if (rc == 0) {
+        printf("{\"algorithm\": \"%s\", \"type\": \"sig\", \"iterations\": %d, "
+               "\"keygen_us\": %.2f, \"sign_us\": %.2f, \"verify_us\": %.2f, "
+               "\"public_key_bytes\": %zu, \"secret_key_bytes\": %zu, "
+               "\"signature_bytes\": %zu}\n",
+               alg, iterations,
+               keygen / iterations, sign / iterations, verify / iterations,
+               sig->length_public_key, sig->length_secret_key,
+               sig->length_signature);
+    }
+
+    free(pk); free(sk); free(signature);
+    OQS_SIG_free(sig);
+    return rc;
+}
+
+int main(int argc, char **argv) {
+    if (argc < 3) {
+        fprintf(stderr, "Usage: %s <iterations> <algorithm>...\n", argv[0]);
+        return 2;
+    }
+
+    int iterations = atoi(argv[1]);
+    if (iterations <= 0) {
+        iterations = 1;
+    }
+
+    int failures = 0;
+    for (int i = 2; i < argc; i++) {
+        int rc;
+        if (OQS_KEM_alg_is_enabled(argv[i])) {
+            rc = bench_kem(argv[i], iterations);
+        } else if (OQS_SIG_alg_is_enabled(argv[i])) {
+            rc = bench_sig(argv[i], iterations);
+        } else {
+            fprintf(stderr, "ERROR: %s not supported by liboqs\n", argv[i]);
+            rc = 1;
+        }
+        failures += rc;
+        fflush(stdout);
+    }
+
+    return failures ? 1 : 0;
+}
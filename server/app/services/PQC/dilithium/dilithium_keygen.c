@@ -2,10 +2,18 @@
 #include <stdint.h>
 #include <oqs/oqs.h>
 
-int main(void) {
-    OQS_SIG *sig = OQS_SIG_new("ML-DSA-44");
+/*
+ * Usage: dilithium_keygen [algorithm] [pk_out] [sk_out]
+ *   algorithm defaults to ML-DSA-44, paths default to server/pqc_keys/
+ */
+int main(int argc, char **argv) {
+    const char *alg = argc > 1 ? argv[1] : "ML-DSA-44";
+    const char *pk_path = argc > 2 ? argv[2] : "server/pqc_keys/dilithium_pk.bin";
+    const char *sk_path = argc > 3 ? argv[3] : "server/pqc_keys/dilithium_sk.bin";
+
+    OQS_SIG *sig = OQS_SIG_new(alg);
     if (sig == NULL) {
-        fprintf(stderr, "ERROR: Dilithium2 not supported by liboqs\n");
+        fprintf(stderr, "ERROR: %s not supported by liboqs\n", alg);
         return 1;
     }
 
@@ -13,16 +21,18 @@ int main(void) {
     uint8_t sk[sig->length_secret_key];
 
     if (OQS_SIG_keypair(sig, pk, sk) != OQS_SUCCESS) {
-        fprintf(stderr, "ERROR: Dilithium key generation failed\n");
+        fprintf(stderr, "ERROR: %s key generation failed\n", alg);
         OQS_SIG_free(sig);
         return 1;
     }
 
-    FILE *fpk = fopen("server/pqc_keys/dilithium_pk.bin", "wb");
-    FILE *fsk = fopen("server/pqc_keys/dilithium_sk.bin", "wb");
+    FILE *fpk = fopen(pk_path, "wb");
+    FILE *fsk = fopen(sk_path, "wb");
 
     if (!fpk || !fsk) {
-        fprintf(stderr, "ERROR: Could not open Dilithium key files\n");
+        fprintf(stderr, "ERROR: Could not open signature key files\n");
+        if (fpk) fclose(fpk);
+        if (fsk) fclose(fsk);
         OQS_SIG_free(sig);
         return 1;
     }
@@ -32,8 +42,10 @@ int main(void) {
 
     fclose(fpk);
     fclose(fsk);
+
+    OQS_MEM_cleanse(sk, sizeof(sk));
     OQS_SIG_free(sig);
 
-    printf("Dilithium keypair generated successfully\n");
+    printf("%s keypair generated successfully\n", alg);
     return 0;
-}
\ No newline at end of file
+}
@@ -2,30 +2,56 @@
 #include <stdint.h>
 #include <oqs/oqs.h>
 
-int main(void) {
+#define MAX_MESSAGE_LEN 4096  /* we only ever sign digests / tree roots */
+
+/*
+ * Usage: dilithium_sign [algorithm] [sk_in] [msg_in] [sig_out]
+ *   algorithm defaults to ML-DSA-44, paths default to pqc_keys/
+ */
+int main(int argc, char **argv) {
+    const char *alg = argc > 1 ? argv[1] : "ML-DSA-44";
+    const char *sk_path = argc > 2 ? argv[2] : "pqc_keys/dilithium_sk.bin";
+    const char *msg_path = argc > 3 ? argv[3] : "pqc_keys/data_to_sign.bin";
+    const char *sig_path = argc > 4 ? argv[4] : "pqc_keys/signature.bin";
+
     /* 1️⃣ Create ML-DSA signer */
-    OQS_SIG *sig = OQS_SIG_new("ML-DSA-44");
+    OQS_SIG *sig = OQS_SIG_new(alg);
     if (sig == NULL) {
-        fprintf(stderr, "ERROR: ML-DSA-44 not supported\n");
+        fprintf(stderr, "ERROR: %s not supported\n", alg);
         return 1;
     }
 
     /* 2️⃣ Load secret key */
     uint8_t sk[sig->length_secret_key];
 
-    FILE *fsk = fopen("pqc_keys/dilithium_sk.bin", "rb");
+    FILE *fsk = fopen(sk_path, "rb");
     if (!fsk) {
         fprintf(stderr, "ERROR: Could not open secret key file\n");
         OQS_SIG_free(sig);
         return 1;
     }
 
-    fread(sk, 1, sizeof(sk), fsk);
+    size_t sk_len = fread(sk, 1, sizeof(sk), fsk);
     fclose(fsk);
 
-    /* 3️⃣ Message to sign (example: SHA-512 hash output) */
-    uint8_t message[64];  // replace with real hash input
-    for (int i = 0; i < 64; i++) message[i] = (uint8_t)i;
+    if (sk_len != sig->length_secret_key) {
+        fprintf(stderr, "ERROR: Secret key size %zu does not match %s\n", sk_len, alg);
+        OQS_SIG_free(sig);
+        return 1;
+    }
+
+    /* 3️⃣ Message to sign (document hash written by the server) */
+    uint8_t message[MAX_MESSAGE_LEN];
+
+    FILE *fm = fopen(msg_path, "rb");
+    if (!fm) {
+        fprintf(stderr, "ERROR: Could not open message file\n");
+        OQS_SIG_free(sig);
+        return 1;
+    }
+
+    size_t message_len = fread(message, 1, sizeof(message), fm);
+    fclose(fm);
 
     /* 4️⃣ Sign */
     uint8_t signature[sig->length_signature];
@@ -33,7 +59,7 @@ int main(void) {
 
     if (OQS_SIG_sign(sig,
                      signature, &sig_len,
-                     message, sizeof(message),
+                     message, message_len,
                      sk) != OQS_SUCCESS) {
         fprintf(stderr, "ERROR: Signature generation failed\n");
         OQS_SIG_free(sig);
@@ -41,7 +67,7 @@ int main(void) {
     }
 
     /* 5️⃣ Write signature */
-    FILE *fs = fopen("pqc_keys/signature.bin", "wb");
+    FILE *fs = fopen(sig_path, "wb");
     if (!fs) {
         fprintf(stderr, "ERROR: Could not write signature file\n");
         OQS_SIG_free(sig);
@@ -51,8 +77,9 @@ int main(void) {
     fwrite(signature, 1, sig_len, fs);
     fclose(fs);
 
+    OQS_MEM_cleanse(sk, sizeof(sk));
     OQS_SIG_free(sig);
 
-    printf("ML-DSA signature generated successfully\n");
+    printf("%s signature generated successfully\n", alg);
     return 0;
-}
\ No newline at end of file
+}
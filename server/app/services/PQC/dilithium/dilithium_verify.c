@@ -2,59 +2,88 @@
 #include <stdint.h>
 #include <oqs/oqs.h>
 
-int main(void) {
+#define MAX_MESSAGE_LEN 4096  /* we only ever sign digests / tree roots */
+
+/*
+ * Usage: dilithium_verify [algorithm] [pk_in] [msg_in] [sig_in]
+ *   algorithm defaults to ML-DSA-44, paths default to pqc_keys/
+ *
+ * Exit code: 0 → valid, 1 → invalid, 2 → error
+ */
+int main(int argc, char **argv) {
+    const char *alg = argc > 1 ? argv[1] : "ML-DSA-44";
+    const char *pk_path = argc > 2 ? argv[2] : "pqc_keys/sender_dilithium_pk.bin";
+    const char *msg_path = argc > 3 ? argv[3] : "pqc_keys/data_to_verify.bin";
+    const char *sig_path = argc > 4 ? argv[4] : "pqc_keys/signature.bin";
+
     /* 1️⃣ Create ML-DSA verifier */
-    OQS_SIG *sig = OQS_SIG_new("ML-DSA-44");
+    OQS_SIG *sig = OQS_SIG_new(alg);
     if (sig == NULL) {
-        fprintf(stderr, "ERROR: ML-DSA-44 not supported\n");
-        return 1;
+        fprintf(stderr, "ERROR: %s not supported\n", alg);
+        return 2;
     }
 
     /* 2️⃣ Load public key */
     uint8_t pk[sig->length_public_key];
 
-    FILE *fpk = fopen("pqc_keys/sender_dilithium_pk.bin", "rb");
+    FILE *fpk = fopen(pk_path, "rb");
     if (!fpk) {
         fprintf(stderr, "ERROR: Could not open public key file\n");
         OQS_SIG_free(sig);
-        return 1;
+        return 2;
     }
 
-    fread(pk, 1, sizeof(pk), fpk);
+    size_t pk_len = fread(pk, 1, sizeof(pk), fpk);
     fclose(fpk);
 
+    if (pk_len != sig->length_public_key) {
+        fprintf(stderr, "ERROR: Public key size %zu does not match %s\n", pk_len, alg);
+        OQS_SIG_free(sig);
+        return 2;
+    }
+
     /* 3️⃣ Load signature */
     uint8_t signature[sig->length_signature];
     size_t sig_len;
 
-    FILE *fs = fopen("pqc_keys/signature.bin", "rb");
+    FILE *fs = fopen(sig_path, "rb");
     if (!fs) {
         fprintf(stderr, "ERROR: Could not open signature file\n");
         OQS_SIG_free(sig);
-        return 1;
+        return 2;
     }
 
     sig_len = fread(signature, 1, sizeof(signature), fs);
     fclose(fs);
 
     /* 4️⃣ Message to verify (same hash used during signing) */
-    uint8_t message[64];  // e.g., SHA-512 digest
-    for (int i = 0; i < 64; i++) message[i] = (uint8_t)i;
+    uint8_t message[MAX_MESSAGE_LEN];
+
+    FILE *fm = fopen(msg_path, "rb");
+    if (!fm) {
+        fprintf(stderr, "ERROR: Could not open message file\n");
+        OQS_SIG_free(sig);
+        return 2;
+    }
+
+    size_t message_len = fread(message, 1, sizeof(message), fm);
+    fclose(fm);
 
     /* 5️⃣ Verify */
     OQS_STATUS rc = OQS_SIG_verify(
         sig,
-        message, sizeof(message),
+        message, message_len,
         signature, sig_len,
         pk
     );
 
+    OQS_SIG_free(sig);
+
     if (rc == OQS_SUCCESS) {
         printf("Signature valid\n");
-    } else {
-        printf("Invalid signature\n");
+        return 0;
     }
 
-    OQS_SIG_free(sig);
-    return 0;
-}
\ No newline at end of file
+    printf("Invalid signature\n");
+    return 1;
+}
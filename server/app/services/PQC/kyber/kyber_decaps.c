@@ -2,44 +2,61 @@
 #include <stdint.h>
 #include <oqs/oqs.h>
 
-int main(void) {
-    /* 1️⃣ Create Kyber KEM */
-    OQS_KEM *kem = OQS_KEM_new("Kyber512");
+/*
+ * Usage: kyber_decaps [algorithm] [sk_in] [ct_in] [ss_out]
+ *   algorithm defaults to Kyber512, paths default to pqc_keys/
+ */
+int main(int argc, char **argv) {
+    const char *alg = argc > 1 ? argv[1] : "Kyber512";
+    const char *sk_path = argc > 2 ? argv[2] : "pqc_keys/kyber_sk.bin";
+    const char *ct_path = argc > 3 ? argv[3] : "pqc_keys/sender_kyber_ct.bin";
+    const char *ss_path = argc > 4 ? argv[4] : "pqc_keys/shared_secret_receiver.bin";
+
+    /* 1️⃣ Create KEM for the parameter set named in the header */
+    OQS_KEM *kem = OQS_KEM_new(alg);
     if (kem == NULL) {
-        fprintf(stderr, "ERROR: Kyber512 not supported by liboqs\n");
+        fprintf(stderr, "ERROR: %s not supported by liboqs\n", alg);
         return 1;
     }
 
-    /* 2️⃣ Load secret key */
-    uint8_t sk[OQS_KEM_kyber_512_length_secret_key];
-    uint8_t ct[OQS_KEM_kyber_512_length_ciphertext];
+    /* 2️⃣ Load secret key and ciphertext */
+    uint8_t sk[kem->length_secret_key];
+    uint8_t ct[kem->length_ciphertext];
 
-    FILE *fsk = fopen("pqc_keys/kyber_sk.bin", "rb");
-    FILE *fct = fopen("pqc_keys/sender_kyber_ct.bin", "rb");
+    FILE *fsk = fopen(sk_path, "rb");
+    FILE *fct = fopen(ct_path, "rb");
 
     if (!fsk || !fct) {
-        fprintf(stderr, "ERROR: Could not open Kyber input files\n");
+        fprintf(stderr, "ERROR: Could not open KEM input files\n");
+        if (fsk) fclose(fsk);
+        if (fct) fclose(fct);
         OQS_KEM_free(kem);
         return 1;
     }
 
-    fread(sk, 1, sizeof(sk), fsk);
-    fread(ct, 1, sizeof(ct), fct);
+    size_t sk_len = fread(sk, 1, sizeof(sk), fsk);
+    size_t ct_len = fread(ct, 1, sizeof(ct), fct);
 
     fclose(fsk);
     fclose(fct);
 
+    if (sk_len != kem->length_secret_key || ct_len != kem->length_ciphertext) {
+        fprintf(stderr, "ERROR: Key or ciphertext size does not match %s\n", alg);
+        OQS_KEM_free(kem);
+        return 1;
+    }
+
     /* 3️⃣ Decapsulation */
-    uint8_t ss[OQS_KEM_kyber_512_length_shared_secret];
+    uint8_t ss[kem->length_shared_secret];
 
     if (OQS_KEM_decaps(kem, ss, ct, sk) != OQS_SUCCESS) {
-        fprintf(stderr, "ERROR: Kyber decapsulation failed\n");
+        fprintf(stderr, "ERROR: %s decapsulation failed\n", alg);
         OQS_KEM_free(kem);
         return 1;
     }
 
     /* 4️⃣ Write shared secret */
-    FILE *fss = fopen("pqc_keys/shared_secret_receiver.bin", "wb");
+    FILE *fss = fopen(ss_path, "wb");
     if (!fss) {
         fprintf(stderr, "ERROR: Could not write shared secret\n");
         OQS_KEM_free(kem);
@@ -49,8 +66,10 @@ int main(void) {
     fwrite(ss, 1, sizeof(ss), fss);
     fclose(fss);
 
+    OQS_MEM_cleanse(sk, sizeof(sk));
+    OQS_MEM_cleanse(ss, sizeof(ss));
     OQS_KEM_free(kem);
 
-    printf("Kyber decapsulation successful\n");
+    printf("%s decapsulation successful\n", alg);
     return 0;
-}
\ No newline at end of file
+}
@@ -1,52 +1,61 @@
 #include <stdio.h>
 #include <stdint.h>
 #include <oqs/oqs.h>
-#include <unistd.h>
-#include <limits.h>
 
-int main(void) {
-    /* 1️⃣ Create Kyber KEM */
-    OQS_KEM *kem = OQS_KEM_new("Kyber512");
+/*
+ * Usage: kyber_encaps [algorithm] [pk_in] [ct_out] [ss_out]
+ *   algorithm defaults to Kyber512, paths default to pqc_keys/
+ */
+int main(int argc, char **argv) {
+    const char *alg = argc > 1 ? argv[1] : "Kyber512";
+    const char *pk_path = argc > 2 ? argv[2] : "pqc_keys/receiver_kyber_pk.bin";
+    const char *ct_path = argc > 3 ? argv[3] : "pqc_keys/kyber_ct.bin";
+    const char *ss_path = argc > 4 ? argv[4] : "pqc_keys/shared_secret_sender.bin";
+
+    /* 1️⃣ Create KEM for the negotiated parameter set */
+    OQS_KEM *kem = OQS_KEM_new(alg);
     if (kem == NULL) {
-        fprintf(stderr, "ERROR: Kyber512 not supported by liboqs\n");
+        fprintf(stderr, "ERROR: %s not supported by liboqs\n", alg);
         return 1;
     }
-    char cwd[PATH_MAX];
-    if (getcwd(cwd, sizeof(cwd)) != NULL) {
-        printf("Current working directory: %s\n", cwd);
-    } else {
-        perror("getcwd() error");
-    }
+
     /* 2️⃣ Load receiver public key */
-    uint8_t pk[OQS_KEM_kyber_512_length_public_key];
+    uint8_t pk[kem->length_public_key];
 
-    FILE *fpk = fopen("pqc_keys/receiver_kyber_pk.bin", "rb");
-    
+    FILE *fpk = fopen(pk_path, "rb");
     if (!fpk) {
-        fprintf(stderr, "ERROR: Could not open Kyber public key\n");
+        fprintf(stderr, "ERROR: Could not open KEM public key\n");
         OQS_KEM_free(kem);
         return 1;
     }
 
-    fread(pk, 1, sizeof(pk), fpk);
+    size_t pk_len = fread(pk, 1, sizeof(pk), fpk);
     fclose(fpk);
 
+    if (pk_len != kem->length_public_key) {
+        fprintf(stderr, "ERROR: Public key size %zu does not match %s\n", pk_len, alg);
+        OQS_KEM_free(kem);
+        return 1;
+    }
+
     /* 3️⃣ Encapsulation */
-    uint8_t ct[OQS_KEM_kyber_512_length_ciphertext];
-    uint8_t ss[OQS_KEM_kyber_512_length_shared_secret];
+    uint8_t ct[kem->length_ciphertext];
+    uint8_t ss[kem->length_shared_secret];
 
     if (OQS_KEM_encaps(kem, ct, ss, pk) != OQS_SUCCESS) {
-        fprintf(stderr, "ERROR: Kyber encapsulation failed\n");
+        fprintf(stderr, "ERROR: %s encapsulation failed\n", alg);
         OQS_KEM_free(kem);
         return 1;
     }
 
     /* 4️⃣ Write ciphertext and shared secret */
-    FILE *fct = fopen("pqc_keys/kyber_ct.bin", "wb");
-    FILE *fss = fopen("pqc_keys/shared_secret_sender.bin", "wb");
+    FILE *fct = fopen(ct_path, "wb");
+    FILE *fss = fopen(ss_path, "wb");
 
     if (!fct || !fss) {
-        fprintf(stderr, "ERROR: Could not write Kyber output files\n");
+        fprintf(stderr, "ERROR: Could not write KEM output files\n");
+        if (fct) fclose(fct);
+        if (fss) fclose(fss);
         OQS_KEM_free(kem);
         return 1;
     }
@@ -57,8 +66,9 @@ int main(void) {
     fclose(fct);
     fclose(fss);
 
+    OQS_MEM_cleanse(ss, sizeof(ss));
     OQS_KEM_free(kem);
 
-    printf("Kyber encapsulation successful\n");
+    printf("%s encapsulation successful\n", alg);
     return 0;
-}
\ No newline at end of file
+}
@@ -2,27 +2,37 @@
 #include <stdint.h>
 #include <oqs/oqs.h>
 
-int main(void) {
-    OQS_KEM *kem = OQS_KEM_new("Kyber512");
+/*
+ * Usage: kyber_keygen [algorithm] [pk_out] [sk_out]
+ *   algorithm defaults to Kyber512, paths default to server/pqc_keys/
+ */
+int main(int argc, char **argv) {
+    const char *alg = argc > 1 ? argv[1] : "Kyber512";
+    const char *pk_path = argc > 2 ? argv[2] : "server/pqc_keys/kyber_pk.bin";
+    const char *sk_path = argc > 3 ? argv[3] : "server/pqc_keys/kyber_sk.bin";
+
+    OQS_KEM *kem = OQS_KEM_new(alg);
     if (kem == NULL) {
-        fprintf(stderr, "ERROR: Kyber512 not supported by liboqs\n");
+        fprintf(stderr, "ERROR: %s not supported by liboqs\n", alg);
         return 1;
     }
 
-    uint8_t pk[OQS_KEM_kyber_512_length_public_key];
-    uint8_t sk[OQS_KEM_kyber_512_length_secret_key];
+    uint8_t pk[kem->length_public_key];
+    uint8_t sk[kem->length_secret_key];
 
     if (OQS_KEM_keypair(kem, pk, sk) != OQS_SUCCESS) {
-        fprintf(stderr, "ERROR: Kyber key generation failed\n");
+        fprintf(stderr, "ERROR: %s key generation failed\n", alg);
         OQS_KEM_free(kem);
         return 1;
     }
 
-    FILE *fpk = fopen("server/pqc_keys/kyber_pk.bin", "wb");
-    FILE *fsk = fopen("server/pqc_keys/kyber_sk.bin", "wb");
+    FILE *fpk = fopen(pk_path, "wb");
+    FILE *fsk = fopen(sk_path, "wb");
 
     if (!fpk || !fsk) {
         fprintf(stderr, "ERROR: Could not open key files for writing\n");
+        if (fpk) fclose(fpk);
+        if (fsk) fclose(fsk);
         OQS_KEM_free(kem);
         return 1;
     }
@@ -33,8 +43,9 @@ int main(void) {
     fclose(fpk);
     fclose(fsk);
 
+    OQS_MEM_cleanse(sk, sizeof(sk));
     OQS_KEM_free(kem);
 
-    printf("Kyber keypair generated successfully\n");
+    printf("%s keypair generated successfully\n", alg);
     return 0;
-}
\ No newline at end of file
+}
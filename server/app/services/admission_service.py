@@ -0,0 +1,163 @@
+import math
+import threading
+import time
+from collections import deque
+
+
+# ======================================================
+# Admission control for crypto endpoints
+# ======================================================
+# Every encrypt / decrypt request is a job with an estimated memory cost
+# and one CPU slot. A job runs only while both budgets hold:
+#
+#   running jobs < ADMISSION_MAX_JOBS
+#   memory of running jobs + its own ≤ ADMISSION_MEMORY_BUDGET_BYTES
+#
+# otherwise it waits in a queue. The queue is served smallest job
+# first, so a burst of small documents is not stuck behind one large
+# one; a waiting job gains ADMISSION_AGING_BYTES_PER_SECOND of priority
+# per second so large jobs are not starved either. A job that does not
+# fit in the whole memory budget runs alone.
+#
+# A full queue, or a wait longer than ADMISSION_QUEUE_TIMEOUT_SECONDS,
+# is answered 429 with a Retry-After estimated from recent job times.
+
+class Overloaded(Exception):
+    """Job rejected by admission control"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry after {retry_after} s")
+        self.retry_after = retry_after
+
+
+def estimate_job_memory(content_length, config) -> int:
+    """
+    Memory a job is expected to hold: the streaming buffers, plus the
+    copies of a document small enough to be inlined into JSON (file
+    read, base64 and the JSON string). Unknown length → inline maximum.
+
+    Returns:
+        bytes
+    """
+    inline_max = config["INLINE_FILE_MAX_BYTES"]
+    size = inline_max if content_length is None else content_length
+    estimate = config["ADMISSION_JOB_BASE_BYTES"]
+    if size <= inline_max:
+        estimate += size * config["ADMISSION_INLINE_FACTOR"]
+    return estimate
+
+
+class _Waiter:
+    def __init__(self, seq: int, memory: int):
+        self.seq = seq
+        self.memory = memory
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.waiting = []
+        self.jobs = 0
+        self.memory = 0
+        self.avg_job_seconds = None
+        self.waits = deque(maxlen=1000)     # recent queue waits (s) of admitted jobs
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    def _fits(self, memory: int, max_jobs: int, memory_budget: int) -> bool:
+        if self.jobs >= max_jobs:
+            return False
+        return self.jobs == 0 or self.memory + memory <= memory_budget
+
+    def _head(self, aging: float, now: float) -> _Waiter:
+        return min(
+            self.waiting,
+            key=lambda w: (w.memory - (now - w.enqueued_at) * aging, w.seq)
+        )
+
+    def _retry_after(self, max_jobs: int) -> int:
+        per_job = self.avg_job_seconds or 1.0
+        return max(1, math.ceil(per_job * (len(self.waiting) + 1) / max_jobs))
+
+    def acquire(
+        self,
+        memory: int,
+        max_jobs: int,
+        memory_budget: int,
+        max_queue: int,
+        timeout: float,
+        aging: float
+    ) -> int:
+        """
+        Blocks until the job may run.
+
+        Returns:
+            memory charged for the job → pass it to release()
+        Raises:
+            Overloaded → queue full or waited longer than `timeout`
+        """
+        with self.cond:
+            if not self.waiting and self._fits(memory, max_jobs, memory_budget):
+                return self._admit(memory, 0.0)
+
+            if len(self.waiting) >= max_queue:
+                self.stats["rejected"] += 1
+                raise Overloaded(self._retry_after(max_jobs))
+
+            self.seq += 1
+            waiter = _Waiter(self.seq, memory)
+            self.waiting.append(waiter)
+            self.stats["queued"] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._head(aging, now) is waiter and self._fits(memory, max_jobs, memory_budget):
+                        break
+                    remaining = waiter.enqueued_at + timeout - now
+                    if remaining <= 0:
+                        self.stats["rejected"] += 1
+                        raise Overloaded(self._retry_after(max_jobs))
+                    # Priorities age, so look again now and then
+                    self.cond.wait(min(remaining, 1.0))
+            finally:
+                self.waiting.remove(waiter)
+                self.cond.notify_all()
+            return self._admit(memory, now - waiter.enqueued_at)
+
+    def _admit(self, memory: int, waited: float) -> int:
+        self.jobs += 1
+        self.memory += memory
+        self.waits.append(waited)
+        self.stats["admitted"] += 1
+        return memory
+
+    def release(self, memory: int, elapsed_seconds: float):
+        with self.cond:
+            self.jobs -= 1
+            self.memory -= memory
+            if self.avg_job_seconds is None:
+                self.avg_job_seconds = elapsed_seconds
+            else:
+                self.avg_job_seconds = 0.8 * self.avg_job_seconds + 0.2 * elapsed_seconds
+            self.cond.notify_all()
+
+    def status(self, max_jobs: int, memory_budget: int) -> dict:
+        with self.cond:
+            now = time.monotonic()
+            waits = sorted(self.waits)
+            return {
+                "running_jobs": self.jobs,
+                "max_jobs": max_jobs,
+                "memory_in_use_bytes": self.memory,
+                "memory_budget_bytes": memory_budget,
+                "queued_jobs": len(self.waiting),
+                "oldest_wait_seconds": max((now - w.enqueued_at for w in self.waiting), default=0.0),
+                "wait_p50_seconds": waits[len(waits) // 2] if waits else 0.0,
+                "wait_p99_seconds": waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0.0,
+                "avg_job_seconds": self.avg_job_seconds,
+                **self.stats
+            }
+
+
+admission = AdmissionController()
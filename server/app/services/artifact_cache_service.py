@@ -0,0 +1,237 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from app.services.cipher_suite_service import ensure_cipher_allowed, get_cipher_suite
+from app.services.pqc_encryption_service import received_file_name
+from app.services.pqc_key_service import load_peer_kyber_public_key
+from app.services.pqc_param_service import transfer_algorithms
+from app.services.pqc_workflow_service import pqc_encrypt_file_workflow
+
+
+# ======================================================
+# Content-addressed encrypted artifact cache (sender)
+# ======================================================
+# Sending the same document to the same receiver again (templated
+# forms, retried sends, re-sharing) would repeat encapsulation, the
+# cipher pass, hashing and signing. With ARTIFACT_CACHE_ENABLED the
+# finished artifact (encrypted file + Kyber ciphertext + signature) is
+# kept under
+#
+#   SHA-256(plaintext) | receiver Kyber key | own Dilithium key
+#   | KEM / signature / cipher suite | hash mode (+ leaf size)
+#   | compression settings
+#
+# so any key rotation, policy change or different receiver misses.
+# Reuse means the receiver (and anyone watching) sees the identical
+# ciphertext for a repeated document, which is why it is opt-in and a
+# single request can refuse it (reuse=false).
+#
+# Eviction: LRU bounded by ARTIFACT_CACHE_MAX_ENTRIES and
+# ARTIFACT_CACHE_MAX_BYTES, entries older than ARTIFACT_CACHE_TTL_SECONDS
+# are dropped on lookup.
+#
+# The index lives in process memory, so every worker process keeps its
+# artifacts in its own ARTIFACT_CACHE_FOLDER/<pid> and only ever clears
+# that folder and those of workers that are gone.
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _process_alive(name: str) -> bool:
+    if not name.isdigit():
+        return False
+    try:
+        os.kill(int(name), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ArtifactCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # key → record (artifact_path, size, created_at, ...)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.folder_ready = False
+
+    def _drop(self, key):
+        record = self.entries.pop(key)
+        self.total_bytes -= record["size"]
+        self.evictions += 1
+        try:
+            os.remove(record["artifact_path"])
+        except OSError:
+            pass
+
+    def prepare_folder(self, folder: str) -> str:
+        """
+        Artifacts of a previous run have no index entry: starts this
+        process's folder empty and removes those of exited processes.
+
+        Returns:
+            this process's artifact folder
+        """
+        own = os.path.join(folder, str(os.getpid()))
+        with self.lock:
+            if self.folder_ready:
+                return own
+            os.makedirs(folder, exist_ok=True)
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if name == str(os.getpid()) or not _process_alive(name):
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        os.remove(path)
+            os.makedirs(own, exist_ok=True)
+            self.folder_ready = True
+            return own
+
+    def get(self, key: str, ttl_seconds: float):
+        with self.lock:
+            record = self.entries.get(key)
+            if record is not None and time.time() - record["created_at"] > ttl_seconds:
+                self._drop(key)
+                record = None
+            if record is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return record
+
+    def put(self, key: str, encrypted_path: str, record: dict, folder: str,
+            max_entries: int, max_bytes: int):
+        size = os.path.getsize(encrypted_path)
+        if size > max_bytes:
+            return
+        artifact_path = os.path.join(folder, f"{key}.enc")
+        shutil.copyfile(encrypted_path, artifact_path)
+
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)["size"]
+            self.entries[key] = {
+                **record,
+                "artifact_path": artifact_path,
+                "size": size,
+                "created_at": time.time()
+            }
+            self.total_bytes += size
+            while len(self.entries) > max_entries or self.total_bytes > max_bytes:
+                self._drop(next(iter(self.entries)))
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.entries):
+                self._drop(key)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+artifact_cache = ArtifactCache()
+
+
+def artifact_key(input_path: str, kem_algorithm: str, sig_algorithm: str, cipher_suite: str,
+                 peer_id: str = None) -> str:
+    key_folder = current_app.config["PQC_KEY_FOLDER"]
+    hash_mode = current_app.config["PQC_HASH_MODE"]
+    leaf_size = current_app.config["MERKLE_LEAF_SIZE"] if hash_mode == "merkle-sha512" else 0
+    parts = [
+        _file_sha256(input_path),
+        hashlib.sha256(load_peer_kyber_public_key(peer_id)).hexdigest(),
+        _file_sha256(os.path.join(key_folder, "dilithium_pk.bin")),
+        kem_algorithm,
+        sig_algorithm,
+        cipher_suite,
+        hash_mode,
+        str(leaf_size),
+        # Compression changes the artifact, not only its size
+        str(current_app.config["COMPRESSION_ENABLED"]),
+        current_app.config["COMPRESSION_CODEC"],
+        str(current_app.config["COMPRESSION_LEVEL"])
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def pqc_encrypt_file_cached(
+    input_path: str,
+    kem_algorithm: str = None,
+    sig_algorithm: str = None,
+    cipher_suite: str = None,
+    reuse: bool = True,
+    peer_id: str = None
+):
+    """
+    pqc_encrypt_file_workflow, answered from the artifact cache when
+    ARTIFACT_CACHE_ENABLED and reuse allow it. A hit copies the stored
+    artifact to ENCRYPTED_FOLDER as <id>_<name>.enc, like a streamed encrypt.
+
+    Returns:
+        the workflow result + artifact_cached (bool)
+    """
+    config = current_app.config
+    if not (config["ARTIFACT_CACHE_ENABLED"] and reuse):
+        return {**pqc_encrypt_file_workflow(input_path, kem_algorithm, sig_algorithm, cipher_suite,
+                                            peer_id=peer_id),
+                "artifact_cached": False}
+
+    start = time.perf_counter_ns()
+    kem_algorithm, sig_algorithm = transfer_algorithms(kem_algorithm, sig_algorithm, peer_id)
+    cipher_suite = ensure_cipher_allowed(cipher_suite or get_cipher_suite())
+    folder = artifact_cache.prepare_folder(config["ARTIFACT_CACHE_FOLDER"])
+
+    key = artifact_key(input_path, kem_algorithm, sig_algorithm, cipher_suite, peer_id)
+    record = artifact_cache.get(key, config["ARTIFACT_CACHE_TTL_SECONDS"])
+    if record is not None:
+        encrypted_path = os.path.join(
+            config["ENCRYPTED_FOLDER"], f"{received_file_name(os.path.basename(input_path))}.enc"
+        )
+        shutil.copyfile(record["artifact_path"], encrypted_path)
+        elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+        current_app.logger.info("Artifact cache hit %s… (%.2f ms)", key[:16], elapsed_ms)
+        return {
+            **{k: v for k, v in record.items() if k not in ("artifact_path", "size", "created_at")},
+            "encrypted_file_path": encrypted_path,
+            "timings": {"file_name": os.path.basename(input_path), "wall_clock": elapsed_ms},
+            "stages": None,
+            "artifact_cached": True
+        }
+
+    result = pqc_encrypt_file_workflow(input_path, kem_algorithm, sig_algorithm, cipher_suite,
+                                       peer_id=peer_id)
+    artifact_cache.put(
+        key,
+        result["encrypted_file_path"],
+        {k: result[k] for k in (
+            "kyber_ciphertext", "shared_secret", "file_hash", "signature",
+            "kem_algorithm", "sig_algorithm", "cipher_suite", "hash_mode", "merkle_leaves"
+        )},
+        folder,
+        config["ARTIFACT_CACHE_MAX_ENTRIES"],
+        config["ARTIFACT_CACHE_MAX_BYTES"]
+    )
+    return {**result, "artifact_cached": False}
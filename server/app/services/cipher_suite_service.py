@@ -0,0 +1,460 @@
+import io
+import os
+import struct
+import time
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import constant_time, hashes, hmac, padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from flask import current_app
+
+from app.extensions import app_state
+from app.services.compression_service import (
+    CompressingReader,
+    DecompressingWriter,
+    codec_from_header
+)
+from app.services.cpu_pool_service import ordered_map
+from app.services.header_service import build_header, parse_header, read_header_stream
+
+
+# ======================================================
+# Cipher suites (bulk document encryption)
+# ======================================================
+# id → value of the "suite" header field (never reuse)
+# legacy → kept only to read / write pre-suite files, never auto-selected
+#
+# Files without a "suite" field are AES-256-CBC (IV || ciphertext).
+
+CIPHER_SUITES = {
+    "AES-256-CBC": {"id": 1, "legacy": True},
+    "AES-256-GCM": {"id": 2, "legacy": False},
+    "ChaCha20-Poly1305": {"id": 3, "legacy": False},
+    "AES-256-CTR-HMAC-SHA256": {"id": 4, "legacy": False},
+}
+
+LEGACY_CIPHER_SUITE = "AES-256-CBC"
+
+# ======================================================
+# Segmented layout (all non-legacy suites)
+# ======================================================
+#
+#   HEADER | NONCE_PREFIX (7) | SEGMENT_0 | SEGMENT_1 | ... | SEGMENT_n
+#   SEGMENT_i = ciphertext (segment size bytes, last one shorter) || tag (16)
+#
+# Segment nonce = NONCE_PREFIX || i (u32, big endian) || last flag (u8),
+# so segments cannot be reordered, and dropping trailing segments is
+# detected because the new last segment was sealed with flag 0.
+# Every segment authenticates the header bytes as associated data.
+
+NONCE_PREFIX_BYTES = 7
+TAG_BYTES = 16
+CBC_IV_BYTES = 16
+IO_CHUNK = 1024 * 1024
+
+
+def suite_id(suite: str) -> int:
+    if suite not in CIPHER_SUITES:
+        raise ValueError(f"Unknown cipher suite: {suite}")
+    return CIPHER_SUITES[suite]["id"]
+
+
+def suite_from_id(sid: int) -> str:
+    for name, params in CIPHER_SUITES.items():
+        if params["id"] == sid:
+            return name
+    raise ValueError(f"Unknown cipher suite id: {sid}")
+
+
+def suite_from_header(fields: dict) -> str:
+    return suite_from_id(fields["suite"]) if "suite" in fields else LEGACY_CIPHER_SUITE
+
+
+# ======================================================
+# Policy + selection
+# ======================================================
+
+def allowed_cipher_suites() -> list:
+    return [s for s in current_app.config["CIPHER_ALLOWED_SUITES"] if s in CIPHER_SUITES]
+
+
+def ensure_cipher_allowed(suite: str) -> str:
+    if suite not in allowed_cipher_suites():
+        raise ValueError(f"Cipher suite {suite} is not allowed by policy")
+    return suite
+
+
+def get_cipher_suite() -> str:
+    """
+    Suite for new files: CIPHER_SUITE from config, or the calibrated
+    fastest allowed suite when it is "auto".
+    """
+    configured = current_app.config["CIPHER_SUITE"]
+    if configured != "auto":
+        return ensure_cipher_allowed(configured)
+
+    if getattr(app_state, "cipher_suite", None) is None:
+        calibrate_cipher_suites()
+    return app_state.cipher_suite
+
+
+def cipher_header_fields(suite: str) -> dict:
+    """Header fields describing `suite` (merged with kem/sig by the PQC workflow)."""
+    fields = {"suite": suite_id(suite)}
+    if not CIPHER_SUITES[suite]["legacy"]:
+        fields["segment"] = current_app.config["CIPHER_SEGMENT_SIZE"]
+    return fields
+
+
+# ======================================================
+# Per-segment seal / open
+# ======================================================
+
+def _segment_nonce(prefix: bytes, index: int, last: bool) -> bytes:
+    return prefix + struct.pack(">IB", index, 1 if last else 0)
+
+
+def _ctr_hmac_keys(key: bytes):
+    okm = HKDF(
+        algorithm=hashes.SHA256(),
+        length=64,
+        salt=None,
+        info=b"pqdocsec-ctr-hmac",
+        backend=default_backend()
+    ).derive(key)
+    return okm[:32], okm[32:]
+
+
+def _ctr_hmac_tag(mac_key, aad, nonce, ciphertext) -> bytes:
+    mac = hmac.HMAC(mac_key, hashes.SHA256(), backend=default_backend())
+    mac.update(struct.pack(">I", len(aad)) + aad + nonce + ciphertext)
+    return mac.finalize()[:TAG_BYTES]
+
+
+class SegmentCipher:
+    """
+    Seals / opens the segments of one file. The key schedule is
+    built once per file, not per segment.
+    """
+
+    def __init__(self, suite: str, key: bytes, prefix: bytes, aad: bytes):
+        self.suite = suite
+        self.prefix = prefix
+        self.aad = aad
+        if suite == "AES-256-GCM":
+            self.aead = AESGCM(key)
+        elif suite == "ChaCha20-Poly1305":
+            self.aead = ChaCha20Poly1305(key)
+        elif suite == "AES-256-CTR-HMAC-SHA256":
+            self.aead = None
+            self.enc_key, self.mac_key = _ctr_hmac_keys(key)
+        else:
+            raise ValueError(f"{suite} is not a segmented cipher suite")
+
+    def seal(self, index: int, last: bool, data: bytes) -> bytes:
+        nonce = _segment_nonce(self.prefix, index, last)
+        if self.aead:
+            return self.aead.encrypt(nonce, data, self.aad)
+
+        encryptor = Cipher(
+            algorithms.AES(self.enc_key), modes.CTR(nonce + b"\0\0\0\0"), backend=default_backend()
+        ).encryptor()
+        ciphertext = encryptor.update(data) + encryptor.finalize()
+        return ciphertext + _ctr_hmac_tag(self.mac_key, self.aad, nonce, ciphertext)
+
+    def open(self, index: int, last: bool, data: bytes) -> bytes:
+        if len(data) < TAG_BYTES:
+            raise ValueError(f"Ciphertext segment {index} is truncated")
+        nonce = _segment_nonce(self.prefix, index, last)
+
+        if self.aead:
+            try:
+                return self.aead.decrypt(nonce, data, self.aad)
+            except InvalidTag:
+                raise ValueError(f"Ciphertext segment {index} failed authentication")
+
+        ciphertext, tag = data[:-TAG_BYTES], data[-TAG_BYTES:]
+        expected = _ctr_hmac_tag(self.mac_key, self.aad, nonce, ciphertext)
+        if not constant_time.bytes_eq(expected, tag):
+            raise ValueError(f"Ciphertext segment {index} failed authentication")
+
+        decryptor = Cipher(
+            algorithms.AES(self.enc_key), modes.CTR(nonce + b"\0\0\0\0"), backend=default_backend()
+        ).decryptor()
+        return decryptor.update(ciphertext) + decryptor.finalize()
+
+
+def _read_full(reader, size: int) -> bytes:
+    """read() that keeps going on short reads (sockets, request streams)."""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = reader.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+# ======================================================
+# Stream encryption / decryption
+# ======================================================
+
+def _segments(reader, size: int):
+    """
+    Yields (index, last, data) for the `size`-byte segments of `reader`,
+    reading one segment ahead to know which one is the last.
+    """
+    index = 0
+    current = _read_full(reader, size)
+    while True:
+        following = _read_full(reader, size) if len(current) == size else b""
+        last = not following
+        yield index, last, current
+        if last:
+            return
+        current = following
+        index += 1
+
+
+def encrypt_stream(reader, writer, key: bytes, header: bytes):
+    """
+    Encrypts everything readable from `reader` into `writer`, using the
+    suite recorded in `header` (written first, and authenticated) and
+    compressing first when it records a codec.
+    """
+    fields, _ = parse_header(header)
+    suite = suite_from_header(fields)
+    writer.write(header)
+
+    codec = codec_from_header(fields)
+    if codec:
+        reader = CompressingReader(reader, codec, current_app.config["COMPRESSION_LEVEL"])
+
+    if suite == LEGACY_CIPHER_SUITE:
+        iv = os.urandom(CBC_IV_BYTES)
+        writer.write(iv)
+        encryptor = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend()).encryptor()
+        padder = padding.PKCS7(128).padder()
+        while True:
+            chunk = reader.read(IO_CHUNK)
+            if not chunk:
+                break
+            writer.write(encryptor.update(padder.update(chunk)))
+        writer.write(encryptor.update(padder.finalize()) + encryptor.finalize())
+        return
+
+    segment_size = fields["segment"]
+    prefix = os.urandom(NONCE_PREFIX_BYTES)
+    writer.write(prefix)
+    segments = SegmentCipher(suite, key, prefix, header)
+
+    # Sealed on the shared CPU pool while the next segments are read
+    for sealed in ordered_map(segments.seal, _segments(reader, segment_size)):
+        writer.write(sealed)
+
+
+def decrypt_stream(reader, writer, key: bytes):
+    """
+    Decrypts a file read from `reader` (positioned at the header) into
+    `writer`, decompressing when the header records a codec. Raises
+    ValueError on the first segment that fails authentication.
+    """
+    # Legacy files: the bytes consumed looking for a header start the IV
+    fields, header_bytes, leftover = read_header_stream(reader)
+
+    suite = suite_from_header(fields)
+    ensure_cipher_allowed(suite)
+
+    codec = codec_from_header(fields)
+    if codec:
+        writer = DecompressingWriter(writer, codec)
+
+    if suite == LEGACY_CIPHER_SUITE:
+        iv = leftover + _read_full(reader, CBC_IV_BYTES - len(leftover))
+        decryptor = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend()).decryptor()
+        unpadder = padding.PKCS7(128).unpadder()
+        while True:
+            chunk = reader.read(IO_CHUNK)
+            if not chunk:
+                break
+            writer.write(unpadder.update(decryptor.update(chunk)))
+        writer.write(unpadder.update(decryptor.finalize()) + unpadder.finalize())
+    else:
+        prefix = _read_full(reader, NONCE_PREFIX_BYTES)
+        segments = SegmentCipher(suite, key, prefix, header_bytes)
+        sealed_size = fields["segment"] + TAG_BYTES
+
+        for plain in ordered_map(segments.open, _segments(reader, sealed_size)):
+            writer.write(plain)
+
+    if codec:
+        writer.finish()
+
+
+# ======================================================
+# Random access (segmented suites)
+# ======================================================
+# Segment i of the plaintext (segment size S) is sealed at
+#
+#   header length + NONCE_PREFIX + i * (S + TAG)
+#
+# so a plaintext byte range only needs the segments it touches, each
+# authenticated on its own. The last segment is known from the file
+# size; a file cut at a segment boundary still fails once its (new)
+# last segment is read. Compressed files have no fixed plaintext
+# offsets and legacy CBC files no segments: neither is seekable.
+
+class SeekableDecryptor:
+    """
+    Decrypts plaintext byte ranges of one encrypted file from a
+    seekable `reader` positioned at the start of the file, `size`
+    bytes long (a container body works too).
+    """
+
+    def __init__(self, reader, size: int, key: bytes):
+        self.reader = reader
+        self.base = reader.tell()
+        fields, header_bytes, _ = read_header_stream(reader)
+
+        suite = suite_from_header(fields)
+        ensure_cipher_allowed(suite)
+        if suite == LEGACY_CIPHER_SUITE:
+            raise ValueError("Legacy AES-256-CBC files cannot be read by range")
+        if codec_from_header(fields):
+            raise ValueError("Compressed files cannot be read by range")
+
+        prefix = _read_full(reader, NONCE_PREFIX_BYTES)
+        self.segments = SegmentCipher(suite, key, prefix, header_bytes)
+        self.segment_size = fields["segment"]
+        self.sealed_size = self.segment_size + TAG_BYTES
+        self.data_offset = len(header_bytes) + NONCE_PREFIX_BYTES
+
+        data_size = size - self.data_offset
+        self.segment_count = max(1, (data_size + self.sealed_size - 1) // self.sealed_size)
+        last_sealed = data_size - (self.segment_count - 1) * self.sealed_size
+        if len(prefix) < NONCE_PREFIX_BYTES or last_sealed < TAG_BYTES:
+            raise ValueError("Ciphertext is truncated")
+        self.plaintext_size = (self.segment_count - 1) * self.segment_size + last_sealed - TAG_BYTES
+        self.segments_opened = 0
+
+    def _open_segment(self, index: int) -> bytes:
+        self.reader.seek(self.base + self.data_offset + index * self.sealed_size)
+        sealed = _read_full(self.reader, self.sealed_size)
+        self.segments_opened += 1
+        return self.segments.open(index, index == self.segment_count - 1, sealed)
+
+    def read(self, offset: int, length: int) -> bytes:
+        """
+        Returns:
+            plaintext[offset : offset + length] (shorter at the end of file)
+        """
+        end = min(offset + length, self.plaintext_size)
+        if offset < 0 or length < 0:
+            raise ValueError("Invalid plaintext range")
+        if offset >= end:
+            return b""
+
+        first = offset // self.segment_size
+        last = (end - 1) // self.segment_size
+        out = bytearray()
+        for index in range(first, last + 1):
+            out += self._open_segment(index)
+        start = offset - first * self.segment_size
+        return bytes(out[start:start + end - offset])
+
+
+def decrypt_range(encrypted_path: str, key: bytes, offset: int, length: int):
+    """
+    Returns:
+        (plaintext bytes, plaintext size, segments opened)
+    """
+    with open(encrypted_path, "rb") as f:
+        decryptor = SeekableDecryptor(f, os.path.getsize(encrypted_path), key)
+        data = decryptor.read(offset, length)
+    return data, decryptor.plaintext_size, decryptor.segments_opened
+
+
+def encrypt_file(input_path: str, output_path: str, key: bytes, header: bytes):
+    with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+        encrypt_stream(src, dst, key, header)
+    return output_path
+
+
+def decrypt_file(encrypted_path: str, output_path: str, key: bytes):
+    """
+    Decrypts to output_path; nothing is left behind if a segment fails.
+    """
+    try:
+        with open(encrypted_path, "rb") as src, open(output_path, "wb") as dst:
+            decrypt_stream(src, dst, key)
+    except Exception:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    return output_path
+
+
+# ======================================================
+# Startup calibration
+# ======================================================
+
+def measure_cipher_suites(suites, sample_bytes: int, rounds: int = 3) -> dict:
+    """
+    Encrypts `sample_bytes` of random data with each suite.
+
+    Returns:
+        {suite: MB/s (best of `rounds`)}
+    """
+    sample = os.urandom(sample_bytes)
+    key = os.urandom(32)
+    results = {}
+
+    for suite in suites:
+        header = build_header(cipher_header_fields(suite))
+
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter_ns()
+            encrypt_stream(io.BytesIO(sample), io.BytesIO(), key, header)
+            elapsed = (time.perf_counter_ns() - start) / 1e9
+            best = elapsed if best is None else min(best, elapsed)
+
+        results[suite] = (sample_bytes / (1024 * 1024)) / best if best else 0.0
+
+    return results
+
+
+def calibrate_cipher_suites() -> dict:
+    """
+    Times every allowed non-legacy suite on this host and selects the
+    fastest for new files (app_state.cipher_suite).
+    """
+    candidates = [s for s in allowed_cipher_suites() if not CIPHER_SUITES[s]["legacy"]]
+    if not candidates:
+        candidates = allowed_cipher_suites()
+
+    results = measure_cipher_suites(candidates, current_app.config["CIPHER_CALIBRATION_BYTES"])
+    selected = max(results, key=results.get)
+
+    app_state.cipher_suite = selected
+    app_state.cipher_calibration = {
+        "throughput_mb_s": results,
+        "selected": selected,
+        "sample_bytes": current_app.config["CIPHER_CALIBRATION_BYTES"],
+        "calibrated_at": time.time()
+    }
+    print(f"Cipher suite calibration: {selected} "
+          + ", ".join(f"{s} {mb:.0f} MB/s" for s, mb in results.items()))
+    return app_state.cipher_calibration
+
+
+def init_cipher_suite(app):
+    """Runs the startup calibration when CIPHER_SUITE is "auto"."""
+    if app.config["CIPHER_SUITE"] == "auto":
+        with app.app_context():
+            calibrate_cipher_suites()
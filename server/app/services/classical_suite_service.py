@@ -0,0 +1,121 @@
+from cryptography.hazmat.primitives import serialization
+from flask import current_app
+
+from app.extensions import app_state
+from app.services import key_service
+from app.services.kem_service import (
+    rsa_encrypt_key,
+    rsa_decrypt_key,
+    x25519_encrypt_key,
+    x25519_decrypt_key
+)
+from app.services.signature_service import (
+    sign_hash,
+    verify_signature,
+    ed25519_sign_hash,
+    ed25519_verify_signature
+)
+
+
+# ======================================================
+# Classical suites
+# ======================================================
+# kem_key / sig_key → (key_lifecycle kind, algorithm) of the receiver's
+# key transport pair and the sender's signing pair.
+# *_label → stage names in the workflow timings
+
+CLASSICAL_SUITES = {
+    "RSA-2048": {
+        "id": 1,
+        "kem_key": ("rsa_kem", "RSA-2048"),
+        "sig_key": ("rsa_sign", "RSA-2048"),
+        "kem_label": "RSA",
+        "sig_label": "Sign",
+        "wrap": rsa_encrypt_key,
+        "unwrap": rsa_decrypt_key,
+        "sign": sign_hash,
+        "verify": verify_signature,
+        "load_kem_private": key_service.load_rsa_private_key,
+        "load_kem_public": key_service.load_rsa_public_key,
+        "load_sig_private": key_service.load_signature_private_key,
+        "load_sig_public": key_service.load_signature_public_key,
+    },
+    "X25519-Ed25519": {
+        "id": 2,
+        "kem_key": ("x25519_kem", "X25519"),
+        "sig_key": ("ed25519_sign", "Ed25519"),
+        "kem_label": "X25519",
+        "sig_label": "Ed25519",
+        "wrap": x25519_encrypt_key,
+        "unwrap": x25519_decrypt_key,
+        "sign": ed25519_sign_hash,
+        "verify": ed25519_verify_signature,
+        "load_kem_private": key_service.load_x25519_private_key,
+        "load_kem_public": key_service.load_x25519_public_key,
+        "load_sig_private": key_service.load_ed25519_private_key,
+        "load_sig_public": key_service.load_ed25519_public_key,
+    },
+}
+
+# Peers that predate suite selection only speak RSA
+LEGACY_SUITE = "RSA-2048"
+
+
+def get_suite(suite: str) -> dict:
+    if suite not in CLASSICAL_SUITES:
+        raise ValueError(f"Unknown classical suite: {suite}")
+    return CLASSICAL_SUITES[suite]
+
+
+# ======================================================
+# Policy
+# ======================================================
+
+def allowed_suites() -> list:
+    return [s for s in current_app.config["CLASSICAL_ALLOWED_SUITES"] if s in CLASSICAL_SUITES]
+
+
+def ensure_suite_allowed(suite: str) -> str:
+    if suite not in allowed_suites():
+        raise ValueError(f"Classical suite {suite} is not allowed by policy")
+    return suite
+
+
+def default_suite() -> str:
+    return current_app.config["CLASSICAL_SUITE"]
+
+
+def get_classical_suite() -> str:
+    """This node's classical suite (chosen at role select / handshake)."""
+    return getattr(app_state, "classical_suite", None) or default_suite()
+
+
+def get_peer_classical_suite() -> str:
+    return getattr(app_state, "peer_classical_suite", None) or LEGACY_SUITE
+
+
+# ======================================================
+# Keys
+# ======================================================
+
+def public_key_pem(public_key) -> str:
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode("utf-8")
+
+
+def load_kem_private_key(suite: str):
+    return get_suite(suite)["load_kem_private"]()
+
+
+def load_kem_public_key(suite: str):
+    return get_suite(suite)["load_kem_public"]()
+
+
+def load_signing_private_key(suite: str):
+    return get_suite(suite)["load_sig_private"]()
+
+
+def load_signing_public_key(suite: str):
+    return get_suite(suite)["load_sig_public"]()
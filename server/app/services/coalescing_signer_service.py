@@ -0,0 +1,195 @@
+import struct
+import threading
+
+from flask import current_app
+
+from app.services.merkle_service import (
+    HASH_BYTES,
+    hash_leaf,
+    merkle_proof,
+    merkle_root,
+    root_from_proof
+)
+from app.services.pqc_key_service import load_peer_dilithium_public_key
+from app.services.pqc_param_service import SIG_PARAMETER_SETS
+from app.services.pqc_signature_service import sign_hash_with_dilithium
+from app.services.verification_service import verify_cached
+
+
+# ======================================================
+# Coalescing signer (SIGN_COALESCE_ENABLED)
+# ======================================================
+# Document hashes that arrive within SIGN_COALESCE_WINDOW_MS of each
+# other (or until SIGN_COALESCE_MAX_ITEMS are waiting) share one
+# Dilithium call: the first caller of a window becomes its leader,
+# builds a Merkle tree over leaf_i = SHA-512(0x00 || hash_i) and signs
+# the root. Every document gets the root signature plus its inclusion
+# proof, packed into the signature field:
+#
+#   MAGIC (4) | VERSION (1) | index (4) | count (4) | proof_len (1)
+#   | proof_len × 64-byte siblings | Dilithium signature over the root
+#
+# A window with a single document is signed directly, so the envelope
+# only appears when signing was actually shared.
+
+ENVELOPE_MAGIC = b"PQCS"
+ENVELOPE_VERSION = 1
+
+_ENVELOPE_PREFIX = struct.Struct(">4sBIIB")
+
+
+def encode_envelope(index: int, count: int, proof: list, root_signature: bytes) -> bytes:
+    return (
+        _ENVELOPE_PREFIX.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, index, count, len(proof))
+        + b"".join(proof)
+        + root_signature
+    )
+
+
+def decode_envelope(signature: bytes, sig_algorithm: str):
+    """
+    Returns:
+        (index, count, proof, root signature) → None for a plain signature
+    """
+    plain_size = SIG_PARAMETER_SETS[sig_algorithm]["signature_bytes"]
+    if len(signature) == plain_size or signature[:4] != ENVELOPE_MAGIC:
+        return None
+    if len(signature) < _ENVELOPE_PREFIX.size:
+        raise ValueError("Truncated signature envelope")
+
+    _, version, index, count, proof_len = _ENVELOPE_PREFIX.unpack_from(signature)
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Unsupported signature envelope version: {version}")
+
+    start = _ENVELOPE_PREFIX.size
+    end = start + proof_len * HASH_BYTES
+    if len(signature) < end:
+        raise ValueError("Truncated signature envelope")
+    proof = [signature[i:i + HASH_BYTES] for i in range(start, end, HASH_BYTES)]
+    return index, count, proof, signature[end:]
+
+
+def max_signature_bytes(sig_algorithm: str) -> int:
+    """Largest signature field of the parameter set: an envelope with a full proof."""
+    return _ENVELOPE_PREFIX.size + 255 * HASH_BYTES + SIG_PARAMETER_SETS[sig_algorithm]["signature_bytes"]
+
+
+def signature_size_valid(sig_algorithm: str, size: int) -> bool:
+    """A plain signature of the parameter set, or an envelope around one."""
+    plain_size = SIG_PARAMETER_SETS[sig_algorithm]["signature_bytes"]
+    if size == plain_size:
+        return True
+    proof_bytes = size - plain_size - _ENVELOPE_PREFIX.size
+    return 0 <= proof_bytes and size <= max_signature_bytes(sig_algorithm) and proof_bytes % HASH_BYTES == 0
+
+
+class _Window:
+    def __init__(self):
+        self.hashes = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.signature = None
+        self.error = None
+
+
+class CoalescingSigner:
+    """
+    Shares one Dilithium signature between concurrent sign() calls
+    of the same parameter set.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = {}      # sig_algorithm → window still accepting hashes
+        self.stats = {"documents": 0, "signatures": 0}
+
+    def sign(self, file_hash: bytes, sig_algorithm: str, window_ms: float, max_items: int) -> bytes:
+        with self.lock:
+            window = self.open.get(sig_algorithm)
+            leader = window is None
+            if leader:
+                window = _Window()
+                self.open[sig_algorithm] = window
+            index = len(window.hashes)
+            window.hashes.append(file_hash)
+            if len(window.hashes) >= max_items:
+                del self.open[sig_algorithm]
+                window.full.set()
+
+        if leader:
+            window.full.wait(window_ms / 1000)
+            with self.lock:
+                if self.open.get(sig_algorithm) is window:
+                    del self.open[sig_algorithm]
+            self._sign_window(window, sig_algorithm)
+        else:
+            window.done.wait()
+
+        if window.error is not None:
+            raise window.error
+
+        if len(window.hashes) == 1:
+            return window.signature
+        leaves = [hash_leaf(h) for h in window.hashes]
+        return encode_envelope(index, len(leaves), merkle_proof(leaves, index), window.signature)
+
+    def _sign_window(self, window: _Window, sig_algorithm: str):
+        # No more hashes can join once the window is closed
+        try:
+            if len(window.hashes) == 1:
+                value = window.hashes[0]
+            else:
+                value = merkle_root([hash_leaf(h) for h in window.hashes])
+            window.signature = sign_hash_with_dilithium(value, sig_algorithm)
+        except Exception as e:
+            window.error = e
+        with self.lock:
+            self.stats["documents"] += len(window.hashes)
+            self.stats["signatures"] += 1
+        window.done.set()
+
+
+coalescing_signer = CoalescingSigner()
+
+
+# ======================================================
+# Document signatures (workflows)
+# ======================================================
+
+def sign_document_hash(file_hash: bytes, sig_algorithm: str) -> bytes:
+    """
+    Signs one document hash, coalesced with concurrent documents when
+    SIGN_COALESCE_ENABLED is set.
+    """
+    if not current_app.config["SIGN_COALESCE_ENABLED"]:
+        return sign_hash_with_dilithium(file_hash, sig_algorithm)
+    return coalescing_signer.sign(
+        file_hash,
+        sig_algorithm,
+        current_app.config["SIGN_COALESCE_WINDOW_MS"],
+        current_app.config["SIGN_COALESCE_MAX_ITEMS"]
+    )
+
+
+def verify_document_signature(file_hash: bytes, signature: bytes, sig_algorithm: str,
+                              peer_id: str = None) -> bool:
+    """
+    Verifies a plain Dilithium signature, or an envelope: inclusion
+    proof up to the root, then the root signature. The Dilithium check
+    goes through the verification cache, so documents sharing a root
+    signature (and retried transfers) verify it once.
+
+    peer_id → sender session whose key signed it (None → active peer)
+    """
+    public_key = load_peer_dilithium_public_key(peer_id)
+    envelope = decode_envelope(signature, sig_algorithm)
+    if envelope is None:
+        return verify_cached(sig_algorithm, file_hash, signature, public_key)[0]
+
+    index, count, proof, root_signature = envelope
+    try:
+        root = root_from_proof(hash_leaf(file_hash), index, count, proof)
+    except ValueError as e:
+        print(f"Invalid inclusion proof: {e}")
+        return False
+    return verify_cached(sig_algorithm, root, root_signature, public_key)[0]
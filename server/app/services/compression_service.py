@@ -0,0 +1,182 @@
+import bz2
+import lzma
+import zlib
+
+from flask import current_app
+
+
+# ======================================================
+# Adaptive compression (before encryption)
+# ======================================================
+# Ciphertext does not compress, so the only place to shrink a transfer
+# is the plaintext. With COMPRESSION_ENABLED each document is checked
+# before encryption:
+#
+#   1. known compressed formats (JPEG, PNG, ZIP / Office, gzip, PDF, ...)
+#      are skipped by their magic bytes
+#   2. the first COMPRESSION_SAMPLE_BYTES are compressed with the
+#      configured codec; unless that saves COMPRESSION_MIN_SAVING the
+#      document is sent as is
+#
+# The chosen codec is recorded in the "codec" header field, and the
+# cipher stream compresses / decompresses on the fly, so no extra pass
+# or temp file is needed. Files without the field are not compressed.
+#
+# id → value of the "codec" header field (never reuse)
+
+CODECS = {
+    "zlib": 1,
+    "lzma": 2,
+    "bz2": 3,
+}
+
+COMPRESSED_MAGIC = (
+    (0, b"\xff\xd8\xff"),           # JPEG
+    (0, b"\x89PNG\r\n\x1a\n"),      # PNG
+    (0, b"GIF8"),                   # GIF
+    (0, b"PK\x03\x04"),             # ZIP, docx / xlsx / pptx, odt, jar
+    (0, b"\x1f\x8b"),               # gzip
+    (0, b"BZh"),                    # bzip2
+    (0, b"\xfd7zXZ\x00"),           # xz
+    (0, b"7z\xbc\xaf\x27\x1c"),     # 7-Zip
+    (0, b"Rar!\x1a\x07"),           # RAR
+    (0, b"\x28\xb5\x2f\xfd"),       # zstd
+    (0, b"%PDF"),                   # PDF (Flate streams)
+    (0, b"OggS"),                   # Ogg
+    (0, b"ID3"),                    # MP3
+    (4, b"ftyp"),                   # MP4 / MOV / HEIC
+    (8, b"WEBP"),                   # WebP
+)
+
+IO_CHUNK = 1024 * 1024
+
+
+def codec_id(codec: str) -> int:
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    return CODECS[codec]
+
+
+def codec_from_id(cid: int) -> str:
+    for name, value in CODECS.items():
+        if value == cid:
+            return name
+    raise ValueError(f"Unknown compression codec id: {cid}")
+
+
+def codec_from_header(fields: dict):
+    """Codec of a file, None when it was not compressed"""
+    return codec_from_id(fields["codec"]) if "codec" in fields else None
+
+
+def make_compressor(codec: str, level: int):
+    if codec == "zlib":
+        return zlib.compressobj(level)
+    if codec == "lzma":
+        return lzma.LZMACompressor(preset=level)
+    if codec == "bz2":
+        return bz2.BZ2Compressor(max(1, level))
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def make_decompressor(codec: str):
+    if codec == "zlib":
+        return zlib.decompressobj()
+    if codec == "lzma":
+        return lzma.LZMADecompressor()
+    if codec == "bz2":
+        return bz2.BZ2Decompressor()
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def compress_bytes(data: bytes, codec: str, level: int) -> bytes:
+    compressor = make_compressor(codec, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+# ======================================================
+# Codec selection
+# ======================================================
+
+def is_compressed_format(head: bytes) -> bool:
+    return any(head[offset:offset + len(magic)] == magic for offset, magic in COMPRESSED_MAGIC)
+
+
+def choose_codec(input_path: str, sample: bytes = None):
+    """
+    sample → first bytes of a document that is being streamed, used
+    instead of reading input_path
+
+    Returns:
+        codec name → compress with it
+        None → send as is (disabled, compressed format, or the sample
+               does not shrink enough)
+    """
+    config = current_app.config
+    if not config["COMPRESSION_ENABLED"]:
+        return None
+
+    if sample is None:
+        with open(input_path, "rb") as f:
+            sample = f.read(config["COMPRESSION_SAMPLE_BYTES"])
+    if not sample or is_compressed_format(sample[:16]):
+        return None
+
+    codec = config["COMPRESSION_CODEC"]
+    compressed = compress_bytes(sample, codec, config["COMPRESSION_LEVEL"])
+    saving = 1 - len(compressed) / len(sample)
+    if saving < config["COMPRESSION_MIN_SAVING"]:
+        return None
+    return codec
+
+
+def compression_header_fields(input_path: str, sample: bytes = None) -> dict:
+    """Header fields for `input_path` (merged with the suite fields)."""
+    codec = choose_codec(input_path, sample)
+    return {"codec": codec_id(codec)} if codec else {}
+
+
+# ======================================================
+# Stream adapters (used by cipher_suite_service)
+# ======================================================
+
+class CompressingReader:
+    """read() of the compressed form of `raw`."""
+
+    def __init__(self, raw, codec: str, level: int):
+        self.raw = raw
+        self.compressor = make_compressor(codec, level)
+        self.buffer = bytearray()
+        self.done = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.done and (size < 0 or len(self.buffer) < size):
+            data = self.raw.read(IO_CHUNK)
+            if data:
+                self.buffer += self.compressor.compress(data)
+            else:
+                self.buffer += self.compressor.flush()
+                self.done = True
+        if size < 0:
+            size = len(self.buffer)
+        out = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return out
+
+
+class DecompressingWriter:
+    """write() of compressed bytes, decompressed into `raw`."""
+
+    def __init__(self, raw, codec: str):
+        self.raw = raw
+        self.decompressor = make_decompressor(codec)
+
+    def write(self, data: bytes):
+        if data:
+            self.raw.write(self.decompressor.decompress(data))
+
+    def finish(self):
+        if hasattr(self.decompressor, "flush"):
+            self.raw.write(self.decompressor.flush())
+        if not self.decompressor.eof:
+            raise ValueError("Compressed stream is truncated")
@@ -0,0 +1,415 @@
+import base64
+import hashlib
+import os
+import shutil
+import struct
+import time
+import uuid
+
+from flask import current_app
+
+from app.services.crypto_service import HASH_MODES, hash_mode_from_header
+from app.services.header_service import PREFIX_SIZE, header_size, parse_header
+from app.services.merkle_service import (
+    MerkleStreamVerifier,
+    bind_root,
+    HASH_BYTES,
+    decode_leaves,
+    encode_leaves,
+    leaf_count,
+    merkle_root
+)
+from app.services.coalescing_signer_service import signature_size_valid
+from app.services.pqc_param_service import KEM_PARAMETER_SETS, algorithm_from_id, algorithm_id, ensure_allowed
+from app.services.pqc_receive_service import BackgroundDecapsulation
+from app.services.pqc_workflow_service import pqc_algorithms_from_header, verify_merkle_manifest
+from app.utils.multipart import READ_CHUNK_SIZE
+
+
+# ======================================================
+# Single-file PQC container (.pqdc)
+# ======================================================
+# One file carries a whole PQC transfer, so it can be stored, hashed,
+# sent and queued as a unit instead of an .enc file plus hex / base64
+# form fields:
+#
+#   MAGIC "PQDC" (4) | VERSION (1) | KEM id (1) | SIG id (1) | HASH id (1)
+#   | CT_LEN (4) | INDEX_LEN (4) | NAME_LEN (2) | BODY_LEN (8) | SIG_LEN (4)
+#   | KYBER CIPHERTEXT | INDEX | NAME (utf-8) | SIGNATURE | BODY
+#
+# (integers big endian). BODY is the .enc file, ciphertext header
+# included, and is signed exactly as before: SHA-512 over body + Kyber
+# ciphertext, or the Merkle root bound to the Kyber ciphertext.
+#
+# INDEX is empty for linear hashing; in Merkle mode it holds
+#
+#   LEAF_SIZE (4) | leaf hashes (64 each)
+#
+# so leaf i of the body sits at body_offset + i * LEAF_SIZE and can be
+# read and checked on its own. The signature comes before the body, so
+# a receiver authenticates the index before the first body byte and
+# rejects a tampered container at its first bad leaf. Version 1
+# containers (signature after the body) are still read.
+#
+# Every length is checked against the parameter tables before it is
+# read: CT_LEN is the KEM's ciphertext size, SIG_LEN a plain signature
+# or a coalesced envelope (coalescing_signer_service), INDEX_LEN exactly
+# 4 + 64 × leaf_count(BODY_LEN) with leaves of at least MIN_LEAF_SIZE.
+
+MAGIC = b"PQDC"
+VERSION = 2
+SIGNATURE_FIRST_VERSION = 2
+MIN_LEAF_SIZE = 64 * 1024
+MIMETYPE = "application/x-pqdocsec-container"
+EXTENSION = ".pqdc"
+
+_FIXED = struct.Struct(">4sBBBBIIHQI")
+FIXED_SIZE = _FIXED.size
+_LEAF_SIZE = struct.Struct(">I")
+
+
+def write_container(
+    out_path: str,
+    encrypted_path: str,
+    kyber_ct: bytes,
+    signature: bytes,
+    kem_algorithm: str,
+    sig_algorithm: str,
+    hash_mode: str,
+    filename: str,
+    leaf_size: int = None,
+    merkle_leaves=None
+) -> str:
+    """
+    Packs an encrypted file and its transfer fields into one container,
+    renamed into place once complete (a concurrent send never reads a
+    half-written container).
+
+    Returns:
+        out_path
+    """
+    index = b""
+    if merkle_leaves is not None:
+        index = _LEAF_SIZE.pack(leaf_size) + encode_leaves(merkle_leaves)
+    name = filename.encode("utf-8")
+    body_size = os.path.getsize(encrypted_path)
+
+    tmp_path = f"{out_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        _write_container_file(tmp_path, encrypted_path, kyber_ct, signature, kem_algorithm,
+                              sig_algorithm, hash_mode, index, name, body_size)
+        os.replace(tmp_path, out_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return out_path
+
+
+def _write_container_file(path, encrypted_path, kyber_ct, signature, kem_algorithm,
+                          sig_algorithm, hash_mode, index, name, body_size):
+    with open(path, "wb") as out, open(encrypted_path, "rb") as body:
+        out.write(_FIXED.pack(
+            MAGIC,
+            VERSION,
+            algorithm_id("kem", kem_algorithm),
+            algorithm_id("sig", sig_algorithm),
+            HASH_MODES[hash_mode],
+            len(kyber_ct),
+            len(index),
+            len(name),
+            body_size,
+            len(signature)
+        ))
+        out.write(kyber_ct)
+        out.write(index)
+        out.write(name)
+        out.write(signature)
+        shutil.copyfileobj(body, out, READ_CHUNK_SIZE)
+
+
+def pack_workflow_result(result: dict, filename: str) -> str:
+    """
+    Container of a pqc_encrypt_file_workflow result, named after the
+    (unique) .enc file it replaces: <id>_<name>.enc → <id>_<name>.pqdc.
+
+    Returns:
+        container path
+    """
+    encrypted_path = result["encrypted_file_path"]
+    path = write_container(
+        os.path.splitext(encrypted_path)[0] + EXTENSION,
+        encrypted_path,
+        result["kyber_ciphertext"],
+        result["signature"],
+        result["kem_algorithm"],
+        result["sig_algorithm"],
+        result["hash_mode"],
+        filename,
+        current_app.config["MERKLE_LEAF_SIZE"],
+        result["merkle_leaves"]
+    )
+    os.remove(encrypted_path)
+    return path
+
+
+# ======================================================
+# Reading (seekable)
+# ======================================================
+
+def _parse_fixed(data: bytes) -> dict:
+    if len(data) < FIXED_SIZE or data[:4] != MAGIC:
+        raise ValueError("Not a PQC container")
+    (_, version, kem_id, sig_id, hash_id, ct_len,
+     index_len, name_len, body_size, sig_len) = _FIXED.unpack_from(data)
+    if not 1 <= version <= VERSION:
+        raise ValueError(f"Unsupported container version: {version}")
+    info = {
+        "version": version,
+        "kem_algorithm": ensure_allowed("kem", algorithm_from_id("kem", kem_id)),
+        "sig_algorithm": ensure_allowed("sig", algorithm_from_id("sig", sig_id)),
+        "hash_mode": hash_mode_from_header({"hash": hash_id}),
+        "ct_len": ct_len,
+        "index_len": index_len,
+        "name_len": name_len,
+        "body_size": body_size,
+        "sig_len": sig_len
+    }
+
+    # Lengths come from the peer: bound them before reading anything
+    if ct_len != KEM_PARAMETER_SETS[info["kem_algorithm"]]["ciphertext_bytes"]:
+        raise ValueError("Container Kyber ciphertext length does not match its KEM")
+    if not signature_size_valid(info["sig_algorithm"], sig_len):
+        raise ValueError("Container signature length does not match its signature scheme")
+    if info["hash_mode"] == "merkle-sha512":
+        if index_len < _LEAF_SIZE.size:
+            raise ValueError("Container index missing")
+    elif index_len:
+        raise ValueError("Container index does not match its hash mode")
+    return info
+
+
+def _parse_index(read, info: dict):
+    """
+    Reads the index through `read(size)` once its leaf size checks out.
+
+    Returns:
+        (leaf_size, leaf hashes) → (None, None) without an index
+    """
+    if not info["index_len"]:
+        return None, None
+    leaf_size = _LEAF_SIZE.unpack(read(_LEAF_SIZE.size))[0]
+    if leaf_size < MIN_LEAF_SIZE:
+        raise ValueError(f"Container leaf size below {MIN_LEAF_SIZE} bytes")
+    expected = leaf_count(info["body_size"], leaf_size)
+    if info["index_len"] != _LEAF_SIZE.size + HASH_BYTES * expected:
+        raise ValueError("Container index does not match the body size")
+    return leaf_size, decode_leaves(read(info["index_len"] - _LEAF_SIZE.size))
+
+
+def _read_head(read, info: dict) -> dict:
+    """Everything between the fixed header and the body (v1: the signature trails the body)."""
+    kyber_ct = read(info["ct_len"])
+    leaf_size, leaves = _parse_index(read, info)
+    name = read(info["name_len"])
+    signature = read(info["sig_len"]) if info["version"] >= SIGNATURE_FIRST_VERSION else None
+    return {
+        "kyber_ct": kyber_ct,
+        "leaf_size": leaf_size,
+        "merkle_leaves": leaves,
+        "filename": name.decode("utf-8"),
+        "signature": signature
+    }
+
+
+def read_container_info(path: str) -> dict:
+    """
+    Reads everything but the body of a container.
+
+    Returns:
+        {
+            version, kem_algorithm, sig_algorithm, hash_mode,
+            kyber_ct, leaf_size, merkle_leaves, filename,
+            body_offset, body_size, signature
+        }
+    """
+    with open(path, "rb") as f:
+        read = lambda size: _read_exact(f, size)
+        info = _parse_fixed(read(FIXED_SIZE))
+        head = _read_head(read, info)
+        body_offset = f.tell()
+        trailer = info["sig_len"] if head["signature"] is None else 0
+        if os.fstat(f.fileno()).st_size != body_offset + info["body_size"] + trailer:
+            raise ValueError("Container size does not match its header")
+        if head["signature"] is None:
+            f.seek(body_offset + info["body_size"])
+            head["signature"] = read(info["sig_len"])
+
+    return {
+        "version": info["version"],
+        "kem_algorithm": info["kem_algorithm"],
+        "sig_algorithm": info["sig_algorithm"],
+        "hash_mode": info["hash_mode"],
+        **head,
+        "body_offset": body_offset,
+        "body_size": info["body_size"]
+    }
+
+
+def leaf_range(info: dict, index: int):
+    """
+    Returns:
+        (file offset, size) of Merkle leaf `index` of the body
+    """
+    if info["leaf_size"] is None:
+        raise ValueError("Container has no chunk index")
+    if not 0 <= index < len(info["merkle_leaves"]):
+        raise ValueError(f"Leaf {index} out of range")
+    start = index * info["leaf_size"]
+    size = min(info["leaf_size"], info["body_size"] - start)
+    return info["body_offset"] + start, size
+
+
+def extract_body(path: str, info: dict, out_path: str) -> str:
+    """Copies the body (the .enc file) out of a container."""
+    with open(path, "rb") as f, open(out_path, "wb") as out:
+        f.seek(info["body_offset"])
+        remaining = info["body_size"]
+        while remaining:
+            data = f.read(min(READ_CHUNK_SIZE, remaining))
+            if not data:
+                raise ValueError("Truncated container body")
+            out.write(data)
+            remaining -= len(data)
+    return out_path
+
+
+# ======================================================
+# Streaming receive (RECEIVER /pqc/decrypt, container body)
+# ======================================================
+
+def _read_exact(stream, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = stream.read(min(READ_CHUNK_SIZE, size - len(data)))
+        if not chunk:
+            raise ValueError("Container ended early")
+        data += chunk
+    return bytes(data)
+
+
+def receive_pqc_container(stream, encrypted_path: str, content_length: int = None,
+                          peer_id: str = None) -> dict:
+    """
+    Reads a container from `stream` in one pass: the body is spooled to
+    encrypted_path and hashed (checked leaf by leaf against the index)
+    as it arrives, Kyber decapsulation starts once the body's ciphertext
+    header has been read.
+
+    In Merkle mode the signature over the index is verified before the
+    body is read (version 2), so a tampered body fails at its first bad
+    leaf; otherwise the decrypt workflow verifies it against file_hash.
+    `content_length` (the request's) must match the header's sizes;
+    peer_id names the sender's session (None → active peer).
+
+    Returns:
+        same shape as PQCUploadReceiver.finish(); "form" carries the
+        signature (base64), Kyber ciphertext (hex) and original_filename
+    """
+    read = lambda size: _read_exact(stream, size)
+    info = _parse_fixed(read(FIXED_SIZE))
+    if content_length is not None and content_length != (
+        FIXED_SIZE + info["ct_len"] + info["index_len"] + info["name_len"]
+        + info["sig_len"] + info["body_size"]
+    ):
+        raise ValueError("Container size does not match its header")
+    head = _read_head(read, info)
+    kyber_ct, leaf_size, leaves = head["kyber_ct"], head["leaf_size"], head["merkle_leaves"]
+    filename = head["filename"]
+    signature = head["signature"]
+
+    manifest_verified = False
+    if leaves is not None and signature is not None:
+        verify_merkle_manifest(info["sig_algorithm"], leaves, kyber_ct, signature, peer_id)
+        manifest_verified = True
+
+    hasher = MerkleStreamVerifier(leaves, leaf_size) if leaves is not None else hashlib.sha512()
+    hash_ns = 0
+    decaps = None
+    head = b""
+    remaining = info["body_size"]
+    try:
+        with open(encrypted_path, "wb") as out:
+            while remaining:
+                data = stream.read(min(READ_CHUNK_SIZE, remaining))
+                if not data:
+                    raise ValueError("Container ended early")
+                remaining -= len(data)
+
+                if decaps is None:
+                    head += data
+                    if len(head) >= PREFIX_SIZE and len(head) >= header_size(head[:PREFIX_SIZE]):
+                        decaps = BackgroundDecapsulation(_check_body_header(head, info, leaf_size), kyber_ct)
+
+                start = time.perf_counter_ns()
+                hasher.update(data)
+                hash_ns += time.perf_counter_ns() - start
+                out.write(data)
+
+        if decaps is None:
+            decaps = BackgroundDecapsulation(_check_body_header(head, info, leaf_size), kyber_ct)
+        if signature is None:
+            signature = read(info["sig_len"])
+        if stream.read(1):
+            raise ValueError("Unexpected data after the container signature")
+
+        start = time.perf_counter_ns()
+        if leaves is not None:
+            hasher.finalize()
+            file_hash = bind_root(merkle_root(leaves), kyber_ct)
+        else:
+            hasher.update(kyber_ct)
+            file_hash = hasher.digest()
+        hash_ns += time.perf_counter_ns() - start
+        shared_secret = decaps.result()
+    except Exception:
+        if decaps is not None:
+            decaps.thread.join()
+        if os.path.exists(encrypted_path):
+            os.remove(encrypted_path)
+        raise
+
+    return {
+        "form": {
+            "signature": base64.b64encode(signature).decode("utf-8"),
+            "kyber_ciphertext": kyber_ct.hex(),
+            "original_filename": filename
+        },
+        "file_hash": file_hash,
+        "shared_secret": shared_secret,
+        "manifest_verified": manifest_verified,
+        "timings": {
+            "Hash_generation": hash_ns / 1e6,
+            "key_ecapsulation": decaps.elapsed_ms
+        }
+    }
+
+
+def _check_body_header(head: bytes, info: dict, leaf_size: int) -> str:
+    """
+    The body's ciphertext header must agree with the container's.
+
+    Returns:
+        KEM parameter set for decapsulation
+    """
+    fields, _ = parse_header(head)
+    if not fields:
+        raise ValueError("Container body has no ciphertext header")
+    kem_algorithm, sig_algorithm, _, hash_mode = pqc_algorithms_from_header(fields)
+    if (kem_algorithm, sig_algorithm, hash_mode) != (
+        info["kem_algorithm"], info["sig_algorithm"], info["hash_mode"]
+    ):
+        raise ValueError("Container header does not match the ciphertext header")
+    if leaf_size is not None and fields.get("leaf") != leaf_size:
+        raise ValueError("Container index leaf size does not match the ciphertext header")
+    return kem_algorithm
@@ -0,0 +1,181 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+
+
+# ======================================================
+# Shared CPU pool (segment sealing, leaf hashing)
+# ======================================================
+# One pool of CPU_WORKERS threads per process runs the CPU-bound steps
+# of every transfer (AEAD seal / open of 1 MiB segments, Merkle leaf
+# hashes; both release the GIL), so the request thread keeps reading
+# the next segment from the socket or disk while the previous ones are
+# sealed. At most CPU_MAX_QUEUED tasks are queued or running: a request
+# that submits more blocks until a slot frees up, which slows its
+# client down instead of growing the queue. Tasks must not submit
+# tasks themselves.
+#
+# CPU_WORKERS = 0, or no app context, runs everything on the caller.
+
+_lock = threading.Lock()
+_pool = None
+_slots = None
+_stats = {"submitted": 0, "running": 0, "queued": 0, "blocked": 0}
+
+
+def _get_pool():
+    """
+    Returns:
+        (pool, slots) → (None, None) when the pool is disabled
+    """
+    global _pool, _slots
+    if not pool_workers():
+        return None, None
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=current_app.config["CPU_WORKERS"],
+                thread_name_prefix="cpu"
+            )
+            _slots = threading.BoundedSemaphore(current_app.config["CPU_MAX_QUEUED"])
+        return _pool, _slots
+
+
+def pool_workers() -> int:
+    """
+    Returns:
+        CPU_WORKERS → 0 when the pool is disabled here
+    """
+    if not has_app_context():
+        return 0
+    return current_app.config["CPU_WORKERS"]
+
+
+def _count(name: str, delta: int):
+    with _lock:
+        _stats[name] += delta
+
+
+def submit(fn, *args):
+    """
+    Runs fn(*args) on the CPU pool, blocking while CPU_MAX_QUEUED tasks
+    are waiting or running.
+
+    Returns:
+        Future → None when the pool is disabled (run fn yourself)
+    """
+    pool, slots = _get_pool()
+    if pool is None:
+        return None
+
+    if not slots.acquire(blocking=False):
+        _count("blocked", 1)
+        slots.acquire()
+
+    def run():
+        _count("queued", -1)
+        _count("running", 1)
+        try:
+            return fn(*args)
+        finally:
+            _count("running", -1)
+
+    def done(future):
+        if future.cancelled():
+            _count("queued", -1)
+        slots.release()
+
+    _count("submitted", 1)
+    _count("queued", 1)
+    try:
+        future = pool.submit(run)
+    except RuntimeError:
+        # Shutting down: nothing will run it
+        _count("queued", -1)
+        slots.release()
+        raise
+    future.add_done_callback(done)
+    return future
+
+
+class OrderedPipeline:
+    """
+    Results of fn calls in submission order, with at most `depth`
+    calls in flight; without a pool every call runs in put().
+
+        pipeline = OrderedPipeline(seal)
+        for args in segments:
+            for result in pipeline.put(*args): write(result)
+        for result in pipeline.drain(): write(result)
+    """
+
+    def __init__(self, fn, depth: int = None):
+        self.fn = fn
+        self.depth = depth or (
+            current_app.config["CPU_PIPELINE_DEPTH"] if has_app_context() else 1
+        )
+        self.in_flight = deque()
+
+    def put(self, *args) -> list:
+        """
+        Returns:
+            results of the oldest calls, once more than `depth` are in flight
+        """
+        future = submit(self.fn, *args)
+        if future is None:
+            return [self.fn(*args)]
+        self.in_flight.append(future)
+
+        done = []
+        while len(self.in_flight) > self.depth:
+            done.append(self.in_flight.popleft().result())
+        return done
+
+    def drain(self) -> list:
+        done = []
+        while self.in_flight:
+            done.append(self.in_flight.popleft().result())
+        return done
+
+    def cancel(self):
+        """Drops queued calls and waits for running ones (error paths)."""
+        while self.in_flight:
+            future = self.in_flight.popleft()
+            if not future.cancel():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+
+
+def ordered_map(fn, items, depth: int = None):
+    """
+    Yields fn(*args) for every args tuple of `items` in order. `items`
+    is consumed on the calling thread while earlier calls run.
+    """
+    pipeline = OrderedPipeline(fn, depth)
+    try:
+        for args in items:
+            yield from pipeline.put(*args)
+        yield from pipeline.drain()
+    finally:
+        pipeline.cancel()
+
+
+def status() -> dict:
+    with _lock:
+        return {
+            "workers": _pool._max_workers if _pool else 0,
+            **_stats
+        }
+
+
+def shutdown(wait: bool = True):
+    """Lets queued tasks finish (graceful stop of a worker process)."""
+    global _pool, _slots
+    with _lock:
+        pool, _pool, _slots = _pool, None, None
+    if pool:
+        pool.shutdown(wait=wait)
@@ -4,6 +4,11 @@ from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
 import os
+from app.services.merkle_service import (
+    bind_root,
+    hash_file_leaves,
+    merkle_root
+)
 
 
 # ======================================================
@@ -26,6 +31,57 @@ def derive_aes_key_from_shared_secret(shared_secret: bytes) -> bytes:
     return hkdf.derive(shared_secret)
 
 
+def derive_batch_file_key(shared_secret: bytes, batch_id: str, index: int) -> bytes:
+    """
+    Per-document AES-256 key of a batch: one Kyber shared secret,
+    a distinct key for every file in the manifest
+    """
+
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"pqc-batch-encryption|" + batch_id.encode("utf-8") + b"|" + str(index).encode("ascii"),
+        backend=default_backend()
+    )
+
+    return hkdf.derive(shared_secret)
+
+
+def derive_delta_wrap_key(shared_secret: bytes) -> bytes:
+    """
+    AES-256 key that carries the long-lived delta key of a
+    sender → receiver pair inside one transfer
+    """
+
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"pqc-delta-key-wrap",
+        backend=default_backend()
+    )
+
+    return hkdf.derive(shared_secret)
+
+
+def derive_delta_chunk_key(delta_key: bytes, chunk_id: str) -> bytes:
+    """
+    Per-chunk AES-256 key: the same chunk content always gets the same
+    key, so a stored chunk can be reused by later transfers
+    """
+
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"pqc-delta-chunk|" + chunk_id.encode("ascii"),
+        backend=default_backend()
+    )
+
+    return hkdf.derive(delta_key)
+
+
 
 
 # ======================================================
@@ -34,12 +90,12 @@ def derive_aes_key_from_shared_secret(shared_secret: bytes) -> bytes:
 
 def compute_hash_from_encrypted_file_and_kyber_ct(
     encrypted_file_path: str,
-    kyber_ct_path: str
+    kyber_ct: bytes
 ) -> bytes:
     """
     Computes SHA-512 hash over:
     1. Encrypted document (.enc file)
-    2. Kyber ciphertext (.bin)
+    2. Kyber ciphertext (bytes of this transfer)
 
     Returns:
         hash bytes (64 bytes)
@@ -48,9 +104,6 @@ def compute_hash_from_encrypted_file_and_kyber_ct(
     if not os.path.exists(encrypted_file_path):
         raise FileNotFoundError(f"Encrypted file not found: {encrypted_file_path}")
 
-    if not os.path.exists(kyber_ct_path):
-        raise FileNotFoundError(f"Kyber ciphertext not found: {kyber_ct_path}")
-
     hasher = hashlib.sha512()
 
     # Read encrypted document (binary)
@@ -61,12 +114,45 @@ def compute_hash_from_encrypted_file_and_kyber_ct(
                 break
             hasher.update(chunk)
 
-    # Read Kyber ciphertext (binary)
-    with open(kyber_ct_path, "rb") as f:
-        while True:
-            chunk = f.read(4096)
-            if not chunk:
-                break
-            hasher.update(chunk)
+    hasher.update(kyber_ct)
+    return hasher.digest()
+
+
+# ======================================================
+# Merkle tree hash for PQC workflow (see merkle_service)
+# ======================================================
+# id → value of the "hash" header field; files without it are linear SHA-512
+
+HASH_MODES = {
+    "sha512": 1,
+    "merkle-sha512": 2,
+}
+
+
+def hash_mode_from_header(fields: dict) -> str:
+    hash_id = fields.get("hash", HASH_MODES["sha512"])
+    for name, mode_id in HASH_MODES.items():
+        if mode_id == hash_id:
+            return name
+    raise ValueError(f"Unknown hash mode id: {hash_id}")
+
+
+def compute_merkle_hash_from_encrypted_file_and_kyber_ct(
+    encrypted_file_path: str,
+    kyber_ct: bytes,
+    leaf_size: int,
+    workers: int = None
+):
+    """
+    Merkle root over the encrypted document (leaves hashed in parallel),
+    bound to the Kyber ciphertext.
+
+    Returns:
+        (hash bytes (64 bytes), leaf hashes)
+    """
+
+    if not os.path.exists(encrypted_file_path):
+        raise FileNotFoundError(f"Encrypted file not found: {encrypted_file_path}")
 
-    return hasher.digest()
\ No newline at end of file
+    leaves = hash_file_leaves(encrypted_file_path, leaf_size, workers)
+    return bind_root(merkle_root(leaves), kyber_ct), leaves
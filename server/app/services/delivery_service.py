@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+
+from app.extensions import app_state
+
+
+# ======================================================
+# Idempotent delivery (receiver side)
+# ======================================================
+# The sender tags every delivery with a transfer id and the SHA-256 of
+# the encrypted file:
+#
+#   X-Transfer-Id: <id>          X-Content-SHA256: <hex>
+#
+# and keeps the same pair when it retries. The receiver remembers the
+# response of every completed transfer, so a retry (for example after a
+# sender timeout on a delivery that did go through) gets the original
+# answer back without hashing, verifying or decrypting again. A retry
+# that arrives while the first attempt is still running waits for it.
+#
+# Only successful deliveries are remembered: after a failure the next
+# attempt runs the full workflow again.
+#
+# The index lives in the node state store ("deliveries" collection), so
+# with STATE_BACKEND = "sqlite" every worker process sees the same
+# transfers: a retry that lands on another worker still gets the first
+# answer. A transfer is claimed by writing its in-flight record only if
+# none is stored (put_if); waiters poll the record. An in-flight record
+# whose worker process has died is taken over by the next attempt.
+# The counters in status() are kept per process.
+
+DELIVERIES = "deliveries"
+WAIT_POLL_SECONDS = 0.05
+
+TRANSFER_ID_HEADER = "X-Transfer-Id"
+CONTENT_HASH_HEADER = "X-Content-SHA256"
+
+
+class TransferConflict(Exception):
+    """Transfer id reused for different content"""
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass    # exists, owned by someone else
+    return True
+
+
+class DeliveryIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {"deliveries": 0, "duplicates": 0, "waited": 0}
+
+    def _count(self, name: str):
+        with self.lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _stale(record: dict, ttl_seconds: float) -> bool:
+        """Completed longer than ttl ago, or claimed by a process that is gone."""
+        if record["state"] == "completed":
+            return record["completed_at"] < time.time() - ttl_seconds
+        return not _process_alive(record["pid"])
+
+    def acquire(self, transfer_id: str, content_hash: str, ttl_seconds: float, wait_seconds: float):
+        """
+        Claims a transfer for processing.
+
+        Returns:
+            stored record of the completed transfer → answer with it
+            None → caller runs the delivery, then complete() or release()
+        """
+        store = app_state.store
+        claim = {
+            "state": "in_flight",
+            "content_hash": content_hash,
+            "pid": os.getpid(),
+            "started_at": time.time()
+        }
+        deadline = time.monotonic() + wait_seconds
+        waited = False
+        while True:
+            record = store.get(DELIVERIES, transfer_id)
+            if record is None or self._stale(record, ttl_seconds):
+                if store.put_if(DELIVERIES, transfer_id, record, claim):
+                    self._count("deliveries")
+                    return None
+                continue    # another attempt got there first: look again
+
+            if record["content_hash"] != content_hash:
+                state = "already completed" if record["state"] == "completed" else "in progress"
+                raise TransferConflict(f"Transfer {transfer_id} {state} with different content")
+            if record["state"] == "completed":
+                self._count("duplicates")
+                return record
+
+            # Same transfer already running: wait for its outcome
+            if not waited:
+                self._count("waited")
+                waited = True
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Transfer {transfer_id} is still in progress")
+            time.sleep(WAIT_POLL_SECONDS)
+
+    def complete(self, transfer_id: str, content_hash: str, status: int, response: dict, max_entries: int):
+        store = app_state.store
+        store.put(DELIVERIES, transfer_id, {
+            "state": "completed",
+            "content_hash": content_hash,
+            "status": status,
+            "response": response,
+            "completed_at": time.time()
+        })
+        # Oldest completed transfers go first
+        while store.count(DELIVERIES) > max_entries:
+            if store.pop_first(DELIVERIES, state="completed") is None:
+                break
+
+    def release(self, transfer_id: str):
+        """Failed attempt: forget it so a retry runs again"""
+        app_state.store.pop(DELIVERIES, transfer_id)
+
+    def status(self) -> dict:
+        records = app_state.store.values(DELIVERIES)
+        in_flight = sum(1 for record in records if record["state"] == "in_flight")
+        with self.lock:
+            return {
+                "completed": len(records) - in_flight,
+                "in_flight": in_flight,
+                **self.stats
+            }
+
+
+delivery_index = DeliveryIndex()
@@ -1,7 +1,18 @@
 import os
+from flask import current_app
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.backends import default_backend
+from app.services.cipher_suite_service import (
+    cipher_header_fields,
+    get_cipher_suite,
+    encrypt_file as cipher_encrypt_file,
+    encrypt_stream as cipher_encrypt_stream,
+    decrypt_file as cipher_decrypt_file
+)
+from app.services.header_service import build_header
+from app.services.compression_service import compression_header_fields
+from app.services.pqc_encryption_service import received_file_name
 
 def encrypt_file(input_path, output_dir):
     os.makedirs(output_dir, exist_ok=True)
@@ -30,69 +41,55 @@ def encrypt_file(input_path, output_dir):
 
     return output_path
 
-def aes_encrypt_file(input_path, output_dir):
+def aes_encrypt_file(input_path, output_dir, cipher_suite=None, reader=None):
     """
-    Encrypts a file using AES-256-CBC
-    Returns: (encrypted_file_path, aes_key, iv)
+    Encrypts a file with a fresh AES-256 key using `cipher_suite`
+    (default: calibrated / configured suite, see cipher_suite_service).
+    The suite is recorded in the file header.
+    reader → plaintext stream encrypted as it arrives (input_path only
+    names the output)
+    Returns: (encrypted_file_path, aes_key)
     """
 
-    # Read file as bytes
-    with open(input_path, "rb") as f:
-        plaintext = f.read()
-
-    # Generate AES-256 key and IV
+    # Generate AES-256 key
     aes_key = os.urandom(32)   # 256-bit key
-    iv = os.urandom(16)        # 128-bit IV
-
-    # Pad plaintext
-    padder = padding.PKCS7(128).padder()
-    padded_data = padder.update(plaintext) + padder.finalize()
-
-    # Encrypt
-    cipher = Cipher(
-        algorithms.AES(aes_key),
-        modes.CBC(iv),
-        backend=default_backend()
-    )
-    encryptor = cipher.encryptor()
-    ciphertext = encryptor.update(padded_data) + encryptor.finalize()
-
-    # Save encrypted file
-    encrypted_filename = os.path.basename(input_path) + ".enc"
-    encrypted_path = os.path.join(output_dir, encrypted_filename)
 
-    with open(encrypted_path, "wb") as f:
-        # prepend IV for later decryption
-        f.write(iv + ciphertext)
+    if reader is not None:
+        compression_fields = compression_header_fields(
+            None, reader.peek(current_app.config["COMPRESSION_SAMPLE_BYTES"])
+        )
+    else:
+        compression_fields = compression_header_fields(input_path)
+    header = build_header({
+        **cipher_header_fields(cipher_suite or get_cipher_suite()),
+        **compression_fields
+    })
+
+    # Save encrypted file, unique per call (input_path may be a client's name)
+    os.makedirs(output_dir, exist_ok=True)
+    encrypted_path = os.path.join(output_dir, f"{received_file_name(os.path.basename(input_path))}.enc")
+
+    if reader is not None:
+        try:
+            with open(encrypted_path, "wb") as dst:
+                cipher_encrypt_stream(reader, dst, aes_key, header)
+        except Exception:
+            if os.path.exists(encrypted_path):
+                os.remove(encrypted_path)
+            raise
+    else:
+        cipher_encrypt_file(input_path, encrypted_path, aes_key, header)
 
     return encrypted_path, aes_key
 
 def aes_decrypt_file(encrypted_path, output_dir, aes_key,original_filename):
     """
-    Decrypts AES-encrypted file
+    Decrypts a file encrypted by aes_encrypt_file (suite from header;
+    files without a header are legacy AES-256-CBC)
     """
 
-    with open(encrypted_path, "rb") as f:
-        data = f.read()
-
-    iv = data[:16]
-    ciphertext = data[16:]
-
-    cipher = Cipher(
-        algorithms.AES(aes_key),
-        modes.CBC(iv),
-        backend=default_backend()
-    )
-    decryptor = cipher.decryptor()
-    padded_plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-
-    unpadder = padding.PKCS7(128).unpadder()
-    plaintext = unpadder.update(padded_plaintext) + unpadder.finalize()
-
-    decrypted_filename = original_filename
-    decrypted_path = os.path.join(output_dir,  decrypted_filename)
-
-    with open(decrypted_path, "wb") as f:
-        f.write(plaintext)
+    # Sanitised and made unique: senders choose original_filename
+    decrypted_filename = received_file_name(original_filename)
+    decrypted_path = os.path.join(output_dir, decrypted_filename)
 
-    return decrypted_path
+    return cipher_decrypt_file(encrypted_path, decrypted_path, aes_key)
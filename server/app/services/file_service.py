@@ -1,5 +1,10 @@
+import base64
 import os
+from flask import current_app, send_file
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import ClosingIterator
+
+from app.utils.multipart import iter_multipart
 
 def save_uploaded_file(file, upload_dir):
     if not os.path.exists(upload_dir):
@@ -12,3 +17,129 @@ def save_uploaded_file(file, upload_dir):
     file.save(file_path)
     return file_path
    
+
+
+# ======================================================
+# Streaming uploads (no plaintext temp file)
+# ======================================================
+# request.files makes Werkzeug parse the whole body first, spooling
+# large files to a temp file, and the routes then saved another copy to
+# UPLOAD_FOLDER. UploadStream parses request.stream incrementally
+# instead: form fields before the file part are collected, then the
+# file part is handed out through read() as it arrives, so the
+# encryption pipeline consumes it directly and only ciphertext is
+# written. Fields that follow the file are returned by finish().
+
+class UploadStream:
+    def __init__(self, stream, boundary: str, max_form_memory_size=None, file_field: str = "file"):
+        self.parts = iter_multipart(stream, boundary, max_form_memory_size)
+        self.file_field = file_field
+        self.form = {}
+        self.filename = None
+        self.buffer = bytearray()
+        self.file_done = False
+        self.bytes_read = 0
+
+        for part in self.parts:
+            if part[0] == "field":
+                self.form[part[1]] = part[2]
+            elif part[1] == file_field:
+                self.filename = part[2]
+                self._add(part[3])
+                break
+        if self.filename is None:
+            raise ValueError("File missing")
+
+    def _add(self, data: bytes):
+        if data:
+            self.buffer += data
+        else:
+            self.file_done = True
+
+    def _fill(self, size: int):
+        while not self.file_done and (size < 0 or len(self.buffer) < size):
+            part = next(self.parts, None)
+            if part is None:
+                raise ValueError("Upload ended inside the file")
+            if part[0] == "file" and part[1] == self.file_field:
+                self._add(part[3])
+
+    def peek(self, size: int) -> bytes:
+        """First `size` pending bytes, left to be read()."""
+        self._fill(size)
+        return bytes(self.buffer[:size])
+
+    def read(self, size: int = -1) -> bytes:
+        self._fill(size)
+        if size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def finish(self) -> dict:
+        """
+        Reads the rest of the body.
+
+        Returns:
+            form fields that came after the file part
+        """
+        self._fill(-1)
+        self.buffer.clear()
+        trailing = {}
+        for part in self.parts:
+            if part[0] == "field":
+                trailing[part[1]] = part[2]
+        return trailing
+
+
+def open_upload_stream(req, file_field: str = "file") -> UploadStream:
+    """
+    UploadStream over a Flask request; never touch request.files /
+    request.form on the same request.
+    """
+    if req.mimetype != "multipart/form-data" or "boundary" not in req.mimetype_params:
+        raise ValueError("File missing")
+    return UploadStream(
+        req.stream,
+        req.mimetype_params["boundary"],
+        current_app.config.get("MAX_FORM_MEMORY_SIZE"),
+        file_field
+    )
+
+
+# ======================================================
+# Large received files (download instead of inline base64)
+# ======================================================
+
+# State store collection of files handed out by next-file, waiting to
+# be downloaded (services/state_store.py)
+DOWNLOADS = "downloads"
+
+
+def inline_b64(path: str):
+    """
+    Returns:
+        base64 of the file when it fits INLINE_FILE_MAX_BYTES, else None
+    """
+    if os.path.getsize(path) > current_app.config["INLINE_FILE_MAX_BYTES"]:
+        return None
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
+
+
+def send_and_remove(path: str, filename: str):
+    """Streams a file as an attachment, deleting it once sent."""
+    response = send_file(path, as_attachment=True, download_name=filename, conditional=False)
+
+    def remove():
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Failed to delete file from disk: {e}")
+
+    # send_file passes the file iterator straight to the server, which
+    # closes the iterator rather than the response
+    response.response = ClosingIterator(response.response, remove)
+    return response
@@ -0,0 +1,128 @@
+import struct
+
+
+# ======================================================
+# Ciphertext header
+# ======================================================
+# Layout (prepended to every .enc file and covered by the signature):
+#
+#   MAGIC (4) | VERSION (1) | FIELDS_LEN (2, big endian) | FIELDS
+#
+# FIELDS is a sequence of (tag u8, length u8, value) entries holding
+# unsigned big-endian integers. Unknown tags are skipped, so new fields
+# can be added without breaking older receivers.
+#
+# Files without the magic are legacy (IV || ciphertext only).
+
+MAGIC = b"PQDS"
+VERSION = 1
+
+_PREFIX = struct.Struct(">4sBH")
+PREFIX_SIZE = _PREFIX.size
+
+FIELD_TAGS = {
+    "kem": 1,   # KEM parameter set id (pqc_param_service)
+    "sig": 2,   # signature parameter set id (pqc_param_service)
+    "suite": 3,     # cipher suite id (cipher_suite_service)
+    "segment": 4,   # plaintext bytes per authenticated segment
+    "hash": 5,      # signed hash mode id (crypto_service.HASH_MODES)
+    "leaf": 6,      # Merkle leaf size in bytes
+    "codec": 7,     # compression codec id (compression_service), absent → none
+}
+
+_TAG_NAMES = {tag: name for name, tag in FIELD_TAGS.items()}
+
+
+def build_header(fields: dict) -> bytes:
+    """
+    Encodes {name: int} into header bytes.
+    """
+    body = b""
+    for name, value in fields.items():
+        if value is None:
+            continue
+        if name not in FIELD_TAGS:
+            raise ValueError(f"Unknown header field: {name}")
+        length = max(1, (int(value).bit_length() + 7) // 8)
+        body += struct.pack(">BB", FIELD_TAGS[name], length) + int(value).to_bytes(length, "big")
+
+    return _PREFIX.pack(MAGIC, VERSION, len(body)) + body
+
+
+def parse_header(data: bytes):
+    """
+    Parses the header at the start of `data`.
+
+    Returns:
+        (fields dict, header length) → ({}, 0) for legacy files
+    """
+    if len(data) < _PREFIX.size or data[:4] != MAGIC:
+        return {}, 0
+
+    _, version, body_len = _PREFIX.unpack_from(data)
+    if version > VERSION:
+        raise ValueError(f"Unsupported header version: {version}")
+
+    end = _PREFIX.size + body_len
+    if len(data) < end:
+        raise ValueError("Truncated ciphertext header")
+
+    fields = {}
+    pos = _PREFIX.size
+    while pos < end:
+        tag, length = struct.unpack_from(">BB", data, pos)
+        pos += 2
+        value = int.from_bytes(data[pos:pos + length], "big")
+        pos += length
+        if tag in _TAG_NAMES:
+            fields[_TAG_NAMES[tag]] = value
+
+    return fields, end
+
+
+def header_size(prefix: bytes) -> int:
+    """
+    Full header length from the first PREFIX_SIZE bytes of a file,
+    for callers that receive the file in arbitrary chunks.
+
+    Returns:
+        header length → 0 for legacy files
+    """
+    if len(prefix) < _PREFIX.size or prefix[:4] != MAGIC:
+        return 0
+    _, _, body_len = _PREFIX.unpack_from(prefix)
+    return _PREFIX.size + body_len
+
+
+def read_header_stream(reader):
+    """
+    Reads the header from the start of a stream.
+
+    Returns:
+        (fields, header bytes, leftover) → leftover holds the body bytes
+        already consumed when the file turns out to be legacy
+    """
+    prefix = reader.read(_PREFIX.size)
+    if len(prefix) < _PREFIX.size or prefix[:4] != MAGIC:
+        return {}, b"", prefix
+
+    _, _, body_len = _PREFIX.unpack(prefix)
+    body = b""
+    while len(body) < body_len:
+        chunk = reader.read(body_len - len(body))
+        if not chunk:
+            break
+        body += chunk
+
+    header = prefix + body
+    fields, _ = parse_header(header)
+    return fields, header, b""
+
+
+def read_header(path: str):
+    """
+    Reads the header of an encrypted file without loading the body.
+    """
+    with open(path, "rb") as f:
+        fields, header, _ = read_header_stream(f)
+    return fields, len(header)
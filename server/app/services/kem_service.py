@@ -1,7 +1,9 @@
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import rsa, padding, x25519
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.keywrap import aes_key_wrap, aes_key_unwrap
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
+from app.services.key_cache import load_public_key_pem
 
 def generate_rsa_keypair():
     """
@@ -20,12 +22,7 @@ def rsa_encrypt_key(aes_key, public_key_pem):
     """
     Encrypts (wraps) AES key using RSA public key.
     """
-    if isinstance(public_key_pem, str):
-        public_key_pem = public_key_pem.encode('utf-8')
-    public_key = serialization.load_pem_public_key(
-        public_key_pem,
-        backend=default_backend()
-    )
+    public_key = load_public_key_pem(public_key_pem)
     encrypted_key = public_key.encrypt(
         aes_key,
         padding.OAEP(
@@ -50,3 +47,58 @@ def rsa_decrypt_key(encrypted_aes_key, private_key):
         )
     )
     return aes_key
+
+
+# ======================================================
+# X25519 + HKDF (fast classical suite)
+# ======================================================
+# encapsulated key = ephemeral public key (32) || AES-KW(KEK, aes_key) (40)
+# KEK = HKDF-SHA256(ECDH(ephemeral, receiver), salt = eph_pk || receiver_pk)
+# A fresh ephemeral key per document gives a fresh KEK, so the
+# deterministic RFC 3394 key wrap is safe and needs no nonce.
+
+X25519_KEY_BYTES = 32
+X25519_WRAP_INFO = b"pqdocsec-x25519-key-wrap"
+
+
+def _raw_public(public_key) -> bytes:
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    )
+
+
+def _x25519_kek(shared_secret, ephemeral_pk, receiver_pk):
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=ephemeral_pk + receiver_pk,
+        info=X25519_WRAP_INFO,
+    ).derive(shared_secret)
+
+
+def x25519_encrypt_key(aes_key, public_key_pem):
+    """
+    Wraps AES key for the receiver's X25519 public key.
+    """
+    receiver_public_key = load_public_key_pem(public_key_pem)
+    ephemeral = x25519.X25519PrivateKey.generate()
+    ephemeral_pk = _raw_public(ephemeral.public_key())
+
+    shared_secret = ephemeral.exchange(receiver_public_key)
+    kek = _x25519_kek(shared_secret, ephemeral_pk, _raw_public(receiver_public_key))
+
+    return ephemeral_pk + aes_key_wrap(kek, aes_key)
+
+
+def x25519_decrypt_key(encrypted_aes_key, private_key):
+    """
+    Unwraps AES key using the receiver's X25519 private key.
+    """
+    ephemeral_pk = encrypted_aes_key[:X25519_KEY_BYTES]
+    wrapped = encrypted_aes_key[X25519_KEY_BYTES:]
+
+    shared_secret = private_key.exchange(x25519.X25519PublicKey.from_public_bytes(ephemeral_pk))
+    kek = _x25519_kek(shared_secret, ephemeral_pk, _raw_public(private_key.public_key()))
+
+    return aes_key_unwrap(kek, wrapped)
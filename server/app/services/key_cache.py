@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+
+
+# ======================================================
+# Parsed key object cache (classical RSA path)
+# ======================================================
+# PEM parsing + RSA key validation costs far more than the OAEP/PSS
+# operation on a small document. Parsed `cryptography` key objects are
+# immutable and thread-safe, so they are cached and shared:
+#
+#   key files  → keyed by path, valid while (inode, mtime, size) match;
+#                a rotated key (os.replace from the key pool, or a
+#                rewrite) changes the stat and is re-parsed
+#   PEM blobs  → keyed by SHA-256 fingerprint of the PEM (peer keys
+#                received during the handshake), bounded LRU
+
+PEM_CACHE_SIZE = 64
+
+_lock = threading.Lock()
+_file_cache = {}                # path → (stat signature, key object)
+_pem_cache = OrderedDict()      # fingerprint → key object
+_stats = {"hits": 0, "misses": 0}
+
+
+def _stat_signature(path: str):
+    st = os.stat(path)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _load_file(path: str, parse):
+    path = os.path.abspath(path)
+    signature = _stat_signature(path)
+
+    with _lock:
+        cached = _file_cache.get(path)
+        if cached and cached[0] == signature:
+            _stats["hits"] += 1
+            return cached[1]
+        _stats["misses"] += 1
+
+    with open(path, "rb") as f:
+        key = parse(f.read())
+
+    with _lock:
+        _file_cache[path] = (signature, key)
+    return key
+
+
+def _parse_private(pem: bytes):
+    return serialization.load_pem_private_key(pem, password=None, backend=default_backend())
+
+
+def _parse_public(pem: bytes):
+    return serialization.load_pem_public_key(pem, backend=default_backend())
+
+
+def load_private_key_file(path: str):
+    """Parsed private key from a PEM file, re-parsed only when the file changes."""
+    return _load_file(path, _parse_private)
+
+
+def load_public_key_file(path: str):
+    """Parsed public key from a PEM file, re-parsed only when the file changes."""
+    return _load_file(path, _parse_public)
+
+
+def fingerprint(pem) -> str:
+    if isinstance(pem, str):
+        pem = pem.encode("utf-8")
+    return hashlib.sha256(pem).hexdigest()
+
+
+def load_public_key_pem(pem):
+    """
+    Parsed public key for a PEM string/bytes (e.g. the peer's key).
+    Already-parsed key objects are passed through.
+    """
+    if not isinstance(pem, (str, bytes)):
+        return pem
+    if isinstance(pem, str):
+        pem = pem.encode("utf-8")
+
+    fp = fingerprint(pem)
+    with _lock:
+        key = _pem_cache.get(fp)
+        if key is not None:
+            _pem_cache.move_to_end(fp)
+            _stats["hits"] += 1
+            return key
+        _stats["misses"] += 1
+
+    key = _parse_public(pem)
+
+    with _lock:
+        _pem_cache[fp] = key
+        while len(_pem_cache) > PEM_CACHE_SIZE:
+            _pem_cache.popitem(last=False)
+    return key
+
+
+def invalidate(path: str = None):
+    """Drops one cached key file, or everything when no path is given."""
+    with _lock:
+        if path is None:
+            _file_cache.clear()
+            _pem_cache.clear()
+        else:
+            _file_cache.pop(os.path.abspath(path), None)
+
+
+def cache_stats() -> dict:
+    with _lock:
+        return {
+            "files": len(_file_cache),
+            "pems": len(_pem_cache),
+            **_stats
+        }
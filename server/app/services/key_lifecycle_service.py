@@ -0,0 +1,479 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:     # Windows: single-process dev server only
+    fcntl = None
+
+from app.extensions import app_state
+from app.services import key_cache, key_service
+from app.services.key_service import (
+    write_rsa_key_pair,
+    write_x25519_key_pair,
+    write_ed25519_key_pair
+)
+from app.services.classical_suite_service import CLASSICAL_SUITES, allowed_suites
+from app.services.pqc_key_service import generate_pqc_key_pair, keep_kem_key_pair
+
+
+# ======================================================
+# Key kinds
+# ======================================================
+# Every kind has one active key pair at a fixed path (what the rest of
+# the app loads) and a pool of pre-generated pairs under KEY_POOL_FOLDER:
+#
+#   <KEY_POOL_FOLDER>/<kind>/<algorithm>/<created>_<id>/<public>, <private>
+#
+# Binding a role moves a pooled pair into the active paths, so the
+# request never waits for keygen unless the pool is empty.
+#
+# Several worker processes (gunicorn.conf.py) share the folder: a pair
+# is claimed by renaming it (exactly one process wins), and only the
+# process holding the flock on <KEY_POOL_FOLDER>/.owner refills the
+# pool. The others still generate pairs a pending bind of theirs waits
+# for, and take over the refill when the owner exits.
+
+KEY_KINDS = {
+    # receiver: RSA-OAEP key transport
+    "rsa_kem": {"files": ("rsa_public.pem", "rsa_private.pem"), "pqc": None,
+                "writer": write_rsa_key_pair},
+    # sender: RSA-PSS signatures
+    "rsa_sign": {"files": ("sign_public.pem", "sign_private.pem"), "pqc": None,
+                 "writer": write_rsa_key_pair},
+    # receiver: X25519 key agreement
+    "x25519_kem": {"files": ("x25519_public.pem", "x25519_private.pem"), "pqc": None,
+                   "writer": write_x25519_key_pair},
+    # sender: Ed25519 signatures
+    "ed25519_sign": {"files": ("ed25519_public.pem", "ed25519_private.pem"), "pqc": None,
+                     "writer": write_ed25519_key_pair},
+    # receiver: ML-KEM
+    "pqc_kem": {"files": ("kyber_pk.bin", "kyber_sk.bin"), "pqc": "kem"},
+    # sender: ML-DSA
+    "pqc_sig": {"files": ("dilithium_pk.bin", "dilithium_sk.bin"), "pqc": "sig"},
+}
+
+
+STALE_SECONDS = 600     # leftover .tmp_ / .claim_ dirs older than this are removed
+
+
+def _active_dir(app, kind: str) -> str:
+    if KEY_KINDS[kind]["pqc"]:
+        return app.config["PQC_KEY_FOLDER"]
+    return key_service.KEY_DIR
+
+
+def _write_key_pair(kind: str, algorithm: str, directory: str):
+    public_name, private_name = KEY_KINDS[kind]["files"]
+    public_path = os.path.join(directory, public_name)
+    private_path = os.path.join(directory, private_name)
+
+    pqc_kind = KEY_KINDS[kind]["pqc"]
+    if pqc_kind:
+        generate_pqc_key_pair(pqc_kind, algorithm, public_path, private_path)
+    else:
+        KEY_KINDS[kind]["writer"](private_path, public_path)
+
+
+# ======================================================
+# Lifecycle service
+# ======================================================
+
+class KeyLifecycleService:
+    """
+    Keeps KEY_POOL_SIZE pre-generated key pairs per (kind, algorithm)
+    ready on disk, generated by one background worker thread (of the
+    pool owner process when there are several).
+
+    - bind_key_pair() activates a pooled pair in O(file rename)
+    - pooled pairs older than KEY_MAX_AGE_SECONDS are discarded
+    - bound pairs older than KEY_MAX_AGE_SECONDS are reported as
+      rotation_due; they are replaced on the next role select or
+      handshake (rotating mid-session would break the peer's copy)
+    """
+
+    def __init__(self):
+        self.app = None
+        self._cond = threading.Condition()
+        self._pools = {}        # (kind, algorithm) → [entry, ...] oldest first
+        self._pending = {}      # kind → algorithm waiting for a fresh pair
+        self._bound = {}        # kind → {algorithm, created, bound_at}
+        self._errors = {}       # (kind, algorithm) → {error, at, retry_at}
+        self._generating = None
+        self._thread = None
+        self._stopping = False
+        self._owner = False
+        self._owner_file = None
+
+    # ---------------- setup ----------------
+
+    def init_app(self, app):
+        self.app = app
+        if app.config["KEY_POOL_ENABLED"]:
+            self.start()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        with self._cond:
+            self._try_own_pool()
+            self._load_pool(startup=True)
+        self._thread = threading.Thread(target=self._worker, name="key-lifecycle", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stops the worker after the pair currently being generated."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+        with self._cond:
+            self._release_pool()
+
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _try_own_pool(self) -> bool:
+        """Takes the refill role if no other process holds it. Caller holds the lock."""
+        if self._owner:
+            return True
+        if fcntl is None:
+            self._owner = True
+            return True
+
+        os.makedirs(self._pool_root(), exist_ok=True)
+        owner_file = open(os.path.join(self._pool_root(), ".owner"), "a")
+        try:
+            fcntl.flock(owner_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            owner_file.close()
+            return False
+        self._owner_file = owner_file
+        self._owner = True
+        return True
+
+    def _release_pool(self):
+        """Caller holds the lock."""
+        if self._owner_file:
+            self._owner_file.close()    # drops the flock
+        self._owner_file = None
+        self._owner = False
+
+    # ---------------- configuration ----------------
+
+    def _targets(self):
+        """(kind, algorithm) pools the worker keeps filled."""
+        config = self.app.config
+        targets = []
+        for suite in allowed_suites():
+            targets += [CLASSICAL_SUITES[suite]["kem_key"], CLASSICAL_SUITES[suite]["sig_key"]]
+        return targets + [
+            ("pqc_kem", config["PQC_KEM_ALGORITHM"]),
+            ("pqc_sig", config["PQC_SIG_ALGORITHM"]),
+        ]
+
+    def _pool_root(self) -> str:
+        return self.app.config["KEY_POOL_FOLDER"]
+
+    def _max_age(self) -> float:
+        return self.app.config["KEY_MAX_AGE_SECONDS"]
+
+    # ---------------- pool on disk ----------------
+
+    def _load_pool(self, startup: bool = False):
+        """
+        Re-reads the pooled pairs from disk (other processes take and
+        add pairs too). The owner drops expired pairs, and on startup
+        half-written / half-claimed dirs left by a crash. Caller holds
+        the lock.
+        """
+        root = self._pool_root()
+        if not os.path.isdir(root):
+            return
+
+        now = time.time()
+        pools = {}
+        for kind in os.listdir(root):
+            if kind not in KEY_KINDS:
+                continue
+            for algorithm in os.listdir(os.path.join(root, kind)):
+                alg_dir = os.path.join(root, kind, algorithm)
+                for name in sorted(os.listdir(alg_dir)):
+                    entry_dir = os.path.join(alg_dir, name)
+                    created = self._parse_created(name)
+                    if created is None:
+                        # ".tmp_" / ".claim_" dir: in use unless left by a crash
+                        if startup and self._owner and now - os.path.getmtime(entry_dir) > STALE_SECONDS:
+                            shutil.rmtree(entry_dir, ignore_errors=True)
+                        continue
+                    complete = all(
+                        os.path.exists(os.path.join(entry_dir, f))
+                        for f in KEY_KINDS[kind]["files"]
+                    )
+                    if not complete or now - created > self._max_age():
+                        if self._owner:
+                            shutil.rmtree(entry_dir, ignore_errors=True)
+                        continue
+                    pools.setdefault((kind, algorithm), []).append({
+                        "dir": entry_dir, "created": created
+                    })
+        self._pools = pools
+
+    @staticmethod
+    def _parse_created(name: str):
+        # "<created>_<id>", anything else is a half-written ".tmp_" dir
+        try:
+            return float(name.split("_", 1)[0])
+        except ValueError:
+            return None
+
+    def _generate_entry(self, kind: str, algorithm: str) -> dict:
+        """
+        Generates a pair into a temp dir and renames it into place,
+        so a crash never leaves a half-written pair in the pool.
+        """
+        alg_dir = os.path.join(self._pool_root(), kind, algorithm)
+        os.makedirs(alg_dir, exist_ok=True)
+
+        created = time.time()
+        name = f"{created:.3f}_{uuid.uuid4().hex[:8]}"
+        tmp_dir = os.path.join(alg_dir, ".tmp_" + name)
+        os.makedirs(tmp_dir)
+
+        try:
+            _write_key_pair(kind, algorithm, tmp_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        entry_dir = os.path.join(alg_dir, name)
+        os.rename(tmp_dir, entry_dir)
+        return {"dir": entry_dir, "created": created}
+
+    def _activate(self, kind: str, algorithm: str, entry: dict):
+        """Moves a pooled pair into the active key paths. Caller holds the lock."""
+        active_dir = _active_dir(self.app, kind)
+        os.makedirs(active_dir, exist_ok=True)
+
+        for filename in KEY_KINDS[kind]["files"]:
+            os.replace(os.path.join(entry["dir"], filename), os.path.join(active_dir, filename))
+            key_cache.invalidate(os.path.join(active_dir, filename))
+        shutil.rmtree(entry["dir"], ignore_errors=True)
+
+        self._bound[kind] = {
+            "algorithm": algorithm,
+            "created": entry["created"],
+            "bound_at": time.time()
+        }
+        if kind == "pqc_kem":
+            keep_kem_key_pair(algorithm)
+            app_state.kem_algorithm = algorithm
+        elif kind == "pqc_sig":
+            app_state.sig_algorithm = algorithm
+
+        print(f"🔑 Bound {kind} key pair ({algorithm})")
+
+    def _take_entry(self, kind: str, algorithm: str):
+        """Oldest unexpired pooled pair, claimed for this process, or None. Caller holds the lock."""
+        self._load_pool()
+        pool = self._pools.get((kind, algorithm), [])
+        while pool:
+            entry = pool.pop(0)
+            claimed = os.path.join(
+                os.path.dirname(entry["dir"]), ".claim_" + os.path.basename(entry["dir"])
+            )
+            try:
+                os.rename(entry["dir"], claimed)
+            except OSError:
+                continue    # taken by another process
+            return {"dir": claimed, "created": entry["created"]}
+        return None
+
+    # ---------------- public API ----------------
+
+    def bind_key_pair(self, kind: str, algorithm: str, wait: bool = False) -> bool:
+        """
+        Makes a fresh (kind, algorithm) pair the active one.
+
+        Returns:
+            True  → the pair is active now
+            False → pool was empty, the worker binds a pair as soon as
+                    it is generated (see status())
+        """
+        if kind not in KEY_KINDS:
+            raise ValueError(f"Unknown key kind: {kind}")
+
+        with self._cond:
+            entry = self._take_entry(kind, algorithm)
+            if entry:
+                self._pending.pop(kind, None)
+                self._activate(kind, algorithm, entry)
+                self._cond.notify_all()     # refill
+                return True
+
+            if not wait:
+                self._pending[kind] = algorithm
+                self._cond.notify_all()
+                return False
+
+            self._pending.pop(kind, None)
+
+        # Nothing pooled and the caller needs the key now
+        entry = self._generate_entry(kind, algorithm)
+        with self._cond:
+            self._activate(kind, algorithm, entry)
+        return True
+
+    def is_ready(self, kind: str) -> bool:
+        """True when no bind is pending and the active pair exists."""
+        with self._cond:
+            if kind in self._pending:
+                return False
+        active_dir = _active_dir(self.app, kind)
+        return all(
+            os.path.exists(os.path.join(active_dir, f))
+            for f in KEY_KINDS[kind]["files"]
+        )
+
+    def wait_until_ready(self, kind: str, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while kind in self._pending:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return self.is_ready(kind)
+
+    def status(self) -> dict:
+        now = time.time()
+        max_age = self._max_age()
+        pool_size = self.app.config["KEY_POOL_SIZE"]
+
+        with self._cond:
+            self._load_pool()
+            pools = {}
+            for kind, algorithm in set(self._pools) | set(self._targets()):
+                entries = self._pools.get((kind, algorithm), [])
+                pools[f"{kind}:{algorithm}"] = {
+                    "ready": len(entries),
+                    "target": pool_size if (kind, algorithm) in self._targets() else 0,
+                    "oldest_age_seconds": round(now - entries[0]["created"], 1) if entries else None
+                }
+
+            active = {}
+            for kind in KEY_KINDS:
+                public_path = os.path.join(_active_dir(self.app, kind), KEY_KINDS[kind]["files"][0])
+                bound = self._bound.get(kind)
+                if bound:
+                    created = bound["created"]
+                elif os.path.exists(public_path):
+                    # bound by an earlier run of the server
+                    created = os.path.getmtime(public_path)
+                else:
+                    created = None
+
+                active[kind] = {
+                    "algorithm": bound["algorithm"] if bound else None,
+                    "present": os.path.exists(public_path),
+                    "pending": self._pending.get(kind),
+                    "age_seconds": round(now - created, 1) if created else None,
+                    "rotation_due": bool(created and now - created > max_age)
+                }
+
+            errors = {
+                f"{kind}:{algorithm}": {
+                    "error": err["error"],
+                    "retry_in_seconds": max(0.0, round(err["retry_at"] - now, 1))
+                }
+                for (kind, algorithm), err in self._errors.items()
+            }
+
+            return {
+                "enabled": self.app.config["KEY_POOL_ENABLED"],
+                "worker_running": self.running(),
+                "pool_owner": self._owner,
+                "generating": self._generating,
+                "pool_size": pool_size,
+                "max_age_seconds": max_age,
+                "pools": pools,
+                "active": active,
+                "errors": errors
+            }
+
+    # ---------------- worker ----------------
+
+    def _next_job(self):
+        """Pending binds first, then the emptiest pool. Caller holds the lock."""
+        now = time.time()
+
+        def backing_off(job):
+            err = self._errors.get(job)
+            return err is not None and err["retry_at"] > now
+
+        for kind, algorithm in self._pending.items():
+            if not backing_off((kind, algorithm)):
+                return kind, algorithm, True
+
+        if not self._owner:
+            return None
+
+        pool_size = self.app.config["KEY_POOL_SIZE"]
+        deficits = [
+            (len(self._pools.get(job, [])), job)
+            for job in self._targets()
+            if len(self._pools.get(job, [])) < pool_size and not backing_off(job)
+        ]
+        if not deficits:
+            return None
+        _, (kind, algorithm) = min(deficits)
+        return kind, algorithm, False
+
+    def _worker(self):
+        retry_seconds = self.app.config["KEY_POOL_RETRY_SECONDS"]
+
+        with self.app.app_context():
+            while True:
+                with self._cond:
+                    if self._stopping:
+                        return
+                    if self._try_own_pool():
+                        self._load_pool()
+                    job = self._next_job()
+                    if job is None:
+                        self._cond.wait(retry_seconds)
+                        continue
+                    kind, algorithm, for_bind = job
+                    self._generating = f"{kind}:{algorithm}"
+
+                try:
+                    entry = self._generate_entry(kind, algorithm)
+                except Exception as e:
+                    print(f"❌ Key pool: {kind} ({algorithm}) generation failed: {e}")
+                    with self._cond:
+                        self._generating = None
+                        self._errors[(kind, algorithm)] = {
+                            "error": str(e),
+                            "at": time.time(),
+                            "retry_at": time.time() + retry_seconds
+                        }
+                    continue
+
+                with self._cond:
+                    self._generating = None
+                    self._errors.pop((kind, algorithm), None)
+                    if for_bind and self._pending.get(kind) == algorithm:
+                        del self._pending[kind]
+                        self._activate(kind, algorithm, entry)
+                    else:
+                        self._pools.setdefault((kind, algorithm), []).append(entry)
+                    self._cond.notify_all()
+
+
+key_lifecycle = KeyLifecycleService()
@@ -1,9 +1,10 @@
 import os
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import rsa, x25519, ed25519
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import hashes
+from app.services import key_cache
 
 KEY_DIR = "keys"
 
@@ -12,24 +13,13 @@ def ensure_key_dir():
     os.makedirs(KEY_DIR, exist_ok=True)
 
 
-# ---------------- RSA (Receiver) ----------------
-
-def generate_rsa_keys():
-    ensure_key_dir()
-
-    private_key_path = os.path.join(KEY_DIR, "rsa_private.pem")
-    public_key_path = os.path.join(KEY_DIR, "rsa_public.pem")
-    #print(public_key_path)
-    # if os.path.exists(private_key_path) and os.path.exists(public_key_path):
-    #     print("Keys already exist")
-    #     return
-
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-        backend=default_backend()
-    )
+# ---------------- Key pairs on disk ----------------
 
+def write_key_pair(private_key, private_key_path, public_key_path):
+    """
+    Writes a key pair as PEM
+    (PKCS8 private key, SubjectPublicKeyInfo public key).
+    """
     public_key = private_key.public_key()
 
     with open(private_key_path, "wb") as f:
@@ -50,21 +40,47 @@ def generate_rsa_keys():
         )
 
 
+def write_rsa_key_pair(private_key_path, public_key_path):
+    """Generates an RSA-2048 key pair and writes it as PEM."""
+    private_key = rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=2048,
+        backend=default_backend()
+    )
+    write_key_pair(private_key, private_key_path, public_key_path)
+
+
+def write_x25519_key_pair(private_key_path, public_key_path):
+    """Generates an X25519 key agreement pair and writes it as PEM."""
+    write_key_pair(x25519.X25519PrivateKey.generate(), private_key_path, public_key_path)
+
+
+def write_ed25519_key_pair(private_key_path, public_key_path):
+    """Generates an Ed25519 signing pair and writes it as PEM."""
+    write_key_pair(ed25519.Ed25519PrivateKey.generate(), private_key_path, public_key_path)
+
+
+# ---------------- RSA (Receiver) ----------------
+
+def generate_rsa_keys():
+    ensure_key_dir()
+
+    private_key_path = os.path.join(KEY_DIR, "rsa_private.pem")
+    public_key_path = os.path.join(KEY_DIR, "rsa_public.pem")
+    #print(public_key_path)
+    # if os.path.exists(private_key_path) and os.path.exists(public_key_path):
+    #     print("Keys already exist")
+    #     return
+
+    write_rsa_key_pair(private_key_path, public_key_path)
+
+
 def load_rsa_private_key():
-    with open(os.path.join(KEY_DIR, "rsa_private.pem"), "rb") as f:
-        return serialization.load_pem_private_key(
-            f.read(),
-            password=None,
-            backend=default_backend()
-        )
+    return key_cache.load_private_key_file(os.path.join(KEY_DIR, "rsa_private.pem"))
 
 
 def load_rsa_public_key():
-    with open(os.path.join(KEY_DIR, "rsa_public.pem"), "rb") as f:
-        return serialization.load_pem_public_key(
-            f.read(),
-            backend=default_backend()
-        )
+    return key_cache.load_public_key_file(os.path.join(KEY_DIR, "rsa_public.pem"))
 
 
 
@@ -79,46 +95,48 @@ def generate_signature_keys():
     # if os.path.exists(private_key_path) and os.path.exists(public_key_path):
     #     return
 
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-        backend=default_backend()
+    write_rsa_key_pair(private_key_path, public_key_path)
+
+
+def load_signature_private_key():
+    return key_cache.load_private_key_file(os.path.join(KEY_DIR, "sign_private.pem"))
+
+
+def load_signature_public_key():
+    return key_cache.load_public_key_file(os.path.join(KEY_DIR, "sign_public.pem"))
+
+
+# ---------------- X25519 (Receiver, fast classical suite) ----------------
+
+def generate_x25519_keys():
+    ensure_key_dir()
+    write_x25519_key_pair(
+        os.path.join(KEY_DIR, "x25519_private.pem"),
+        os.path.join(KEY_DIR, "x25519_public.pem")
     )
 
-    public_key = private_key.public_key()
 
-    with open(private_key_path, "wb") as f:
-        f.write(
-            private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.PKCS8,
-                encryption_algorithm=serialization.NoEncryption()
-            )
-        )
+def load_x25519_private_key():
+    return key_cache.load_private_key_file(os.path.join(KEY_DIR, "x25519_private.pem"))
 
-    with open(public_key_path, "wb") as f:
-        f.write(
-            public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            )
-        )
 
+def load_x25519_public_key():
+    return key_cache.load_public_key_file(os.path.join(KEY_DIR, "x25519_public.pem"))
 
-def load_signature_private_key():
-    with open(os.path.join(KEY_DIR, "sign_private.pem"), "rb") as f:
-        return serialization.load_pem_private_key(
-            f.read(),
-            password=None,
-            backend=default_backend()
-        )
 
+# ---------------- Ed25519 (Sender, fast classical suite) ----------------
+
+def generate_ed25519_keys():
+    ensure_key_dir()
+    write_ed25519_key_pair(
+        os.path.join(KEY_DIR, "ed25519_private.pem"),
+        os.path.join(KEY_DIR, "ed25519_public.pem")
+    )
+
+
+def load_ed25519_private_key():
+    return key_cache.load_private_key_file(os.path.join(KEY_DIR, "ed25519_private.pem"))
 
-def load_signature_public_key():
-    with open(os.path.join(KEY_DIR, "sign_public.pem"), "rb") as f:
-        return serialization.load_pem_public_key(
-            f.read(),
-            backend=default_backend()
-        )
-    
 
+def load_ed25519_public_key():
+    return key_cache.load_public_key_file(os.path.join(KEY_DIR, "ed25519_public.pem"))
@@ -0,0 +1,231 @@
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.cpu_pool_service import OrderedPipeline, ordered_map, pool_workers
+
+
+# ======================================================
+# Merkle tree hash (PQC signatures)
+# ======================================================
+# The encrypted file (header included) is cut into fixed-size leaves:
+#
+#   leaf_i = SHA-512(0x00 || bytes[i*L : (i+1)*L])
+#   node   = SHA-512(0x01 || left || right)     (odd node carried up)
+#   root   = top node, SHA-512(0x00) for an empty file
+#   signed = SHA-512(0x02 || root || SHA-512(kyber_ct))
+#
+# Leaves are independent, so they are hashed on the shared CPU pool
+# (hashlib releases the GIL on large buffers). The receiver gets the leaf list
+# with the signature, checks it against the signed root once, then can
+# check every leaf as it arrives.
+
+HASH_BYTES = 64
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+BIND_PREFIX = b"\x02"
+
+
+def hash_leaf(data: bytes) -> bytes:
+    return hashlib.sha512(LEAF_PREFIX + data).digest()
+
+
+def _parents(level: list) -> list:
+    parents = [
+        hashlib.sha512(NODE_PREFIX + level[i] + level[i + 1]).digest()
+        for i in range(0, len(level) - 1, 2)
+    ]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(leaf_hashes) -> bytes:
+    level = list(leaf_hashes)
+    if not level:
+        return hash_leaf(b"")
+
+    while len(level) > 1:
+        level = _parents(level)
+    return level[0]
+
+
+def merkle_proof(leaf_hashes, index: int) -> list:
+    """
+    Sibling hashes from leaf `index` up to the root (levels where the
+    node is carried up have no sibling and add nothing).
+    """
+    level = list(leaf_hashes)
+    proof = []
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling])
+        level = _parents(level)
+        index //= 2
+    return proof
+
+
+def root_from_proof(leaf_hash: bytes, index: int, count: int, proof: list) -> bytes:
+    """Recomputes the root of a `count`-leaf tree from one leaf and its proof."""
+    if not 0 <= index < count:
+        raise ValueError("Merkle proof index out of range")
+
+    node = leaf_hash
+    used = 0
+    while count > 1:
+        sibling = index ^ 1
+        if sibling < count:
+            if used >= len(proof):
+                raise ValueError("Merkle proof too short")
+            pair = proof[used] + node if index & 1 else node + proof[used]
+            node = hashlib.sha512(NODE_PREFIX + pair).digest()
+            used += 1
+        index //= 2
+        count = (count + 1) // 2
+
+    if used != len(proof):
+        raise ValueError("Merkle proof too long")
+    return node
+
+
+def bind_root(root: bytes, kyber_ct: bytes) -> bytes:
+    """The value Dilithium signs: tree root bound to the Kyber ciphertext."""
+    return hashlib.sha512(BIND_PREFIX + root + hashlib.sha512(kyber_ct).digest()).digest()
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def hash_file_leaves(path: str, leaf_size: int, workers: int = None):
+    """
+    Hashes the leaves of a file in parallel, reading sequentially and
+    keeping at most 2 × workers leaves in memory. workers=None uses the
+    shared CPU pool when there is one (services/cpu_pool_service.py).
+
+    Returns:
+        list of leaf hashes
+    """
+    shared = pool_workers()
+    if workers is None and shared:
+        with open(path, "rb") as f:
+            chunks = ((chunk,) for chunk in iter(lambda: f.read(leaf_size), b""))
+            return list(ordered_map(hash_leaf, chunks, depth=2 * shared))
+
+    workers = workers or default_workers()
+    if workers == 1:
+        with open(path, "rb") as f:
+            leaves = [hash_leaf(chunk) for chunk in iter(lambda: f.read(leaf_size), b"")]
+        return leaves
+
+    leaves = []
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(path, "rb") as f:
+        while True:
+            chunk = f.read(leaf_size)
+            if not chunk:
+                break
+            in_flight.append(pool.submit(hash_leaf, chunk))
+            if len(in_flight) >= 2 * workers:
+                leaves.append(in_flight.popleft().result())
+        while in_flight:
+            leaves.append(in_flight.popleft().result())
+    return leaves
+
+
+def encode_leaves(leaf_hashes) -> bytes:
+    return b"".join(leaf_hashes)
+
+
+def decode_leaves(data: bytes) -> list:
+    if len(data) % HASH_BYTES:
+        raise ValueError("Merkle leaf list length is not a multiple of the hash size")
+    return [data[i:i + HASH_BYTES] for i in range(0, len(data), HASH_BYTES)]
+
+
+def leaf_count(total_bytes: int, leaf_size: int) -> int:
+    return (total_bytes + leaf_size - 1) // leaf_size
+
+
+# ======================================================
+# Streaming hashing / verification (receiver)
+# ======================================================
+
+class MerkleStreamHasher:
+    """
+    Builds the leaf list of data that arrives in arbitrary chunks, so
+    the receiver hashes the upload while it is being received (leaves
+    on the shared CPU pool, the request thread keeps reading).
+    """
+
+    def __init__(self, leaf_size: int):
+        self.leaf_size = leaf_size
+        self.buffer = bytearray()
+        self.leaves = []
+        self.total = 0
+        self.pipeline = OrderedPipeline(hash_leaf)
+
+    def update(self, data: bytes):
+        self.total += len(data)
+        self.buffer += data
+        while len(self.buffer) >= self.leaf_size:
+            self.leaves += self.pipeline.put(bytes(self.buffer[:self.leaf_size]))
+            del self.buffer[:self.leaf_size]
+
+    def finalize(self) -> list:
+        if self.buffer:
+            self.leaves += self.pipeline.put(bytes(self.buffer))
+            self.buffer.clear()
+        self.leaves += self.pipeline.drain()
+        return self.leaves
+
+
+def _sized_leaf_hash(data: bytes):
+    return hash_leaf(data), len(data)
+
+
+class MerkleStreamVerifier:
+    """
+    Checks bytes as they arrive against an authenticated leaf list.
+    update() raises ValueError at the first leaf that does not match.
+    """
+
+    def __init__(self, leaf_hashes, leaf_size: int):
+        self.expected = leaf_hashes
+        self.leaf_size = leaf_size
+        self.buffer = bytearray()
+        self.index = 0
+        self.total = 0
+        # Leaves are hashed on the shared CPU pool and checked in order
+        self.pipeline = OrderedPipeline(_sized_leaf_hash)
+
+    def _check(self, results: list):
+        for leaf_hash, size in results:
+            if self.index >= len(self.expected):
+                raise ValueError(f"Unexpected data after leaf {len(self.expected) - 1}")
+            if leaf_hash != self.expected[self.index]:
+                start = self.index * self.leaf_size
+                raise ValueError(
+                    f"Merkle leaf {self.index} (bytes {start}-{start + size - 1}) does not match"
+                )
+            self.index += 1
+
+    def update(self, data: bytes):
+        self.total += len(data)
+        self.buffer += data
+        while len(self.buffer) >= self.leaf_size:
+            self._check(self.pipeline.put(bytes(self.buffer[:self.leaf_size])))
+            del self.buffer[:self.leaf_size]
+
+    def finalize(self):
+        if self.buffer:
+            self._check(self.pipeline.put(bytes(self.buffer)))
+            self.buffer.clear()
+        self._check(self.pipeline.drain())
+        if self.index != len(self.expected):
+            raise ValueError(
+                f"Transfer ended after {self.index} of {len(self.expected)} Merkle leaves"
+            )
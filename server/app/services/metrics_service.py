@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+# ======================================================
+# Stage metrics of the crypto workflows
+# ======================================================
+# Every encrypt / decrypt workflow hands its {stage: ms} timings to
+# record(); GET /metrics returns, per workflow and stage, the count,
+# total and max since the last reset plus p50 / p99 over the most
+# recent METRICS_WINDOW samples. Load tests reset the counters after
+# their warmup and read them at the end (benchmarks/load.py).
+#
+# Kept per process: under gunicorn each worker reports its own share.
+
+METRICS_WINDOW = 1000
+
+
+def _pick(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class StageMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.workflows = {}
+        self.since = time.time()
+
+    def record(self, workflow: str, timings: dict):
+        """timings → {stage: ms}; non-numeric entries (file_name) are skipped."""
+        with self.lock:
+            stages = self.workflows.setdefault(workflow, {"count": 0, "stages": {}})
+            stages["count"] += 1
+            for name, ms in timings.items():
+                if not isinstance(ms, (int, float)):
+                    continue
+                stage = stages["stages"].setdefault(name, {
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "recent": deque(maxlen=METRICS_WINDOW)
+                })
+                stage["count"] += 1
+                stage["total_ms"] += ms
+                stage["max_ms"] = max(stage["max_ms"], ms)
+                stage["recent"].append(ms)
+
+    def reset(self):
+        with self.lock:
+            self.workflows = {}
+            self.since = time.time()
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            {worker_pid, since, workflows: {workflow: {count, stages:
+            {stage: {count, total_ms, mean_ms, max_ms, p50_ms, p99_ms}}}}}
+        """
+        with self.lock:
+            workflows = {}
+            for workflow, entry in self.workflows.items():
+                stages = {}
+                for name, stage in entry["stages"].items():
+                    recent = sorted(stage["recent"])
+                    stages[name] = {
+                        "count": stage["count"],
+                        "total_ms": stage["total_ms"],
+                        "mean_ms": stage["total_ms"] / stage["count"],
+                        "max_ms": stage["max_ms"],
+                        "p50_ms": _pick(recent, 50),
+                        "p99_ms": _pick(recent, 99)
+                    }
+                workflows[workflow] = {"count": entry["count"], "stages": stages}
+            return {
+                "worker_pid": os.getpid(),
+                "since": self.since,
+                "workflows": workflows
+            }
+
+
+stage_metrics = StageMetrics()
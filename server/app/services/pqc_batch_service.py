@@ -0,0 +1,394 @@
+import base64
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.services.cipher_suite_service import (
+    cipher_header_fields,
+    encrypt_file,
+    ensure_cipher_allowed,
+    get_cipher_suite,
+    suite_from_header
+)
+from app.services.compression_service import compression_header_fields
+from app.services.crypto_service import derive_batch_file_key
+from app.services.header_service import build_header, read_header
+from app.services.pqc_encryption_service import decrypt_file_with_aes_key
+from app.services.pqc_key_service import (
+    load_peer_dilithium_public_key,
+    sender_generate_shared_secret_and_ciphertext
+)
+from app.services.pqc_param_service import (
+    algorithm_id,
+    ensure_allowed,
+    transfer_algorithms
+)
+from app.services.pqc_receive_service import BackgroundDecapsulation
+from app.services.pqc_signature_service import (
+    sign_hash_with_dilithium,
+    verify_dilithium_signature
+)
+from app.utils.multipart import StreamedMultipartBody, iter_multipart
+
+
+# ======================================================
+# PQC batch transfer
+# ======================================================
+# One Kyber encapsulation and one Dilithium signature cover a whole
+# batch of documents:
+#
+#   key_i    = HKDF(shared secret, "pqc-batch-encryption|<batch id>|<i>")
+#   manifest = canonical JSON {batch_id, kem/sig algorithm, files: [
+#                  {index, filename, size, sha512 of the .enc file}]}
+#   signed   = SHA-512(manifest || kyber_ct)
+#
+# Transfer: a single multipart POST to /pqc/batch/receive carrying the
+# manifest, signature and Kyber ciphertext first, then file_0..file_n
+# as raw ciphertext. The receiver verifies the manifest once and every
+# file against its manifest entry while it streams in.
+
+MANIFEST_VERSION = 1
+
+
+def _sha512_file(path: str) -> str:
+    hasher = hashlib.sha512()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def manifest_hash(manifest: bytes, kyber_ct: bytes) -> bytes:
+    return hashlib.sha512(manifest + kyber_ct).digest()
+
+
+def encode_manifest(manifest: dict) -> bytes:
+    return json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+# ======================================================
+# SENDER
+# ======================================================
+
+def pqc_encrypt_batch_workflow(
+    inputs: list,
+    kem_algorithm: str = None,
+    sig_algorithm: str = None,
+    cipher_suite: str = None,
+    peer_id: str = None
+):
+    """
+    Encrypts many documents under one Kyber encapsulation, in parallel
+    on BATCH_WORKERS threads, and signs one manifest over all of them.
+
+    inputs  → [(input_path, original_filename), ...]
+    peer_id → receiver session (None → active peer)
+
+    Returns:
+        {
+            batch_id,
+            manifest (bytes),
+            signature,
+            kyber_ciphertext,
+            files → [{index, filename, size, sha512, encrypted_file_path}],
+            kem_algorithm,
+            sig_algorithm,
+            cipher_suite,
+            timings
+        }
+    """
+    if not inputs:
+        raise ValueError("Batch has no files")
+
+    kem_algorithm, sig_algorithm = transfer_algorithms(kem_algorithm, sig_algorithm, peer_id)
+    cipher_suite = ensure_cipher_allowed(cipher_suite or get_cipher_suite())
+    header_fields = {
+        "kem": algorithm_id("kem", kem_algorithm),
+        "sig": algorithm_id("sig", sig_algorithm),
+        **cipher_header_fields(cipher_suite)
+    }
+    app = current_app._get_current_object()
+    batch_id = uuid.uuid4().hex
+    output_dir = current_app.config["ENCRYPTED_FOLDER"]
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 1️⃣ One Kyber encapsulation for the whole batch
+    kyber_start = time.perf_counter_ns()
+    shared_secret, kyber_ct = sender_generate_shared_secret_and_ciphertext(kem_algorithm, peer_id)
+    kyber_end = time.perf_counter_ns()
+
+    # 2️⃣ Per-file keys, files encrypted + hashed in parallel
+    def encrypt_one(index, input_path, filename):
+        encrypted_path = os.path.join(output_dir, f"batch_{batch_id}_{index}.enc")
+        with app.app_context():
+            # Compression is decided per file
+            encrypt_file(
+                input_path,
+                encrypted_path,
+                derive_batch_file_key(shared_secret, batch_id, index),
+                build_header({**header_fields, **compression_header_fields(input_path)})
+            )
+        return {
+            "index": index,
+            "filename": filename,
+            "size": os.path.getsize(encrypted_path),
+            "sha512": _sha512_file(encrypted_path),
+            "encrypted_file_path": encrypted_path
+        }
+
+    encrypt_start = time.perf_counter_ns()
+    with ThreadPoolExecutor(max_workers=current_app.config["BATCH_WORKERS"]) as pool:
+        futures = [
+            pool.submit(encrypt_one, index, input_path, filename)
+            for index, (input_path, filename) in enumerate(inputs)
+        ]
+        files = [future.result() for future in futures]
+    encrypt_end = time.perf_counter_ns()
+
+    # 3️⃣ One Dilithium signature over the manifest
+    manifest = encode_manifest({
+        "version": MANIFEST_VERSION,
+        "batch_id": batch_id,
+        "kem_algorithm": kem_algorithm,
+        "sig_algorithm": sig_algorithm,
+        "files": [
+            {key: f[key] for key in ("index", "filename", "size", "sha512")}
+            for f in files
+        ]
+    })
+    sign_start = time.perf_counter_ns()
+    signature = sign_hash_with_dilithium(manifest_hash(manifest, kyber_ct), sig_algorithm)
+    sign_end = time.perf_counter_ns()
+    print(f"Batch {batch_id}: {len(files)} files encrypted in "
+          f"{(encrypt_end - encrypt_start) / 1e6:.2f} ms")  # Debug print of time taken
+
+    return {
+        "batch_id": batch_id,
+        "manifest": manifest,
+        "signature": signature,
+        "kyber_ciphertext": kyber_ct,
+        "files": files,
+        "kem_algorithm": kem_algorithm,
+        "sig_algorithm": sig_algorithm,
+        "cipher_suite": cipher_suite,
+        "timings": {
+            "key_encapsulation": (kyber_end - kyber_start) / 1e6,
+            "AES_encrypt": (encrypt_end - encrypt_start) / 1e6,
+            "Sign_generation": (sign_end - sign_start) / 1e6
+        }
+    }
+
+
+class BatchTransferBody(StreamedMultipartBody):
+    """
+    Body of a batch transfer: manifest, signature, Kyber ciphertext,
+    then file_0..file_n.
+    """
+
+    def __init__(self, batch: dict):
+        super().__init__(
+            [
+                ("manifest", batch["manifest"].decode("utf-8")),
+                ("signature", base64.b64encode(batch["signature"]).decode("utf-8")),
+                ("kyber_ciphertext", batch["kyber_ciphertext"].hex()),
+            ],
+            [
+                (f"file_{f['index']}", f"{f['index']}.enc", f["encrypted_file_path"], 0, f["size"])
+                for f in batch["files"]
+            ]
+        )
+
+
+# ======================================================
+# RECEIVER
+# ======================================================
+
+class PQCBatchReceiver:
+    """
+    Consumes a /pqc/batch/receive upload: verifies the manifest once,
+    then hashes each file while spooling it and hands matching files
+    to a decryption pool while the next ones are still arriving.
+    peer_id → session of the sender (None → active peer).
+    """
+
+    def __init__(self, peer_id: str = None):
+        self.app = current_app._get_current_object()
+        self.peer_id = peer_id
+        self.form = {}
+        self.manifest = None
+        self.decaps = None
+        self.pool = ThreadPoolExecutor(max_workers=current_app.config["BATCH_WORKERS"])
+        self.jobs = {}
+        self.results = {}
+        self.current = None     # (index, path, file object, hasher)
+        self.paths = []
+        self.verify_ms = 0.0
+
+    def add_field(self, name: str, value: str):
+        self.form[name] = value
+
+    # ---------------- manifest ----------------
+
+    def _open_manifest(self):
+        for name in ("manifest", "signature", "kyber_ciphertext"):
+            if name not in self.form:
+                raise ValueError(f"Batch field {name} must precede the files")
+
+        raw = self.form["manifest"].encode("utf-8")
+        manifest = json.loads(raw)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported batch manifest version: {manifest.get('version')}")
+        kem_algorithm = ensure_allowed("kem", manifest["kem_algorithm"])
+        sig_algorithm = ensure_allowed("sig", manifest["sig_algorithm"])
+
+        kyber_ct = bytes.fromhex(self.form["kyber_ciphertext"])
+        signature = base64.b64decode(self.form["signature"])
+        verify_start = time.perf_counter_ns()
+        public_key = load_peer_dilithium_public_key(self.peer_id)
+        if not verify_dilithium_signature(manifest_hash(raw, kyber_ct), signature, sig_algorithm, public_key):
+            raise Exception("Batch manifest signature verification failed")
+        self.verify_ms = (time.perf_counter_ns() - verify_start) / 1e6
+
+        self.decaps = BackgroundDecapsulation(kem_algorithm, kyber_ct)
+        self.manifest = manifest
+        self.entries = {entry["index"]: entry for entry in manifest["files"]}
+
+    # ---------------- files ----------------
+
+    def add_file_data(self, name: str, data: bytes):
+        if self.manifest is None:
+            self._open_manifest()
+
+        if self.current is None:
+            if not name.startswith("file_") or not name[5:].isdigit():
+                raise ValueError(f"Unexpected batch part: {name}")
+            index = int(name[5:])
+            if index not in self.entries or index in self.results or index in self.jobs:
+                raise ValueError(f"File {index} is not expected in this batch")
+            path = os.path.join(
+                current_app.config["ENCRYPTED_FOLDER"],
+                f"recv_batch_{self.manifest['batch_id']}_{index}.enc"
+            )
+            self.paths.append(path)
+            self.current = (index, path, open(path, "wb"), hashlib.sha512())
+
+        index, path, out, hasher = self.current
+        if data:
+            hasher.update(data)
+            out.write(data)
+            return
+
+        # End of this file part
+        out.close()
+        self.current = None
+        entry = self.entries[index]
+        if hasher.hexdigest() != entry["sha512"]:
+            os.remove(path)
+            self.results[index] = {"status": "FAILED", "error": "File does not match the signed manifest"}
+            return
+        self.jobs[index] = self.pool.submit(self._decrypt_one, index, path)
+
+    def _decrypt_one(self, index: int, path: str):
+        entry = self.entries[index]
+        with self.app.app_context():
+            cipher_suite = ensure_cipher_allowed(suite_from_header(read_header(path)[0]))
+            aes_key = derive_batch_file_key(self.decaps.result(), self.manifest["batch_id"], index)
+            decrypted_path = decrypt_file_with_aes_key(
+                path,
+                current_app.config["DECRYPTED_FOLDER"],
+                aes_key,
+                os.path.basename(entry["filename"]) or f"batch_file_{index}"
+            )
+        os.remove(path)
+        return decrypted_path, cipher_suite
+
+    # ---------------- end of body ----------------
+
+    def finish(self) -> dict:
+        """
+        Returns:
+            {
+                batch_id,
+                kem_algorithm,
+                sig_algorithm,
+                shared_secret,
+                kyber_ciphertext (hex), signature (base64) → as received
+                files → [{index, filename, sha512, status,
+                          decrypted_file_path + cipher_suite | error}],
+                timings
+            }
+        """
+        if self.manifest is None:
+            self._open_manifest()
+
+        files = []
+        for index, entry in sorted(self.entries.items()):
+            item = {"index": index, "filename": entry["filename"], "sha512": entry["sha512"]}
+            if index in self.jobs:
+                try:
+                    decrypted_path, cipher_suite = self.jobs[index].result()
+                    item.update(status="READY", decrypted_file_path=decrypted_path, cipher_suite=cipher_suite)
+                except Exception as e:
+                    item.update(status="FAILED", error=str(e))
+            else:
+                item.update(self.results.get(index, {"status": "FAILED", "error": "File missing from transfer"}))
+            files.append(item)
+        self.pool.shutdown()
+
+        return {
+            "batch_id": self.manifest["batch_id"],
+            "kem_algorithm": self.manifest["kem_algorithm"],
+            "sig_algorithm": self.manifest["sig_algorithm"],
+            "shared_secret": self.decaps.result(),
+            "kyber_ciphertext": self.form["kyber_ciphertext"],
+            "signature": self.form["signature"],
+            "files": files,
+            "timings": {
+                "Verify_signature": self.verify_ms,
+                "key_ecapsulation": self.decaps.elapsed_ms
+            }
+        }
+
+    def abort(self):
+        if self.current is not None:
+            self.current[2].close()
+        self.pool.shutdown(wait=True)
+        if self.decaps is not None:
+            self.decaps.thread.join()
+        # A rejected batch keeps nothing, not even files already decrypted
+        for job in self.jobs.values():
+            if job.exception() is None and os.path.exists(job.result()[0]):
+                os.remove(job.result()[0])
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def receive_pqc_batch(stream, boundary: str, max_form_memory_size=None, peer_id: str = None):
+    """
+    Reads a batch transfer from `stream` in one pass.
+
+    Raises on a malformed body or a bad manifest signature (nothing
+    is kept); individual files that do not match the manifest are
+    reported as FAILED.
+
+    Returns:
+        PQCBatchReceiver.finish() result
+    """
+    os.makedirs(current_app.config["ENCRYPTED_FOLDER"], exist_ok=True)
+    receiver = PQCBatchReceiver(peer_id)
+    try:
+        for part in iter_multipart(stream, boundary, max_form_memory_size):
+            if part[0] == "field":
+                receiver.add_field(part[1], part[2])
+            else:
+                receiver.add_file_data(part[1], part[3])
+        return receiver.finish()
+    except Exception:
+        receiver.abort()
+        raise
@@ -0,0 +1,568 @@
+import base64
+import hashlib
+import hmac
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from flask import current_app
+
+from app.services.cipher_suite_service import (
+    cipher_header_fields,
+    decrypt_stream,
+    encrypt_stream,
+    ensure_cipher_allowed,
+    get_cipher_suite
+)
+from app.services.coalescing_signer_service import sign_document_hash, verify_document_signature
+from app.services.crypto_service import derive_delta_chunk_key, derive_delta_wrap_key
+from app.services.header_service import build_header
+from app.services.pqc_batch_service import encode_manifest, manifest_hash
+from app.services.pqc_encryption_service import received_file_name
+from app.services.pqc_key_service import (
+    load_peer_dilithium_public_key,
+    load_peer_kyber_public_key,
+    sender_generate_shared_secret_and_ciphertext
+)
+from app.services.pqc_param_service import (
+    ensure_allowed,
+    transfer_algorithms
+)
+from app.services.pqc_receive_service import BackgroundDecapsulation
+from app.utils.multipart import StreamedMultipartBody, iter_multipart
+
+
+# ======================================================
+# Delta transfer (content-defined chunking)
+# ======================================================
+# A re-sent, slightly edited document should only cost the bytes that
+# changed. Documents are cut where a rolling Gear hash over the last 32
+# bytes hits a mask, so an insertion only moves the boundaries next to
+# it. Each chunk is then
+#
+#   id       = HMAC-SHA256(delta key, chunk)     (keyed: ids do not
+#                                                 reveal content)
+#   chunk_key = HKDF(delta key, "pqc-delta-chunk|<id>")
+#   sealed   = cipher suite header + segments of the chunk
+#
+# The delta key is long-lived per sender → receiver pair; every transfer
+# carries it wrapped under that transfer's Kyber shared secret. The
+# receiver keeps sealed chunks in a store per sender (keyed by the
+# sender's Dilithium key), so a later transfer only sends:
+#
+#   manifest = canonical JSON {transfer_id, filename, size, algorithms,
+#                  wrapped_key, chunks: [[id, length], ...]}
+#   signed   = SHA-512(manifest || kyber_ct)     (as batch transfers)
+#
+# plus the chunks the receiver reported missing (/pqc/delta/missing).
+# Reassembly checks every chunk against its id; new chunks only enter
+# the store once the whole document has been rebuilt.
+
+MANIFEST_VERSION = 1
+GEAR_WINDOW = 32
+
+GEAR = [
+    int.from_bytes(hashlib.sha256(b"pqc-delta-gear" + bytes([i])).digest()[:4], "big")
+    for i in range(256)
+]
+
+
+def _find_cut(buf, n: int, min_size: int, mask: int, max_size: int) -> int:
+    """Length of the next chunk at the start of buf[:n]."""
+    if n <= min_size:
+        return n
+    end = min(n, max_size)
+    # The hash only depends on the last GEAR_WINDOW bytes, so start there
+    position = max(0, min_size - GEAR_WINDOW)
+    h = 0
+    gear = GEAR
+    for byte in memoryview(buf)[position:end]:
+        h = ((h << 1) + gear[byte]) & 0xFFFFFFFF
+        position += 1
+        if not h & mask and position >= min_size:
+            return position
+    return end
+
+
+def chunk_file(path: str, delta_key: bytes, min_size: int, avg_size: int, max_size: int) -> list:
+    """
+    Content-defined chunks of a file.
+
+    Returns:
+        [{id, offset, length}, ...]
+    """
+    bits = max(1, avg_size.bit_length() - 1)
+    mask = ((1 << bits) - 1) << (32 - bits)     # top bits: they depend on the whole window
+
+    chunks = []
+    offset = 0
+    buf = bytearray()
+    with open(path, "rb") as f:
+        eof = False
+        while buf or not eof:
+            if not eof and len(buf) < max_size:
+                data = f.read(max(4 * max_size, 1024 * 1024))
+                eof = not data
+                buf += data
+                continue
+            cut = _find_cut(buf, len(buf), min_size, mask, max_size)
+            chunk = bytes(buf[:cut])
+            del buf[:cut]
+            chunks.append({
+                "id": hmac.new(delta_key, chunk, hashlib.sha256).hexdigest(),
+                "offset": offset,
+                "length": cut
+            })
+            offset += cut
+    return chunks
+
+
+def _chunk_sizes() -> tuple:
+    config = current_app.config
+    return config["DELTA_MIN_CHUNK_SIZE"], config["DELTA_AVG_CHUNK_SIZE"], config["DELTA_MAX_CHUNK_SIZE"]
+
+
+def _key_fingerprint(public_key: bytes) -> str:
+    return hashlib.sha256(public_key).hexdigest()
+
+
+# ======================================================
+# SENDER
+# ======================================================
+
+def load_delta_key(peer_id: str = None) -> bytes:
+    """
+    Delta key for the receiver session `peer_id` (None → active peer),
+    by its Kyber public key, created on first use. A new receiver key
+    starts a fresh key, so everything is sent again once.
+    """
+    key_folder = current_app.config["PQC_KEY_FOLDER"]
+    receiver = _key_fingerprint(load_peer_kyber_public_key(peer_id))
+    path = os.path.join(key_folder, f"delta_key_{receiver[:16]}.bin")
+    if not os.path.exists(path):
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(os.urandom(32))
+        os.replace(tmp, path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def pqc_plan_delta_transfer(input_path: str, peer_id: str = None) -> dict:
+    """
+    Returns:
+        {delta_key, chunks → [{id, offset, length}], chunking_ms}
+    """
+    delta_key = load_delta_key(peer_id)
+    start = time.perf_counter_ns()
+    chunks = chunk_file(input_path, delta_key, *_chunk_sizes())
+    return {
+        "delta_key": delta_key,
+        "chunks": chunks,
+        "chunking_ms": (time.perf_counter_ns() - start) / 1e6
+    }
+
+
+def pqc_encrypt_delta_workflow(
+    input_path: str,
+    filename: str,
+    plan: dict,
+    missing: set,
+    kem_algorithm: str = None,
+    sig_algorithm: str = None,
+    cipher_suite: str = None,
+    peer_id: str = None
+):
+    """
+    Seals the chunks in `missing` into one spool file and signs the
+    manifest of the whole document. peer_id → receiver session (None →
+    active peer); `plan` must have been made for the same session.
+
+    Returns:
+        {
+            transfer_id,
+            manifest (bytes),
+            signature,
+            kyber_ciphertext,
+            spool_path,
+            parts → [(chunk id, offset in spool, size)],
+            chunk_count, sent_chunks, sent_bytes,
+            kem_algorithm, sig_algorithm, cipher_suite,
+            timings
+        }
+    """
+    kem_algorithm, sig_algorithm = transfer_algorithms(kem_algorithm, sig_algorithm, peer_id)
+    cipher_suite = ensure_cipher_allowed(cipher_suite or get_cipher_suite())
+    header = build_header(cipher_header_fields(cipher_suite))
+    delta_key = plan["delta_key"]
+    transfer_id = uuid.uuid4().hex
+
+    # 1️⃣ Kyber encapsulation → wraps the delta key for this transfer
+    kyber_start = time.perf_counter_ns()
+    shared_secret, kyber_ct = sender_generate_shared_secret_and_ciphertext(kem_algorithm, peer_id)
+    nonce = os.urandom(12)
+    wrapped_key = nonce + AESGCM(derive_delta_wrap_key(shared_secret)).encrypt(
+        nonce, delta_key, transfer_id.encode("ascii")
+    )
+    kyber_end = time.perf_counter_ns()
+
+    # 2️⃣ Seal only what the receiver lacks (each chunk once)
+    output_dir = current_app.config["ENCRYPTED_FOLDER"]
+    os.makedirs(output_dir, exist_ok=True)
+    spool_path = os.path.join(output_dir, f"delta_{transfer_id}.chunks")
+    parts = []
+    sealed_ids = set()
+    encrypt_start = time.perf_counter_ns()
+    with open(input_path, "rb") as src, open(spool_path, "wb") as spool:
+        for chunk in plan["chunks"]:
+            if chunk["id"] not in missing or chunk["id"] in sealed_ids:
+                continue
+            src.seek(chunk["offset"])
+            start = spool.tell()
+            encrypt_stream(
+                io.BytesIO(src.read(chunk["length"])),
+                spool,
+                derive_delta_chunk_key(delta_key, chunk["id"]),
+                header
+            )
+            parts.append((chunk["id"], start, spool.tell() - start))
+            sealed_ids.add(chunk["id"])
+    encrypt_end = time.perf_counter_ns()
+
+    # 3️⃣ One signature over the manifest of the whole document
+    manifest = encode_manifest({
+        "version": MANIFEST_VERSION,
+        "transfer_id": transfer_id,
+        "filename": filename,
+        "size": sum(c["length"] for c in plan["chunks"]),
+        "kem_algorithm": kem_algorithm,
+        "sig_algorithm": sig_algorithm,
+        "cipher_suite": cipher_suite,
+        "wrapped_key": wrapped_key.hex(),
+        "chunks": [[c["id"], c["length"]] for c in plan["chunks"]]
+    })
+    sign_start = time.perf_counter_ns()
+    signature = sign_document_hash(manifest_hash(manifest, kyber_ct), sig_algorithm)
+    sign_end = time.perf_counter_ns()
+
+    sent_bytes = sum(size for _, _, size in parts)
+    print(f"Delta {transfer_id}: {len(parts)}/{len(plan['chunks'])} chunks, "
+          f"{sent_bytes} bytes to send")  # Debug print of delta size
+
+    return {
+        "transfer_id": transfer_id,
+        "manifest": manifest,
+        "signature": signature,
+        "kyber_ciphertext": kyber_ct,
+        "spool_path": spool_path,
+        "parts": parts,
+        "chunk_count": len(plan["chunks"]),
+        "sent_chunks": len(parts),
+        "sent_bytes": sent_bytes,
+        "kem_algorithm": kem_algorithm,
+        "sig_algorithm": sig_algorithm,
+        "cipher_suite": cipher_suite,
+        "timings": {
+            "Chunking": plan["chunking_ms"],
+            "key_encapsulation": (kyber_end - kyber_start) / 1e6,
+            "AES_encrypt": (encrypt_end - encrypt_start) / 1e6,
+            "Sign_generation": (sign_end - sign_start) / 1e6
+        }
+    }
+
+
+class DeltaTransferBody(StreamedMultipartBody):
+    """
+    Body of a delta transfer: manifest, signature, Kyber ciphertext,
+    then chunk_<id> for every chunk the receiver lacks.
+    """
+
+    def __init__(self, delta: dict):
+        super().__init__(
+            [
+                ("manifest", delta["manifest"].decode("utf-8")),
+                ("signature", base64.b64encode(delta["signature"]).decode("utf-8")),
+                ("kyber_ciphertext", delta["kyber_ciphertext"].hex()),
+            ],
+            [
+                (f"chunk_{chunk_id}", f"{chunk_id}.chunk", delta["spool_path"], offset, size)
+                for chunk_id, offset, size in delta["parts"]
+            ]
+        )
+
+
+# ======================================================
+# RECEIVER
+# ======================================================
+
+_store_lock = threading.Lock()
+
+
+def chunk_store_folder(peer_id: str = None) -> str:
+    """Chunk store of the sender session `peer_id` (by its Dilithium public key)."""
+    sender = _key_fingerprint(load_peer_dilithium_public_key(peer_id))
+    folder = os.path.join(current_app.config["DELTA_STORE_FOLDER"], sender[:32])
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _chunk_path(folder: str, chunk_id: str) -> str:
+    if len(chunk_id) != 64 or any(c not in "0123456789abcdef" for c in chunk_id):
+        raise ValueError(f"Invalid chunk id: {chunk_id[:80]}")
+    return os.path.join(folder, f"{chunk_id}.chunk")
+
+
+def missing_chunks(chunk_ids: list, peer_id: str = None) -> list:
+    """Chunk ids (in request order, once each) not in the sender's store."""
+    folder = chunk_store_folder(peer_id)
+    missing = []
+    seen = set()
+    for chunk_id in chunk_ids:
+        if chunk_id in seen:
+            continue
+        seen.add(chunk_id)
+        if not os.path.exists(_chunk_path(folder, chunk_id)):
+            missing.append(chunk_id)
+    return missing
+
+
+def _prune_store(folder: str, keep: set, max_bytes: int):
+    """Least recently used chunks go first; `keep` is never removed."""
+    entries = []
+    total = 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if not name.endswith(".chunk"):
+            continue
+        st = os.stat(path)
+        total += st.st_size
+        entries.append((st.st_mtime_ns, st.st_size, name[:-6], path))
+    for _, size, chunk_id, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if chunk_id in keep:
+            continue
+        os.remove(path)
+        total -= size
+
+
+class StoreChunksMissing(Exception):
+    """Manifest references chunks that are neither stored nor sent"""
+
+    def __init__(self, missing: list):
+        super().__init__(f"{len(missing)} chunks are neither stored nor sent")
+        self.missing = missing
+
+
+class PQCDeltaReceiver:
+    """
+    Consumes a /pqc/delta/receive upload: manifest checked first, new
+    chunks spooled as they arrive, document rebuilt in finish().
+    peer_id → session of the sender (None → active peer).
+    """
+
+    def __init__(self, peer_id: str = None):
+        self.peer_id = peer_id
+        self.form = {}
+        self.manifest = None
+        self.decaps = None
+        self.folder = chunk_store_folder(peer_id)
+        self.new_chunks = {}        # id → spooled sealed chunk path
+        self.current = None         # (id, path, file object, size)
+        self.verify_ms = 0.0
+        self.max_sealed = current_app.config["DELTA_MAX_CHUNK_SIZE"] + 4096
+
+    def add_field(self, name: str, value: str):
+        self.form[name] = value
+
+    def _open_manifest(self):
+        for name in ("manifest", "signature", "kyber_ciphertext"):
+            if name not in self.form:
+                raise ValueError(f"Delta field {name} must precede the chunks")
+
+        raw = self.form["manifest"].encode("utf-8")
+        manifest = json.loads(raw)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported delta manifest version: {manifest.get('version')}")
+        kem_algorithm = ensure_allowed("kem", manifest["kem_algorithm"])
+        sig_algorithm = ensure_allowed("sig", manifest["sig_algorithm"])
+
+        kyber_ct = bytes.fromhex(self.form["kyber_ciphertext"])
+        signature = base64.b64decode(self.form["signature"])
+        verify_start = time.perf_counter_ns()
+        if not verify_document_signature(manifest_hash(raw, kyber_ct), signature, sig_algorithm, self.peer_id):
+            raise Exception("Delta manifest signature verification failed")
+        self.verify_ms = (time.perf_counter_ns() - verify_start) / 1e6
+
+        self.decaps = BackgroundDecapsulation(kem_algorithm, kyber_ct)
+        self.manifest = manifest
+        self.chunk_ids = {chunk_id for chunk_id, _ in manifest["chunks"]}
+        for chunk_id in self.chunk_ids:
+            _chunk_path(self.folder, chunk_id)      # rejects malformed ids
+
+    def add_file_data(self, name: str, data: bytes):
+        if self.manifest is None:
+            self._open_manifest()
+
+        if self.current is None:
+            chunk_id = name[6:] if name.startswith("chunk_") else ""
+            if chunk_id not in self.chunk_ids or chunk_id in self.new_chunks:
+                raise ValueError(f"Unexpected delta part: {name[:80]}")
+            path = os.path.join(
+                current_app.config["ENCRYPTED_FOLDER"],
+                f"recv_delta_{self.manifest['transfer_id']}_{chunk_id}.chunk"
+            )
+            self.new_chunks[chunk_id] = path
+            self.current = (chunk_id, path, open(path, "wb"), 0)
+
+        chunk_id, path, out, size = self.current
+        if data:
+            size += len(data)
+            if size > self.max_sealed:
+                raise ValueError(f"Chunk {chunk_id} exceeds the maximum chunk size")
+            out.write(data)
+            self.current = (chunk_id, path, out, size)
+            return
+        out.close()
+        self.current = None
+
+    def _delta_key(self) -> bytes:
+        wrapped = bytes.fromhex(self.manifest["wrapped_key"])
+        return AESGCM(derive_delta_wrap_key(self.decaps.result())).decrypt(
+            wrapped[:12], wrapped[12:], self.manifest["transfer_id"].encode("ascii")
+        )
+
+    @staticmethod
+    def _open_chunk(path: str, chunk_id: str, delta_key: bytes):
+        """Plaintext of a sealed chunk, None if it does not match its id."""
+        plain = io.BytesIO()
+        try:
+            with open(path, "rb") as sealed:
+                decrypt_stream(sealed, plain, derive_delta_chunk_key(delta_key, chunk_id))
+        except ValueError:
+            return None
+        plain = plain.getvalue()
+        if not hmac.compare_digest(hmac.new(delta_key, plain, hashlib.sha256).hexdigest(), chunk_id):
+            return None
+        return plain
+
+    def finish(self) -> dict:
+        """
+        Raises StoreChunksMissing when the store lost chunks the sender
+        expected (nothing is kept; the sender can retry with them).
+
+        Returns:
+            {transfer_id, filename, decrypted_file_path, file_size,
+             kem_algorithm, sig_algorithm, cipher_suite, shared_secret,
+             kyber_ciphertext (hex), signature (base64), manifest_hash,
+             chunk_count, received_chunks, timings}
+        """
+        if self.manifest is None:
+            self._open_manifest()
+
+        sources = {}
+        missing = []
+        for chunk_id in self.chunk_ids:
+            if chunk_id in self.new_chunks:
+                sources[chunk_id] = self.new_chunks[chunk_id]
+            else:
+                stored = _chunk_path(self.folder, chunk_id)
+                if os.path.exists(stored):
+                    sources[chunk_id] = stored
+                else:
+                    missing.append(chunk_id)
+        if missing:
+            raise StoreChunksMissing(missing)
+
+        delta_key = self._delta_key()
+        filename = os.path.basename(self.manifest["filename"]) or "delta_file"
+        decrypted_path = os.path.join(current_app.config["DECRYPTED_FOLDER"], received_file_name(filename))
+        os.makedirs(current_app.config["DECRYPTED_FOLDER"], exist_ok=True)
+
+        # Rebuild + check every chunk against its keyed id
+        rebuild_start = time.perf_counter_ns()
+        try:
+            with open(decrypted_path, "wb") as out:
+                for chunk_id, length in self.manifest["chunks"]:
+                    plain = self._open_chunk(sources[chunk_id], chunk_id, delta_key)
+                    if plain is None or len(plain) != length:
+                        if chunk_id in self.new_chunks:
+                            raise ValueError(f"Chunk {chunk_id} does not match the signed manifest")
+                        # Damaged / stale store entry: drop it, the sender sends it again
+                        os.remove(sources[chunk_id])
+                        raise StoreChunksMissing([chunk_id])
+                    out.write(plain)
+        except Exception:
+            os.remove(decrypted_path)
+            raise
+        rebuild_end = time.perf_counter_ns()
+
+        # Only now do new chunks join the store
+        received_chunks = len(self.new_chunks)
+        with _store_lock:
+            for chunk_id, path in self.new_chunks.items():
+                os.replace(path, _chunk_path(self.folder, chunk_id))
+            now = time.time()
+            for chunk_id in self.chunk_ids:
+                os.utime(_chunk_path(self.folder, chunk_id), (now, now))
+            _prune_store(self.folder, self.chunk_ids, current_app.config["DELTA_STORE_MAX_BYTES"])
+        self.new_chunks = {}
+
+        raw = self.form["manifest"].encode("utf-8")
+        kyber_ct = bytes.fromhex(self.form["kyber_ciphertext"])
+        return {
+            "transfer_id": self.manifest["transfer_id"],
+            "filename": filename,
+            "decrypted_file_path": decrypted_path,
+            "file_size": os.path.getsize(decrypted_path),
+            "kem_algorithm": self.manifest["kem_algorithm"],
+            "sig_algorithm": self.manifest["sig_algorithm"],
+            "cipher_suite": self.manifest["cipher_suite"],
+            "shared_secret": self.decaps.result(),
+            "kyber_ciphertext": self.form["kyber_ciphertext"],
+            "signature": self.form["signature"],
+            "manifest_hash": manifest_hash(raw, kyber_ct),
+            "chunk_count": len(self.manifest["chunks"]),
+            "received_chunks": received_chunks,
+            "timings": {
+                "Verify_signature": self.verify_ms,
+                "key_ecapsulation": self.decaps.elapsed_ms,
+                "AES_decryption": (rebuild_end - rebuild_start) / 1e6
+            }
+        }
+
+    def abort(self):
+        if self.current is not None:
+            self.current[2].close()
+        if self.decaps is not None:
+            self.decaps.thread.join()
+        for path in self.new_chunks.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def receive_pqc_delta(stream, boundary: str, max_form_memory_size=None, peer_id: str = None):
+    """
+    Reads a delta transfer from `stream` in one pass and rebuilds the
+    document. Raises (keeping nothing) on a malformed body, a bad
+    signature or a chunk that does not match its id.
+
+    Returns:
+        PQCDeltaReceiver.finish() result
+    """
+    os.makedirs(current_app.config["ENCRYPTED_FOLDER"], exist_ok=True)
+    receiver = PQCDeltaReceiver(peer_id)
+    try:
+        for part in iter_multipart(stream, boundary, max_form_memory_size):
+            if part[0] == "field":
+                receiver.add_field(part[1], part[2])
+            else:
+                receiver.add_file_data(part[1], part[3])
+        return receiver.finish()
+    except Exception:
+        receiver.abort()
+        raise
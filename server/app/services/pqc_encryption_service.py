@@ -1,17 +1,19 @@
 import os
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives import padding
-from cryptography.hazmat.backends import default_backend
+import uuid
+from werkzeug.utils import secure_filename
+from app.services.cipher_suite_service import encrypt_file, encrypt_stream, decrypt_file, decrypt_range
 
 
 # ======================================================
-# AES-256-CBC encryption (PQC version)
+# Document encryption (PQC version)
 # ======================================================
 
-def encrypt_file_with_aes_key(input_path: str, output_dir: str, aes_key: bytes):
+def encrypt_file_with_aes_key(input_path: str, output_dir: str, aes_key: bytes, header: bytes = b""):
     """
-    Encrypts a file using AES-256-CBC.
+    Encrypts a file with the cipher suite recorded in `header`
+    (see header_service / cipher_suite_service), as <id>_<name>.enc.
     AES key is PROVIDED (derived from Kyber).
+    An empty header writes a legacy AES-256-CBC file (IV + ciphertext).
     
     Returns:
         encrypted_file_path
@@ -19,40 +21,45 @@ def encrypt_file_with_aes_key(input_path: str, output_dir: str, aes_key: bytes):
 
     os.makedirs(output_dir, exist_ok=True)
 
-    # Read plaintext
-    with open(input_path, "rb") as f:
-        plaintext = f.read()
+    # Save encrypted file (header + nonce/IV + ciphertext), unique per call
+    encrypted_path = os.path.join(output_dir, f"{received_file_name(os.path.basename(input_path))}.enc")
 
-    # Generate IV
-    iv = os.urandom(16)  # 128-bit IV
+    return encrypt_file(input_path, encrypted_path, aes_key, header)
 
-    # Pad plaintext
-    padder = padding.PKCS7(128).padder()
-    padded_data = padder.update(plaintext) + padder.finalize()
 
-    # Encrypt
-    cipher = Cipher(
-        algorithms.AES(aes_key),
-        modes.CBC(iv),
-        backend=default_backend()
-    )
-    encryptor = cipher.encryptor()
-    ciphertext = encryptor.update(padded_data) + encryptor.finalize()
-
-    # Save encrypted file (IV + ciphertext)
-    encrypted_filename = os.path.basename(input_path) + ".enc"
-    encrypted_path = os.path.join(output_dir, encrypted_filename)
+def encrypt_stream_with_aes_key(reader, filename: str, output_dir: str, aes_key: bytes, header: bytes = b""):
+    """
+    encrypt_file_with_aes_key for a plaintext stream (an upload being
+    received): only the ciphertext is written, as <id>_<filename>.enc
+    (received_file_name: the client's name is sanitised, and concurrent
+    uploads of the same name do not share a file).
 
-    with open(encrypted_path, "wb") as f:
-        f.write(iv + ciphertext)
+    Returns:
+        encrypted_file_path
+    """
 
+    os.makedirs(output_dir, exist_ok=True)
+    encrypted_path = os.path.join(output_dir, f"{received_file_name(filename)}.enc")
+
+    try:
+        with open(encrypted_path, "wb") as dst:
+            encrypt_stream(reader, dst, aes_key, header)
+    except Exception:
+        if os.path.exists(encrypted_path):
+            os.remove(encrypted_path)
+        raise
     return encrypted_path
 
 
 # ======================================================
-# AES-256-CBC decryption (PQC version)
+# Document decryption (PQC version)
 # ======================================================
 
+def received_file_name(original_filename: str) -> str:
+    """Disk name of a received file: <id>_<sanitised original name>"""
+    return f"{uuid.uuid4().hex[:12]}_{secure_filename(original_filename or '') or 'file'}"
+
+
 def decrypt_file_with_aes_key(
     encrypted_path: str,
     output_dir: str,
@@ -60,7 +67,8 @@ def decrypt_file_with_aes_key(
     original_filename: str
 ):
     """
-    Decrypts AES-256-CBC encrypted file using PROVIDED AES key.
+    Decrypts a file using PROVIDED AES key; the cipher suite is
+    taken from the file header (legacy files are AES-256-CBC).
     
     Returns:
         decrypted_file_path
@@ -68,30 +76,23 @@ def decrypt_file_with_aes_key(
 
     os.makedirs(output_dir, exist_ok=True)
 
-    # Read encrypted file
-    with open(encrypted_path, "rb") as f:
-        data = f.read()
-
-    iv = data[:16]
-    ciphertext = data[16:]
+    # Save decrypted file; the name comes from the sender, so it is
+    # sanitised and made unique (the inbox keeps the original name)
+    decrypted_path = os.path.join(output_dir, received_file_name(original_filename))
 
-    # Decrypt
-    cipher = Cipher(
-        algorithms.AES(aes_key),
-        modes.CBC(iv),
-        backend=default_backend()
-    )
-    decryptor = cipher.decryptor()
-    padded_plaintext = decryptor.update(ciphertext) + decryptor.finalize()
+    return decrypt_file(encrypted_path, decrypted_path, aes_key)
 
-    # Unpad
-    unpadder = padding.PKCS7(128).unpadder()
-    plaintext = unpadder.update(padded_plaintext) + unpadder.finalize()
 
-    # Save decrypted file
-    decrypted_path = os.path.join(output_dir, original_filename)
+# ======================================================
+# Partial decryption (PQC version)
+# ======================================================
 
-    with open(decrypted_path, "wb") as f:
-        f.write(plaintext)
+def decrypt_range_with_aes_key(encrypted_path: str, aes_key: bytes, offset: int, length: int):
+    """
+    Decrypts plaintext[offset : offset + length] of a stored file,
+    opening and authenticating only the segments it touches.
 
-    return decrypted_path
\ No newline at end of file
+    Returns:
+        (plaintext bytes, plaintext size, segments opened)
+    """
+    return decrypt_range(encrypted_path, aes_key, offset, length)
@@ -0,0 +1,146 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.extensions import app_state
+
+
+# ======================================================
+# Receiver inbox: acknowledge on receipt, decrypt in the background
+# ======================================================
+# /pqc/decrypt answers the sender as soon as the ciphertext is spooled
+# to disk and its signature checked. Decryption runs on a pool of
+# RECEIVE_WORKERS threads, so senders push at network speed while the
+# receiver drains at CPU speed. Each queued file moves
+#
+#   RECEIVED → VERIFIED → READY
+#                       ↘ FAILED
+#
+# and /pqc/next-file only hands out READY files. With more than
+# RECEIVE_MAX_PENDING files waiting for a worker, a delivery is
+# decrypted before it is answered, which slows the sender down instead
+# of piling ciphertext up on disk.
+#
+# Entries live in the state store, so with the SQLite backend any
+# worker can hand out a file another worker received.
+
+RECEIVED = "RECEIVED"
+VERIFIED = "VERIFIED"
+READY = "READY"
+FAILED = "FAILED"
+
+INBOX = "pqc_inbox"     # state store collection (services/state_store.py)
+
+_lock = threading.Lock()
+_pool = None
+_pending = 0
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=current_app.config["RECEIVE_WORKERS"],
+                thread_name_prefix="receive"
+            )
+        return _pool
+
+
+def add_entry(entry: dict) -> dict:
+    entry.setdefault("status", RECEIVED)
+    entry.setdefault("received_at", time.time())
+    app_state.store.put(INBOX, entry["id"], entry)
+    return entry
+
+
+def set_status(entry: dict, status: str, **fields):
+    entry.update(fields)
+    entry["status"] = status
+    app_state.store.update(INBOX, entry["id"], {**fields, "status": status})
+
+
+def find_entry(file_id: str):
+    return app_state.store.get(INBOX, file_id)
+
+
+def remove_entry(file_id: str):
+    """
+    Returns:
+        removed entry, or None
+    """
+    return app_state.store.pop(INBOX, file_id)
+
+
+def pop_ready():
+    """
+    Returns:
+        oldest READY entry, removed from the inbox → None if there is none
+    """
+    return app_state.store.pop_first(INBOX, status=READY)
+
+
+def list_entries() -> list:
+    return [
+        {
+            "id": e["id"],
+            "filename": e["filename"],
+            "status": e["status"],
+            "file_size": e.get("file_size"),
+            "received_at": e.get("received_at"),
+            "peer_id": e.get("peer_id"),
+            "error": e.get("error")
+        }
+        for e in app_state.store.values(INBOX)
+    ]
+
+
+def submit_decryption(job, entry: dict) -> bool:
+    """
+    Runs job(entry) on the receive pool; the job sets the entry READY,
+    an exception marks it FAILED.
+
+    Returns:
+        False → too many files pending, the caller runs the job itself
+    """
+    global _pending
+    with _lock:
+        if _pending >= current_app.config["RECEIVE_MAX_PENDING"]:
+            return False
+        _pending += 1
+    app = current_app._get_current_object()
+
+    def run():
+        global _pending
+        try:
+            with app.app_context():
+                job(entry)
+        except Exception as e:
+            print(f"Background decryption of {entry['id']} failed: {e}")
+            set_status(entry, FAILED, error=str(e))
+        finally:
+            with _lock:
+                _pending -= 1
+
+    _get_pool().submit(run)
+    return True
+
+
+def pending_count() -> int:
+    with _lock:
+        return _pending
+
+
+def shutdown(wait: bool = True):
+    """
+    Finishes the acknowledged deliveries still being decrypted
+    (graceful stop of a worker process).
+    """
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool:
+        print(f"Receive pool: finishing {pending_count()} pending decryption(s)")
+        pool.shutdown(wait=wait)
@@ -1,28 +1,24 @@
 import os
 import shutil
 import subprocess
+import uuid
 from flask import current_app
 
+from app.extensions import app_state
+
 
 # ======================================================
 # 1️⃣ Load existing keys (already generated in C)
 # ======================================================
 
-def load_kyber_public_key() -> bytes:
-    path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "kyber_pk.bin"
-    )
-    with open(path, "rb") as f:
+def load_kyber_public_key(kem_algorithm: str = None) -> bytes:
+    """kem_algorithm → that parameter set's pair (see kem_key_path), else the active one"""
+    with open(kem_key_path("kyber_pk.bin", kem_algorithm), "rb") as f:
         return f.read()
 
 
-def load_kyber_private_key() -> bytes:
-    path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "kyber_sk.bin"
-    )
-    with open(path, "rb") as f:
+def load_kyber_private_key(kem_algorithm: str = None) -> bytes:
+    with open(kem_key_path("kyber_sk.bin", kem_algorithm), "rb") as f:
         return f.read()
 
 
@@ -45,40 +41,128 @@ def load_dilithium_private_key() -> bytes:
 
 
 # ======================================================
-# 2️⃣ Store received public keys (handshake phase)
+# Receiver Kyber key pair per parameter set
 # ======================================================
+# kyber_pk.bin / kyber_sk.bin hold the active pair; every pair that
+# becomes active is also kept under kem/<parameter set>/, so a sender
+# that negotiates another set gets a pair of its own instead of
+# replacing the one earlier senders still encrypt to.
+
+def _kem_key_dir(kem_algorithm: str) -> str:
+    return os.path.join(current_app.config["PQC_KEY_FOLDER"], "kem", kem_algorithm)
 
-def store_sender_dilithium_public_key(pk_bytes: bytes):
+
+def kem_key_path(filename: str, kem_algorithm: str = None) -> str:
     """
-    Receiver stores sender's Dilithium public key as raw bytes
+    Returns:
+        path of kyber_pk.bin / kyber_sk.bin of `kem_algorithm`, the
+        active pair's when that set has none kept
     """
-    dest = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "sender_dilithium_pk.bin"
+    if kem_algorithm:
+        path = os.path.join(_kem_key_dir(kem_algorithm), filename)
+        if os.path.exists(path):
+            return path
+    return os.path.join(current_app.config["PQC_KEY_FOLDER"], filename)
+
+
+def has_kem_key_pair(kem_algorithm: str) -> bool:
+    return all(
+        os.path.exists(os.path.join(_kem_key_dir(kem_algorithm), name))
+        for name in ("kyber_pk.bin", "kyber_sk.bin")
     )
-    with open(dest, "wb") as f:
-        f.write(pk_bytes)
 
 
-def store_receiver_kyber_public_key(pk_bytes: bytes):
+def keep_kem_key_pair(kem_algorithm: str):
+    """Copies the active Kyber pair to kem/<kem_algorithm>/ (secret key last)."""
+    key_dir = _kem_key_dir(kem_algorithm)
+    os.makedirs(key_dir, exist_ok=True)
+    for name in ("kyber_pk.bin", "kyber_sk.bin"):
+        tmp_path = os.path.join(key_dir, f".{name}.{uuid.uuid4().hex[:8]}")
+        shutil.copyfile(os.path.join(current_app.config["PQC_KEY_FOLDER"], name), tmp_path)
+        os.replace(tmp_path, os.path.join(key_dir, name))
+
+
+# ======================================================
+# 2️⃣ Peer public keys (handshake phase, one set per peer session)
+# ======================================================
+
+def _peer_key(field: str, label: str, peer_id: str = None) -> bytes:
+    key = app_state.peer_session(peer_id)[field]
+    if key is None:
+        raise ValueError(
+            f"No {label} public key for peer {peer_id or app_state.active_peer}; complete a handshake"
+        )
+    return key
+
+
+def load_peer_kyber_public_key(peer_id: str = None) -> bytes:
+    """Sender: the receiver's Kyber public key (None → active peer)"""
+    return _peer_key("peer_kyber_public_key", "Kyber", peer_id)
+
+
+def load_peer_dilithium_public_key(peer_id: str = None) -> bytes:
+    """Receiver: the sender's Dilithium public key (None → active peer)"""
+    return _peer_key("peer_dilithium_public_key", "Dilithium", peer_id)
+
+
+# ======================================================
+# Key generation (C keygen binaries)
+# ======================================================
+
+_KEYGEN_BINARIES = {
+    "kem": ("kyber", "kyber_keygen"),
+    "sig": ("dilithium", "dilithium_keygen"),
+}
+
+
+def keygen_binary_path(kind: str) -> str:
+    """Path of the keygen binary for 'kem' (Kyber) or 'sig' (Dilithium)"""
+    subdir, name = _KEYGEN_BINARIES[kind]
+    path = os.path.join(current_app.root_path, "services", "PQC", subdir, "bin", name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{name} binary not found at {path}")
+    return path
+
+
+def generate_pqc_key_pair(kind: str, algorithm: str, pk_path: str, sk_path: str):
     """
-    Sender stores receiver's Kyber public key as raw bytes
+    Runs the keygen binary for `algorithm` and writes the key pair
+    to the given paths.
     """
-    dest = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "receiver_kyber_pk.bin"
+    keygen_bin = keygen_binary_path(kind)
+
+    result = subprocess.run(
+        [keygen_bin, algorithm, pk_path, sk_path],
+        capture_output=True,
+        text=True
     )
-    with open(dest, "wb") as f:
-        f.write(pk_bytes)
+
+    if result.returncode != 0:
+        print(f"STDOUT: {result.stdout}")
+        print(f"STDERR: {result.stderr}")
+        raise subprocess.CalledProcessError(result.returncode, keygen_bin)
+
+    if not os.path.exists(pk_path):
+        raise FileNotFoundError(f"Public key not found at: {pk_path}")
+    if not os.path.exists(sk_path):
+        raise FileNotFoundError(f"Secret key not found at: {sk_path}")
+
+
 # ======================================================
 # 3️⃣ Sender side: Kyber encapsulation
 # ======================================================
 
-def sender_generate_shared_secret_and_ciphertext():
+def sender_generate_shared_secret_and_ciphertext(kem_algorithm: str, peer_id: str = None):
     """
     Uses receiver's Kyber public key to generate:
     - shared secret
     - Kyber ciphertext
+
+    kem_algorithm → parameter set of the receiver's key (e.g. ML-KEM-768)
+    peer_id → receiver session holding that key (None → active peer)
+
+    Every call goes through files of its own, so concurrent encryptions
+    never pair one request's secret with another's ciphertext.
     """
     
     kyber_encaps_bin = os.path.join(
@@ -88,25 +172,30 @@ def sender_generate_shared_secret_and_ciphertext():
     
     if not os.path.exists(kyber_encaps_bin):
         raise FileNotFoundError("kyber_encaps binary not found")
-    # print("Running kyber_encaps binary")
-    subprocess.run([kyber_encaps_bin], check=True)
-    
-    shared_secret_path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "shared_secret_sender.bin"
-    )
-    # print("Shared secret and Kyber ciphertext generated")
-
-    ciphertext_path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "kyber_ct.bin"
-    )
 
-    with open(shared_secret_path, "rb") as f:
-        shared_secret = f.read()
-
-    with open(ciphertext_path, "rb") as f:
-        ciphertext = f.read()
+    pqc_key_folder = current_app.config["PQC_KEY_FOLDER"]
+    suffix = uuid.uuid4().hex
+    public_key_path = os.path.join(pqc_key_folder, f"receiver_kyber_pk_{suffix}.bin")
+    shared_secret_path = os.path.join(pqc_key_folder, f"shared_secret_sender_{suffix}.bin")
+    ciphertext_path = os.path.join(pqc_key_folder, f"kyber_ct_{suffix}.bin")
+    with open(public_key_path, "wb") as f:
+        f.write(load_peer_kyber_public_key(peer_id))
+
+    try:
+        subprocess.run(
+            [kyber_encaps_bin, kem_algorithm, public_key_path, ciphertext_path, shared_secret_path],
+            check=True
+        )
+
+        with open(shared_secret_path, "rb") as f:
+            shared_secret = f.read()
+
+        with open(ciphertext_path, "rb") as f:
+            ciphertext = f.read()
+    finally:
+        for path in (public_key_path, ciphertext_path, shared_secret_path):
+            if os.path.exists(path):
+                os.remove(path)
 
     return shared_secret, ciphertext
 
@@ -115,11 +204,15 @@ def sender_generate_shared_secret_and_ciphertext():
 # 4️⃣ Receiver side: Kyber decapsulation
 # ======================================================
 
-def receiver_derive_shared_secret_from_ciphertext():
+def receiver_derive_shared_secret_from_ciphertext(kem_algorithm: str, kyber_ct: bytes):
     """
     Uses:
-    - receiver Kyber private key
+    - receiver Kyber private key of that parameter set
     - received Kyber ciphertext
+
+    kem_algorithm → parameter set recorded in the ciphertext header
+    kyber_ct → decapsulated through files of its own, so concurrent
+    receives do not overwrite each other's ciphertext
     """
 
     kyber_decaps_bin = os.path.join(
@@ -130,12 +223,23 @@ def receiver_derive_shared_secret_from_ciphertext():
     if not os.path.exists(kyber_decaps_bin):
         raise FileNotFoundError("kyber_decaps binary not found")
 
-    subprocess.run([kyber_decaps_bin], check=True)
-
-    shared_secret_path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "shared_secret_receiver.bin"
-    )
-
-    with open(shared_secret_path, "rb") as f:
-        return f.read()
\ No newline at end of file
+    pqc_key_folder = current_app.config["PQC_KEY_FOLDER"]
+    secret_key_path = kem_key_path("kyber_sk.bin", kem_algorithm)
+    suffix = uuid.uuid4().hex
+    ciphertext_path = os.path.join(pqc_key_folder, f"sender_kyber_ct_{suffix}.bin")
+    shared_secret_path = os.path.join(pqc_key_folder, f"shared_secret_receiver_{suffix}.bin")
+    with open(ciphertext_path, "wb") as f:
+        f.write(kyber_ct)
+
+    try:
+        subprocess.run(
+            [kyber_decaps_bin, kem_algorithm, secret_key_path, ciphertext_path, shared_secret_path],
+            check=True
+        )
+
+        with open(shared_secret_path, "rb") as f:
+            return f.read()
+    finally:
+        for path in (ciphertext_path, shared_secret_path):
+            if os.path.exists(path):
+                os.remove(path)
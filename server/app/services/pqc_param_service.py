@@ -0,0 +1,264 @@
+import json
+import os
+import subprocess
+from flask import current_app
+from app.extensions import app_state
+
+
+# ======================================================
+# Parameter sets (FIPS 203 ML-KEM / FIPS 204 ML-DSA)
+# ======================================================
+# id  → value recorded in the ciphertext header (never reuse)
+# *_bytes → sizes as produced by liboqs
+
+KEM_PARAMETER_SETS = {
+    "ML-KEM-512": {
+        "id": 1, "nist_level": 1,
+        "public_key_bytes": 800, "secret_key_bytes": 1632,
+        "ciphertext_bytes": 768, "shared_secret_bytes": 32,
+    },
+    "ML-KEM-768": {
+        "id": 2, "nist_level": 3,
+        "public_key_bytes": 1184, "secret_key_bytes": 2400,
+        "ciphertext_bytes": 1088, "shared_secret_bytes": 32,
+    },
+    "ML-KEM-1024": {
+        "id": 3, "nist_level": 5,
+        "public_key_bytes": 1568, "secret_key_bytes": 3168,
+        "ciphertext_bytes": 1568, "shared_secret_bytes": 32,
+    },
+}
+
+SIG_PARAMETER_SETS = {
+    "ML-DSA-44": {
+        "id": 1, "nist_level": 2,
+        "public_key_bytes": 1312, "secret_key_bytes": 2560,
+        "signature_bytes": 2420,
+    },
+    "ML-DSA-65": {
+        "id": 2, "nist_level": 3,
+        "public_key_bytes": 1952, "secret_key_bytes": 4032,
+        "signature_bytes": 3309,
+    },
+    "ML-DSA-87": {
+        "id": 3, "nist_level": 5,
+        "public_key_bytes": 2592, "secret_key_bytes": 4896,
+        "signature_bytes": 4627,
+    },
+}
+
+_TABLES = {"kem": KEM_PARAMETER_SETS, "sig": SIG_PARAMETER_SETS}
+
+
+def _table(kind: str) -> dict:
+    if kind not in _TABLES:
+        raise ValueError(f"Unknown parameter set kind: {kind}")
+    return _TABLES[kind]
+
+
+def algorithm_id(kind: str, algorithm: str) -> int:
+    table = _table(kind)
+    if algorithm not in table:
+        raise ValueError(f"Unknown {kind.upper()} parameter set: {algorithm}")
+    return table[algorithm]["id"]
+
+
+def algorithm_from_id(kind: str, alg_id: int) -> str:
+    for name, params in _table(kind).items():
+        if params["id"] == alg_id:
+            return name
+    raise ValueError(f"Unknown {kind.upper()} parameter set id: {alg_id}")
+
+
+def algorithm_for_public_key(kind: str, public_key: bytes):
+    """
+    Public key sizes are unique per parameter set, so a key on disk
+    tells us which set it belongs to.
+    """
+    for name, params in _table(kind).items():
+        if params["public_key_bytes"] == len(public_key):
+            return name
+    return None
+
+
+def validate_public_key(kind: str, algorithm: str, public_key: bytes):
+    expected = _table(kind)[algorithm]["public_key_bytes"]
+    if len(public_key) != expected:
+        raise ValueError(
+            f"{algorithm} public key must be {expected} bytes, got {len(public_key)}"
+        )
+
+
+# ======================================================
+# Policy
+# ======================================================
+
+def allowed_algorithms(kind: str) -> list:
+    """
+    Parameter sets this node accepts, in order of preference,
+    filtered by the configured minimum NIST security level.
+    """
+    key = "PQC_ALLOWED_KEM_ALGORITHMS" if kind == "kem" else "PQC_ALLOWED_SIG_ALGORITHMS"
+    min_level = current_app.config["PQC_MIN_SECURITY_LEVEL"]
+    table = _table(kind)
+    return [
+        alg for alg in current_app.config[key]
+        if alg in table and table[alg]["nist_level"] >= min_level
+    ]
+
+
+def ensure_allowed(kind: str, algorithm: str) -> str:
+    if algorithm not in allowed_algorithms(kind):
+        raise ValueError(
+            f"{kind.upper()} parameter set {algorithm} is not allowed by policy"
+        )
+    return algorithm
+
+
+def default_algorithm(kind: str) -> str:
+    key = "PQC_KEM_ALGORITHM" if kind == "kem" else "PQC_SIG_ALGORITHM"
+    return current_app.config[key]
+
+
+def _algorithm_from_key_file(kind: str, filename: str):
+    path = os.path.join(current_app.config["PQC_KEY_FOLDER"], filename)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return algorithm_for_public_key(kind, f.read())
+
+
+def get_kem_algorithm() -> str:
+    """This node's (receiver) KEM parameter set."""
+    return (
+        getattr(app_state, "kem_algorithm", None)
+        or _algorithm_from_key_file("kem", "kyber_pk.bin")
+        or default_algorithm("kem")
+    )
+
+
+def get_sig_algorithm() -> str:
+    """This node's (sender) signature parameter set."""
+    return (
+        getattr(app_state, "sig_algorithm", None)
+        or _algorithm_from_key_file("sig", "dilithium_pk.bin")
+        or default_algorithm("sig")
+    )
+
+
+def _peer_algorithm(kind: str, peer_id: str = None):
+    session = app_state.peer_session(peer_id)
+    key = session["peer_kyber_public_key" if kind == "kem" else "peer_dilithium_public_key"]
+    return (
+        session["peer_kem_algorithm" if kind == "kem" else "peer_sig_algorithm"]
+        or (algorithm_for_public_key(kind, key) if key else None)
+        or default_algorithm(kind)
+    )
+
+
+def get_peer_kem_algorithm(peer_id: str = None) -> str:
+    """KEM parameter set of the receiver's public key (sender side), None → active peer."""
+    return _peer_algorithm("kem", peer_id)
+
+
+def get_peer_sig_algorithm(peer_id: str = None) -> str:
+    """Signature parameter set of the sender's public key (receiver side), None → active peer."""
+    return _peer_algorithm("sig", peer_id)
+
+
+def transfer_algorithms(kem_algorithm: str = None, sig_algorithm: str = None, peer_id: str = None):
+    """
+    Parameter sets of an outgoing transfer to `peer_id` (None → active
+    peer). An override (form field) must name the set of the key it is
+    used with, the receiver's Kyber key or this node's Dilithium key;
+    anything else is a ValueError.
+
+    Returns:
+        (kem_algorithm, sig_algorithm)
+    """
+    bound = {"kem": get_peer_kem_algorithm(peer_id), "sig": get_sig_algorithm()}
+    chosen = {"kem": kem_algorithm, "sig": sig_algorithm}
+    for kind, algorithm in chosen.items():
+        if algorithm and algorithm != bound[kind]:
+            raise ValueError(
+                f"{kind.upper()} parameter set {algorithm} does not match the bound key "
+                f"({bound[kind]}), repeat the handshake to change it"
+            )
+        chosen[kind] = ensure_allowed(kind, bound[kind])
+    return chosen["kem"], chosen["sig"]
+
+
+# ======================================================
+# Negotiation
+# ======================================================
+
+def transfer_cost(kind: str, algorithm: str, cost_matrix: dict = None) -> float:
+    """
+    Per-document cost of a parameter set: measured encaps+decaps or
+    sign+verify time when a cost matrix is available, NIST level otherwise.
+    """
+    measured = (cost_matrix or {}).get(kind, {}).get(algorithm)
+    if measured:
+        if kind == "kem":
+            return measured["encaps_us"] + measured["decaps_us"]
+        return measured["sign_us"] + measured["verify_us"]
+    return float(_table(kind)[algorithm]["nist_level"])
+
+
+def negotiate_algorithm(kind: str, local_allowed, peer_offered, cost_matrix: dict = None):
+    """
+    Picks the cheapest parameter set both peers accept.
+
+    Returns:
+        algorithm name, or None if there is no overlap
+    """
+    candidates = [alg for alg in local_allowed if alg in (peer_offered or [])]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda alg: transfer_cost(kind, alg, cost_matrix))
+
+
+def recommend_parameter_sets(cost_matrix: dict = None) -> dict:
+    """Cheapest allowed KEM and signature parameter set for this host."""
+    return {
+        kind: negotiate_algorithm(kind, allowed_algorithms(kind), allowed_algorithms(kind), cost_matrix)
+        for kind in ("kem", "sig")
+    }
+
+
+# ======================================================
+# Cost matrix (host micro-benchmark)
+# ======================================================
+
+def measure_cost_matrix(iterations: int = 100) -> dict:
+    """
+    Runs the pqc_bench binary over every parameter set and returns
+    per-operation times (µs) and key / ciphertext / signature sizes.
+    """
+    pqc_bench_bin = os.path.join(
+        current_app.root_path,
+        "services", "PQC", "bench", "bin", "pqc_bench"
+    )
+
+    if not os.path.exists(pqc_bench_bin):
+        raise FileNotFoundError(f"pqc_bench binary not found at {pqc_bench_bin}")
+
+    algorithms = list(KEM_PARAMETER_SETS) + list(SIG_PARAMETER_SETS)
+    result = subprocess.run(
+        [pqc_bench_bin, str(iterations), *algorithms],
+        capture_output=True,
+        text=True
+    )
+
+    matrix = {"iterations": iterations, "kem": {}, "sig": {}, "errors": []}
+    for line in result.stdout.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        entry = json.loads(line)
+        matrix[entry.pop("type")][entry.pop("algorithm")] = entry
+
+    if result.returncode != 0:
+        matrix["errors"].append(result.stderr.strip())
+
+    return matrix
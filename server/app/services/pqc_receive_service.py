@@ -0,0 +1,237 @@
+import base64
+import hashlib
+import os
+import threading
+import time
+
+from flask import current_app
+
+from app.services.header_service import PREFIX_SIZE, header_size, parse_header
+from app.services.merkle_service import (
+    MerkleStreamHasher,
+    MerkleStreamVerifier,
+    bind_root,
+    decode_leaves,
+    merkle_root
+)
+from app.services.pqc_key_service import receiver_derive_shared_secret_from_ciphertext
+from app.services.pqc_workflow_service import (
+    pqc_algorithms_from_header,
+    pqc_verify_merkle_manifest
+)
+from app.utils.multipart import iter_multipart
+
+
+# ======================================================
+# Streaming receive (RECEIVER /pqc/decrypt)
+# ======================================================
+# The multipart body is read once from request.stream:
+#
+#   form fields    → kept (signature, kyber_ciphertext, merkle_leaves, ...)
+#   file part      → hashed / leaf-checked and spooled to disk in the
+#                    same pass
+#   header + ct    → Kyber decapsulation starts on a thread as soon as the
+#                    ciphertext field and the file header have arrived,
+#                    so it overlaps the rest of the upload
+#
+# The sender (/pqc/send-file) puts the form fields before the file.
+# If a client sends them after it, hashing still happens in-stream and
+# decapsulation simply runs once the body has been read.
+
+
+class BackgroundDecapsulation:
+    """Kyber decapsulation on a worker thread with its own app context."""
+
+    def __init__(self, kem_algorithm: str, kyber_ct: bytes):
+        self.app = current_app._get_current_object()
+        self.kem_algorithm = kem_algorithm
+        self.kyber_ct = kyber_ct
+        self.shared_secret = None
+        self.error = None
+        self.elapsed_ms = 0.0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        start = time.perf_counter_ns()
+        try:
+            with self.app.app_context():
+                self.shared_secret = receiver_derive_shared_secret_from_ciphertext(self.kem_algorithm, self.kyber_ct)
+        except Exception as e:
+            self.error = e
+        self.elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+
+    def result(self) -> bytes:
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.shared_secret
+
+
+class PQCUploadReceiver:
+    """
+    Consumes the parts of one /pqc/decrypt upload. Feed it with
+    add_field / add_file_data in arrival order, then call finish().
+    peer_id → session of the sender (None → active peer).
+    """
+
+    def __init__(self, encrypted_path: str, peer_id: str = None):
+        self.encrypted_path = encrypted_path
+        self.peer_id = peer_id
+        self.form = {}
+        self.file_seen = False
+        self.out = None
+        self.pending = bytearray()   # file bytes held back until the header is known
+        self.header_fields = None
+        self.kem_algorithm = None
+        self.hasher = None           # hashlib / MerkleStreamHasher / MerkleStreamVerifier
+        self.manifest_verified = False
+        self.decaps = None
+        self.hash_ns = 0
+
+    # ---------------- form fields ----------------
+
+    def add_field(self, name: str, value: str):
+        self.form[name] = value
+        if name == "kyber_ciphertext":
+            self._maybe_start_decaps()
+
+    def kyber_ct(self) -> bytes:
+        return bytes.fromhex(self.form["kyber_ciphertext"])
+
+    def signature(self) -> bytes:
+        return base64.b64decode(self.form["signature"])
+
+    # ---------------- file part ----------------
+
+    def add_file_data(self, data: bytes):
+        if self.out is None:
+            self.file_seen = True
+            self.out = open(self.encrypted_path, "wb")
+
+        if self.header_fields is None:
+            self.pending += data
+            if len(self.pending) < PREFIX_SIZE:
+                return
+            needed = header_size(bytes(self.pending[:PREFIX_SIZE]))
+            if len(self.pending) < needed:
+                return
+            self._start_file(parse_header(bytes(self.pending))[0])
+            data = bytes(self.pending)
+            self.pending.clear()
+
+        self._consume(data)
+
+    def _start_file(self, header_fields: dict):
+        self.header_fields = header_fields
+        self.kem_algorithm, _, _, hash_mode = pqc_algorithms_from_header(header_fields, self.peer_id)
+
+        if hash_mode != "merkle-sha512":
+            self.hasher = hashlib.sha512()
+        elif all(k in self.form for k in ("merkle_leaves", "signature", "kyber_ciphertext")):
+            # Authenticate the leaf list once, then reject at the first bad leaf
+            leaf_hashes = decode_leaves(base64.b64decode(self.form["merkle_leaves"]))
+            pqc_verify_merkle_manifest(header_fields, leaf_hashes, self.kyber_ct(), self.signature(),
+                                       self.peer_id)
+            self.hasher = MerkleStreamVerifier(leaf_hashes, header_fields["leaf"])
+            self.manifest_verified = True
+        else:
+            self.hasher = MerkleStreamHasher(header_fields["leaf"])
+
+        self._maybe_start_decaps()
+
+    def _consume(self, data: bytes):
+        start = time.perf_counter_ns()
+        self.hasher.update(data)
+        self.hash_ns += time.perf_counter_ns() - start
+        self.out.write(data)
+
+    def _maybe_start_decaps(self):
+        if self.decaps is None and self.kem_algorithm and "kyber_ciphertext" in self.form:
+            self.decaps = BackgroundDecapsulation(self.kem_algorithm, self.kyber_ct())
+
+    # ---------------- end of body ----------------
+
+    def finish(self) -> dict:
+        """
+        Returns:
+            {
+                form,
+                file_hash,
+                shared_secret,
+                manifest_verified,
+                timings → stream hash / decapsulation durations (ms)
+            }
+        """
+        if not self.file_seen:
+            raise ValueError("Encrypted file missing")
+        for name in ("signature", "kyber_ciphertext"):
+            if name not in self.form:
+                raise ValueError("Missing signature or Kyber ciphertext")
+
+        if self.header_fields is None:
+            # Shorter than a header: legacy file or garbage
+            self._start_file(parse_header(bytes(self.pending))[0])
+            data = bytes(self.pending)
+            self.pending.clear()
+            self._consume(data)
+        self.out.close()
+
+        start = time.perf_counter_ns()
+        kyber_ct = self.kyber_ct()
+        if isinstance(self.hasher, MerkleStreamVerifier):
+            self.hasher.finalize()
+            file_hash = bind_root(merkle_root(self.hasher.expected), kyber_ct)
+        elif isinstance(self.hasher, MerkleStreamHasher):
+            file_hash = bind_root(merkle_root(self.hasher.finalize()), kyber_ct)
+        else:
+            self.hasher.update(kyber_ct)
+            file_hash = self.hasher.digest()
+        self.hash_ns += time.perf_counter_ns() - start
+
+        self._maybe_start_decaps()
+        shared_secret = self.decaps.result()
+
+        return {
+            "form": self.form,
+            "file_hash": file_hash,
+            "shared_secret": shared_secret,
+            "manifest_verified": self.manifest_verified,
+            "timings": {
+                "Hash_generation": self.hash_ns / 1e6,
+                "key_ecapsulation": self.decaps.elapsed_ms
+            }
+        }
+
+    def abort(self):
+        if self.out is not None:
+            self.out.close()
+        if self.decaps is not None:
+            self.decaps.thread.join()
+        if os.path.exists(self.encrypted_path):
+            os.remove(self.encrypted_path)
+
+
+def receive_pqc_upload(stream, boundary: str, encrypted_path: str, max_form_memory_size=None,
+                       peer_id: str = None):
+    """
+    Reads a multipart /pqc/decrypt body from `stream` in one pass,
+    spooling the file part to encrypted_path.
+
+    Raises ValueError on malformed or tampered uploads; the partial
+    file is removed.
+
+    Returns:
+        PQCUploadReceiver.finish() result
+    """
+    receiver = PQCUploadReceiver(encrypted_path, peer_id)
+    try:
+        for part in iter_multipart(stream, boundary, max_form_memory_size):
+            if part[0] == "field":
+                receiver.add_field(part[1], part[2])
+            elif part[1] == "file" and part[3]:
+                receiver.add_file_data(part[3])
+        return receiver.finish()
+    except Exception:
+        receiver.abort()
+        raise
@@ -1,7 +1,10 @@
 import os
 import subprocess
+import uuid
 from flask import current_app
 
+from app.services.pqc_key_service import load_peer_dilithium_public_key
+
 
 # ======================================================
 # Helper: write / read binary files
@@ -17,16 +20,30 @@ def _read_binary(path: str) -> bytes:
         return f.read()
 
 
+def _scratch_path(pqc_key_folder: str, name: str) -> str:
+    # One file per call: concurrent sign / verify calls must not share inputs
+    return os.path.join(pqc_key_folder, f"{name}_{uuid.uuid4().hex}.bin")
+
+
+def _remove_quietly(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
 # ======================================================
 # SIGNATURE GENERATION (Sender side)
 # ======================================================
 
-def sign_hash_with_dilithium(hash_bytes: bytes) -> bytes:
+def sign_hash_with_dilithium(hash_bytes: bytes, sig_algorithm: str) -> bytes:
     """
     Signs a hash using Dilithium (ML-DSA) private key.
 
     Input:
-        hash_bytes → hash of encrypted file + Kyber ciphertext
+        hash_bytes    → hash of encrypted file + Kyber ciphertext
+        sig_algorithm → parameter set of the signing key (e.g. ML-DSA-65)
 
     Output:
         signature bytes
@@ -34,11 +51,9 @@ def sign_hash_with_dilithium(hash_bytes: bytes) -> bytes:
 
     pqc_key_folder = current_app.config["PQC_KEY_FOLDER"]
 
-    hash_path = os.path.join(pqc_key_folder, "data_to_sign.bin")
-    sig_path = os.path.join(pqc_key_folder, "signature.bin")
-
-    # Write hash to file (input for C binary)
-    _write_binary(hash_path, hash_bytes)
+    hash_path = _scratch_path(pqc_key_folder, "data_to_sign")
+    sig_path = _scratch_path(pqc_key_folder, "signature")
+    secret_key_path = os.path.join(pqc_key_folder, "dilithium_sk.bin")
 
     dilithium_sign_bin = os.path.join(
         current_app.root_path,
@@ -48,23 +63,36 @@ def sign_hash_with_dilithium(hash_bytes: bytes) -> bytes:
     if not os.path.exists(dilithium_sign_bin):
         raise FileNotFoundError("Dilithium sign binary not found")
 
+    # Write hash to file (input for C binary)
+    _write_binary(hash_path, hash_bytes)
+
     # Run Dilithium signing binary
-    subprocess.run(
-        [dilithium_sign_bin],
-        check=True
-    )
+    try:
+        subprocess.run(
+            [dilithium_sign_bin, sig_algorithm, secret_key_path, hash_path, sig_path],
+            check=True
+        )
 
-    # Read generated signature
-    return _read_binary(sig_path)
+        # Read generated signature
+        return _read_binary(sig_path)
+    finally:
+        _remove_quietly(hash_path, sig_path)
 
 
 # ======================================================
 # SIGNATURE VERIFICATION (Receiver side)
 # ======================================================
 
-def verify_dilithium_signature(hash_bytes: bytes, signature: bytes) -> bool:
+def verify_dilithium_signature(
+    hash_bytes: bytes,
+    signature: bytes,
+    sig_algorithm: str,
+    public_key: bytes = None
+) -> bool:
     """
-    Verifies Dilithium (ML-DSA) signature.
+    Verifies Dilithium (ML-DSA) signature against the sender's public key.
+    sig_algorithm → parameter set recorded in the ciphertext header
+    public_key    → other signer's raw public key (default: the active peer's)
 
     Returns:
         True  → signature valid
@@ -73,12 +101,13 @@ def verify_dilithium_signature(hash_bytes: bytes, signature: bytes) -> bool:
 
     pqc_key_folder = current_app.config["PQC_KEY_FOLDER"]
 
-    hash_path = os.path.join(pqc_key_folder, "data_to_verify.bin")
-    sig_path = os.path.join(pqc_key_folder, "signature.bin")
+    if public_key is None:
+        public_key = load_peer_dilithium_public_key()
 
-    # Write verification inputs
-    _write_binary(hash_path, hash_bytes)
-    _write_binary(sig_path, signature)
+    hash_path = _scratch_path(pqc_key_folder, "data_to_verify")
+    sig_path = _scratch_path(pqc_key_folder, "signature")
+    public_key_path = _scratch_path(pqc_key_folder, "verify_pk")
+    scratch = [hash_path, sig_path, public_key_path]
 
     dilithium_verify_bin = os.path.join(
         current_app.root_path,
@@ -88,11 +117,22 @@ def verify_dilithium_signature(hash_bytes: bytes, signature: bytes) -> bool:
     if not os.path.exists(dilithium_verify_bin):
         raise FileNotFoundError("Dilithium verify binary not found")
 
+    # Write verification inputs
+    _write_binary(hash_path, hash_bytes)
+    _write_binary(sig_path, signature)
+    _write_binary(public_key_path, public_key)
+
     # Run verification binary
-    result = subprocess.run(
-        [dilithium_verify_bin],
-        capture_output=True
-    )
+    try:
+        result = subprocess.run(
+            [dilithium_verify_bin, sig_algorithm, public_key_path, hash_path, sig_path],
+            capture_output=True
+        )
+    finally:
+        _remove_quietly(*scratch)
+
+    # Convention: exit code 0 → valid signature, 1 → invalid, 2 → error
+    if result.returncode == 2:
+        print(f"Dilithium verify error: {result.stderr.decode(errors='replace').strip()}")
 
-    # Convention: exit code 0 → valid signature
     return result.returncode == 0
\ No newline at end of file
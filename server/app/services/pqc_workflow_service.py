@@ -2,6 +2,7 @@ from urllib import response
 
 from flask import current_app
 import os
+import time
 from supabase import create_client, Client
 from dotenv import load_dotenv
 load_dotenv()
@@ -14,90 +15,178 @@ from app.services.pqc_key_service import (
 
 # Crypto
 from app.services.crypto_service import (
+    HASH_MODES,
     derive_aes_key_from_shared_secret,
-    compute_hash_from_encrypted_file_and_kyber_ct
+    compute_hash_from_encrypted_file_and_kyber_ct,
+    compute_merkle_hash_from_encrypted_file_and_kyber_ct,
+    hash_mode_from_header
 )
+from app.services.merkle_service import bind_root, merkle_root
 
 # AES encryption
 from app.services.pqc_encryption_service import (
     encrypt_file_with_aes_key,
+    encrypt_stream_with_aes_key,
     decrypt_file_with_aes_key
 )
 
-# Signatures
-from app.services.pqc_signature_service import (
-    sign_hash_with_dilithium,
-    verify_dilithium_signature
+# Signatures (optionally coalesced across concurrent documents)
+from app.services.coalescing_signer_service import (
+    sign_document_hash,
+    verify_document_signature
 )
-# Timer
-import time
+
+# Parameter sets + ciphertext header
+from app.services.pqc_param_service import (
+    algorithm_id,
+    algorithm_from_id,
+    ensure_allowed,
+    get_kem_algorithm,
+    get_peer_sig_algorithm,
+    transfer_algorithms
+)
+from app.services.header_service import build_header, read_header
+from app.services.stage_graph_service import (
+    run_stage_graph,
+    print_stage_report,
+    stage_timings
+)
+from app.services.cipher_suite_service import (
+    cipher_header_fields,
+    ensure_cipher_allowed,
+    get_cipher_suite,
+    suite_from_header
+)
+from app.services.compression_service import compression_header_fields
+from app.services.metrics_service import stage_metrics
 
 # ======================================================
 # SENDER WORKFLOW (Encrypt + Sign)
 # ======================================================
 
-def pqc_encrypt_file_workflow(input_path: str):
+def pqc_encrypt_file_workflow(
+    input_path: str,
+    kem_algorithm: str = None,
+    sig_algorithm: str = None,
+    cipher_suite: str = None,
+    reader=None,
+    peer_id: str = None
+):
     """
     PQC-based encryption workflow (Sender side)
 
+    kem_algorithm / sig_algorithm override the negotiated parameter
+    sets for this transfer, cipher_suite the calibrated / configured
+    bulk cipher; all are recorded in the ciphertext header, as is the
+    hash mode (PQC_HASH_MODE: linear SHA-512 or Merkle tree).
+
+    reader → plaintext stream (file_service.UploadStream) encrypted as
+    it arrives; input_path then only names the output file.
+
+    peer_id → receiver session whose Kyber key is used (None → active peer)
+
     Returns:
         {
             encrypted_file_path,
             kyber_ciphertext,
             file_hash,
-            signature
+            signature,
+            kem_algorithm,
+            sig_algorithm,
+            cipher_suite,
+            hash_mode,
+            merkle_leaves → leaf hashes (Merkle mode) or None
         }
     """
+    kem_algorithm, sig_algorithm = transfer_algorithms(kem_algorithm, sig_algorithm, peer_id)
+    cipher_suite = ensure_cipher_allowed(cipher_suite or get_cipher_suite())
+    hash_mode = current_app.config["PQC_HASH_MODE"]
+    leaf_size = current_app.config["MERKLE_LEAF_SIZE"]
+    if reader is not None:
+        compression_fields = compression_header_fields(
+            None, reader.peek(current_app.config["COMPRESSION_SAMPLE_BYTES"])
+        )
+    else:
+        compression_fields = compression_header_fields(input_path)
+    header = build_header({
+        "kem": algorithm_id("kem", kem_algorithm),
+        "sig": algorithm_id("sig", sig_algorithm),
+        **cipher_header_fields(cipher_suite),
+        **compression_fields,
+        "hash": HASH_MODES[hash_mode],
+        "leaf": leaf_size if hash_mode == "merkle-sha512" else None
+    })
+
     url: str = os.getenv("SUPABASE_URL")
     key: str = os.getenv("SUPABASE_KEY")
-    supabase: Client = create_client(url, key)
-    kyber_start = time.perf_counter_ns()
+    supabase: Client = create_client(url, key) if url and key else None
+
     # 1️⃣ Kyber encapsulation (shared secret + ciphertext)
-    shared_secret, kyber_ct = sender_generate_shared_secret_and_ciphertext()
-    kyber_end = time.perf_counter_ns()
-    print(f"Kyber encapsulation time: {(kyber_end - kyber_start) / 1e6:.2f} ms")  # Debug print of time taken
+    def key_encapsulation(r):
+        return sender_generate_shared_secret_and_ciphertext(kem_algorithm, peer_id)
+
     # 2️⃣ Derive AES key from shared secret
-    print(f"Derived shared secret: {shared_secret.hex()}")  # Debug print of shared secret
+    def derive_key(r):
+        return derive_aes_key_from_shared_secret(r["key_encapsulation"][0])
 
-    derive_start = time.perf_counter_ns()
-    aes_key = derive_aes_key_from_shared_secret(shared_secret)
-    derive_end = time.perf_counter_ns()
-    print(f"AES key derivation time: {(derive_end - derive_start) / 1e6:.2f} ms")  # Debug print of time taken
-    print(f"Derived AES key: {aes_key.hex()}")  # Debug print of AES key
     # 3️⃣ AES encrypt file
-    
-    aes_start = time.perf_counter_ns()
-    encrypted_path = encrypt_file_with_aes_key(
-        input_path,
-        current_app.config["ENCRYPTED_FOLDER"],
-        aes_key
-    )
-    aes_end = time.perf_counter_ns()
-    print(f"AES encryption time: {(aes_end - aes_start) / 1e6:.2f} ms")  # Debug print of time taken
+    def aes_encrypt(r):
+        if reader is not None:
+            return encrypt_stream_with_aes_key(
+                reader,
+                input_path,
+                current_app.config["ENCRYPTED_FOLDER"],
+                r["derive_key"],
+                header
+            )
+        return encrypt_file_with_aes_key(
+            input_path,
+            current_app.config["ENCRYPTED_FOLDER"],
+            r["derive_key"],
+            header
+        )
 
     # 4️⃣ Hash encrypted file + Kyber ciphertext
-    hash_start = time.perf_counter_ns()
-    file_hash = compute_hash_from_encrypted_file_and_kyber_ct(
-        encrypted_path,
-        f"{current_app.config['PQC_KEY_FOLDER']}/kyber_ct.bin"
-    )
-    hash_end = time.perf_counter_ns()
-    print(f"Hash computation time: {(hash_end - hash_start) / 1e6:.2f} ms")  # Debug print of time taken
+    def hash_generation(r):
+        kyber_ct = r["key_encapsulation"][1]
+        if hash_mode == "merkle-sha512":
+            return compute_merkle_hash_from_encrypted_file_and_kyber_ct(
+                r["AES_encrypt"],
+                kyber_ct,
+                leaf_size,
+                current_app.config["MERKLE_WORKERS"]
+            )
+        return compute_hash_from_encrypted_file_and_kyber_ct(r["AES_encrypt"], kyber_ct), None
 
     # 5️⃣ Sign hash using Dilithium
-    sign_start = time.perf_counter_ns()
-    signature = sign_hash_with_dilithium(file_hash)
-    sign_end = time.perf_counter_ns()
-    print(f"Dilithium signature time: {(sign_end - sign_start) / 1e6:.2f} ms")  # Debug print of time taken
+    def sign_generation(r):
+        return sign_document_hash(r["Hash_generation"][0], sig_algorithm)
+
+    # Everything after the encapsulation needs its key, so this graph is
+    # a chain; it still reports per-stage wait/run times like decryption.
+    # A streamed upload is read on the request thread, not the stage pool,
+    # and so is signing: a coalesced signature waits for its window, which
+    # must not hold a pool thread, and the window must be able to fill with
+    # more requests than the pool has threads.
+    results, report = run_stage_graph([
+        ("key_encapsulation", key_encapsulation, []),
+        ("derive_key", derive_key, ["key_encapsulation"]),
+        ("AES_encrypt", aes_encrypt, ["derive_key"]),
+        ("Hash_generation", hash_generation, ["AES_encrypt", "key_encapsulation"]),
+        ("Sign_generation", sign_generation, ["Hash_generation"]),
+    ], inline={"AES_encrypt", "Sign_generation"} if reader is not None else {"Sign_generation"})
+    shared_secret, kyber_ct = results["key_encapsulation"]
+    aes_key = results["derive_key"]
+    encrypted_path = results["AES_encrypt"]
+    file_hash, merkle_leaves = results["Hash_generation"]
+    signature = results["Sign_generation"]
+    print_stage_report("PQC encrypt", report)
 
     data = {
         "file_name": os.path.basename(input_path),
-        "key_encapsulation": (kyber_end - kyber_start) / 1e6,  # ms
-        "derive_key": (derive_end - derive_start) / 1e6,       # ms
-        "AES_encrypt": (aes_end - aes_start) / 1e6,
-        "Hash_generation": (hash_end - hash_start) / 1e6,
-        "Sign_generation": (sign_end - sign_start) / 1e6              # ms
+        **stage_timings(report)
     }
+    stage_metrics.record("pqc_encrypt", data)
 #     response = supabase.table("post-quantum encryption").insert(data).execute()
 
 # # Optional debug
@@ -108,7 +197,14 @@ def pqc_encrypt_file_workflow(input_path: str):
         "kyber_ciphertext": kyber_ct,
         "shared_secret": shared_secret,
         "file_hash": file_hash,
-        "signature": signature
+        "signature": signature,
+        "kem_algorithm": kem_algorithm,
+        "sig_algorithm": sig_algorithm,
+        "cipher_suite": cipher_suite,
+        "hash_mode": hash_mode,
+        "merkle_leaves": merkle_leaves,
+        "timings": data,
+        "stages": report
     }
 
 
@@ -116,69 +212,180 @@ def pqc_encrypt_file_workflow(input_path: str):
 # RECEIVER WORKFLOW (Verify + Decrypt)
 # ======================================================
 
+def pqc_algorithms_from_header(header_fields: dict, peer_id: str = None):
+    """
+    Parameter sets, cipher suite and hash mode of a received file,
+    checked against this node's policy. Legacy files without a header
+    use this node's KEM key and the signature key of peer_id (None →
+    active peer).
+
+    Returns:
+        (kem_algorithm, sig_algorithm, cipher_suite, hash_mode)
+    """
+    kem_algorithm = (
+        algorithm_from_id("kem", header_fields["kem"]) if "kem" in header_fields
+        else get_kem_algorithm()
+    )
+    sig_algorithm = (
+        algorithm_from_id("sig", header_fields["sig"]) if "sig" in header_fields
+        else get_peer_sig_algorithm(peer_id)
+    )
+    cipher_suite = suite_from_header(header_fields)
+    hash_mode = hash_mode_from_header(header_fields)
+    ensure_allowed("kem", kem_algorithm)
+    ensure_allowed("sig", sig_algorithm)
+    ensure_cipher_allowed(cipher_suite)
+    return kem_algorithm, sig_algorithm, cipher_suite, hash_mode
+
+
+def pqc_verify_merkle_manifest(header_fields: dict, leaf_hashes, kyber_ct: bytes, signature: bytes,
+                               peer_id: str = None):
+    """
+    Checks the sender's Merkle leaf list against the signature before
+    any file data is trusted, so the receiver can then verify every
+    leaf as it arrives. peer_id → sender session (None → active peer)
+
+    Returns:
+        signed hash (root bound to the Kyber ciphertext)
+    """
+    _, sig_algorithm, _, _ = pqc_algorithms_from_header(header_fields, peer_id)
+    return verify_merkle_manifest(sig_algorithm, leaf_hashes, kyber_ct, signature, peer_id)
+
+
+def verify_merkle_manifest(sig_algorithm: str, leaf_hashes, kyber_ct: bytes, signature: bytes,
+                           peer_id: str = None):
+    """
+    pqc_verify_merkle_manifest for a caller that already knows the
+    (policy-checked) signature parameter set.
+
+    Returns:
+        signed hash (root bound to the Kyber ciphertext)
+    """
+    file_hash = bind_root(merkle_root(leaf_hashes), kyber_ct)
+    if not verify_document_signature(file_hash, signature, sig_algorithm, peer_id):
+        raise Exception("Signature verification failed")
+    return file_hash
+
+
+def pqc_verify_received(encrypted_file_path: str, signature: bytes, received: dict,
+                        peer_id: str = None) -> dict:
+    """
+    Signature check of a received upload ahead of decryption, so the
+    receiver can acknowledge the delivery before decrypting it.
+    peer_id → sender session (None → active peer)
+
+    Returns:
+        received, marked signature_verified (decrypt workflow skips the check)
+    """
+    fields, _ = read_header(encrypted_file_path)
+    _, sig_algorithm, _, _ = pqc_algorithms_from_header(fields, peer_id)
+
+    start = time.perf_counter_ns()
+    if not received.get("manifest_verified"):
+        if not verify_document_signature(received["file_hash"], signature, sig_algorithm, peer_id):
+            raise Exception("Signature verification failed")
+    timings = {**received.get("timings", {}), "Verify_signature": (time.perf_counter_ns() - start) / 1e6}
+    return {**received, "signature_verified": True, "timings": timings}
+
+
 def pqc_decrypt_file_workflow(
     encrypted_file_path: str,
     signature: bytes,
-    original_filename: str
+    original_filename: str,
+    received: dict = None,
+    peer_id: str = None,
+    kyber_ct: bytes = None
 ):
     """
     PQC-based decryption workflow (Receiver side)
 
+    The parameter sets are taken from the ciphertext header; legacy
+    files without a header use this node's key and the peer's key.
+
+    received → result of pqc_receive_service.receive_pqc_upload: the
+    hash and the Kyber shared secret were already produced while the
+    upload streamed in, so only signature verification (skipped when
+    the Merkle leaf list or pqc_verify_received checked it up front)
+    and decryption remain.
+
+    peer_id → sender session whose key signed the file (None → active peer)
+    kyber_ct → Kyber ciphertext of this transfer, needed unless `received`
+    already carries the hash and the shared secret
+
     Returns:
         decrypted_file_path
     """
+    fields, _ = read_header(encrypted_file_path)
+    kem_algorithm, sig_algorithm, cipher_suite, hash_mode = pqc_algorithms_from_header(fields, peer_id)
+    received = received or {}
+    stream_timings = received.get("timings", {})
+    if kyber_ct is None and (received.get("file_hash") is None or received.get("shared_secret") is None):
+        raise ValueError("Kyber ciphertext missing")
+
     url: str = os.getenv("SUPABASE_URL")
     key: str = os.getenv("SUPABASE_KEY")
-    supabase: Client = create_client(url, key)
-    # 1️⃣ Hash encrypted file + Kyber ciphertext
-    hash_start = time.perf_counter_ns()
-    file_hash = compute_hash_from_encrypted_file_and_kyber_ct(
-        encrypted_file_path,
-        f"{current_app.config['PQC_KEY_FOLDER']}/kyber_ct.bin"
-    )
-    hash_end = time.perf_counter_ns()
-    print(f"Hash computation time: {(hash_end - hash_start) / 1e6:.2f} ms")  # Debug print of time taken
+    supabase: Client = create_client(url, key) if url and key else None
+
+    # 1️⃣ Hash encrypted file + received Kyber ciphertext
+    def hash_generation(r):
+        if received.get("file_hash") is not None:
+            return received["file_hash"]
+        if hash_mode == "merkle-sha512":
+            return compute_merkle_hash_from_encrypted_file_and_kyber_ct(
+                encrypted_file_path,
+                kyber_ct,
+                fields["leaf"],
+                current_app.config["MERKLE_WORKERS"]
+            )[0]
+        return compute_hash_from_encrypted_file_and_kyber_ct(encrypted_file_path, kyber_ct)
 
     # 2️⃣ Verify Dilithium signature
-    verify_start = time.perf_counter_ns()
-    if not verify_dilithium_signature(file_hash, signature):
-        raise Exception("Signature verification failed")
-    verify_end = time.perf_counter_ns()
-    print(f"Dilithium signature verification time: {(verify_end - verify_start) / 1e6:.2f} ms")  # Debug print of time taken
+    def verify_signature(r):
+        if received.get("manifest_verified") or received.get("signature_verified"):
+            return True
+        if not verify_document_signature(r["Hash_generation"], signature, sig_algorithm, peer_id):
+            raise Exception("Signature verification failed")
+        return True
 
-    # 3️⃣ Kyber decapsulation (derive shared secret)
-    kyber_start = time.perf_counter_ns()
-    shared_secret = receiver_derive_shared_secret_from_ciphertext()
-    kyber_end = time.perf_counter_ns()
-    print(f"Kyber decapsulation time: {(kyber_end - kyber_start) / 1e6:.2f} ms")  # Debug print of time taken
-    print(f"Derived shared secret: {shared_secret.hex()}")  # Debug print of shared secret
+    # 3️⃣ Kyber decapsulation (derive shared secret) – independent of the hash
+    def key_decapsulation(r):
+        if received.get("shared_secret") is not None:
+            return received["shared_secret"]
+        return receiver_derive_shared_secret_from_ciphertext(kem_algorithm, kyber_ct)
 
     # 4️⃣ Derive AES key from shared secret
-    derive_start = time.perf_counter_ns()
-    aes_key = derive_aes_key_from_shared_secret(shared_secret)
-    derive_end = time.perf_counter_ns()
-    print(f"AES key derivation time: {(derive_end - derive_start) / 1e6:.2f} ms")  # Debug print of time taken
-    print(f"Derived AES key: {aes_key.hex()}")  # Debug print of AES key
-
-    # 5️⃣ AES decrypt file
-    aes_start = time.perf_counter_ns()
-    decrypted_path = decrypt_file_with_aes_key(
-        encrypted_file_path,
-        current_app.config["DECRYPTED_FOLDER"],
-        aes_key,
-        original_filename
-    )
-    aes_end = time.perf_counter_ns()
-    print(f"AES decryption time: {(aes_end - aes_start) / 1e6:.2f} ms")  # Debug print of time taken
+    def derive_key(r):
+        return derive_aes_key_from_shared_secret(r["key_ecapsulation"])
+
+    # 5️⃣ AES decrypt file (only once the signature checked out)
+    def aes_decrypt(r):
+        return decrypt_file_with_aes_key(
+            encrypted_file_path,
+            current_app.config["DECRYPTED_FOLDER"],
+            r["derive_key"],
+            original_filename
+        )
+
+    results, report = run_stage_graph([
+        ("Hash_generation", hash_generation, []),
+        ("Verify_signature", verify_signature, ["Hash_generation"]),
+        ("key_ecapsulation", key_decapsulation, []),
+        ("derive_key", derive_key, ["key_ecapsulation"]),
+        ("AES_decryption", aes_decrypt, ["Verify_signature", "derive_key"]),
+    ])
+    file_hash = results["Hash_generation"]
+    shared_secret = results["key_ecapsulation"]
+    aes_key = results["derive_key"]
+    decrypted_path = results["AES_decryption"]
+    print_stage_report("PQC decrypt", report)
 
     data = {
         "file_name": original_filename,
-        "Hash_generation": (hash_end - hash_start) / 1e6,          # ms
-        "Verify_signature": (verify_end - verify_start) / 1e6,     # ms
-        "key_ecapsulation": (kyber_end - kyber_start) / 1e6,
-        "derive_key": (derive_end - derive_start) / 1e6,       # ms
-        "AES_decryption": (aes_end - aes_start) / 1e6              # ms
+        **stage_timings(report)
     }
+    # Work that overlapped the upload is reported with its own duration
+    data.update(stream_timings)
+    stage_metrics.record("pqc_decrypt", data)
 
 #     response = supabase.table("post-quantum decryption").insert(data).execute()
 
@@ -190,5 +397,11 @@ def pqc_decrypt_file_workflow(
         "shared_secret": shared_secret,
         "signature_verified": True,
         "original_filename": original_filename,
+        "kem_algorithm": kem_algorithm,
+        "sig_algorithm": sig_algorithm,
+        "cipher_suite": cipher_suite,
+        "hash_mode": hash_mode,
+        "timings": data,
+        "stages": report,
         # This can be added if needed for debugging       
     }
\ No newline at end of file
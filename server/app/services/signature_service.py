@@ -1,7 +1,6 @@
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
+from app.services.key_cache import load_public_key_pem
 
 
 def sign_hash(hash_bytes, private_key):
@@ -23,11 +22,7 @@ def verify_signature(hash_bytes, signature, public_key_pem):
     """
     Verifies RSA signature.
     """
-    if isinstance(public_key_pem, str):
-        public_key_pem = public_key_pem.encode('utf-8')
-    public_key = serialization.load_pem_public_key(
-        public_key_pem, 
-    )
+    public_key = load_public_key_pem(public_key_pem)
     try:
         public_key.verify(
             signature,
@@ -41,3 +36,26 @@ def verify_signature(hash_bytes, signature, public_key_pem):
         return True
     except Exception:
         return False
+
+
+# ======================================================
+# Ed25519 (fast classical suite)
+# ======================================================
+
+def ed25519_sign_hash(hash_bytes, private_key):
+    """
+    Signs hash using Ed25519 private key.
+    """
+    return private_key.sign(hash_bytes)
+
+
+def ed25519_verify_signature(hash_bytes, signature, public_key_pem):
+    """
+    Verifies Ed25519 signature.
+    """
+    public_key = load_public_key_pem(public_key_pem)
+    try:
+        public_key.verify(signature, hash_bytes)
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,172 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from flask import current_app, has_app_context
+
+
+# ======================================================
+# Stage graph executor (workflows)
+# ======================================================
+# A workflow is a list of stages:
+#
+#   (name, fn, deps)   fn(results) → value, results holds every
+#                      finished stage's value by name
+#
+# The calling thread starts each stage on a shared pool as soon as its
+# dependencies are done, so independent stages overlap and the wall
+# clock follows the longest dependency chain. Stages named in `inline`
+# (those reading the request body) run on the calling thread instead:
+# the pool is sized for CPU work (STAGE_WORKERS), and a stage paced by
+# a client's upload would hold a pool thread for as long as the upload
+# lasts while SERVE_THREADS requests share the pool. Per stage it records:
+#
+#   wait_ms → ready (deps done) until a pool thread picked it up
+#   run_ms  → time spent in fn
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = current_app.config["STAGE_WORKERS"] if has_app_context() else 4
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage")
+        return _pool
+
+
+def _run_stage(app, fn, results, times):
+    times["start"] = time.perf_counter_ns()
+    try:
+        if app is None:
+            return fn(results)
+        with app.app_context():
+            return fn(results)
+    finally:
+        times["end"] = time.perf_counter_ns()
+
+
+def run_stage_graph(stages: list, inline=()):
+    """
+    Runs the stages in dependency order, overlapping independent ones.
+    On the first failure no new stage is started, running ones are
+    waited for and the error is re-raised.
+
+    inline → names of stages run on the calling thread, once the ready
+    pool stages have been started
+
+    Returns:
+        (results {name: value}, report) → report is
+        {
+            wall_ms,
+            critical_path → stage names on the longest chain,
+            stages → {name: {wait_ms, run_ms, start_ms, end_ms}}
+        }
+    """
+    names = [name for name, _, _ in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("Duplicate stage name")
+    for name, _, deps in stages:
+        for dep in deps:
+            if dep not in names:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+
+    app = current_app._get_current_object() if has_app_context() else None
+    pool = _get_pool()
+
+    results = {}
+    times = {name: {} for name in names}
+    pending = {name: (fn, set(deps)) for name, fn, deps in stages}
+    running = {}
+    error = None
+    graph_start = time.perf_counter_ns()
+
+    while pending or running:
+        if error is None:
+            ready = [n for n, (_, deps) in pending.items() if deps <= results.keys()]
+            for name in ready:
+                if name in inline:
+                    continue
+                fn, _ = pending.pop(name)
+                times[name]["ready"] = time.perf_counter_ns()
+                # Stages only read the results of finished stages, a snapshot is enough
+                future = pool.submit(_run_stage, app, fn, dict(results), times[name])
+                running[future] = name
+
+            local = next((n for n in ready if n in inline), None)
+            if local is not None:
+                fn, _ = pending.pop(local)
+                times[local]["ready"] = time.perf_counter_ns()
+                try:
+                    # Already in the caller's app context
+                    results[local] = _run_stage(None, fn, dict(results), times[local])
+                except Exception as e:
+                    error = e
+                continue
+        elif not running:
+            break
+
+        if not running:
+            raise ValueError(f"Stage graph has a cycle: {sorted(pending)}")
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                if error is None:
+                    error = e
+
+    if error is not None:
+        raise error
+
+    return results, _report(stages, times, graph_start)
+
+
+def _report(stages: list, times: dict, graph_start: int) -> dict:
+    deps_of = {name: deps for name, _, deps in stages}
+
+    def ms(ns):
+        return (ns - graph_start) / 1e6
+
+    report = {}
+    for name, t in times.items():
+        report[name] = {
+            "wait_ms": (t["start"] - t["ready"]) / 1e6,
+            "run_ms": (t["end"] - t["start"]) / 1e6,
+            "start_ms": ms(t["start"]),
+            "end_ms": ms(t["end"])
+        }
+
+    # Walk back from the last stage to finish through the dependency
+    # that finished last, i.e. the one that held each stage back
+    path = []
+    current = max(times, key=lambda n: times[n]["end"]) if times else None
+    while current is not None:
+        path.append(current)
+        deps = deps_of[current]
+        current = max(deps, key=lambda n: times[n]["end"]) if deps else None
+    path.reverse()
+
+    return {
+        "wall_ms": (max((t["end"] for t in times.values()), default=graph_start) - graph_start) / 1e6,
+        "critical_path": path,
+        "stages": report
+    }
+
+
+def stage_timings(report: dict) -> dict:
+    """Flattens a report into the workflows' {stage: run ms} timings."""
+    timings = {name: stage["run_ms"] for name, stage in report["stages"].items()}
+    timings["wall_clock"] = report["wall_ms"]
+    return timings
+
+
+def print_stage_report(title: str, report: dict):
+    for name, stage in report["stages"].items():
+        print(f"{title} {name}: wait {stage['wait_ms']:.2f} ms, run {stage['run_ms']:.2f} ms")
+    print(f"{title} wall clock {report['wall_ms']:.2f} ms, "
+          f"critical path {' → '.join(report['critical_path'])}")
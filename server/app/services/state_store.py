@@ -0,0 +1,235 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+
+
+# ======================================================
+# Node state store
+# ======================================================
+# Records (JSON-compatible dicts, bytes allowed) grouped in collections
+# and kept in insertion order:
+#
+#   node        → "self": role, own parameter sets, active peer, ...
+#   sessions    → one record per peer: its keys and negotiated suites
+#   handshakes  → discovery / acknowledgment flags of the listener threads
+#   inbox, pqc_inbox, downloads → received files
+#   deliveries  → transfer ids in flight / completed (delivery_service)
+#
+# Every operation is atomic. The memory backend serves the threads of
+# one process; the SQLite backend (STATE_BACKEND = "sqlite") is shared
+# by every worker process of the node through one database file.
+
+class MemoryStateStore:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.collections = {}
+
+    def _collection(self, collection: str) -> dict:
+        return self.collections.setdefault(collection, {})
+
+    def get(self, collection: str, key: str):
+        with self.lock:
+            return copy.deepcopy(self._collection(collection).get(key))
+
+    def put(self, collection: str, key: str, record: dict):
+        with self.lock:
+            self._collection(collection)[key] = copy.deepcopy(record)
+
+    def update(self, collection: str, key: str, fields: dict) -> dict:
+        """Merges fields into a record, creating it if needed."""
+        with self.lock:
+            record = self._collection(collection).setdefault(key, {})
+            record.update(copy.deepcopy(fields))
+            return copy.deepcopy(record)
+
+    def put_if(self, collection: str, key: str, expected, record: dict) -> bool:
+        """
+        Writes record only while the stored one equals `expected`
+        (None → no record yet).
+
+        Returns:
+            True if written
+        """
+        with self.lock:
+            if self._collection(collection).get(key) != expected:
+                return False
+            self._collection(collection)[key] = copy.deepcopy(record)
+            return True
+
+    def pop(self, collection: str, key: str):
+        with self.lock:
+            return self._collection(collection).pop(key, None)
+
+    def pop_first(self, collection: str, **match):
+        """
+        Returns:
+            oldest record whose fields equal `match`, removed → None if none
+        """
+        with self.lock:
+            records = self._collection(collection)
+            for key, record in records.items():
+                if all(record.get(name) == value for name, value in match.items()):
+                    return records.pop(key)
+        return None
+
+    def values(self, collection: str) -> list:
+        with self.lock:
+            return copy.deepcopy(list(self._collection(collection).values()))
+
+    def count(self, collection: str) -> int:
+        with self.lock:
+            return len(self._collection(collection))
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return {"__bytes__": value.hex()}
+    raise TypeError(f"{type(value).__name__} cannot be stored in the node state")
+
+
+def _decode(obj: dict):
+    if len(obj) == 1 and "__bytes__" in obj:
+        return bytes.fromhex(obj["__bytes__"])
+    return obj
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, default=_encode)
+
+
+def _loads(data: str) -> dict:
+    return json.loads(data, object_hook=_decode)
+
+
+class SQLiteStateStore:
+    """Same operations as MemoryStateStore, one connection per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " collection TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (collection, key))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def get(self, collection: str, key: str):
+        row = self._connection().execute(
+            "SELECT data FROM records WHERE collection = ? AND key = ?", (collection, key)
+        ).fetchone()
+        return _loads(row[0]) if row else None
+
+    def _write(self, db, collection: str, key: str, record: dict):
+        updated = db.execute(
+            "UPDATE records SET data = ? WHERE collection = ? AND key = ?",
+            (_dumps(record), collection, key)
+        ).rowcount
+        if not updated:
+            db.execute(
+                "INSERT INTO records (collection, key, seq, data) VALUES"
+                " (?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM records), ?)",
+                (collection, key, _dumps(record))
+            )
+
+    def put(self, collection: str, key: str, record: dict):
+        with self._transaction() as db:
+            self._write(db, collection, key, record)
+
+    def update(self, collection: str, key: str, fields: dict) -> dict:
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT data FROM records WHERE collection = ? AND key = ?", (collection, key)
+            ).fetchone()
+            record = _loads(row[0]) if row else {}
+            record.update(fields)
+            self._write(db, collection, key, record)
+            return record
+
+    def put_if(self, collection: str, key: str, expected, record: dict) -> bool:
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT data FROM records WHERE collection = ? AND key = ?", (collection, key)
+            ).fetchone()
+            if (_loads(row[0]) if row else None) != expected:
+                return False
+            self._write(db, collection, key, record)
+            return True
+
+    def pop(self, collection: str, key: str):
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT data FROM records WHERE collection = ? AND key = ?", (collection, key)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute("DELETE FROM records WHERE collection = ? AND key = ?", (collection, key))
+            return _loads(row[0])
+
+    def pop_first(self, collection: str, **match):
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT key, data FROM records WHERE collection = ? ORDER BY seq", (collection,)
+            ).fetchall()
+            for key, data in rows:
+                record = _loads(data)
+                if all(record.get(name) == value for name, value in match.items()):
+                    db.execute("DELETE FROM records WHERE collection = ? AND key = ?", (collection, key))
+                    return record
+        return None
+
+    def values(self, collection: str) -> list:
+        rows = self._connection().execute(
+            "SELECT data FROM records WHERE collection = ? ORDER BY seq", (collection,)
+        ).fetchall()
+        return [_loads(data) for data, in rows]
+
+    def count(self, collection: str) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM records WHERE collection = ?", (collection,)
+        ).fetchone()[0]
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE … COMMIT: one writer at a time across processes."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def open_state_store(config):
+    """
+    Returns:
+        store selected by STATE_BACKEND ("memory" or "sqlite")
+    """
+    backend = config["STATE_BACKEND"]
+    if backend == "memory":
+        return MemoryStateStore()
+    if backend == "sqlite":
+        return SQLiteStateStore(config["STATE_DB_PATH"])
+    raise ValueError(f"Unknown state backend: {backend}")
@@ -0,0 +1,160 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.extensions import app_state
+from app.services.pqc_param_service import SIG_PARAMETER_SETS, ensure_allowed
+from app.services.pqc_key_service import load_peer_dilithium_public_key
+from app.services.pqc_signature_service import verify_dilithium_signature
+from app.services.signature_service import verify_signature, ed25519_verify_signature
+
+
+# ======================================================
+# Signature verification with a result cache
+# ======================================================
+# A verification result only depends on (scheme, hash, signature, key),
+# so it is cached under
+#
+#   (scheme, hash, SHA-256(signature), SHA-256(public key))
+#
+# and a retried document, or every document under one coalesced root
+# signature, costs one Dilithium call. Only definite valid / invalid
+# answers are cached, never errors.
+#
+# Schemes: ML-DSA-* (raw public key bytes), RSA-2048 and Ed25519 (PEM).
+# Without an explicit key the peer's key from the handshake is used.
+
+CLASSICAL_SCHEMES = {
+    "RSA-2048": verify_signature,
+    "Ed25519": ed25519_verify_signature,
+}
+
+
+class VerificationCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, valid: bool, max_entries: int):
+        with self.lock:
+            self.entries[key] = valid
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+verification_cache = VerificationCache()
+
+
+def _default_public_key(scheme: str) -> bytes:
+    if scheme in SIG_PARAMETER_SETS:
+        return load_peer_dilithium_public_key()
+
+    pem = app_state.peer_signature_public_key
+    if pem is None:
+        raise ValueError("No sender signature public key; complete a handshake or pass public_key")
+    return pem.encode("utf-8")
+
+
+def _check_scheme(scheme: str):
+    if scheme in SIG_PARAMETER_SETS:
+        ensure_allowed("sig", scheme)
+    elif scheme not in CLASSICAL_SCHEMES:
+        raise ValueError(f"Unknown signature scheme: {scheme}")
+
+
+def verify_cached(scheme: str, hash_bytes: bytes, signature: bytes, public_key: bytes = None):
+    """
+    Verifies one signature, answering repeats from the cache.
+
+    public_key → raw ML-DSA key or PEM bytes; None → peer key
+
+    Returns:
+        (valid, cached)
+    """
+    _check_scheme(scheme)
+    if public_key is None:
+        public_key = _default_public_key(scheme)
+
+    key = (
+        scheme,
+        bytes(hash_bytes),
+        hashlib.sha256(signature).digest(),
+        hashlib.sha256(public_key).digest()
+    )
+    valid = verification_cache.get(key)
+    if valid is not None:
+        return valid, True
+
+    if scheme in SIG_PARAMETER_SETS:
+        valid = verify_dilithium_signature(hash_bytes, signature, scheme, public_key)
+    else:
+        valid = CLASSICAL_SCHEMES[scheme](hash_bytes, signature, public_key.decode("utf-8"))
+
+    verification_cache.put(key, valid, current_app.config["VERIFY_CACHE_SIZE"])
+    return valid, False
+
+
+def verify_batch(items: list) -> list:
+    """
+    Verifies many signatures concurrently on VERIFY_WORKERS threads
+    (the Dilithium binary runs as a subprocess, the classical checks
+    release the GIL). Identical items are verified once.
+
+    items → [{scheme, hash (bytes), signature (bytes), public_key (bytes | None)}]
+
+    Returns:
+        [{valid, cached, error}] in input order
+    """
+    app = current_app._get_current_object()
+
+    def run(item):
+        with app.app_context():
+            try:
+                valid, cached = verify_cached(
+                    item["scheme"], item["hash"], item["signature"], item.get("public_key")
+                )
+                return {"valid": valid, "cached": cached, "error": None}
+            except Exception as e:
+                return {"valid": False, "cached": False, "error": str(e)}
+
+    unique = {}
+    for item in items:
+        dedup_key = (item["scheme"], item["hash"], item["signature"], item.get("public_key"))
+        unique.setdefault(dedup_key, item)
+
+    with ThreadPoolExecutor(max_workers=current_app.config["VERIFY_WORKERS"]) as pool:
+        results = dict(zip(unique, pool.map(run, unique.values())))
+
+    return [
+        dict(results[(item["scheme"], item["hash"], item["signature"], item.get("public_key"))])
+        for item in items
+    ]
@@ -1,8 +1,8 @@
 import time
 
 from app.services.encryption_service import aes_encrypt_file,aes_decrypt_file
-from app.services.kem_service import rsa_encrypt_key, rsa_decrypt_key
-from app.services.signature_service import sign_hash,verify_signature
+from app.services.classical_suite_service import get_suite, LEGACY_SUITE
+from app.services.metrics_service import stage_metrics
 from app.utils.helpers import sha256_hash_file
 import os
 from supabase import create_client, Client
@@ -13,20 +13,37 @@ def encrypt_file_workflow(
     input_path,
     output_dir,
     rsa_public_key,
-    signing_private_key
+    signing_private_key,
+    suite=LEGACY_SUITE,
+    cipher_suite=None,
+    reader=None
 ):
+    """
+    suite → classical suite (classical_suite_service): "RSA-2048" wraps
+    with RSA-OAEP and signs with RSA-PSS, "X25519-Ed25519" wraps with
+    X25519+HKDF and signs with Ed25519. rsa_public_key is the receiver's
+    public key PEM for the suite.
+
+    cipher_suite → bulk cipher (cipher_suite_service), default is the
+    calibrated / configured one; recorded in the file header.
+
+    reader → plaintext stream (file_service.UploadStream) encrypted as
+    it arrives; input_path then only names the output file.
+    """
+    suite_info = get_suite(suite)
+
     # 1. AES encrypt file
     url: str = os.getenv("SUPABASE_URL")
     key: str = os.getenv("SUPABASE_KEY")
-    supabase: Client = create_client(url, key)
+    supabase: Client = create_client(url, key) if url and key else None
 
     aes_start = time.perf_counter_ns()
-    encrypted_path, aes_key = aes_encrypt_file(input_path, output_dir)
+    encrypted_path, aes_key = aes_encrypt_file(input_path, output_dir, cipher_suite, reader)
     aes_end = time.perf_counter_ns()
 
-    # 2. RSA encrypt AES key (KEM)
+    # 2. Wrap AES key for the receiver (KEM)
     rsa_start = time.perf_counter_ns()
-    encrypted_aes_key = rsa_encrypt_key(aes_key, rsa_public_key)
+    encrypted_aes_key = suite_info["wrap"](aes_key, rsa_public_key)
     rsa_end = time.perf_counter_ns()
 
     # 3. Hash encrypted file
@@ -36,16 +53,17 @@ def encrypt_file_workflow(
 
     # 4. Sign hash
     sign_start = time.perf_counter_ns()
-    signature = sign_hash(file_hash, signing_private_key)
+    signature = suite_info["sign"](file_hash, signing_private_key)
     sign_end = time.perf_counter_ns()
     
     data = {
                 "file_name": os.path.basename(input_path),
                 'AES_time': (aes_end - aes_start) / 1e6,
-                'RSA_time': (rsa_end - rsa_start) / 1e6,
+                f"{suite_info['kem_label']}_time": (rsa_end - rsa_start) / 1e6,
                 'Hash_time': (hash_end - hash_start) / 1e6,
-                'Sign_time': (sign_end - sign_start) / 1e6
+                f"{suite_info['sig_label']}_time": (sign_end - sign_start) / 1e6
     }
+    stage_metrics.record("classical_encrypt", data)
     # response = supabase.table("classical encryption").insert(data).execute()
     # print("Supabase insert response:", response)
 
@@ -54,7 +72,9 @@ def encrypt_file_workflow(
         'aes_key': aes_key,
         "encrypted_aes_key": encrypted_aes_key,
         "file_hash": file_hash,
-        "signature": signature
+        "signature": signature,
+        "suite": suite,
+        "timings": data
     }
 
 def decrypt_file_workflow(
@@ -64,11 +84,15 @@ def decrypt_file_workflow(
     rsa_private_key,
     signer_public_key,
     decrypted_output_dir,
-    original_filename
+    original_filename,
+    timings=None,
+    suite=LEGACY_SUITE
 ):
+    suite_info = get_suite(suite)
+
     url: str = os.getenv("SUPABASE_URL")
     key: str = os.getenv("SUPABASE_KEY")
-    supabase: Client = create_client(url, key)
+    supabase: Client = create_client(url, key) if url and key else None
 
     # 1. Hash encrypted file
 
@@ -78,13 +102,13 @@ def decrypt_file_workflow(
 
     # 2. Verify signature
     verify_start = time.perf_counter_ns()
-    if not verify_signature(file_hash, signature, signer_public_key):
+    if not suite_info["verify"](file_hash, signature, signer_public_key):
         raise Exception("Signature verification failed")
     verify_end = time.perf_counter_ns()
 
-    # 3. Decrypt AES key
+    # 3. Unwrap AES key
     rsa_start = time.perf_counter_ns()
-    aes_key = rsa_decrypt_key(encrypted_aes_key, rsa_private_key)
+    aes_key = suite_info["unwrap"](encrypted_aes_key, rsa_private_key)
     rsa_end = time.perf_counter_ns()
 
     # 4. AES decrypt file
@@ -101,11 +125,16 @@ def decrypt_file_workflow(
         "file_name":original_filename,
         'Hash_time': (hash_end - hash_start) / 1e6,
         'Verify_time': (verify_end - verify_start) / 1e6,
-        'RSA_time': (rsa_end - rsa_start) / 1e6,
+        f"{suite_info['kem_label']}_time": (rsa_end - rsa_start) / 1e6,
         'AES_time': (aes_end - aes_start) / 1e6
     }
+    stage_metrics.record("classical_decrypt", data)
 
     # response = supabase.table("classical decryption").insert(data).execute()
     # print("Supabase insert response:", response)
 
+    # Callers that want the stage breakdown (e.g. benchmarks) pass a dict
+    if timings is not None:
+        timings.update(data)
+
     return decrypted_path
@@ -0,0 +1,65 @@
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+from app.services.admission_service import Overloaded, admission, estimate_job_memory
+
+
+# ======================================================
+# Request body limits per role
+# ======================================================
+# MAX_CONTENT_LENGTH bounds every request, which suits the JSON and
+# control endpoints that buffer their body. Endpoints that stream the
+# body to disk raise it to the limit of their role:
+#
+#   SENDER   → documents uploaded for encryption (SENDER_MAX_UPLOAD_BYTES)
+#   RECEIVER → encrypted deliveries from a peer (RECEIVER_MAX_UPLOAD_BYTES)
+
+def upload_limit(role: str):
+    """Decorator: body limit of a streaming endpoint, 0 → unlimited."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limit = current_app.config[f"{role}_MAX_UPLOAD_BYTES"]
+            # None would fall back to MAX_CONTENT_LENGTH
+            request.max_content_length = limit or 2 ** 63 - 1
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ======================================================
+# Admission control (see services/admission_service.py)
+# ======================================================
+
+def admitted(view):
+    """Decorator: runs a crypto endpoint as an admitted job, 429 when overloaded."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        config = current_app.config
+        if not config["ADMISSION_ENABLED"]:
+            return view(*args, **kwargs)
+
+        try:
+            memory = admission.acquire(
+                estimate_job_memory(request.content_length, config),
+                config["ADMISSION_MAX_JOBS"],
+                config["ADMISSION_MEMORY_BUDGET_BYTES"],
+                config["ADMISSION_MAX_QUEUE"],
+                config["ADMISSION_QUEUE_TIMEOUT_SECONDS"],
+                config["ADMISSION_AGING_BYTES_PER_SECOND"]
+            )
+        except Overloaded as e:
+            print(f"Admission: rejected {request.path} ({e})")
+            response = jsonify({"error": str(e), "retry_after": e.retry_after})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response
+
+        start = time.monotonic()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            admission.release(memory, time.monotonic() - start)
+    return wrapper
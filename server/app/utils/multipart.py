@@ -0,0 +1,128 @@
+import uuid
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import (
+    MultipartDecoder,
+    Field,
+    File,
+    Data,
+    Epilogue,
+    NeedData
+)
+
+
+# ======================================================
+# Streamed multipart/form-data
+# ======================================================
+# Both directions of a transfer, without buffering a body:
+#
+#   iter_multipart        → parses a request body (request.stream) as it
+#                           arrives, for the receiving endpoints and
+#                           file_service.UploadStream
+#   StreamedMultipartBody → request body for requests.post, read from
+#                           disk as it is sent
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_multipart(stream, boundary: str, max_form_memory_size=None):
+    """
+    Parses a multipart body from `stream` as it arrives. Form fields are
+    held in memory: once they add up to more than max_form_memory_size
+    (one field or all of them together) RequestEntityTooLarge is raised.
+    The decoder itself only bounds its parse buffer, not field values.
+
+    Yields:
+        ("field", name, value)
+        ("file", name, filename, data) → one entry per chunk; data is
+                                         b"" once the part has ended
+    """
+    decoder = MultipartDecoder(boundary.encode("latin-1"), max_form_memory_size=max_form_memory_size)
+    part = None
+    field_value = []
+    form_bytes = 0
+
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        decoder.receive_data(chunk or None)
+
+        event = decoder.next_event()
+        while not isinstance(event, NeedData):
+            if isinstance(event, Epilogue):
+                return
+            if isinstance(event, (Field, File)):
+                part = event
+                field_value = []
+            elif isinstance(event, Data):
+                if isinstance(part, File):
+                    if event.data:
+                        yield ("file", part.name, part.filename, event.data)
+                    if not event.more_data:
+                        yield ("file", part.name, part.filename, b"")
+                else:
+                    form_bytes += len(event.data)
+                    if max_form_memory_size is not None and form_bytes > max_form_memory_size:
+                        raise RequestEntityTooLarge("Form fields exceed MAX_FORM_MEMORY_SIZE")
+                    field_value.append(event.data)
+                    if not event.more_data:
+                        yield ("field", part.name, b"".join(field_value).decode("utf-8"))
+            event = decoder.next_event()
+
+        if not chunk:
+            raise ValueError("Upload ended before the multipart body was complete")
+
+
+class StreamedMultipartBody:
+    """
+    multipart/form-data body streamed from disk: text fields first, then
+    file parts read from (path, offset, size). Has a length so requests
+    sends Content-Length instead of chunking.
+
+    parts → [(field name, filename, path, offset, size)]
+    """
+
+    def __init__(self, fields: list, parts: list):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.fields = fields
+        self.parts = parts
+
+    def _field(self, name: str, value: str) -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+            f"{value}\r\n"
+        ).encode("utf-8")
+
+    def _file_head(self, name: str, filename: str) -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"{name}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+
+    def _tail(self) -> bytes:
+        return f"--{self.boundary}--\r\n".encode("utf-8")
+
+    def __len__(self):
+        length = sum(len(self._field(name, value)) for name, value in self.fields)
+        for name, filename, _, _, size in self.parts:
+            length += len(self._file_head(name, filename)) + size + 2
+        return length + len(self._tail())
+
+    def __iter__(self):
+        for name, value in self.fields:
+            yield self._field(name, value)
+        for name, filename, path, offset, size in self.parts:
+            yield self._file_head(name, filename)
+            with open(path, "rb") as src:
+                src.seek(offset)
+                remaining = size
+                while remaining > 0:
+                    chunk = src.read(min(256 * 1024, remaining))
+                    if not chunk:
+                        raise IOError(f"{path} is shorter than expected")
+                    remaining -= len(chunk)
+                    yield chunk
+            yield b"\r\n"
+        yield self._tail()
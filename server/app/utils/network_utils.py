@@ -5,11 +5,11 @@ import threading
 from app.services.pqc_key_service import load_dilithium_public_key
 from app.services.pqc_key_service import load_kyber_public_key
 # from app.utils.helpers import bin_to_b64
-from app.services.key_service import load_signature_public_key, load_rsa_public_key
-from cryptography.hazmat.primitives import serialization
 
 DISCOVERY_PORT = 9999
 BROADCAST_ADDR = "255.255.255.255"
+# Handshakes carry hex PQC public keys (ML-DSA-87 alone is ~5 KB)
+MAX_DATAGRAM = 65535
 
 
 def get_local_ip():
@@ -64,7 +64,7 @@ def listen_for_handshake(port, state, timeout=60):
     
     while not state.should_stop and (time.time() - start_time) < timeout:
         try:
-            data, addr = sock.recvfrom(4096)
+            data, addr = sock.recvfrom(MAX_DATAGRAM)
             message = json.loads(data.decode())
             print("Handshake message received:", message)
             if message.get("type") == "SENDER_HANDSHAKE":
@@ -72,7 +72,11 @@ def listen_for_handshake(port, state, timeout=60):
                     "ip": message["ip"],
                     "port": message["port"],
                     "name": message["name"], 
-                    "dilithium_public_key": message["dilithium_public_key"]
+                    "dilithium_public_key": message.get("dilithium_public_key"),
+                    "sig_algorithm": message.get("sig_algorithm"),
+                    "kem_algorithms": message.get("kem_algorithms"),
+                    "classical_suite": message.get("classical_suite"),
+                    "signature_public_key": message.get("signature_public_key")
                 }
                 state.handshake_received = True
                 state.should_stop = True  # Stop broadcasting
@@ -87,22 +91,29 @@ def listen_for_handshake(port, state, timeout=60):
     sock.close()
 
 
-def send_handshake(receiver_ip, receiver_port, sender_ip, sender_port, sender_name):
-    """Sender sends handshake to receiver"""
+def send_handshake(receiver_ip, receiver_port, sender_ip, sender_port, sender_name,
+                   sig_algorithm=None, kem_algorithms=None,
+                   classical_suite=None, signature_public_key=None):
+    """
+    Sender sends handshake to receiver.
+    PQC: announces its signature parameter set and the KEM parameter sets it accepts.
+    Classical (classical_suite set): carries the suite and the signing public key PEM.
+    """
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    # sign_public_key = load_signature_public_key()
-    dilithium_pk = load_dilithium_public_key()
     payload = {
         "type": "SENDER_HANDSHAKE",
         "name": sender_name,
         "ip": sender_ip,
         "port": sender_port,
-        # "signature_public_key": sign_public_key.public_bytes(
-        #     encoding=serialization.Encoding.PEM,
-        #     format=serialization.PublicFormat.SubjectPublicKeyInfo
-        # ).decode('utf-8')
-        "dilithium_public_key": dilithium_pk.hex()
     }
+    if classical_suite:
+        payload["classical_suite"] = classical_suite
+        payload["signature_public_key"] = signature_public_key
+    else:
+        dilithium_pk = load_dilithium_public_key()
+        payload["dilithium_public_key"] = dilithium_pk.hex()
+        payload["sig_algorithm"] = sig_algorithm
+        payload["kem_algorithms"] = kem_algorithms
     print("Sending handshake payload:", payload)
 
     try:
@@ -125,7 +136,7 @@ def listen_for_receiver(timeout=10):
     sock.settimeout(timeout)
 
     try:
-        data, _ = sock.recvfrom(4096)
+        data, _ = sock.recvfrom(MAX_DATAGRAM)
         message = json.loads(data.decode())
         print("Message received:", message)
         if message.get("type") == "RECEIVER_AVAILABLE":
@@ -137,22 +148,28 @@ def listen_for_receiver(timeout=10):
         sock.close()
     return None, None, None
 
-def send_acknowledgment(sender_ip, sender_port, receiver_ip, receiver_port, receiver_name):
-    """Receiver sends acknowledgment back to sender"""
+def send_acknowledgment(sender_ip, sender_port, receiver_ip, receiver_port, receiver_name,
+                        kem_algorithm=None, classical_suite=None, kem_public_key=None):
+    """
+    Receiver sends acknowledgment back to sender.
+    PQC: kem_algorithm → negotiated parameter set of the Kyber public key
+    Classical (classical_suite set): carries the key transport public key PEM
+    (RSA or X25519).
+    """
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    # rsa_public_key = load_rsa_public_key()
-    kyber_pk = load_kyber_public_key()
     payload = {
         "type": "RECEIVER_ACK",
         "name": receiver_name,
         "ip": receiver_ip,
         "port": receiver_port,
-        # "rsa_public_key": rsa_public_key.public_bytes(
-        #     encoding=serialization.Encoding.PEM,
-        #     format=serialization.PublicFormat.SubjectPublicKeyInfo
-        # ).decode('utf-8')
-        "kyber_public_key": kyber_pk.hex()
     }
+    if classical_suite:
+        payload["classical_suite"] = classical_suite
+        payload["kem_public_key"] = kem_public_key
+    else:
+        kyber_pk = load_kyber_public_key(kem_algorithm)
+        payload["kyber_public_key"] = kyber_pk.hex()
+        payload["kem_algorithm"] = kem_algorithm
 
     print("sending",sender_ip, sender_port, "acknowledgment with payload:", payload)
     try:
@@ -177,7 +194,7 @@ def listen_for_acknowledgment(port, state, timeout=30):
     
     while not state.should_stop and (time.time() - start_time) < timeout:
         try:
-            data, addr = sock.recvfrom(4096)
+            data, addr = sock.recvfrom(MAX_DATAGRAM)
             message = json.loads(data.decode())
 
             if message.get("type") == "RECEIVER_ACK":
@@ -186,7 +203,10 @@ def listen_for_acknowledgment(port, state, timeout=30):
                     "ip": message["ip"],
                     "port": message["port"],
                     "name": message["name"],
-                    "kyber_public_key": message["kyber_public_key"]
+                    "kyber_public_key": message.get("kyber_public_key"),
+                    "kem_algorithm": message.get("kem_algorithm"),
+                    "classical_suite": message.get("classical_suite"),
+                    "kem_public_key": message.get("kem_public_key")
                 }
                 state.should_stop = True
                 break
@@ -0,0 +1,29 @@
+from flask import request
+
+from app.extensions import app_state
+
+
+# ======================================================
+# Which peer a transfer belongs to
+# ======================================================
+# Each side keeps a session per peer (app_state.peer_session). The
+# receiver keys its sessions by the sender's handshake address, which
+# the sender records as local_peer_id and sends with every transfer:
+#
+#   X-Peer-Id: <ip:port>
+#
+# so the receiver verifies with that sender's key, whichever peer is
+# active. Without the header (older senders) the active peer is used.
+
+PEER_ID_HEADER = "X-Peer-Id"
+
+
+def peer_headers(peer_id: str = None) -> dict:
+    """Sender: headers naming this node to the receiver session `peer_id` (None → active)."""
+    local_peer_id = app_state.peer_session(peer_id)["local_peer_id"]
+    return {PEER_ID_HEADER: local_peer_id} if local_peer_id else {}
+
+
+def sending_peer() -> str:
+    """Receiver: session id of the sender of the current request."""
+    return request.headers.get(PEER_ID_HEADER) or app_state.active_peer
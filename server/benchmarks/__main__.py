@@ -0,0 +1,563 @@
+"""
+Classical vs PQC pipeline benchmark.
+
+Run from the server/ directory (the PQC binaries resolve their key
+paths relative to it):
+
+    python -m benchmarks run --sizes 1K,1M,64M --reps 5 --out results.json
+    python -m benchmarks compare baseline.json results.json --threshold 10
+    python -m benchmarks keys --iterations 200
+    python -m benchmarks hash --sizes 16M,256M --workers 1,2,4,8
+    python -m benchmarks sign --concurrency 1,8,32,64 --window-ms 5
+    python -m benchmarks compress --codecs zlib:1,zlib:6,lzma:1,bz2:9 --link-mbps 50
+    python -m benchmarks large --size 4G --max-rss-mb 512
+    python -m benchmarks serve --workers 1,2,4 --concurrency 32 --duration 20
+    python -m benchmarks load --flows pqc,classical --mix 1K:30,64K:50,1M:20 --duration 30
+    python -m benchmarks load --arrival open --rate 20 --concurrency 64
+
+NOTE: the benchmark generates fresh keys in keys/ and pqc_keys/ exactly
+like /role/select does, so do not run it on a node mid-session.
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import traceback
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _setup_app(work_dir, cipher_suite=None):
+    from app import create_app
+
+    app = create_app()
+    # Background keygen would compete with the measured pipelines
+    from app.services.key_lifecycle_service import key_lifecycle
+    key_lifecycle.stop()
+
+    app.config.update(
+        UPLOAD_FOLDER=os.path.join(work_dir, "uploads"),
+        ENCRYPTED_FOLDER=os.path.join(work_dir, "encrypted_files"),
+        DECRYPTED_FOLDER=os.path.join(work_dir, "decrypted_files"),
+        # The benchmark corpus goes up to 1 GB
+        MAX_CONTENT_LENGTH=None
+    )
+    if cipher_suite:
+        app.config["CIPHER_SUITE"] = cipher_suite
+    for key in ("UPLOAD_FOLDER", "ENCRYPTED_FOLDER", "DECRYPTED_FOLDER"):
+        os.makedirs(app.config[key], exist_ok=True)
+    return app
+
+
+def _run_case(run, app, ctx, doc_path, base_url):
+    # Swallow the workflows' and routes' debug prints while measuring
+    with contextlib.redirect_stdout(io.StringIO()):
+        if base_url is None:
+            return run(app, ctx, doc_path)
+        return run(app, ctx, doc_path, base_url)
+
+
+def cmd_run(args):
+    from benchmarks.corpus import generate_corpus, parse_size
+    from benchmarks.pipelines import PIPELINES, LoopbackServer
+    from benchmarks.stats import summarize, peak_rss_kb, write_json, write_csv
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    kinds = args.kinds.split(",")
+    pipelines = args.pipelines.split(",")
+    modes = args.modes.split(",")
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pqdocsec_bench_")
+    corpus_dir = args.corpus_dir or os.path.join(work_dir, "corpus")
+
+    print(f"Generating corpus in {corpus_dir} ...")
+    corpus = generate_corpus(corpus_dir, sizes, kinds)
+
+    app = _setup_app(work_dir, args.cipher_suite)
+    with app.app_context():
+        from app.services.cipher_suite_service import get_cipher_suite
+        cipher_suite = get_cipher_suite()
+    rows = []
+    skipped = []
+
+    for mode in modes:
+        server = LoopbackServer(app) if mode == "http" else contextlib.nullcontext()
+        with server:
+            base_url = server.base_url if mode == "http" else None
+
+            for pipeline in pipelines:
+                setup, run = PIPELINES[(pipeline, mode)]
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        ctx = setup(app)
+                except Exception as e:
+                    print(f"[skip] {pipeline}/{mode}: {e}")
+                    skipped.append({"pipeline": pipeline, "mode": mode, "reason": str(e)})
+                    continue
+
+                for doc in corpus:
+                    label = f"{pipeline}/{mode} {doc['kind']} {doc['size']} B"
+                    try:
+                        for _ in range(args.warmup):
+                            _run_case(run, app, ctx, doc["path"], base_url)
+
+                        samples = {}
+                        for _ in range(args.reps):
+                            stages = _run_case(run, app, ctx, doc["path"], base_url)
+                            for stage, ms in stages.items():
+                                samples.setdefault(stage, []).append(ms)
+                    except Exception as e:
+                        print(f"[fail] {label}: {e}")
+                        if args.verbose:
+                            traceback.print_exc()
+                        skipped.append({
+                            "pipeline": pipeline, "mode": mode,
+                            "kind": doc["kind"], "size": doc["size"], "reason": str(e)
+                        })
+                        continue
+
+                    rss = peak_rss_kb()
+                    for stage, stage_samples in samples.items():
+                        row = {
+                            "pipeline": pipeline,
+                            "mode": mode,
+                            "kind": doc["kind"],
+                            "size": doc["size"],
+                            "stage": stage,
+                            "peak_rss_kb": rss,
+                        }
+                        row.update(summarize(stage_samples, doc["size"]))
+                        row["samples_ms"] = stage_samples
+                        rows.append(row)
+
+                    total = summarize(samples["total"], doc["size"])
+                    print(f"[ok] {label}: p50 {total['p50_ms']:.2f} ms, "
+                          f"p99 {total['p99_ms']:.2f} ms, "
+                          f"{total['throughput_mb_s']:.2f} MB/s, peak RSS {rss} KB")
+
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "reps": args.reps,
+        "warmup": args.warmup,
+        "cipher_suite": cipher_suite,
+        "skipped": skipped,
+    }
+
+    write_json(args.out, meta, rows)
+    print(f"Results written to {args.out}")
+    if args.csv:
+        write_csv(args.csv, rows)
+        print(f"CSV written to {args.csv}")
+    return 0
+
+
+def cmd_compare(args):
+    from benchmarks.stats import load_results, compare_results
+
+    diffs = compare_results(
+        load_results(args.baseline),
+        load_results(args.candidate),
+        metric=args.metric,
+        threshold_pct=args.threshold
+    )
+
+    regressions = 0
+    for diff in diffs:
+        key = diff["key"]
+        flag = "REGRESSION" if diff["regression"] else ""
+        regressions += diff["regression"]
+        print(f"{key['pipeline']:>9} {key['mode']:>9} {key['kind']:>12} {key['size']:>11} "
+              f"{key['stage']:<28} {diff['baseline']:>10.2f} -> {diff['candidate']:>10.2f} ms "
+              f"({diff['change_pct']:+6.1f}%) {flag}")
+
+    print(f"{len(diffs)} stages compared, {regressions} regression(s) "
+          f"beyond {args.threshold:.1f}% on {args.metric}")
+    return 1 if regressions else 0
+
+
+def cmd_keys(args):
+    from benchmarks.keycache import run_key_cache_benchmark
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pqdocsec_bench_")
+    rows = run_key_cache_benchmark(work_dir, args.iterations)
+
+    # Sender and receiver each do one of every operation per document
+    total_saving = 0.0
+    for row in rows:
+        total_saving += row["saving_us"]
+        print(f"{row['operation']:<24} uncached {row['uncached_p50_us']:>9.1f} us  "
+              f"cached {row['cached_p50_us']:>7.1f} us  saving {row['saving_us']:>9.1f} us")
+    print(f"per-document saving (sender or receiver): {total_saving / 1000:.2f} ms")
+    return 0
+
+
+def cmd_hash(args):
+    from benchmarks.corpus import parse_size
+    from benchmarks.hashing import run_hash_benchmark
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pqdocsec_bench_")
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    workers = [int(w) for w in args.workers.split(",")]
+    rows = run_hash_benchmark(work_dir, sizes, workers, parse_size(args.leaf_size), args.reps)
+
+    print(f"cpu_count: {os.cpu_count()}")
+    for row in rows:
+        print(f"{row['size']:>11} B {row['variant']:<7} workers {row['workers']:>2}  "
+              f"p50 {row['p50_ms']:>9.2f} ms  {row['throughput_mb_s']:>8.1f} MB/s  "
+              f"x{row['speedup']:.2f}")
+    return 0
+
+
+def cmd_sign(args):
+    from benchmarks.pipelines import setup_pqc
+    from benchmarks.signing import run_sign_benchmark
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pqdocsec_bench_")
+    app = _setup_app(work_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        setup_pqc(app)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    rows = run_sign_benchmark(app, levels, args.per_thread, args.window_ms, args.max_items, work_dir)
+
+    print(f"cpu_count: {os.cpu_count()}, stage workers {app.config['STAGE_WORKERS']}, "
+          f"window {args.window_ms} ms, max {args.max_items} per signature (whole encrypt workflows)")
+    for row in rows:
+        print(f"{row['mode']:<13} concurrency {row['concurrency']:>3}  "
+              f"{row['docs_per_s']:>8.1f} docs/s  p50 {row['p50_ms']:>8.2f} ms  "
+              f"p99 {row['p99_ms']:>8.2f} ms  {row['signatures']:>5} signatures")
+    return 0
+
+
+def cmd_compress(args):
+    from benchmarks.corpus import parse_size
+    from benchmarks.compression import corpus_documents, run_compression_benchmark
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pqdocsec_bench_")
+    app = _setup_app(work_dir)
+    documents = corpus_documents(
+        work_dir,
+        args.kinds.split(","),
+        [parse_size(s) for s in args.sizes.split(",")],
+        args.corpus_dir
+    )
+    codecs = []
+    for spec in args.codecs.split(","):
+        codec, _, level = spec.partition(":")
+        codecs.append((codec, int(level or 3)))
+    rows = run_compression_benchmark(app, documents, codecs, args.link_mbps, args.reps)
+
+    print(f"link {args.link_mbps} Mbit/s")
+    for row in rows:
+        print(f"{row['document']:<28} {row['codec']:>4}:{row['level']:<2} "
+              f"{'on ' if row['selected'] else 'off'} x{row['ratio']:>6.2f}  "
+              f"compress {row['compress_ms']:>9.2f} ms ({row['compress_mb_s']:>7.1f} MB/s)  "
+              f"decompress {row['decompress_ms']:>8.2f} ms  "
+              f"link {row['link_ms']:>9.1f} ms  saved {row['saved_ms']:>9.1f} ms")
+    return 0
+
+
+def cmd_large(args):
+    from benchmarks.corpus import parse_size
+    from benchmarks.large import large_document, run_large_transfer
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pqdocsec_bench_")
+    app = _setup_app(work_dir)
+    doc_path = large_document(work_dir, args.kind, parse_size(args.size))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        row = run_large_transfer(app, doc_path, work_dir)
+
+    print(f"{args.kind} {row['size'] / (1024 * 1024):.0f} MB  "
+          + "  ".join(f"{name} {seconds:.1f} s" for name, seconds in row["stages"].items())
+          + f"  ({row['throughput_mb_s']:.1f} MB/s)")
+    print(f"peak RSS {row['peak_rss_mb']:.0f} MB (before transfer {row['baseline_rss_mb']:.0f} MB)")
+    if not row["matches"]:
+        print("FAIL: downloaded file differs from the original")
+        return 1
+    if args.max_rss_mb and row["peak_rss_mb"] > args.max_rss_mb:
+        print(f"FAIL: peak RSS above {args.max_rss_mb} MB")
+        return 1
+    return 0
+
+
+def cmd_serve(args):
+    from benchmarks.corpus import generate_document, parse_size
+    from benchmarks.pipelines import setup_pqc
+    from benchmarks.serving import run_serving_benchmark
+    from benchmarks.stats import write_json
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pqdocsec_bench_")
+    app = _setup_app(work_dir)
+    # Keys for the served node (same pqc_keys/ folder)
+    with contextlib.redirect_stdout(io.StringIO()):
+        setup_pqc(app)
+    doc_path = os.path.join(work_dir, f"serve_{args.kind}_{args.size}.bin")
+    generate_document(doc_path, args.kind, parse_size(args.size))
+
+    configs = []
+    for server in args.servers.split(","):
+        if server == "dev":
+            configs.append(("dev", 1))
+        else:
+            configs += [(server, int(w)) for w in args.workers.split(",")]
+
+    rows = run_serving_benchmark(work_dir, doc_path, configs,
+                                 args.concurrency, args.duration, args.warmup)
+
+    print(f"/pqc/encrypt {args.kind} {args.size}, {args.concurrency} clients, "
+          f"{args.duration:.0f} s, {os.cpu_count()} cores")
+    for row in rows:
+        print(f"{row['server']:<9} workers {row['workers']:>2}  {row['rps']:>8.1f} req/s  "
+              f"p50 {row['p50_ms']:>8.1f} ms  p99 {row['p99_ms']:>8.1f} ms  "
+              f"status {row['status_counts']}")
+
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "endpoint": "/pqc/encrypt",
+        "duration": args.duration,
+        "warmup": args.warmup,
+    }
+    write_json(args.out, meta, rows)
+    print(f"Results written to {args.out}")
+    return 0
+
+
+def cmd_load(args):
+    from benchmarks.load import (
+        FLOWS,
+        LoadTarget,
+        load_documents,
+        parse_mix,
+        result_rows,
+        run_load_test,
+        served_pair
+    )
+    from benchmarks.pipelines import setup_classical, setup_pqc, setup_x25519
+    from benchmarks.stats import write_json
+
+    flows = args.flows.split(",")
+    for flow in flows:
+        if flow not in FLOWS:
+            print(f"Unknown flow: {flow} (choose from {', '.join(FLOWS)})")
+            return 2
+    if bool(args.sender) != bool(args.receiver):
+        print("--sender and --receiver go together")
+        return 2
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pqdocsec_load_")
+    mix = parse_mix(args.mix)
+    documents = load_documents(work_dir, args.kind, mix)
+
+    if not args.sender:
+        # Keys shared by the local sender and receiver (same key folders)
+        app = _setup_app(work_dir)
+        setups = {"pqc": setup_pqc, "classical": setup_classical, "x25519": setup_x25519}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for flow in flows:
+                setups[flow](app)
+
+    results = []
+    rows = []
+    for flow in flows:
+        if args.sender:
+            target = contextlib.nullcontext(LoadTarget(args.sender, args.receiver))
+        else:
+            target = served_pair(flow, args.server, args.workers, work_dir)
+        with target as target:
+            result = run_load_test(flow, target, documents, args.arrival, args.concurrency,
+                                   args.rate, args.duration, args.warmup, args.seed)
+        results.append(result)
+        rows += result_rows(result, args.kind)
+
+        print(f"{flow} {args.arrival} loop, {args.concurrency} clients"
+              + (f", {args.rate:g} docs/s offered" if args.arrival == "open" else "")
+              + f": {result['docs_per_s']:.1f} docs/s ({result['mb_per_s']:.2f} MB/s), "
+              f"{result['completed']} ok, {result['failed']} failed "
+              f"({result['error_rate'] * 100:.1f}%), {result['not_started']} not started")
+        for name, summary in [("document", result["document"]), *result["operations"].items()]:
+            print(f"  {name:<10} p50 {summary['p50_ms']:>9.1f} ms  p90 {summary['p90_ms']:>9.1f} ms  "
+                  f"p99 {summary['p99_ms']:>9.1f} ms")
+        for op, by_status in result["errors"].items():
+            print(f"  errors {op}: {by_status}")
+        for node, report in result["server"].items():
+            metrics = report["metrics"]
+            if not metrics:
+                continue
+            for workflow, entry in metrics["workflows"].items():
+                print(f"  {node} {workflow} ({entry['count']} runs, pid {metrics['worker_pid']}): "
+                      + ", ".join(f"{stage} {summary['mean_ms']:.1f}"
+                                  for stage, summary in entry["stages"].items())
+                      + " ms mean")
+
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "target": {"sender": args.sender, "receiver": args.receiver}
+                  if args.sender else {"server": args.server, "workers": args.workers},
+        "arrival": args.arrival,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "mix": args.mix,
+        "kind": args.kind,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "seed": args.seed,
+        "flows": results,
+    }
+    write_json(args.out, meta, rows)
+    print(f"Results written to {args.out}")
+
+    if args.max_error_rate is not None and any(
+        r["error_rate"] > args.max_error_rate for r in results
+    ):
+        print(f"FAIL: error rate above {args.max_error_rate * 100:.1f}%")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the pipelines over a generated corpus")
+    run.add_argument("--sizes", default="1K,64K,1M,16M",
+                     help="comma separated document sizes, 1K up to 1G")
+    run.add_argument("--kinds", default="random,compressible,pdf")
+    run.add_argument("--pipelines", default="classical,x25519,pqc",
+                     help="classical (RSA-2048), x25519 (X25519+Ed25519), pqc")
+    run.add_argument("--modes", default="inprocess,http")
+    run.add_argument("--reps", type=int, default=5)
+    run.add_argument("--warmup", type=int, default=1)
+    run.add_argument("--cipher-suite",
+                     help="bulk cipher for all pipelines (default: startup calibration)")
+    run.add_argument("--corpus-dir", help="reuse a corpus directory between runs")
+    run.add_argument("--work-dir", help="scratch directory for uploads/outputs")
+    run.add_argument("--out", default="benchmark_results.json")
+    run.add_argument("--csv", help="also write a flat CSV of the summaries")
+    run.add_argument("--verbose", action="store_true")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="diff two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--metric", default="p50_ms")
+    compare.add_argument("--threshold", type=float, default=10.0,
+                         help="percent slowdown that counts as a regression")
+    compare.set_defaults(func=cmd_compare)
+
+    keys = sub.add_parser("keys", help="micro-benchmark the parsed key cache")
+    keys.add_argument("--iterations", type=int, default=200)
+    keys.add_argument("--work-dir", help="scratch directory for the test keys")
+    keys.set_defaults(func=cmd_keys)
+
+    hashing = sub.add_parser("hash", help="linear SHA-512 vs parallel Merkle hash")
+    hashing.add_argument("--sizes", default="16M,128M")
+    hashing.add_argument("--workers", default="1,2,4,8",
+                         help="comma separated thread counts for leaf hashing")
+    hashing.add_argument("--leaf-size", default="1M")
+    hashing.add_argument("--reps", type=int, default=3)
+    hashing.add_argument("--work-dir", help="scratch directory for the test files")
+    hashing.set_defaults(func=cmd_hash)
+
+    sign = sub.add_parser("sign", help="per-document vs coalesced Dilithium signing, through /pqc/encrypt's workflow")
+    sign.add_argument("--concurrency", default="1,8,32,64",
+                      help="comma separated numbers of concurrent signers")
+    sign.add_argument("--per-thread", type=int, default=20)
+    sign.add_argument("--window-ms", type=float, default=5.0)
+    sign.add_argument("--max-items", type=int, default=32)
+    sign.add_argument("--work-dir", help="scratch directory")
+    sign.set_defaults(func=cmd_sign)
+
+    compress = sub.add_parser("compress", help="compression stage: link time saved vs CPU")
+    compress.add_argument("--codecs", default="zlib:1,zlib:6,lzma:1,bz2:9",
+                          help="codec:level list")
+    compress.add_argument("--kinds", default="random,compressible,pdf")
+    compress.add_argument("--sizes", default="1M,16M")
+    compress.add_argument("--corpus-dir", help="measure these files instead of a generated corpus")
+    compress.add_argument("--link-mbps", type=float, default=50.0)
+    compress.add_argument("--reps", type=int, default=3)
+    compress.add_argument("--work-dir", help="scratch directory")
+    compress.set_defaults(func=cmd_compress)
+
+    large = sub.add_parser("large", help="one multi-GB transfer, checks peak memory")
+    large.add_argument("--size", default="4G")
+    large.add_argument("--kind", default="random")
+    large.add_argument("--max-rss-mb", type=float, default=512,
+                       help="fail above this peak RSS, 0 → report only")
+    large.add_argument("--work-dir", help="scratch directory (needs ~4x --size free)")
+    large.set_defaults(func=cmd_large)
+
+    serve = sub.add_parser("serve", help="requests/s and p99 of the dev server vs gunicorn workers")
+    serve.add_argument("--servers", default="dev,gunicorn")
+    serve.add_argument("--workers", default="1,2,4",
+                       help="comma separated gunicorn worker counts")
+    serve.add_argument("--concurrency", type=int, default=32)
+    serve.add_argument("--duration", type=float, default=20.0, help="seconds per server")
+    serve.add_argument("--warmup", type=float, default=2.0, help="seconds, not measured")
+    serve.add_argument("--size", default="64K")
+    serve.add_argument("--kind", default="random")
+    serve.add_argument("--work-dir", help="scratch directory")
+    serve.add_argument("--out", default="serving_results.json")
+    serve.set_defaults(func=cmd_serve)
+
+    load = sub.add_parser("load", help="documents/s through encrypt → send → next-file")
+    load.add_argument("--flows", default="pqc,classical",
+                      help="comma separated: pqc, classical (RSA-2048), x25519")
+    load.add_argument("--arrival", choices=("closed", "open"), default="closed",
+                      help="closed: clients send back to back, open: Poisson arrivals at --rate")
+    load.add_argument("--concurrency", type=int, default=8,
+                      help="clients (open loop: most documents in flight)")
+    load.add_argument("--rate", type=float, default=10.0, help="documents/s offered (open loop)")
+    load.add_argument("--mix", default="1K:30,64K:50,1M:20", help="size:weight list")
+    load.add_argument("--kind", default="random")
+    load.add_argument("--duration", type=float, default=30.0, help="seconds per flow")
+    load.add_argument("--warmup", type=float, default=3.0, help="seconds, not measured")
+    load.add_argument("--server", choices=("dev", "gunicorn"), default="gunicorn",
+                      help="how the local sender / receiver are served")
+    load.add_argument("--workers", type=int, default=1,
+                      help="gunicorn workers per node (metrics cover the worker answering)")
+    load.add_argument("--sender", help="URL of a running sender instead of a local one")
+    load.add_argument("--receiver", help="URL of the receiver paired with --sender")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--max-error-rate", type=float,
+                      help="fail above this fraction of failed documents")
+    load.add_argument("--work-dir", help="scratch directory")
+    load.add_argument("--out", default="load_results.json")
+    load.set_defaults(func=cmd_load)
+
+    args = parser.parse_args(argv)
+
+    for attr in ("out", "csv", "corpus_dir", "work_dir", "baseline", "candidate"):
+        if getattr(args, attr, None):
+            setattr(args, attr, os.path.abspath(getattr(args, attr)))
+
+    # Key folders and the PQC binaries are relative to server/
+    os.chdir(SERVER_DIR)
+    if SERVER_DIR not in sys.path:
+        sys.path.insert(0, SERVER_DIR)
+
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
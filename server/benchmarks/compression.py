@@ -0,0 +1,107 @@
+import io
+import os
+import time
+
+from benchmarks.corpus import generate_document
+from benchmarks.stats import summarize
+
+
+# ======================================================
+# Compression stage: time saved on the link vs CPU spent
+# ======================================================
+# For every document and codec/level the stream is compressed and
+# decompressed the way the cipher layer does it (CompressingReader /
+# DecompressingWriter). Net saving on a link of `link_mbps`:
+#
+#   saved_ms = (original - compressed) / link rate - compress - decompress
+#
+# "selected" tells whether the adaptive check (magic bytes + sample)
+# would compress the document at all; when it would not, the saving
+# is 0 by construction.
+
+def _time_ms(fn, reps: int):
+    samples = []
+    result = None
+    for _ in range(reps):
+        start = time.perf_counter_ns()
+        result = fn()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+    return samples, result
+
+
+def corpus_documents(work_dir: str, kinds, sizes, corpus_dir: str = None):
+    """
+    Returns:
+        [(label, path)] → files of corpus_dir, or generated kinds × sizes
+    """
+    if corpus_dir:
+        return [
+            (name, os.path.join(corpus_dir, name))
+            for name in sorted(os.listdir(corpus_dir))
+            if os.path.isfile(os.path.join(corpus_dir, name))
+        ]
+    documents = []
+    for kind in kinds:
+        for size in sizes:
+            path = os.path.join(work_dir, f"bench_compress_{kind}_{size}")
+            generate_document(path, kind, size)
+            documents.append((f"{kind}/{size}", path))
+    return documents
+
+
+def run_compression_benchmark(app, documents, codecs, link_mbps: float, reps: int = 3):
+    """
+    codecs → [(codec, level)]
+
+    Returns:
+        list of {document, size, codec, level, selected, ratio,
+                 compress_ms, decompress_ms, compress_mb_s, link_ms, saved_ms}
+    """
+    from app.services.compression_service import (
+        CompressingReader,
+        DecompressingWriter,
+        choose_codec
+    )
+
+    link_bytes_per_ms = link_mbps * 1e6 / 8 / 1000
+    rows = []
+    for label, path in documents:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            data = f.read()
+
+        for codec, level in codecs:
+            with app.app_context():
+                app.config.update(COMPRESSION_ENABLED=True, COMPRESSION_CODEC=codec, COMPRESSION_LEVEL=level)
+                selected = choose_codec(path) is not None
+
+            compress_samples, compressed = _time_ms(
+                lambda: CompressingReader(io.BytesIO(data), codec, level).read(),
+                reps
+            )
+
+            def decompress():
+                writer = DecompressingWriter(io.BytesIO(), codec)
+                writer.write(compressed)
+                writer.finish()
+
+            decompress_samples, _ = _time_ms(decompress, reps)
+            compress = summarize(compress_samples, size)
+            decompress_ms = summarize(decompress_samples)["p50_ms"]
+
+            link_ms = size / link_bytes_per_ms
+            saved_ms = (size - len(compressed)) / link_bytes_per_ms - compress["p50_ms"] - decompress_ms
+            rows.append({
+                "document": label,
+                "size": size,
+                "codec": codec,
+                "level": level,
+                "selected": selected,
+                "ratio": size / len(compressed) if compressed else 0.0,
+                "compress_ms": compress["p50_ms"],
+                "decompress_ms": decompress_ms,
+                "compress_mb_s": compress["throughput_mb_s"],
+                "link_ms": link_ms,
+                "saved_ms": saved_ms if selected else 0.0
+            })
+    return rows
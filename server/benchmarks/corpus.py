@@ -0,0 +1,159 @@
+import os
+import random
+
+
+# ======================================================
+# Benchmark corpus generation
+# ======================================================
+
+CORPUS_KINDS = ("random", "compressible", "pdf")
+
+_WRITE_CHUNK = 1024 * 1024  # generate documents 1 MB at a time
+
+_SIZE_UNITS = {
+    "B": 1,
+    "K": 1024,
+    "KB": 1024,
+    "M": 1024 ** 2,
+    "MB": 1024 ** 2,
+    "G": 1024 ** 3,
+    "GB": 1024 ** 3,
+}
+
+
+def parse_size(text: str) -> int:
+    """
+    Parses a human size such as "1K", "10MB" or "1G" into bytes.
+    """
+    text = text.strip().upper()
+    for unit in sorted(_SIZE_UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * _SIZE_UNITS[unit])
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    for unit, factor in (("G", 1024 ** 3), ("M", 1024 ** 2), ("K", 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
+
+
+# ------------------------------------------------------
+# Content generators (yield chunks until size is reached)
+# ------------------------------------------------------
+
+def _random_chunks(size: int):
+    remaining = size
+    while remaining > 0:
+        n = min(_WRITE_CHUNK, remaining)
+        yield os.urandom(n)
+        remaining -= n
+
+
+def _compressible_chunks(size: int, seed: int = 0):
+    """
+    CSV-like export rows: highly repetitive text, shrinks well.
+    """
+    rng = random.Random(seed)
+    words = ["invoice", "report", "customer", "amount", "status",
+             "approved", "pending", "region", "north", "south"]
+    remaining = size
+    while remaining > 0:
+        rows = []
+        length = 0
+        while length < min(_WRITE_CHUNK, remaining):
+            row = "{},{},{},{:.2f},{}\n".format(
+                rng.randint(1, 10 ** 6),
+                rng.choice(words),
+                rng.choice(words),
+                rng.random() * 10000,
+                rng.choice(words)
+            )
+            rows.append(row)
+            length += len(row)
+        chunk = "".join(rows).encode("utf-8")[:remaining]
+        yield chunk
+        remaining -= len(chunk)
+
+
+def _pdf_chunks(size: int, seed: int = 0):
+    """
+    PDF-shaped document: text objects interleaved with binary
+    (already-compressed looking) streams, as real PDFs are.
+    """
+    rng = random.Random(seed)
+    trailer = b"\ntrailer\n<< /Root 1 0 R >>\n%%EOF\n"
+    body_size = max(size - len(trailer), 0)
+
+    parts = [b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"]
+    produced = buffered = len(parts[0])
+    obj = 1
+
+    while produced < body_size:
+        stream_len = rng.randint(2048, 16384)
+        piece = (
+            f"{obj} 0 obj\n<< /Type /Page /Contents {obj + 1} 0 R >>\nendobj\n"
+            f"BT /F1 12 Tf 72 712 Td (Page {obj} of benchmark document) Tj ET\n"
+            f"{obj + 1} 0 obj\n<< /Length {stream_len} /Filter /FlateDecode >>\nstream\n"
+        ).encode("ascii") + os.urandom(stream_len) + b"\nendstream\nendobj\n"
+        piece = piece[:body_size - produced]
+        parts.append(piece)
+        produced += len(piece)
+        buffered += len(piece)
+        obj += 2
+
+        if buffered >= _WRITE_CHUNK:
+            yield b"".join(parts)
+            parts = []
+            buffered = 0
+
+    parts.append(trailer)
+    yield b"".join(parts)
+
+
+_GENERATORS = {
+    "random": _random_chunks,
+    "compressible": _compressible_chunks,
+    "pdf": _pdf_chunks,
+}
+
+
+def generate_document(path: str, kind: str, size: int) -> str:
+    """
+    Writes one synthetic document of exactly `size` bytes.
+    """
+    if kind not in _GENERATORS:
+        raise ValueError(f"Unknown corpus kind: {kind}")
+
+    written = 0
+    with open(path, "wb") as f:
+        for chunk in _GENERATORS[kind](size):
+            chunk = chunk[:size - written]
+            f.write(chunk)
+            written += len(chunk)
+            if written >= size:
+                break
+
+    return path
+
+
+def generate_corpus(output_dir: str, sizes, kinds=CORPUS_KINDS):
+    """
+    Generates (or reuses) one document per (kind, size).
+
+    Returns:
+        list of {kind, size, path} sorted by size
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    corpus = []
+
+    for size in sorted(sizes):
+        for kind in kinds:
+            ext = "pdf" if kind == "pdf" else ("csv" if kind == "compressible" else "bin")
+            path = os.path.join(output_dir, f"{kind}_{format_size(size)}.{ext}")
+            if not os.path.exists(path) or os.path.getsize(path) != size:
+                generate_document(path, kind, size)
+            corpus.append({"kind": kind, "size": size, "path": path})
+
+    return corpus
@@ -0,0 +1,66 @@
+import os
+import time
+
+from benchmarks.stats import summarize
+
+
+# ======================================================
+# Signed hash: linear SHA-512 vs parallel Merkle tree
+# ======================================================
+# Both variants hash the encrypted file plus the Kyber ciphertext and
+# produce the 64-byte value Dilithium signs.
+
+def _time_ms(fn, reps: int):
+    samples = []
+    for _ in range(reps):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+    return samples
+
+
+def run_hash_benchmark(work_dir: str, sizes, worker_counts, leaf_size: int, reps: int = 3):
+    """
+    Returns:
+        list of {size, variant, workers, p50_ms, throughput_mb_s, speedup}
+    """
+    from app.services.crypto_service import (
+        compute_hash_from_encrypted_file_and_kyber_ct,
+        compute_merkle_hash_from_encrypted_file_and_kyber_ct
+    )
+
+    kyber_ct = os.urandom(1088)
+
+    rows = []
+    for size in sizes:
+        data_path = os.path.join(work_dir, f"bench_hash_{size}.enc")
+        with open(data_path, "wb") as f:
+            remaining = size
+            while remaining:
+                chunk = min(remaining, 4 * 1024 * 1024)
+                f.write(os.urandom(chunk))
+                remaining -= chunk
+
+        linear = summarize(_time_ms(
+            lambda: compute_hash_from_encrypted_file_and_kyber_ct(data_path, kyber_ct),
+            reps
+        ), size)
+        rows.append({"size": size, "variant": "linear", "workers": 1,
+                     "p50_ms": linear["p50_ms"],
+                     "throughput_mb_s": linear["throughput_mb_s"], "speedup": 1.0})
+
+        for workers in worker_counts:
+            merkle = summarize(_time_ms(
+                lambda: compute_merkle_hash_from_encrypted_file_and_kyber_ct(
+                    data_path, kyber_ct, leaf_size, workers
+                ),
+                reps
+            ), size)
+            rows.append({"size": size, "variant": "merkle", "workers": workers,
+                         "p50_ms": merkle["p50_ms"],
+                         "throughput_mb_s": merkle["throughput_mb_s"],
+                         "speedup": linear["p50_ms"] / merkle["p50_ms"] if merkle["p50_ms"] else 0.0})
+
+        os.remove(data_path)
+
+    return rows
@@ -0,0 +1,73 @@
+import os
+import time
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+
+from benchmarks.stats import summarize
+
+
+# ======================================================
+# Per-document key handling: uncached vs key_cache
+# ======================================================
+# One classical document costs, on top of AES:
+#   sender   → load signing private key, parse receiver RSA public PEM
+#   receiver → load RSA private key, parse sender signing public PEM
+
+def _uncached_private(path):
+    with open(path, "rb") as f:
+        return serialization.load_pem_private_key(f.read(), password=None, backend=default_backend())
+
+
+def _uncached_public_pem(pem: str):
+    return serialization.load_pem_public_key(pem.encode("utf-8"), backend=default_backend())
+
+
+def _time_us(fn, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1e3)
+    return samples
+
+
+def run_key_cache_benchmark(work_dir: str, iterations: int = 200):
+    """
+    Returns:
+        list of {operation, uncached_p50_us, cached_p50_us, saving_us}
+    """
+    from app.services import key_cache
+    from app.services.key_service import write_rsa_key_pair
+
+    private_path = os.path.join(work_dir, "bench_private.pem")
+    public_path = os.path.join(work_dir, "bench_public.pem")
+    write_rsa_key_pair(private_path, public_path)
+    with open(public_path) as f:
+        public_pem = f.read()
+
+    key_cache.invalidate()
+    cases = [
+        ("load private key file",
+         lambda: _uncached_private(private_path),
+         lambda: key_cache.load_private_key_file(private_path)),
+        ("parse peer public PEM",
+         lambda: _uncached_public_pem(public_pem),
+         lambda: key_cache.load_public_key_pem(public_pem)),
+    ]
+
+    rows = []
+    for name, uncached, cached in cases:
+        cached()    # first call parses, like the first document after a rotation
+        before = summarize(_time_us(uncached, iterations))["p50_ms"]
+        after = summarize(_time_us(cached, iterations))["p50_ms"]
+        rows.append({
+            "operation": name,
+            "uncached_p50_us": before,
+            "cached_p50_us": after,
+            "saving_us": before - after
+        })
+
+    os.remove(private_path)
+    os.remove(public_path)
+    return rows
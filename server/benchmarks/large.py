@@ -0,0 +1,120 @@
+import hashlib
+import os
+import resource
+import sys
+import time
+
+import requests
+
+from app.extensions import app_state
+from app.utils.multipart import StreamedMultipartBody
+from benchmarks.corpus import generate_document
+from benchmarks.pipelines import LoopbackServer, wait_for_inbox, setup_pqc_http
+
+
+# ======================================================
+# Large-object transfer: multi-GB document end to end
+# ======================================================
+# Encrypt → send (container) → next-file → download over the loopback
+# server, with the client side streamed from / to disk too, so the peak
+# RSS of this process is the one of the node itself. A node that buffers
+# a whole document anywhere shows up as RSS ≈ document size.
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _elapsed_s(start_ns: int) -> float:
+    return (time.perf_counter_ns() - start_ns) / 1e9
+
+
+def run_large_transfer(app, doc_path: str, work_dir: str) -> dict:
+    """
+    One PQC transfer of doc_path through the HTTP routes.
+
+    Returns:
+        {size, stages (seconds), throughput_mb_s, matches, baseline_rss_mb, peak_rss_mb}
+    """
+    setup_pqc_http(app)
+    app_state.role = "SENDER"
+    size = os.path.getsize(doc_path)
+    out_path = os.path.join(work_dir, "downloaded_" + os.path.basename(doc_path))
+    baseline = peak_rss_mb()
+    stages = {}
+
+    with LoopbackServer(app) as server:
+        base_url = server.base_url
+        total_start = time.perf_counter_ns()
+
+        start = time.perf_counter_ns()
+        body = StreamedMultipartBody([], [("file", os.path.basename(doc_path), doc_path, 0, size)])
+        response = requests.post(
+            f"{base_url}/pqc/encrypt",
+            data=body,
+            headers={"Content-Type": body.content_type}
+        )
+        response.raise_for_status()
+        encrypted = response.json()
+        stages["encrypt"] = _elapsed_s(start)
+
+        start = time.perf_counter_ns()
+        response = requests.post(f"{base_url}/pqc/send-file", json={
+            "receiver_api": base_url,
+            "container_file_name": encrypted["container_file_name"]
+        })
+        response.raise_for_status()
+        stages["send_file"] = _elapsed_s(start)
+
+        # Same node, receiver side: decrypted in the background after the ack
+        app_state.role = "RECEIVER"
+        start = time.perf_counter_ns()
+        wait_for_inbox(base_url, timeout=3600)
+        stages["decrypt_ready"] = _elapsed_s(start)
+
+        start = time.perf_counter_ns()
+        response = requests.post(f"{base_url}/pqc/next-file")
+        response.raise_for_status()
+        entry = response.json()
+        if not entry.get("download_url"):
+            raise RuntimeError("Receiver inlined the file instead of offering a download")
+        with requests.get(base_url + entry["download_url"], stream=True) as response:
+            response.raise_for_status()
+            with open(out_path, "wb") as out:
+                for data in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    out.write(data)
+        stages["download"] = _elapsed_s(start)
+        stages["total"] = _elapsed_s(total_start)
+
+    matches = _sha256_file(out_path) == _sha256_file(doc_path)
+    os.remove(out_path)
+    return {
+        "size": size,
+        "stages": stages,
+        "throughput_mb_s": size / (1024 * 1024) / stages["total"],
+        "matches": matches,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def large_document(work_dir: str, kind: str, size: int) -> str:
+    path = os.path.join(work_dir, f"large_{kind}_{size}.bin")
+    if not os.path.exists(path) or os.path.getsize(path) != size:
+        generate_document(path, kind, size)
+    return path
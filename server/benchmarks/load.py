@@ -0,0 +1,463 @@
+import contextlib
+import os
+import queue
+import random
+import threading
+import time
+
+import requests
+
+from benchmarks.corpus import format_size, generate_document, parse_size
+from benchmarks.pipelines import CLASSICAL_PIPELINE_SUITES, _public_pem
+from benchmarks.serving import ServedNode, bench_app
+from benchmarks.stats import summarize
+
+
+# ======================================================
+# Load generator: sender + receiver stand-in over loopback
+# ======================================================
+# Drives whole documents through the public API, the way the UI does:
+#
+#   sender   POST /pqc/encrypt    → container
+#   sender   POST /pqc/send-file  → receiver POST /pqc/decrypt
+#   receiver POST /pqc/next-file  (polled until a file is READY)
+#
+# (/encrypt, /send-file, /decrypt, /next-file for the classical flows).
+# Both nodes run as local child processes sharing the key folders, so
+# each is the other's peer without a handshake; --sender / --receiver
+# point the generator at nodes that are already paired instead.
+#
+# Arrivals are either a closed loop (`concurrency` clients, each sends
+# its next document when the previous one is through) or an open loop
+# (Poisson arrivals at `rate` documents/s served by at most
+# `concurrency` clients). Open-loop latency runs from the scheduled
+# arrival, so time spent waiting for a free client counts, as it would
+# for a real sender. Document sizes are drawn from a weighted mix.
+#
+# The server-side stage breakdown comes from GET /metrics of both
+# nodes, reset after the warmup (see services/metrics_service.py).
+
+FLOWS = {
+    "pqc": {
+        "encrypt": "/pqc/encrypt",
+        "send_file": "/pqc/send-file",
+        "next_file": "/pqc/next-file",
+        "suite": None
+    },
+    **{
+        name: {
+            "encrypt": "/encrypt",
+            "send_file": "/send-file",
+            "next_file": "/next-file",
+            "suite": suite
+        }
+        for name, suite in CLASSICAL_PIPELINE_SUITES.items()
+    }
+}
+
+OPERATIONS = ("encrypt", "send_file", "next_file")
+NEXT_FILE_POLL_SECONDS = 0.005
+NEXT_FILE_TIMEOUT_SECONDS = 60
+REQUEST_TIMEOUT_SECONDS = 300
+
+
+class LoadError(Exception):
+    """One document failed at `op` (HTTP status or exception name)"""
+
+    def __init__(self, op: str, status):
+        super().__init__(f"{op} failed: {status}")
+        self.op = op
+        self.status = str(status)
+
+
+def parse_mix(text: str) -> list:
+    """
+    "1K:30,64K:50,1M:20" → [(1024, 30.0), (65536, 50.0), (1048576, 20.0)]
+    (a size without a weight counts 1)
+    """
+    mix = []
+    for spec in text.split(","):
+        size, _, weight = spec.partition(":")
+        mix.append((parse_size(size), float(weight or 1)))
+    return mix
+
+
+# ======================================================
+# Nodes
+# ======================================================
+
+def node_app(work_dir: str, role: str, classical_suite: str = None):
+    """
+    App factory of a loopback node: bench_app() in `role`, paired with
+    a node using the same key folders (the keys must already exist).
+    """
+    from app.extensions import app_state
+    from app.services.classical_suite_service import (
+        load_kem_public_key,
+        load_signing_public_key
+    )
+    from app.services.pqc_key_service import load_dilithium_public_key, load_kyber_public_key
+
+    app = bench_app(work_dir)
+    with app.app_context():
+        app_state.role = role
+        if classical_suite:
+            app_state.classical_suite = classical_suite
+            app_state.peer_classical_suite = classical_suite
+            app_state.peer_rsa_public_key = _public_pem(load_kem_public_key(classical_suite))
+            app_state.peer_signature_public_key = _public_pem(load_signing_public_key(classical_suite))
+        else:
+            # PQC peer keys live in the session, not in the key folder
+            app_state.peer_kyber_public_key = load_kyber_public_key()
+            app_state.peer_dilithium_public_key = load_dilithium_public_key()
+            app_state.peer_kem_algorithm = app_state.kem_algorithm
+            app_state.peer_sig_algorithm = app_state.sig_algorithm
+    return app
+
+
+class LoadTarget:
+    """
+    Where the documents go. sender_dir → scratch folder of a local
+    sender, whose classical ciphertexts (not deleted by /send-file)
+    the generator removes.
+    """
+
+    def __init__(self, sender_url: str, receiver_url: str, sender_dir: str = None):
+        self.sender_url = sender_url.rstrip("/")
+        self.receiver_url = receiver_url.rstrip("/")
+        self.sender_dir = sender_dir
+
+
+@contextlib.contextmanager
+def served_pair(flow: str, server: str, workers: int, work_dir: str):
+    """Receiver stand-in and sender for `flow` as child processes."""
+    suite = FLOWS[flow]["suite"]
+    receiver = ServedNode(server, workers, work_dir, f"{flow}_receiver",
+                          "benchmarks.load:node_app", ("RECEIVER", suite))
+    sender = ServedNode(server, workers, work_dir, f"{flow}_sender",
+                        "benchmarks.load:node_app", ("SENDER", suite))
+    with receiver, sender:
+        yield LoadTarget(sender.base_url, receiver.base_url, sender.node_dir)
+
+
+# ======================================================
+# One document through the API
+# ======================================================
+
+def _checked(response, op: str):
+    if response.status_code != 200:
+        raise LoadError(op, response.status_code)
+    return response.json()
+
+
+def _timed(op: str, timings: dict, call):
+    start = time.perf_counter_ns()
+    try:
+        result = call()
+    except requests.RequestException as e:
+        raise LoadError(op, type(e).__name__)
+    timings[op] = (time.perf_counter_ns() - start) / 1e6
+    return result
+
+
+def _next_file(session, target: LoadTarget, path: str):
+    """Polls the receiver until it hands out a file (any sender's), downloads large ones."""
+    deadline = time.monotonic() + NEXT_FILE_TIMEOUT_SECONDS
+    while True:
+        response = session.post(f"{target.receiver_url}{path}", timeout=REQUEST_TIMEOUT_SECONDS)
+        if response.status_code != 204:
+            break
+        if time.monotonic() > deadline:
+            raise LoadError("next_file", "timeout")
+        time.sleep(NEXT_FILE_POLL_SECONDS)
+
+    entry = _checked(response, "next_file")
+    if entry.get("download_url"):
+        with session.get(f"{target.receiver_url}{entry['download_url']}",
+                         stream=True, timeout=REQUEST_TIMEOUT_SECONDS) as download:
+            if download.status_code != 200:
+                raise LoadError("next_file", download.status_code)
+            for _ in download.iter_content(1024 * 1024):
+                pass
+    return entry
+
+
+def run_document(session, flow: str, target: LoadTarget, filename: str, document: bytes) -> dict:
+    """
+    Encrypt → send → next-file for one document.
+
+    Returns:
+        {encrypt, send_file, next_file: ms}, raises LoadError
+    """
+    paths = FLOWS[flow]
+    timings = {}
+
+    encrypted = _timed("encrypt", timings, lambda: _checked(session.post(
+        f"{target.sender_url}{paths['encrypt']}",
+        files={"file": (filename, document)},
+        timeout=REQUEST_TIMEOUT_SECONDS
+    ), "encrypt"))
+
+    if paths["suite"] is None:
+        payload = {
+            "receiver_api": target.receiver_url,
+            "container_file_name": encrypted["container_file_name"]
+        }
+    else:
+        payload = {
+            "receiver_api": target.receiver_url,
+            "encrypted_file_name": encrypted["encrypted_file_name"],
+            "encrypted_aes_key": encrypted["encrypted_aes_key"],
+            "signature": encrypted["signature"],
+            "original_filename": filename,
+            "classical_suite": encrypted["classical_suite"]
+        }
+    try:
+        _timed("send_file", timings, lambda: _checked(session.post(
+            f"{target.sender_url}{paths['send_file']}",
+            json=payload,
+            timeout=REQUEST_TIMEOUT_SECONDS
+        ), "send_file"))
+    finally:
+        if paths["suite"] is not None and target.sender_dir:
+            encrypted_path = os.path.join(
+                target.sender_dir, "encrypted_files", encrypted["encrypted_file_name"]
+            )
+            if os.path.exists(encrypted_path):
+                os.remove(encrypted_path)
+
+    _timed("next_file", timings, lambda: _next_file(session, target, paths["next_file"]))
+    return timings
+
+
+# ======================================================
+# Arrival loops
+# ======================================================
+
+class LoadRecorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.operations = {op: [] for op in OPERATIONS}
+        self.documents = {}      # size → [ms]
+        self.queue_waits = []
+        self.errors = {}         # op → {status: count}
+        self.completed = 0
+        self.failed = 0
+        self.bytes = 0
+        self.not_started = 0
+
+    def success(self, size: int, timings: dict, latency_ms: float, wait_ms: float):
+        with self.lock:
+            for op, ms in timings.items():
+                self.operations[op].append(ms)
+            self.documents.setdefault(size, []).append(latency_ms)
+            self.queue_waits.append(wait_ms)
+            self.completed += 1
+            self.bytes += size
+
+    def failure(self, error: LoadError):
+        with self.lock:
+            by_status = self.errors.setdefault(error.op, {})
+            by_status[error.status] = by_status.get(error.status, 0) + 1
+            self.failed += 1
+
+
+def _document_picker(documents: list, seed: int):
+    """documents: [(size, weight, bytes)] → thread-safe weighted choice"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    weights = [weight for _, weight, _ in documents]
+
+    def pick():
+        with lock:
+            return rng.choices(documents, weights)[0]
+    return pick
+
+
+def _run_arrivals(flow, target, documents, arrival, concurrency, rate, duration, seed):
+    recorder = LoadRecorder()
+    pick = _document_picker(documents, seed)
+    deadline = time.monotonic() + duration
+
+    def one_document(session, scheduled):
+        size, _, document = pick()
+        # Clients of the same document size upload under the same name, concurrently
+        filename = f"load_{format_size(size)}.bin"
+        start = time.monotonic()
+        try:
+            timings = run_document(session, flow, target, filename, document)
+        except LoadError as e:
+            recorder.failure(e)
+            return
+        end = time.monotonic()
+        recorder.success(size, timings, (end - scheduled) * 1000, (start - scheduled) * 1000)
+
+    arrivals = queue.Queue()
+
+    def closed_client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            one_document(session, time.monotonic())
+
+    def open_client():
+        session = requests.Session()
+        while True:
+            scheduled = arrivals.get()
+            if scheduled is None:
+                return
+            one_document(session, scheduled)
+
+    def scheduler():
+        rng = random.Random(seed + 1)
+        next_arrival = time.monotonic()
+        while True:
+            next_arrival += rng.expovariate(rate)
+            if next_arrival >= deadline:
+                break
+            time.sleep(max(0.0, next_arrival - time.monotonic()))
+            arrivals.put(next_arrival)
+        # Arrivals no client picked up in time are reported, not sent late
+        while True:
+            try:
+                arrivals.get_nowait()
+                recorder.not_started += 1
+            except queue.Empty:
+                break
+        for _ in range(concurrency):
+            arrivals.put(None)
+
+    if arrival == "closed":
+        threads = [threading.Thread(target=closed_client) for _ in range(concurrency)]
+    elif arrival == "open":
+        threads = [threading.Thread(target=open_client) for _ in range(concurrency)]
+        threads.append(threading.Thread(target=scheduler))
+    else:
+        raise ValueError(f"Unknown arrival mode: {arrival}")
+
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.monotonic() - start
+
+
+# ======================================================
+# Server-side metrics
+# ======================================================
+
+def _server_get(url: str, path: str):
+    try:
+        response = requests.get(f"{url}{path}", timeout=10)
+        return response.json() if response.status_code == 200 else None
+    except requests.RequestException:
+        return None
+
+
+def _reset_metrics(target: LoadTarget):
+    for url in (target.sender_url, target.receiver_url):
+        try:
+            requests.delete(f"{url}/metrics", timeout=10)
+        except requests.RequestException:
+            pass
+
+
+def server_report(target: LoadTarget) -> dict:
+    """
+    Returns:
+        {sender, receiver: {metrics, admission}}, None where a node
+        does not expose the endpoint
+    """
+    return {
+        node: {
+            "metrics": _server_get(url, "/metrics"),
+            "admission": _server_get(url, "/admission/status")
+        }
+        for node, url in (("sender", target.sender_url), ("receiver", target.receiver_url))
+    }
+
+
+# ======================================================
+# Load test
+# ======================================================
+
+def load_documents(work_dir: str, kind: str, mix: list) -> list:
+    """
+    Returns:
+        [(size, weight, document bytes)]
+    """
+    documents = []
+    os.makedirs(work_dir, exist_ok=True)
+    for size, weight in mix:
+        path = os.path.join(work_dir, f"load_{kind}_{format_size(size)}.bin")
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            generate_document(path, kind, size)
+        with open(path, "rb") as f:
+            documents.append((size, weight, f.read()))
+    return documents
+
+
+def run_load_test(flow: str, target: LoadTarget, documents: list, arrival: str,
+                  concurrency: int, rate: float, duration: float, warmup: float,
+                  seed: int = 0) -> dict:
+    """
+    Returns:
+        {flow, arrival, concurrency, rate, wall_seconds, completed,
+        failed, not_started, docs_per_s, mb_per_s, error_rate,
+        operations: {op: summary}, documents: {size: summary},
+        document: summary, queue_wait: summary, errors, server}
+    """
+    if warmup:
+        _run_arrivals(flow, target, documents, arrival, concurrency, rate, warmup, seed)
+    _reset_metrics(target)
+
+    recorder, wall = _run_arrivals(
+        flow, target, documents, arrival, concurrency, rate, duration, seed + 2
+    )
+    attempted = recorder.completed + recorder.failed
+    return {
+        "flow": flow,
+        "arrival": arrival,
+        "concurrency": concurrency,
+        "rate": rate if arrival == "open" else None,
+        "wall_seconds": wall,
+        "completed": recorder.completed,
+        "failed": recorder.failed,
+        "not_started": recorder.not_started,
+        "docs_per_s": recorder.completed / wall,
+        "mb_per_s": recorder.bytes / (1024 * 1024) / wall,
+        "error_rate": recorder.failed / attempted if attempted else 0.0,
+        "operations": {op: summarize(samples) for op, samples in recorder.operations.items()},
+        "documents": {size: summarize(samples, size) for size, samples in sorted(recorder.documents.items())},
+        "document": summarize([ms for samples in recorder.documents.values() for ms in samples]),
+        "queue_wait": summarize(recorder.queue_waits),
+        "errors": recorder.errors,
+        "server": server_report(target)
+    }
+
+
+def result_rows(result: dict, kind: str) -> list:
+    """
+    Flattens run_load_test() into benchmark result rows (stats.ROW_KEYS),
+    so `python -m benchmarks compare` diffs two load runs.
+    """
+    base = {"pipeline": result["flow"], "mode": result["arrival"], "kind": kind}
+    rows = [{
+        **base, "size": "mix", "stage": "document", **result["document"],
+        "docs_per_s": result["docs_per_s"],
+        "mb_per_s": result["mb_per_s"],
+        "error_rate": result["error_rate"]
+    }]
+    for op, summary in result["operations"].items():
+        rows.append({**base, "size": "mix", "stage": f"http.{op}", **summary})
+    for size, summary in result["documents"].items():
+        rows.append({**base, "size": size, "stage": "document", **summary})
+
+    for node, report in result["server"].items():
+        metrics = report["metrics"]
+        if not metrics:
+            continue
+        for workflow, entry in metrics["workflows"].items():
+            for stage, summary in entry["stages"].items():
+                rows.append({**base, "size": "mix", "stage": f"server.{node}.{workflow}.{stage}", **summary})
+    return rows
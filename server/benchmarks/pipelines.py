@@ -0,0 +1,327 @@
+import os
+import threading
+import time
+
+import requests
+from cryptography.hazmat.primitives import serialization
+from werkzeug.serving import make_server
+
+from app.extensions import app_state
+from app.routes.file_routes import INBOX as CLASSICAL_INBOX
+from app.services.pqc_inbox_service import INBOX as PQC_INBOX
+
+
+# ======================================================
+# Helpers
+# ======================================================
+
+def _elapsed_ms(start_ns: int) -> float:
+    return (time.perf_counter_ns() - start_ns) / 1e6
+
+
+def _remove_quietly(path):
+    try:
+        if path and os.path.exists(path):
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def _public_pem(public_key) -> str:
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode("utf-8")
+
+
+# ======================================================
+# CLASSICAL – in process
+# ======================================================
+# "classical" → RSA-2048 OAEP + RSA-PSS
+# "x25519"    → X25519 + HKDF key wrap + Ed25519
+
+CLASSICAL_PIPELINE_SUITES = {
+    "classical": "RSA-2048",
+    "x25519": "X25519-Ed25519",
+}
+
+
+def _setup_classical_suite(app, suite):
+    from app.services.key_service import (
+        generate_rsa_keys,
+        generate_signature_keys,
+        generate_x25519_keys,
+        generate_ed25519_keys
+    )
+    from app.services.classical_suite_service import (
+        load_kem_private_key,
+        load_kem_public_key,
+        load_signing_private_key,
+        load_signing_public_key
+    )
+
+    if suite == "RSA-2048":
+        generate_rsa_keys()
+        generate_signature_keys()
+    else:
+        generate_x25519_keys()
+        generate_ed25519_keys()
+
+    return {
+        "suite": suite,
+        "rsa_public_pem": _public_pem(load_kem_public_key(suite)),
+        "rsa_private_key": load_kem_private_key(suite),
+        "sign_public_pem": _public_pem(load_signing_public_key(suite)),
+        "sign_private_key": load_signing_private_key(suite),
+    }
+
+
+def setup_classical(app):
+    return _setup_classical_suite(app, CLASSICAL_PIPELINE_SUITES["classical"])
+
+
+def setup_x25519(app):
+    return _setup_classical_suite(app, CLASSICAL_PIPELINE_SUITES["x25519"])
+
+
+def run_classical(app, ctx, doc_path):
+    from app.services.workflow_service import encrypt_file_workflow, decrypt_file_workflow
+
+    stages = {}
+    original_filename = "bench_" + os.path.basename(doc_path)
+
+    with app.app_context():
+        total_start = time.perf_counter_ns()
+        result = encrypt_file_workflow(
+            input_path=doc_path,
+            output_dir=app.config["ENCRYPTED_FOLDER"],
+            rsa_public_key=ctx["rsa_public_pem"],
+            signing_private_key=ctx["sign_private_key"],
+            suite=ctx["suite"]
+        )
+        decrypt_timings = {}
+        decrypted_path = decrypt_file_workflow(
+            encrypted_file_path=result["encrypted_file_path"],
+            encrypted_aes_key=result["encrypted_aes_key"],
+            signature=result["signature"],
+            rsa_private_key=ctx["rsa_private_key"],
+            signer_public_key=ctx["sign_public_pem"],
+            decrypted_output_dir=app.config["DECRYPTED_FOLDER"],
+            original_filename=original_filename,
+            timings=decrypt_timings,
+            suite=ctx["suite"]
+        )
+        stages["total"] = _elapsed_ms(total_start)
+
+    for name, ms in result["timings"].items():
+        if name != "file_name":
+            stages[f"encrypt.{name}"] = ms
+    for name, ms in decrypt_timings.items():
+        if name != "file_name":
+            stages[f"decrypt.{name}"] = ms
+
+    _remove_quietly(result["encrypted_file_path"])
+    _remove_quietly(decrypted_path)
+    return stages
+
+
+# ======================================================
+# PQC (Kyber + Dilithium) – in process
+# ======================================================
+
+def setup_pqc(app):
+    from app.routes.pqc_control_routes import generate_kyber_keys, generate_dilithium_keys
+    from app.services.pqc_param_service import default_algorithm
+    from app.services.pqc_key_service import (
+        load_kyber_public_key,
+        load_dilithium_public_key
+    )
+
+    # One node plays both roles: it is its own peer
+    with app.app_context():
+        generate_kyber_keys(default_algorithm("kem"))
+        generate_dilithium_keys(default_algorithm("sig"))
+        app_state.peer_kyber_public_key = load_kyber_public_key()
+        app_state.peer_dilithium_public_key = load_dilithium_public_key()
+        app_state.peer_kem_algorithm = app_state.kem_algorithm
+        app_state.peer_sig_algorithm = app_state.sig_algorithm
+
+    return {}
+
+
+def run_pqc(app, ctx, doc_path):
+    from app.services.pqc_workflow_service import (
+        pqc_encrypt_file_workflow,
+        pqc_decrypt_file_workflow
+    )
+
+    stages = {}
+    original_filename = "bench_" + os.path.basename(doc_path)
+
+    with app.app_context():
+        total_start = time.perf_counter_ns()
+        enc = pqc_encrypt_file_workflow(doc_path)
+        dec = pqc_decrypt_file_workflow(
+            encrypted_file_path=enc["encrypted_file_path"],
+            signature=enc["signature"],
+            original_filename=original_filename,
+            kyber_ct=enc["kyber_ciphertext"]
+        )
+        stages["total"] = _elapsed_ms(total_start)
+
+    for name, ms in enc["timings"].items():
+        if name != "file_name":
+            stages[f"encrypt.{name}"] = ms
+    for name, ms in dec["timings"].items():
+        if name != "file_name":
+            stages[f"decrypt.{name}"] = ms
+
+    _remove_quietly(enc["encrypted_file_path"])
+    _remove_quietly(dec["decrypted_file_path"])
+    return stages
+
+
+# ======================================================
+# Loopback HTTP – the node is its own receiver stand-in
+# ======================================================
+
+class LoopbackServer:
+    """
+    Serves the Flask app on 127.0.0.1 in a background thread so the
+    sender routes can deliver to the receiver routes of the same node.
+    """
+
+    def __init__(self, app):
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.thread.join()
+
+
+def _drain_queue(collection):
+    while True:
+        entry = app_state.store.pop_first(collection)
+        if entry is None:
+            break
+        _remove_quietly(entry.get("path"))
+
+
+def wait_for_inbox(base_url, timeout=600):
+    """The receiver answers before decrypting: wait until its inbox settles."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        files = requests.get(f"{base_url}/pqc/inbox").json()["files"]
+        if all(f["status"] in ("READY", "FAILED") for f in files):
+            failed = [f for f in files if f["status"] == "FAILED"]
+            if failed:
+                raise RuntimeError(f"Receiver failed to decrypt: {failed[0]['error']}")
+            return files
+        time.sleep(0.005)
+    raise TimeoutError("Receiver inbox did not settle")
+
+
+def _setup_classical_suite_http(ctx):
+    app_state.role = "SENDER"
+    app_state.classical_suite = ctx["suite"]
+    app_state.peer_classical_suite = ctx["suite"]
+    app_state.peer_rsa_public_key = ctx["rsa_public_pem"]
+    app_state.peer_signature_public_key = ctx["sign_public_pem"]
+    return ctx
+
+
+def setup_classical_http(app):
+    return _setup_classical_suite_http(setup_classical(app))
+
+
+def setup_x25519_http(app):
+    return _setup_classical_suite_http(setup_x25519(app))
+
+
+def run_classical_http(app, ctx, doc_path, base_url):
+    stages = {}
+    original_filename = "bench_" + os.path.basename(doc_path)
+
+    total_start = time.perf_counter_ns()
+    with open(doc_path, "rb") as f:
+        start = time.perf_counter_ns()
+        response = requests.post(
+            f"{base_url}/encrypt",
+            files={"file": (os.path.basename(doc_path), f)}
+        )
+        stages["http.encrypt"] = _elapsed_ms(start)
+    response.raise_for_status()
+    encrypted = response.json()
+
+    start = time.perf_counter_ns()
+    response = requests.post(f"{base_url}/send-file", json={
+        "receiver_api": base_url,
+        "encrypted_file_name": encrypted["encrypted_file_name"],
+        "encrypted_aes_key": encrypted["encrypted_aes_key"],
+        "signature": encrypted["signature"],
+        "original_filename": original_filename,
+        "classical_suite": encrypted["classical_suite"]
+    })
+    stages["http.send_file"] = _elapsed_ms(start)
+    response.raise_for_status()
+    stages["total"] = _elapsed_ms(total_start)
+
+    _remove_quietly(os.path.join(app.config["ENCRYPTED_FOLDER"], encrypted["encrypted_file_name"]))
+    _drain_queue(CLASSICAL_INBOX)
+    return stages
+
+
+def setup_pqc_http(app):
+    return setup_pqc(app)
+
+
+def run_pqc_http(app, ctx, doc_path, base_url):
+    stages = {}
+
+    total_start = time.perf_counter_ns()
+    with open(doc_path, "rb") as f:
+        start = time.perf_counter_ns()
+        response = requests.post(
+            f"{base_url}/pqc/encrypt",
+            files={"file": (os.path.basename(doc_path), f)}
+        )
+        stages["http.encrypt"] = _elapsed_ms(start)
+    response.raise_for_status()
+    encrypted = response.json()
+
+    start = time.perf_counter_ns()
+    response = requests.post(f"{base_url}/pqc/send-file", json={
+        "receiver_api": base_url,
+        "container_file_name": encrypted["container_file_name"]
+    })
+    stages["http.send_file"] = _elapsed_ms(start)
+    response.raise_for_status()
+
+    start = time.perf_counter_ns()
+    wait_for_inbox(base_url)
+    stages["http.decrypt_ready"] = _elapsed_ms(start)
+    stages["total"] = _elapsed_ms(total_start)
+
+    _remove_quietly(os.path.join(app.config["ENCRYPTED_FOLDER"], encrypted["container_file_name"]))
+    _drain_queue(PQC_INBOX)
+    return stages
+
+
+# ======================================================
+# Registry
+# ======================================================
+
+PIPELINES = {
+    ("classical", "inprocess"): (setup_classical, run_classical),
+    ("x25519", "inprocess"): (setup_x25519, run_classical),
+    ("pqc", "inprocess"): (setup_pqc, run_pqc),
+    ("classical", "http"): (setup_classical_http, run_classical_http),
+    ("x25519", "http"): (setup_x25519_http, run_classical_http),
+    ("pqc", "http"): (setup_pqc_http, run_pqc_http),
+}
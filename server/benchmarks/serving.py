@@ -0,0 +1,189 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from benchmarks.stats import percentile
+
+
+# ======================================================
+# Serving modes under load
+# ======================================================
+# Starts the node as its own process, either like app.py (Flask dev
+# server, debug mode) or like production (gunicorn.conf.py with N
+# worker processes), and drives /pqc/encrypt from `concurrency`
+# closed-loop clients for `duration` seconds. Requests/second and p99
+# latency per mode show how serving scales with the cores of the host
+# (the clients run on the same host and take their share of the CPU).
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_TIMEOUT_SECONDS = 60
+
+
+def bench_app(work_dir: str):
+    """
+    App factory of the served node: scratch folders and node state in
+    work_dir, no background keygen competing with the measured requests.
+    """
+    from app.config import Config
+
+    Config.UPLOAD_FOLDER = os.path.join(work_dir, "uploads")
+    Config.ENCRYPTED_FOLDER = os.path.join(work_dir, "encrypted_files")
+    Config.DECRYPTED_FOLDER = os.path.join(work_dir, "decrypted_files")
+    Config.STATE_DB_PATH = os.path.join(work_dir, "state", "node_state.db")
+    Config.KEY_POOL_ENABLED = False
+    for folder in (Config.UPLOAD_FOLDER, Config.ENCRYPTED_FOLDER, Config.DECRYPTED_FOLDER):
+        os.makedirs(folder, exist_ok=True)
+
+    from app import create_app
+    return create_app()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServedNode:
+    """
+    The node in a child process: server "dev" (workers ignored) or
+    "gunicorn". Stopped with SIGTERM, like a deployment would.
+
+    factory → "module:function" building the app, called with the
+    node's own directory followed by factory_args (literals only).
+    """
+
+    def __init__(self, server: str, workers: int, work_dir: str, name: str = None,
+                 factory: str = "benchmarks.serving:bench_app", factory_args: tuple = ()):
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.node_dir = os.path.join(work_dir, name or f"{server}_{workers}")
+        os.makedirs(self.node_dir, exist_ok=True)
+        module, function = factory.split(":")
+        call = f"{function}({', '.join(repr(a) for a in (self.node_dir, *factory_args))})"
+
+        if server == "dev":
+            self.command = [
+                sys.executable, "-c",
+                f"from {module} import {function}; "
+                f"{call}.run(host='127.0.0.1', port={self.port}, "
+                "debug=True, use_reloader=False)"
+            ]
+        elif server == "gunicorn":
+            self.command = [
+                sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                "-w", str(workers), "-b", f"127.0.0.1:{self.port}",
+                f"{module}:{call}"
+            ]
+        else:
+            raise ValueError(f"Unknown server: {server}")
+        self.log_path = os.path.join(self.node_dir, "server.log")
+        self.process = None
+
+    def __enter__(self):
+        self.log = open(self.log_path, "w")
+        self.process = subprocess.Popen(
+            self.command, cwd=SERVER_DIR, stdout=self.log, stderr=subprocess.STDOUT
+        )
+        deadline = time.monotonic() + START_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited on startup, see {self.log_path}")
+            try:
+                requests.get(f"{self.base_url}/health", timeout=1)
+                return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.__exit__()
+        raise TimeoutError(f"Server did not start, see {self.log_path}")
+
+    def __exit__(self, *exc):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+
+
+def run_load(base_url: str, doc_path: str, concurrency: int, duration: float) -> dict:
+    """
+    `concurrency` clients each POST the document to /pqc/encrypt again
+    as soon as the previous answer arrives.
+
+    Returns:
+        {requests, rps, p50_ms, p90_ms, p99_ms, status_counts}
+    """
+    with open(doc_path, "rb") as f:
+        document = f.read()
+    filename = os.path.basename(doc_path)
+
+    latencies_ms = []
+    status_counts = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.perf_counter_ns()
+            try:
+                status = session.post(
+                    f"{base_url}/pqc/encrypt", files={"file": (filename, document)}
+                ).status_code
+            except requests.RequestException:
+                status = "error"
+            elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+            with lock:
+                status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+                if status == 200:
+                    latencies_ms.append(elapsed_ms)
+
+    start = time.monotonic()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    wall = time.monotonic() - start
+
+    return {
+        "requests": len(latencies_ms),
+        "rps": len(latencies_ms) / wall,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p90_ms": percentile(latencies_ms, 90),
+        "p99_ms": percentile(latencies_ms, 99),
+        "status_counts": status_counts
+    }
+
+
+def run_serving_benchmark(work_dir: str, doc_path: str, configs: list,
+                          concurrency: int, duration: float, warmup: float) -> list:
+    """
+    configs: [(server, workers), ...]
+
+    Returns:
+        one row per config: run_load() results plus server, workers,
+        concurrency and document size
+    """
+    rows = []
+    for server, workers in configs:
+        with ServedNode(server, workers, work_dir) as node:
+            if warmup:
+                run_load(node.base_url, doc_path, concurrency, warmup)
+            row = run_load(node.base_url, doc_path, concurrency, duration)
+        rows.append({
+            "server": server,
+            "workers": workers,
+            "concurrency": concurrency,
+            "size": os.path.getsize(doc_path),
+            **row
+        })
+    return rows
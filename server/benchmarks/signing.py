@@ -0,0 +1,88 @@
+import contextlib
+import io
+import os
+import threading
+import time
+
+from benchmarks.stats import summarize
+
+
+# ======================================================
+# Dilithium signing: per document vs coalesced
+# ======================================================
+# `concurrency` threads each encrypt `per_thread` small documents back
+# to back through pqc_encrypt_file_workflow, like that many simultaneous
+# /pqc/encrypt requests: signing happens where production signs, as the
+# workflow's Sign_generation stage on the request thread, while the other
+# stages share the stage pool (STAGE_WORKERS).
+
+DOCUMENT_SIZE = 4 * 1024
+
+
+def _run_level(app, concurrency: int, per_thread: int, work_dir: str):
+    from app.services.pqc_workflow_service import pqc_encrypt_file_workflow
+
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def worker(index):
+        doc_path = os.path.join(work_dir, f"sign_doc_{index}.bin")
+        with open(doc_path, "wb") as f:
+            f.write(os.urandom(DOCUMENT_SIZE))
+        with app.app_context():
+            for _ in range(per_thread):
+                start = time.perf_counter_ns()
+                try:
+                    result = pqc_encrypt_file_workflow(doc_path)
+                except Exception as e:
+                    errors.append(e)
+                    return
+                with lock:
+                    latencies.append((time.perf_counter_ns() - start) / 1e6)
+                os.remove(result["encrypted_file_path"])
+        os.remove(doc_path)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter_ns()
+    # The workflow prints a stage report per document
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    wall_s = (time.perf_counter_ns() - start) / 1e9
+    if errors:
+        raise errors[0]
+    return latencies, wall_s
+
+
+def run_sign_benchmark(app, concurrency_levels, per_thread: int, window_ms: float, max_items: int,
+                       work_dir: str):
+    """
+    Returns:
+        list of {mode, concurrency, docs_per_s, p50_ms, p99_ms, signatures}
+        → latencies are whole encrypt workflows
+    """
+    from app.services.coalescing_signer_service import coalescing_signer
+
+    app.config.update(SIGN_COALESCE_WINDOW_MS=window_ms, SIGN_COALESCE_MAX_ITEMS=max_items)
+    rows = []
+    for concurrency in concurrency_levels:
+        for mode, enabled in (("per-document", False), ("coalesced", True)):
+            app.config["SIGN_COALESCE_ENABLED"] = enabled
+            before = coalescing_signer.stats["signatures"]
+            latencies, wall_s = _run_level(app, concurrency, per_thread, work_dir)
+            summary = summarize(latencies)
+            rows.append({
+                "mode": mode,
+                "concurrency": concurrency,
+                "docs_per_s": len(latencies) / wall_s,
+                "p50_ms": summary["p50_ms"],
+                "p99_ms": summary["p99_ms"],
+                "signatures": (
+                    coalescing_signer.stats["signatures"] - before if enabled else len(latencies)
+                )
+            })
+    app.config["SIGN_COALESCE_ENABLED"] = False
+    return rows
@@ -0,0 +1,125 @@
+import csv
+import json
+import math
+import resource
+import sys
+
+
+# ======================================================
+# Summary statistics
+# ======================================================
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(samples, pct: float) -> float:
+    """
+    Nearest-rank percentile (no interpolation, like most load tools).
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples_ms, size_bytes: int = 0) -> dict:
+    """
+    Summarises a list of millisecond samples.
+
+    Throughput is computed from the median so one slow outlier
+    does not dominate it.
+    """
+    summary = {
+        "count": len(samples_ms),
+        "mean_ms": sum(samples_ms) / len(samples_ms) if samples_ms else 0.0,
+        "min_ms": min(samples_ms) if samples_ms else 0.0,
+        "max_ms": max(samples_ms) if samples_ms else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = percentile(samples_ms, pct)
+
+    p50 = summary["p50_ms"]
+    summary["throughput_mb_s"] = (
+        (size_bytes / (1024 * 1024)) / (p50 / 1000) if size_bytes and p50 > 0 else 0.0
+    )
+    return summary
+
+
+def peak_rss_kb() -> int:
+    """
+    High-water mark of resident memory for this process, in KB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+# ======================================================
+# Result files
+# ======================================================
+
+ROW_KEYS = ("pipeline", "mode", "kind", "size", "stage")
+
+
+def row_key(row: dict) -> tuple:
+    return tuple(row[k] for k in ROW_KEYS)
+
+
+def write_json(path: str, meta: dict, rows):
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": rows}, f, indent=2)
+
+
+def write_csv(path: str, rows):
+    rows = [{k: v for k, v in row.items() if k != "samples_ms"} for row in rows]
+    if not rows:
+        open(path, "w").close()
+        return
+
+    fieldnames = list(rows[0].keys())
+    for row in rows:
+        for key in row:
+            if key not in fieldnames:
+                fieldnames.append(key)
+
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(baseline: dict, candidate: dict, metric: str = "p50_ms",
+                    threshold_pct: float = 10.0):
+    """
+    Diffs two result files stage by stage.
+
+    Returns:
+        list of {key, baseline, candidate, change_pct, regression}
+    """
+    base_rows = {row_key(r): r for r in baseline["results"] if metric in r}
+    diffs = []
+
+    for row in candidate["results"]:
+        key = row_key(row)
+        if key not in base_rows or metric not in row:
+            continue
+
+        old = base_rows[key][metric]
+        new = row[metric]
+        change_pct = ((new - old) / old * 100) if old else 0.0
+
+        diffs.append({
+            "key": dict(zip(ROW_KEYS, key)),
+            "baseline": old,
+            "candidate": new,
+            "change_pct": change_pct,
+            "regression": change_pct > threshold_pct,
+        })
+
+    return diffs
@@ -0,0 +1,49 @@
+import os
+
+from app.config import Config
+
+
+# ======================================================
+# Production server: gunicorn -c gunicorn.conf.py
+# ======================================================
+# Worker processes (one per core by default) with SERVE_THREADS request
+# threads each; the CPU-bound work of a worker runs on its shared CPU
+# pool (app/services/cpu_pool_service.py). Node-wide budgets in Config
+# are split between the workers, and with more than one worker the node
+# state moves to the SQLite store so every worker sees the same node.
+#
+# SIGTERM: stop accepting, give in-flight transfers SERVE_GRACEFUL_TIMEOUT
+# seconds, then every worker drains its background work (shutdown_app).
+
+wsgi_app = "wsgi:app"
+bind = Config.SERVE_BIND
+workers = Config.SERVE_WORKERS or os.cpu_count() or 1
+worker_class = "gthread"
+threads = Config.SERVE_THREADS
+graceful_timeout = Config.SERVE_GRACEFUL_TIMEOUT
+keepalive = Config.SERVE_KEEPALIVE
+timeout = 60            # worker heartbeat; long transfers only keep a request thread busy
+preload_app = False     # every worker builds its own app, pools and threads after the fork
+
+
+def on_starting(server):
+    """Runs in the master before the workers are forked (they inherit Config)."""
+    count = server.cfg.workers
+    if count > 1 and Config.STATE_BACKEND == "memory":
+        Config.STATE_BACKEND = "sqlite"
+        server.log.info("Node state: %s, shared by %d workers", Config.STATE_DB_PATH, count)
+
+    if Config.CPU_WORKERS:
+        Config.CPU_WORKERS = max(1, Config.CPU_WORKERS // count)
+    Config.ADMISSION_MAX_JOBS = max(1, Config.ADMISSION_MAX_JOBS // count)
+    Config.ADMISSION_MEMORY_BUDGET_BYTES //= count
+    server.log.info(
+        "Per worker: %d request threads, %d CPU threads, %d admitted jobs, %d MiB job memory",
+        server.cfg.threads, Config.CPU_WORKERS, Config.ADMISSION_MAX_JOBS,
+        Config.ADMISSION_MEMORY_BUDGET_BYTES // (1024 * 1024)
+    )
+
+
+def worker_exit(server, worker):
+    from app import shutdown_app
+    shutdown_app()
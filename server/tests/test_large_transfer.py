@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+# ======================================================
+# Large-object transfer: bounded memory end to end
+# ======================================================
+# Streams a document several times larger than the RSS budget through
+# /pqc/encrypt → /pqc/send-file → receive → /pqc/next-file → download
+# over a loopback server (benchmarks.large), and checks that the
+# download hashes to the original and that the node's peak RSS grew by
+# less than the budget. Runs in a child process so the peak RSS reading
+# is that transfer's alone.
+#
+#   PQDOCSEC_LARGE_TEST_SIZE=4G PQDOCSEC_LARGE_TEST_MAX_RSS_MB=256 \
+#       python -m pytest tests/test_large_transfer.py
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEST_SIZE = os.environ.get("PQDOCSEC_LARGE_TEST_SIZE", "256M")
+MAX_RSS_GROWTH_MB = float(os.environ.get("PQDOCSEC_LARGE_TEST_MAX_RSS_MB", "64"))
+
+CHILD = """
+import contextlib, io, json, sys
+from benchmarks.__main__ import _setup_app
+from benchmarks.corpus import parse_size
+from benchmarks.large import large_document, run_large_transfer
+
+work_dir, size = sys.argv[1], parse_size(sys.argv[2])
+app = _setup_app(work_dir)
+# Small enough that the receiver offers a download instead of inlining it
+app.config["INLINE_FILE_MAX_BYTES"] = 1024 * 1024
+doc_path = large_document(work_dir, "random", size)
+with contextlib.redirect_stdout(io.StringIO()):
+    row = run_large_transfer(app, doc_path, work_dir)
+print(json.dumps(row))
+"""
+
+
+class LargeTransferTest(unittest.TestCase):
+
+    def test_round_trip_in_bounded_memory(self):
+        with tempfile.TemporaryDirectory(prefix="pqdocsec_large_") as work_dir:
+            result = subprocess.run(
+                [sys.executable, "-c", CHILD, work_dir, TEST_SIZE],
+                cwd=SERVER_DIR,
+                env={**os.environ, "PYTHONPATH": SERVER_DIR},
+                capture_output=True,
+                text=True,
+                timeout=3600
+            )
+        self.assertEqual(result.returncode, 0, result.stderr[-4000:])
+        row = json.loads(result.stdout.strip().splitlines()[-1])
+
+        size_mb = row["size"] / (1024 * 1024)
+        self.assertGreaterEqual(size_mb, 3 * MAX_RSS_GROWTH_MB,
+                                "the document must be several times the RSS budget")
+        self.assertTrue(row["matches"], "downloaded file differs from the original")
+        growth_mb = row["peak_rss_mb"] - row["baseline_rss_mb"]
+        self.assertLess(growth_mb, MAX_RSS_GROWTH_MB,
+                        f"peak RSS grew {growth_mb:.0f} MB for a {size_mb:.0f} MB document")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,4 @@
+from app import create_app
+
+# WSGI entry point of the production server: gunicorn -c gunicorn.conf.py
+app = create_app()